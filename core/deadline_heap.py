@@ -0,0 +1,131 @@
+# core/deadline_heap.py
+"""
+可喚醒的到期時間最小堆 - LoopScheduler 與 DeadlineQueue 共用的排程核心
+
+功能：
+- 最小堆維護 (到期時間, 序號, 鍵, 版本號)，版本號不符的堆項目在堆頂時丟棄
+- notify：記錄待處理的通知（首次通知時間），立即喚醒等待者
+- 等待迴圈：睡眠到最早的到期時間、收到通知、超過 max_wait 或關閉為止
+- 時鐘可注入；到期時間可為秒數（monotonic）或 datetime，由子類提供時間差換算
+
+子類負責判斷堆項目是否仍有效（_is_current）以及到期後如何處理（一次性或週期性）。
+"""
+
+import heapq
+import itertools
+import threading
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional, Tuple
+
+
+class DeadlineHeap:
+    """以條件變數等待的到期時間最小堆（基底類別）"""
+
+    def __init__(self, clock: Callable[[], Any]):
+        self._clock = clock
+        self._cond = threading.Condition(threading.Lock())
+        self._heap: List[Tuple[Any, int, Hashable, int]] = []
+        self._seq = itertools.count()
+        self._closed = False
+
+        # 尚未處理的通知：原因 / 來源 -> 首次通知時間
+        self._pending: Dict[str, Any] = {}
+
+        self.stats: Dict[str, Any] = {"wakeups": 0, "idle_wakeups": 0, "notifications": {}}
+
+    # === 子類提供 ===
+
+    def _is_current(self, key: Hashable, generation: int) -> bool:
+        """堆項目是否仍是該鍵目前的到期時間（呼叫者持有鎖）"""
+        raise NotImplementedError
+
+    @staticmethod
+    def _seconds_between(start: Any, end: Any) -> float:
+        """兩個時鐘讀數之間的秒數"""
+        return end - start
+
+    # === 堆操作（呼叫者持有鎖） ===
+
+    def _push(self, due: Any, key: Hashable, generation: int):
+        heapq.heappush(self._heap, (due, next(self._seq), key, generation))
+
+    def _drop_stale(self):
+        """丟棄已取消或已重新設定的堆頂項目"""
+        while self._heap:
+            _, _, key, generation = self._heap[0]
+            if self._is_current(key, generation):
+                return
+            heapq.heappop(self._heap)
+
+    def _head_due(self) -> Optional[Any]:
+        """最早的有效到期時間，沒有項目時返回 None"""
+        self._drop_stale()
+        return self._heap[0][0] if self._heap else None
+
+    def _pop_due(self, now: Any) -> List[Tuple[Any, Hashable, int]]:
+        """取出所有已到期的有效項目 (到期時間, 鍵, 版本號)，依到期時間排序"""
+        due = []
+        self._drop_stale()
+        while self._heap and self._heap[0][0] <= now:
+            due_at, _, key, generation = heapq.heappop(self._heap)
+            due.append((due_at, key, generation))
+            self._drop_stale()
+        return due
+
+    # === 喚醒 ===
+
+    def _notify(self, reasons: Iterable[str]):
+        """記錄通知並喚醒等待者；關閉後忽略"""
+        with self._cond:
+            if self._closed:
+                return
+            now = self._clock()
+            notifications = self.stats["notifications"]
+            for reason in reasons:
+                self._pending.setdefault(reason, now)
+                notifications[reason] = notifications.get(reason, 0) + 1
+            self._cond.notify_all()
+
+    def _wait_locked(self, max_wait: Optional[float]) -> bool:
+        """
+        阻塞到有項目到期、收到通知、超過 max_wait 秒或關閉（呼叫者持有鎖）
+
+        Returns:
+            是否仍在運行（已關閉時返回 False）
+        """
+        started = self._clock()
+        while not self._closed and not self._pending:
+            now = self._clock()
+            head = self._head_due()
+            if head is not None and head <= now:
+                break
+            timeout = self._seconds_between(now, head) if head is not None else None
+            if max_wait is not None:
+                remaining = max_wait - self._seconds_between(started, now)
+                if remaining <= 0:
+                    break
+                timeout = remaining if timeout is None else min(timeout, remaining)
+            self._cond.wait(timeout)
+        return not self._closed
+
+    def _take_pending(self) -> Dict[str, Any]:
+        """取走所有待處理的通知（呼叫者持有鎖）"""
+        pending = dict(self._pending)
+        self._pending.clear()
+        return pending
+
+    def _count_wakeup(self, idle: bool):
+        self.stats["wakeups"] += 1
+        if idle:
+            self.stats["idle_wakeups"] += 1
+
+    # === 生命週期 ===
+
+    def close(self):
+        """關閉並喚醒所有等待者"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
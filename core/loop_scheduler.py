@@ -0,0 +1,174 @@
+# core/loop_scheduler.py
+"""
+主循環排程器 - 以條件變數喚醒取代固定間隔輪詢
+
+功能：
+- 週期性計時器（效能快照、狀態日誌、GC、boredom 等）以最小堆維護下一次到期時間
+- notify(reason)：狀態佇列推入、層級完成事件等外部變化立即喚醒主循環
+- wait()：阻塞到最近的計時器到期或收到通知為止，沒有事情時不佔用 CPU
+- 喚醒次數、計時器觸發、通知來源與「通知 → 處理」延遲統計
+
+堆、通知與等待迴圈由 core.deadline_heap.DeadlineHeap 提供，這裡只處理週期性計時器的重新排程。
+"""
+
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from core.deadline_heap import DeadlineHeap
+from utils.debug_helper import debug_log
+
+
+class _Timer:
+    """週期性計時器"""
+
+    def __init__(self, name: str, interval: float, callback: Optional[Callable[[], None]]):
+        self.name = name
+        self.interval = interval
+        self.callback = callback
+        self.generation = 0  # 重新排程後舊的堆項目作廢
+        self.fire_count = 0
+
+
+class LoopScheduler(DeadlineHeap):
+    """主循環排程器"""
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic):
+        super().__init__(clock)
+        self._timers: Dict[str, _Timer] = {}
+
+        # 統計（idle_wakeups：只因計時器醒來，沒有外部通知）
+        self._started_at = clock()
+        self.stats.update({
+            "timer_fires": {},
+            "latency_count": 0,
+            "latency_total_ms": 0.0,
+            "latency_max_ms": 0.0,
+            "latency_last_ms": 0.0
+        })
+
+    # === 計時器 ===
+
+    def schedule_interval(self, name: str, interval: float,
+                          callback: Optional[Callable[[], None]] = None, first_delay: Optional[float] = None):
+        """註冊（或重新設定）週期性計時器；interval <= 0 視為取消"""
+        with self._cond:
+            timer = self._timers.get(name)
+            if interval is None or interval <= 0:
+                if timer is not None:
+                    timer.generation += 1
+                    del self._timers[name]
+                return
+
+            if timer is None:
+                timer = self._timers[name] = _Timer(name, interval, callback)
+            else:
+                timer.interval = interval
+                if callback is not None:
+                    timer.callback = callback
+                timer.generation += 1
+
+            due = self._clock() + (interval if first_delay is None else first_delay)
+            self._push(due, name, timer.generation)
+            # 新的到期時間可能比目前等待的更早
+            self._cond.notify_all()
+
+    def cancel(self, name: str):
+        """取消計時器"""
+        self.schedule_interval(name, 0)
+
+    def next_due_in(self) -> Optional[float]:
+        """距離最近一個計時器到期的秒數，沒有計時器時返回 None"""
+        with self._cond:
+            head = self._head_due()
+            if head is None:
+                return None
+            return max(head - self._clock(), 0.0)
+
+    def _is_current(self, name: str, generation: int) -> bool:
+        timer = self._timers.get(name)
+        return timer is not None and timer.generation == generation
+
+    # === 喚醒 ===
+
+    def notify(self, reason: str = "event"):
+        """外部狀態變化，立即喚醒等待中的主循環"""
+        self._notify((reason,))
+
+    def wait(self, max_wait: Optional[float] = None) -> Tuple[List[_Timer], List[str]]:
+        """
+        阻塞到有計時器到期或收到通知
+
+        Returns:
+            (到期的計時器, 通知原因)；排程器關閉後返回兩個空列表
+        """
+        with self._cond:
+            if not self._wait_locked(max_wait):
+                return [], []
+
+            now = self._clock()
+            due: List[_Timer] = []
+            expired = self._pop_due(now)
+            for due_at, name, generation in expired:
+                timer = self._timers[name]
+                timer.fire_count += 1
+                fires = self.stats["timer_fires"]
+                fires[name] = fires.get(name, 0) + 1
+                due.append(timer)
+                # 以原到期時間推進，落後過多時從現在重新起算，避免補跑一連串
+                next_due = due_at + timer.interval
+                if next_due <= now:
+                    next_due = now + timer.interval
+                self._push(next_due, name, generation)
+
+            pending = self._take_pending()
+            if pending:
+                self._record_latency((now - min(pending.values())) * 1000)
+
+            self._count_wakeup(idle=not pending)
+            return due, list(pending)
+
+    def _record_latency(self, latency_ms: float):
+        """記錄通知到被主循環取走的延遲（呼叫者持有鎖）"""
+        self.stats["latency_count"] += 1
+        self.stats["latency_total_ms"] += latency_ms
+        self.stats["latency_last_ms"] = latency_ms
+        if latency_ms > self.stats["latency_max_ms"]:
+            self.stats["latency_max_ms"] = latency_ms
+
+    def run_due(self, timers: List[_Timer]):
+        """依序執行到期計時器的回調，單一回調失敗不影響其他回調"""
+        for timer in timers:
+            if timer.callback is None:
+                continue
+            try:
+                timer.callback()
+            except Exception as e:
+                debug_log(1, f"[LoopScheduler] 計時器 {timer.name} 執行失敗: {e}")
+
+    # === 生命週期 ===
+
+    def reset(self):
+        """重新開始（主循環重新啟動時使用），保留已註冊的計時器並重新計時"""
+        with self._cond:
+            self._closed = False
+            self._pending.clear()
+            self._heap.clear()
+            now = self._clock()
+            for timer in self._timers.values():
+                timer.generation += 1
+                self._push(now + timer.interval, timer.name, timer.generation)
+            self._started_at = now
+
+    def get_stats(self) -> Dict[str, Any]:
+        """獲取喚醒與延遲統計"""
+        with self._cond:
+            elapsed = max(self._clock() - self._started_at, 1e-9)
+            stats = dict(self.stats)
+            stats["notifications"] = dict(self.stats["notifications"])
+            stats["timer_fires"] = dict(self.stats["timer_fires"])
+            stats["timers"] = {name: timer.interval for name, timer in self._timers.items()}
+            stats["wakeups_per_second"] = stats["wakeups"] / elapsed
+            stats["idle_wakeups_per_second"] = stats["idle_wakeups"] / elapsed
+            stats["latency_avg_ms"] = (stats["latency_total_ms"] / stats["latency_count"]
+                                       if stats["latency_count"] else 0.0)
+            return stats
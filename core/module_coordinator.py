@@ -1238,13 +1238,19 @@ class ModuleInvocationCoordinator:
     
     def _prepare_output_input(self, processing_data: Dict[str, Any]) -> Dict[str, Any]:
         """準備輸出層（TTS）輸入"""
-        return {
+        output_input = {
             "text": processing_data.get('response', processing_data.get('text', '')),
             "source": "three_layer_coordinator",
             "output_mode": "voice",
             "timestamp": time.time(),
             "processing_result": processing_data
         }
+        # LLM 已將回應串流給 TTS 合成時，輸出層只需等待該串流完成
+        llm_output = processing_data.get('llm_output') or {}
+        tts_stream_id = (llm_output.get('metadata') or {}).get('tts_stream_id') if isinstance(llm_output, dict) else None
+        if tts_stream_id:
+            output_input["stream_id"] = tts_stream_id
+        return output_input
     
     def _prepare_module_input(self, target_module: str, input_data: Dict[str, Any]) -> Dict[str, Any]:
         """為特定模組準備輸入數據（通用方法）"""
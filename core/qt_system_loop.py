@@ -69,9 +69,10 @@ class CoreLoopThread(QThread):
             info_log("[CoreLoopThread] ✅ SystemLoop 已在 QThread 中啟動")
             
             # 保持線程活躍，等待停止信號
-            # SystemLoop 內部有自己的 loop_thread，我們只需要等待
+            # SystemLoop 內部有自己的 loop_thread，我們只需要等待；stop() 會設置 stop_event 立即喚醒
             while self._is_running and not self.isInterruptionRequested():
-                self.msleep(100)  # 100ms 檢查一次
+                if self.system_loop.stop_event.wait(1.0):
+                    break  # SystemLoop 已停止
             
             info_log("[CoreLoopThread] 🛑 收到停止信號，準備停止...")
             
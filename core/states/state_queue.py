@@ -95,6 +95,9 @@ class StateQueueManager:
         self.state_handlers: Dict[UEPState, Callable] = {}
         self.completion_handlers: Dict[UEPState, Callable] = {}
         
+        # 佇列變化監聽器（SystemLoop 以此喚醒主循環，取代輪詢）
+        self._change_listeners: List[Callable[[], None]] = []
+        
         # 會話管理 - 延遲導入避免循環依賴
         self._session_manager = None
         
@@ -116,6 +119,18 @@ class StateQueueManager:
         self.completion_handlers[state] = handler
         debug_log(2, f"[StateQueue] 註冊完成處理器: {state.name}")
     
+    def add_change_listener(self, listener: Callable[[], None]):
+        """註冊佇列變化監聽器（添加、推進、完成、清空時調用）"""
+        self._change_listeners.append(listener)
+    
+    def _notify_change(self):
+        """通知所有佇列變化監聽器"""
+        for listener in list(self._change_listeners):
+            try:
+                listener()
+            except Exception as e:
+                debug_log(1, f"[StateQueue] 佇列變化監聽器執行失敗: {e}")
+    
     def _register_default_handlers(self):
         """註冊默認的狀態處理器"""
         # 註冊 CHAT 狀態處理器
@@ -538,6 +553,7 @@ class StateQueueManager:
         
         # 保存佇列
         self._save_queue()
+        self._notify_change()
         
         # ✅ 如果當前是 IDLE 狀態，自動處理下一個狀態
         if self.current_state == UEPState.IDLE and not self.current_item:
@@ -823,6 +839,7 @@ class StateQueueManager:
             debug_log(4, f"[StateQueue] 狀態 {next_item.state.value} 沒有註冊處理器")
         
         self._save_queue()
+        self._notify_change()
         return True
     
     def complete_current_state(self, success: bool = True, result_data: Optional[Dict[str, Any]] = None,
@@ -899,6 +916,7 @@ class StateQueueManager:
         # 否則 current_state 保持原樣，等待 SystemLoop 推進
         
         self._save_queue()
+        self._notify_change()
     
     def _transition_to_idle(self):
         """切換到IDLE狀態"""
@@ -988,6 +1006,7 @@ class StateQueueManager:
         
         # 保存空狀態到檔案
         self._save_queue()
+        self._notify_change()
     
     def _save_queue(self):
         """保存佇列到檔案"""
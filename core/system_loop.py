@@ -20,6 +20,7 @@ from typing import Dict, Any, Optional, Callable
 from enum import Enum
 
 from utils.debug_helper import debug_log, info_log, error_log, OPERATION_LEVEL
+from core.loop_scheduler import LoopScheduler
 
 
 class LoopStatus(Enum):
@@ -67,6 +68,13 @@ class SystemLoop:
         self.last_status_log_time = 0
         self.snapshot_interval = 5.0  # 5秒間隔蒐集效能快照
         self.status_log_interval = 10.0  # 10秒間隔輸出狀態日誌
+        self.boredom_interval = 60.0  # 60秒間隔更新 boredom
+        
+        # 事件驅動排程：狀態變化與層級完成事件立即喚醒，計時器以最小堆排程
+        # idle_heartbeat 為保底的狀態監控間隔（涵蓋沒有事件通知的旗標變化）
+        system_config = self.config.get("system", {}) or {}
+        self.idle_heartbeat = system_config.get("idle_heartbeat", 1.0)
+        self.scheduler = LoopScheduler()
         
         # 🔧 Cycle 層級的處理/輸出追蹤（確保所有輸出完成後才發布 CYCLE_COMPLETED）
         # 格式: {"session_id:cycle_index": {"processing_count": int, "output_count": int}}
@@ -98,6 +106,9 @@ class SystemLoop:
         
         # ✅ 訂閱事件總線
         self._setup_event_subscriptions()
+        
+        # ✅ 狀態變化喚醒主循環
+        self._setup_wakeup_sources()
     
     def _setup_event_subscriptions(self):
         """設置事件訂閱"""
@@ -143,6 +154,62 @@ class SystemLoop:
         except Exception as e:
             error_log(f"[SystemLoop] 事件訂閱失敗: {e}")
     
+    def _setup_wakeup_sources(self):
+        """註冊喚醒來源：狀態管理器、狀態佇列與會影響循環推進的事件"""
+        try:
+            from core.event_bus import event_bus, SystemEvent
+            from core.states.state_manager import state_manager
+            from core.states.state_queue import get_state_queue_manager
+            
+            state_manager.add_state_change_callback(
+                lambda old_state, new_state: self.wake("state_changed")
+            )
+            get_state_queue_manager().add_change_listener(
+                lambda: self.wake("state_queue")
+            )
+            
+            for event_type in (
+                SystemEvent.INPUT_LAYER_COMPLETE,
+                SystemEvent.PROCESSING_LAYER_COMPLETE,
+                SystemEvent.OUTPUT_LAYER_COMPLETE,
+                SystemEvent.STATE_ADVANCED,
+                SystemEvent.CYCLE_COMPLETED,
+                SystemEvent.SESSION_STARTED,
+                SystemEvent.SESSION_ENDED,
+                SystemEvent.WORKFLOW_REQUIRES_INPUT,
+                SystemEvent.WORKFLOW_INPUT_COMPLETED,
+            ):
+                event_bus.subscribe(
+                    event_type,
+                    lambda event, reason=event_type.value: self.wake(reason),
+                    handler_name=f"SystemLoop.wake.{event_type.value}"
+                )
+            
+            debug_log(2, "[SystemLoop] ✅ 已註冊主循環喚醒來源")
+            
+        except Exception as e:
+            error_log(f"[SystemLoop] 註冊喚醒來源失敗: {e}")
+    
+    def wake(self, reason: str = "event"):
+        """喚醒主循環立即檢查狀態（可由任意線程調用）"""
+        self.scheduler.notify(reason)
+    
+    def _register_loop_timers(self):
+        """註冊主循環的週期性計時器"""
+        self.scheduler.schedule_interval("snapshot", self.snapshot_interval, self._collect_performance_snapshot)
+        self.scheduler.schedule_interval("status_log", self.status_log_interval, self._log_system_status)
+        self.scheduler.schedule_interval("gc", self.gc_interval, self._run_gc)
+        self.scheduler.schedule_interval("boredom", self.boredom_interval, self._update_boredom_level)
+        # 保底監控：回調為空，由主循環在到期時執行狀態監控
+        self.scheduler.schedule_interval("monitor", self.idle_heartbeat)
+    
+    def _run_gc(self):
+        """P1: 定期觸發 GC"""
+        import gc
+        collected = gc.collect()
+        debug_log(3, f"[SystemLoop] GC 觸發，回收 {collected} 個物件")
+        self.last_gc_time = time.time()
+    
     def _start_event_bus(self):
         """啟動事件總線處理線程"""
         try:
@@ -458,6 +525,8 @@ class SystemLoop:
             self.start_time = time.time()
             self.last_snapshot_time = time.time()
             self.last_status_log_time = time.time()
+            self._register_loop_timers()
+            self.scheduler.reset()
             
             # 啟動循環線程
             self.loop_thread = threading.Thread(target=self._main_loop, daemon=True)
@@ -493,8 +562,9 @@ class SystemLoop:
             info_log("🛑 停止系統主循環...")
             self.status = LoopStatus.STOPPING
             
-            # 設置停止事件
+            # 設置停止事件並喚醒等待中的主循環
             self.stop_event.set()
+            self.scheduler.close()
             
             # 等待循環線程結束（增加超時時間至 10 秒）
             if self.loop_thread and self.loop_thread.is_alive():
@@ -709,38 +779,23 @@ class SystemLoop:
         info_log("🔄 主循環線程已啟動")
         
         try:
+            # 啟動後先檢查一次狀態（可能已有持久化的佇列項目）
+            self.wake("loop_started")
+            
             while not self.stop_event.is_set():
-                current_time = time.time()
+                # 阻塞到計時器到期或收到狀態變化通知
+                due_timers, wake_reasons = self.scheduler.wait()
+                if self.stop_event.is_set():
+                    break
                 
-                # 檢查是否需要蒐集效能快照
-                if current_time - self.last_snapshot_time >= self.snapshot_interval:
-                    self._collect_performance_snapshot()
-                    self.last_snapshot_time = current_time
+                # 效能快照、狀態日誌、GC、boredom 等到期計時器
+                self.scheduler.run_due(due_timers)
                 
-                # 檢查是否需要輸出狀態日誌
-                if current_time - self.last_status_log_time >= self.status_log_interval:
-                    self._log_system_status()
-                    self.last_status_log_time = current_time
-                
-                # P1: 定期觸發 GC
-                if self.gc_interval > 0 and current_time - self.last_gc_time >= self.gc_interval:
-                    import gc
-                    collected = gc.collect()
-                    debug_log(3, f"[SystemLoop] GC 觸發，回收 {collected} 個物件")
-                    self.last_gc_time = current_time
-                
-                # 定期更新 boredom（每60秒檢查一次）
-                if not hasattr(self, 'last_boredom_update_time'):
-                    self.last_boredom_update_time = current_time
-                if current_time - self.last_boredom_update_time >= 60:
-                    self._update_boredom_level()
-                    self.last_boredom_update_time = current_time
-                
-                # 檢查系統狀態變化
-                self._monitor_system_state()
-                
-                # 短暫休眠避免占用過多 CPU
-                time.sleep(0.1)
+                # 狀態變化通知或保底心跳時檢查系統狀態
+                if wake_reasons or any(timer.name == "monitor" for timer in due_timers):
+                    if wake_reasons:
+                        debug_log(4, f"[SystemLoop] 主循環喚醒: {wake_reasons}")
+                    self._monitor_system_state()
                 
         except Exception as e:
             error_log(f"❌ 主循環執行錯誤: {e}")
@@ -802,19 +857,9 @@ class SystemLoop:
                 return
             
             # 檢查狀態佇列是否有新項目
+            # 不再於此休眠：下一次檢查由狀態變化通知或保底心跳觸發
             if queue_size > 0:
                 debug_log(3, f"[SystemLoop] 檢測到狀態佇列活動: {queue_size} 項目")
-                        
-                # 在非IDLE狀態添加等待機制，避免CPU過度使用
-                if current_state in [UEPState.CHAT, UEPState.WORK]:
-                    # 檢查是否有活躍的模組處理
-                    active_modules = self._check_active_modules()
-                    if not active_modules:
-                        # 沒有活躍模組，增加等待時間
-                        time.sleep(0.5)
-                    else:
-                        # 有活躍模組，短暫等待
-                        time.sleep(0.2)
             
             # 檢查是否在IDLE狀態（包括一直保持IDLE的情況）
             elif current_state == UEPState.IDLE and hasattr(self, '_previous_state'):
@@ -974,6 +1019,9 @@ class SystemLoop:
             "output_completed": False
         }
         self.current_cycle_start_time = None
+        
+        # 循環完成後立即檢查 IDLE 重啟輸入與狀態推進
+        self.wake("cycle_completed")
     
     def _check_active_modules(self) -> bool:
         """檢查是否有活躍的模組在處理"""
@@ -995,6 +1043,7 @@ class SystemLoop:
     
     def _log_system_status(self):
         """定期輸出系統運行狀態"""
+        self.last_status_log_time = time.time()
         try:
             from core.framework import core_framework
             from core.states.state_manager import state_manager
@@ -1058,6 +1107,7 @@ class SystemLoop:
     
     def _collect_performance_snapshot(self):
         """蒐集系統效能快照"""
+        self.last_snapshot_time = time.time()
         try:
             from core.framework import core_framework
             
@@ -1127,7 +1177,8 @@ class SystemLoop:
             "processing_cycles": self.processing_cycles,
             "uptime": uptime,
             "is_running": self.status == LoopStatus.RUNNING,
-            "thread_alive": self.loop_thread.is_alive() if self.loop_thread else False
+            "thread_alive": self.loop_thread.is_alive() if self.loop_thread else False,
+            "scheduler": self.scheduler.get_stats()
         }
     
     def pause(self) -> bool:
@@ -1425,6 +1476,7 @@ class SystemLoop:
         try:
             if key_path == "advanced.performance.gc_interval":
                 self.gc_interval = value
+                self.scheduler.schedule_interval("gc", value, self._run_gc)
                 info_log(f"[SystemLoop] GC 間隔已更新: {value}秒")
                 return True
             elif key_path == "interaction.proactivity.allow_system_initiative":
@@ -0,0 +1,7 @@
+"""
+Benchmarks Package
+==================
+
+離線效能基準測試腳本，每個檔案可直接以 `python -m devtools.benchmarks.<name>` 執行。
+這些腳本使用合成資料，不需要載入完整系統或真實模型。
+"""
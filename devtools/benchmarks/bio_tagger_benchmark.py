@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+"""
+BIOTagger 推論基準測試 - fp32 vs int8、批次大小 1/8/32
+
+從 train/nlp 的標註資料取 N 句語句，停用結果快取後以 predict_batch
+逐批推論，回報每句平均延遲與吞吐量（句 / 秒），並回報 int8 與 fp32
+分段結果（意圖與邊界）的一致率。
+
+需要已訓練的 BIO 模型（預設 models/nlp/bio_tagger）。
+
+用法:
+    python -m devtools.benchmarks.bio_tagger_benchmark [--utterances 256] [--batch-sizes 1 8 32] [--threads 4]
+"""
+
+import argparse
+import json
+import time
+from pathlib import Path
+
+import torch
+
+from modules.nlp_module.bio_tagger import BIOTagger
+
+
+def _load_utterances(paths, limit):
+    texts = []
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    texts.append(json.loads(line)["text"])
+                if len(texts) >= limit:
+                    return texts
+    return texts
+
+
+def _run(tagger: BIOTagger, texts, batch_size: int, repeats: int):
+    tagger.predict_batch(texts[:batch_size], batch_size=batch_size)  # 暖機
+    start = time.perf_counter()
+    for _ in range(repeats):
+        results = tagger.predict_batch(texts, batch_size=batch_size)
+    wall = (time.perf_counter() - start) / repeats
+    return results, wall
+
+
+def _signature(segments):
+    return [(s["intent"], s["start_pos"], s["end_pos"]) for s in segments]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="BIOTagger 推論基準測試")
+    parser.add_argument("--model-path", default="models/nlp/bio_tagger")
+    parser.add_argument("--data", nargs="+", default=["train/nlp/nlp_training_data.jsonl"])
+    parser.add_argument("--utterances", type=int, default=256)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--threads", type=int, default=None, help="torch CPU 執行緒數")
+    args = parser.parse_args()
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+    if not Path(args.model_path).exists():
+        raise SystemExit(f"找不到 BIO 模型: {args.model_path}")
+
+    texts = _load_utterances(args.data, args.utterances)
+    print(f"語句數: {len(texts)}，平均長度 {sum(map(len, texts)) / len(texts):.1f} 字元")
+
+    reference = None
+    print(f"{'model':>6}{'batch':>7}{'ms / utt':>11}{'utt / s':>10}{'agree':>9}")
+    for quantization in ("none", "int8"):
+        tagger = BIOTagger(quantization=quantization, cache_size=0)
+        tagger.load_model(args.model_path)
+        label = "fp32" if quantization == "none" else "int8"
+        for batch_size in args.batch_sizes:
+            results, wall = _run(tagger, texts, batch_size, args.repeats)
+            signatures = [_signature(r) for r in results]
+            if reference is None:
+                reference = signatures
+            agree = sum(a == b for a, b in zip(signatures, reference)) / len(texts)
+            print(f"{label:>6}{batch_size:>7}{wall / len(texts) * 1000:>11.2f}"
+                  f"{len(texts) / wall:>10.1f}{agree:>9.1%}")
+
+
+if __name__ == "__main__":
+    main()
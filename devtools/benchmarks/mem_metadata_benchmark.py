@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+"""
+元資料後端基準測試 - JSON vs SQLite
+
+對同一份合成記憶資料，分別量測：
+- 單筆更新（含自動儲存）的延遲：JSON 後端每次整檔重寫，SQLite 後端單列更新
+- 帶過濾條件（令牌 + 類型 + 重要性 + 時間範圍）的查詢延遲
+- SQLite 首次啟動時從 JSON 遷移的耗時
+
+用法:
+    python -m devtools.benchmarks.mem_metadata_benchmark [--sizes 1000 10000] [--updates 50] [--queries 200]
+"""
+
+import argparse
+import json
+import shutil
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+
+from modules.mem_module.storage.metadata_storage import MetadataStorageManager
+from modules.mem_module.storage.sqlite_metadata_storage import SQLiteMetadataStorageManager
+
+TOKENS = [f"bench_token_{i}" for i in range(4)]
+TYPES = ["snapshot", "long_term", "profile", "preference"]
+IMPORTANCE = ["low", "medium", "high"]
+
+
+def write_json_fixture(path: Path, size: int, rng: np.random.Generator):
+    """寫出合成的 JSON 元資料檔"""
+    base = datetime.now() - timedelta(days=365)
+    memories = []
+    for i in range(size):
+        memories.append({
+            "memory_id": f"mem_{i}",
+            "memory_token": TOKENS[i % len(TOKENS)],
+            "memory_type": TYPES[int(rng.integers(len(TYPES)))],
+            "importance": IMPORTANCE[int(rng.integers(len(IMPORTANCE)))],
+            "content": f"synthetic memory content {i} " * 4,
+            "topic": "bench",
+            "created_at": (base + timedelta(minutes=int(rng.integers(525600)))).isoformat(),
+            "access_count": 0,
+        })
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"version": "2.0", "memories": memories}, f, ensure_ascii=False)
+
+
+def time_updates(manager, size: int, count: int, rng: np.random.Generator) -> float:
+    """平均單筆更新延遲（毫秒）"""
+    start = time.perf_counter()
+    for _ in range(count):
+        manager.update_memory(f"mem_{int(rng.integers(size))}", {"access_count": 1})
+    return (time.perf_counter() - start) * 1000 / count
+
+
+def time_queries(manager, count: int) -> float:
+    """平均過濾查詢延遲（毫秒）"""
+    now = datetime.now()
+    filters = {
+        "memory_types": ["snapshot", "profile"],
+        "importance_filter": ["high"],
+        "time_range": {"start": now - timedelta(days=30), "end": now},
+        "include_archived": False,
+    }
+    start = time.perf_counter()
+    for i in range(count):
+        manager.search_memories(TOKENS[i % len(TOKENS)], filters)
+    return (time.perf_counter() - start) * 1000 / count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="元資料後端基準測試")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--updates", type=int, default=50)
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(7)
+    print(f"\n📊 元資料後端基準測試 ({args.updates} 次更新, {args.queries} 次查詢)")
+    print("=" * 78)
+    print(f"{'記憶數':>8} | {'後端':>6} | {'更新 (ms)':>10} | {'查詢 (ms)':>10} | {'啟動/遷移 (ms)':>14}")
+    print("-" * 78)
+
+    for size in args.sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            json_file = Path(tmp) / "json" / "mem_metadata.json"
+            write_json_fixture(json_file, size, rng)
+            sqlite_json = Path(tmp) / "sqlite" / "mem_metadata.json"
+            sqlite_json.parent.mkdir(parents=True)
+            shutil.copy(json_file, sqlite_json)
+
+            for name, factory, path in (
+                ("json", MetadataStorageManager, json_file),
+                ("sqlite", SQLiteMetadataStorageManager, sqlite_json),
+            ):
+                start = time.perf_counter()
+                manager = factory({"metadata_file": str(path)})
+                manager.initialize()
+                init_ms = (time.perf_counter() - start) * 1000
+
+                update_ms = time_updates(manager, size, args.updates, rng)
+                query_ms = time_queries(manager, args.queries)
+                print(f"{size:>8} | {name:>6} | {update_ms:>10.2f} | {query_ms:>10.3f} | {init_ms:>14.1f}")
+
+                if hasattr(manager, "close"):
+                    manager.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+"""
+記憶檢索基準測試 - FAISS索引路徑 vs 全量餘弦比對
+
+以合成的正規化向量填充 MemoryStorageManager，比較兩種檢索模式在
+1k / 10k / 100k 條記憶下的單次查詢延遲。
+
+用法:
+    python -m devtools.benchmarks.mem_search_benchmark [--sizes 1000 10000] [--queries 50]
+"""
+
+import argparse
+import tempfile
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+from modules.mem_module.schemas import MemoryQuery, MemoryType
+from modules.mem_module.storage.storage_manager import MemoryStorageManager
+
+DIMENSION = 384
+TOKENS = ["bench_token_a", "bench_token_b"]
+
+
+class _AllowAllIdentity:
+    """基準測試用的身份管理器，略過權限檢查"""
+
+    def initialize(self):
+        return True
+
+    def validate_memory_token(self, memory_token):
+        return True
+
+    def check_operation_permission(self, memory_token, operation):
+        return True
+
+    def get_stats(self):
+        return {}
+
+
+class _LookupEncoder:
+    """以查詢文本查表回傳預先生成的向量，排除模型推論時間"""
+
+    def __init__(self, table):
+        self.table = table
+
+    def encode(self, text, convert_to_numpy=True, **kwargs):
+        if isinstance(text, list):
+            return np.vstack([self.table[t] for t in text])
+        return self.table[text]
+
+
+def build_storage(base_dir: Path, size: int, rng: np.random.Generator) -> MemoryStorageManager:
+    """建立並批次填充存儲管理器"""
+    storage = MemoryStorageManager({
+        "vector": {"index_file": str(base_dir / "index"), "vector_dimension": DIMENSION},
+        "metadata": {"metadata_file": str(base_dir / "meta.json"), "auto_backup": False},
+    }, identity_manager=_AllowAllIdentity())
+    storage.metadata_manager.initialize()
+    storage.vector_manager.initialize()
+
+    vectors = rng.standard_normal((size, DIMENSION)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    memory_types = [MemoryType.SNAPSHOT.value, MemoryType.LONG_TERM.value]
+    now = datetime.now().isoformat()
+
+    memory_ids = []
+    for i in range(size):
+        memory_id = f"mem_{uuid.uuid4().hex}"
+        memory_ids.append(memory_id)
+        storage.metadata_manager.metadata_cache.append({
+            "memory_id": memory_id,
+            "memory_token": TOKENS[i % len(TOKENS)],
+            "memory_type": memory_types[i % len(memory_types)],
+            "content": f"synthetic memory {i}",
+            "importance": "medium",
+            "created_at": now,
+            "access_count": 0,
+        })
+    storage.metadata_manager._rebuild_cache_indexes()
+    storage.metadata_manager.embedding_store.put_many(memory_ids, vectors)
+    storage.vector_manager.add_vectors(vectors.copy(), memory_ids)
+    storage._rebuild_index_mapping()
+    storage._index_consistent = True
+    storage.is_initialized = True
+    return storage
+
+
+def run_queries(storage: MemoryStorageManager, mode: str, queries: list) -> float:
+    """執行查詢並返回平均延遲（毫秒）"""
+    storage.retrieval_mode = mode
+    storage.embedding_service.clear_cache()  # 兩種模式都從冷快取開始
+    start = time.perf_counter()
+    for query_text in queries:
+        storage.search_memories(MemoryQuery(
+            memory_token=TOKENS[0],
+            query_text=query_text,
+            memory_types=[MemoryType.SNAPSHOT],
+            max_results=10,
+            similarity_threshold=0.0,
+        ))
+    return (time.perf_counter() - start) * 1000 / len(queries)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="記憶檢索基準測試")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--queries", type=int, default=50)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    print(f"\n📊 記憶檢索基準測試 (維度 {DIMENSION}, 每組 {args.queries} 次查詢)")
+    print("=" * 60)
+    print(f"{'記憶數':>10} | {'brute_force (ms)':>18} | {'index (ms)':>12} | {'加速':>8}")
+    print("-" * 60)
+
+    for size in args.sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            storage = build_storage(Path(tmp), size, rng)
+            query_vectors = rng.standard_normal((args.queries, DIMENSION)).astype(np.float32)
+            table = {f"q{i}": vec for i, vec in enumerate(query_vectors)}
+            storage.embedding_model = _LookupEncoder(table)
+            storage.embedding_service.set_model(storage.embedding_model)
+            storage.embedding_service.batch_window = 0
+            queries = list(table.keys())
+
+            brute_ms = run_queries(storage, "brute_force", queries)
+            index_ms = run_queries(storage, "index", queries)
+            print(f"{size:>10} | {brute_ms:>18.2f} | {index_ms:>12.2f} | {brute_ms / index_ms:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
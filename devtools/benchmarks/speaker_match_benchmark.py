@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+"""
+說話人匹配基準測試 - 逐對 Python 迴圈 vs 嵌入索引向量化匹配
+
+以合成嵌入（每位說話人一個中心 + 樣本噪聲）建立資料庫，比較：
+- legacy：逐說話人、逐樣本呼叫 _calculate_multi_distance / cosine（重構前的匹配迴圈）
+- vectorized：_best_known_match（一次矩陣-向量乘積 + 向量化多距離）
+
+兩種模式（多距離 / 單純餘弦）都會確認匹配到同一位說話人。
+
+用法:
+    python -m devtools.benchmarks.speaker_match_benchmark [--speakers 10 100 1000] [--samples 20] [--dim 512]
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from modules.stt_module.speaker_identification import SpeakerIdentification, cosine
+
+
+def _database(speakers: int, samples: int, dim: int, rng):
+    database = {}
+    for k in range(speakers):
+        center = rng.normal(size=dim) * 3
+        database[f"speaker_{k:04d}"] = {
+            'embeddings': [center + rng.normal(size=dim) * 0.3 for _ in range(samples)],
+            'metadata': {'sample_count': samples}
+        }
+    return database
+
+
+def _legacy_match(spk: SpeakerIdentification, embedding):
+    """重構前的逐對匹配迴圈"""
+    best_id, best_similarity, best_score = None, 0.0, float('inf')
+    for known_id, data in spk._get_qualified_speakers().items():
+        for known in data['embeddings']:
+            if spk.use_multi_distance:
+                score = spk._combine_distances(spk._calculate_multi_distance(embedding, known))
+                if score < best_score:
+                    best_id, best_score = known_id, score
+            else:
+                similarity = 1 - cosine(embedding, known)
+                if similarity > best_similarity:
+                    best_id, best_similarity = known_id, similarity
+    return best_id
+
+
+def _time_ms(fn, repeats):
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return min(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="說話人匹配基準測試")
+    parser.add_argument("--speakers", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--samples", type=int, default=20, help="每位說話人的樣本數")
+    parser.add_argument("--dim", type=int, default=512, help="嵌入維度")
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    spk = SpeakerIdentification({})
+
+    print(f"{'speakers':>9}{'rows':>8}{'mode':>8}{'legacy ms':>12}{'vector ms':>12}{'speedup':>9}")
+    for n in args.speakers:
+        spk.speaker_database = _database(n, args.samples, args.dim, rng)
+        spk.embedding_index.rebuild(spk.speaker_database)
+        target = f"speaker_{n // 2:04d}"
+        query = spk.speaker_database[target]['embeddings'][0] + rng.normal(size=args.dim) * 0.05
+
+        for mode, multi in (("multi", True), ("cosine", False)):
+            spk.use_multi_distance = multi
+            assert _legacy_match(spk, query) == target
+            assert spk._best_known_match(query)[0] == target
+            # 舊迴圈在大資料庫上很慢，只跑一次
+            legacy = _time_ms(lambda: _legacy_match(spk, query), 1 if n >= 1000 else args.repeats)
+            vector = _time_ms(lambda: spk._best_known_match(query), args.repeats)
+            print(f"{n:>9}{len(spk.embedding_index):>8}{mode:>8}{legacy:>12.2f}{vector:>12.3f}{legacy / vector:>8.0f}x")
+
+
+if __name__ == "__main__":
+    main()
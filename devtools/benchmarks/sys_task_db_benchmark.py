@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+"""
+任務資料庫並行基準測試 - 每次 connect vs TaskDatabase 連線池
+
+N 個執行緒同時對暫存的 uep_tasks 結構執行混合的待辦 / 行事曆操作
+（查詢、新增、更新通知標記），比較：
+  - connect: 每次操作 sqlite3.connect + commit + close（改版前的作法）
+  - pooled:  TaskDatabase 每執行緒長駐連線（WAL + synchronous=NORMAL）
+  - queued:  pooled，且通知標記改走寫入佇列批次提交
+
+回報總吞吐量（操作 / 秒）、p50 / p99 延遲與 "database is locked" 次數。
+
+用法:
+    python -m devtools.benchmarks.sys_task_db_benchmark [--threads 1 4 8] [--ops 500]
+"""
+
+import argparse
+import random
+import sqlite3
+import statistics
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from modules.sys_module.actions.task_database import TaskDatabase
+
+_SCHEMA = [
+    """CREATE TABLE todos (
+      id INTEGER PRIMARY KEY AUTOINCREMENT, task_name TEXT NOT NULL, priority TEXT NOT NULL DEFAULT 'none',
+      status TEXT NOT NULL DEFAULT 'pending', created_at TEXT NOT NULL, deadline TEXT,
+      last_notified_at TEXT, last_notified_stage TEXT)""",
+    """CREATE TABLE calendar_events (
+      id INTEGER PRIMARY KEY AUTOINCREMENT, summary TEXT NOT NULL, start_time TEXT NOT NULL,
+      end_time TEXT NOT NULL, created_at TEXT NOT NULL, last_notified_at TEXT, last_notified_stage TEXT)""",
+    "CREATE INDEX idx_todos_status ON todos(status)",
+    "CREATE INDEX idx_todos_deadline ON todos(deadline)",
+]
+
+_SELECT_TODOS = "SELECT id, task_name, deadline FROM todos WHERE status != 'completed' ORDER BY deadline LIMIT 50"
+_SELECT_EVENTS = "SELECT id, summary, start_time FROM calendar_events WHERE start_time >= ? ORDER BY start_time LIMIT 50"
+_INSERT_TODO = "INSERT INTO todos (task_name, created_at, deadline) VALUES (?, ?, ?)"
+_INSERT_EVENT = "INSERT INTO calendar_events (summary, start_time, end_time, created_at) VALUES (?, ?, ?, ?)"
+_MARK_TODO = "UPDATE todos SET last_notified_at = ?, last_notified_stage = ? WHERE id = ?"
+
+
+def _prepare(path: Path, rows: int):
+    conn = sqlite3.connect(path)
+    for statement in _SCHEMA:
+        conn.execute(statement)
+    now = datetime.now()
+    conn.executemany(_INSERT_TODO, [
+        (f"todo {i}", now.isoformat(), (now + timedelta(hours=i % 72)).isoformat()) for i in range(rows)
+    ])
+    conn.executemany(_INSERT_EVENT, [
+        (f"event {i}", (now + timedelta(hours=i % 72)).isoformat(),
+         (now + timedelta(hours=i % 72 + 1)).isoformat(), now.isoformat()) for i in range(rows)
+    ])
+    conn.commit()
+    conn.close()
+
+
+def _operation(rng: random.Random, rows: int):
+    """依讀多寫少的比例挑一個操作：(kind, sql, params)"""
+    now = datetime.now().isoformat()
+    roll = rng.random()
+    if roll < 0.4:
+        return "read", _SELECT_TODOS, ()
+    if roll < 0.7:
+        return "read", _SELECT_EVENTS, (now,)
+    if roll < 0.8:
+        return "write", _INSERT_TODO, ("bench todo", now, now)
+    if roll < 0.85:
+        return "write", _INSERT_EVENT, ("bench event", now, now, now)
+    return "mark", _MARK_TODO, (now, "1h_before", rng.randint(1, rows))
+
+
+def _run_connect(path, kind, sql, params):
+    conn = sqlite3.connect(path)
+    try:
+        if kind == "read":
+            conn.execute(sql, params).fetchall()
+        else:
+            conn.execute(sql, params)
+            conn.commit()
+    finally:
+        conn.close()
+
+
+def _bench(mode: str, path: Path, threads: int, ops: int, rows: int):
+    db = TaskDatabase(str(path)) if mode != "connect" else None
+    latencies = []
+    locked = [0]
+    lock = threading.Lock()
+    barrier = threading.Barrier(threads)
+
+    def worker(seed):
+        rng = random.Random(seed)
+        local = []
+        barrier.wait()
+        for _ in range(ops):
+            kind, sql, params = _operation(rng, rows)
+            start = time.perf_counter()
+            try:
+                if mode == "connect":
+                    _run_connect(str(path), kind, sql, params)
+                elif kind == "read":
+                    db.query(sql, params)
+                elif kind == "mark" and mode == "queued":
+                    db.submit(sql, params)
+                else:
+                    db.execute(sql, params)
+            except sqlite3.OperationalError as e:
+                if "locked" not in str(e):
+                    raise
+                with lock:
+                    locked[0] += 1
+            local.append(time.perf_counter() - start)
+        with lock:
+            latencies.extend(local)
+
+    workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    start = time.perf_counter()
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    if db is not None:
+        db.flush()
+    wall = time.perf_counter() - start
+    if db is not None:
+        db.close()
+
+    latencies.sort()
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    return len(latencies) / wall, statistics.median(latencies), p99, locked[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="任務資料庫並行基準測試")
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--ops", type=int, default=500, help="每個執行緒的操作數")
+    parser.add_argument("--rows", type=int, default=2000, help="預先填入的待辦 / 事件數")
+    args = parser.parse_args()
+
+    print(f"{'mode':>8}{'threads':>9}{'ops / s':>11}{'p50 ms':>9}{'p99 ms':>9}{'locked':>8}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for threads in args.threads:
+            for mode in ("connect", "pooled", "queued"):
+                # 每輪使用新的資料庫，避免前一輪的寫入與 journal 模式影響結果
+                path = Path(tmp) / f"{mode}_{threads}.db"
+                _prepare(path, args.rows)
+                throughput, p50, p99, locked = _bench(mode, path, threads, args.ops, args.rows)
+                print(f"{mode:>8}{threads:>9}{throughput:>11.0f}{p50 * 1000:>9.2f}{p99 * 1000:>9.2f}{locked:>8}")
+
+
+if __name__ == "__main__":
+    main()
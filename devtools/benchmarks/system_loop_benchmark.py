@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+"""
+主循環喚醒基準測試 - 100ms 輪詢 vs 事件驅動排程
+
+以與 SystemLoop 相同的計時器配置（快照 5 秒、狀態日誌 10 秒、boredom 60 秒、
+保底心跳）比較兩種主循環：
+- 閒置時每秒喚醒次數
+- 狀態變化（佇列推入）到主循環處理的延遲
+
+輪詢模式重現舊實作：每 0.1 秒一次迭代，佇列有項目時額外休眠 0.2~0.5 秒。
+
+用法:
+    python -m devtools.benchmarks.system_loop_benchmark [--idle 5] [--events 30]
+"""
+
+import argparse
+import random
+import statistics
+import threading
+import time
+
+from core.loop_scheduler import LoopScheduler
+
+
+class _PollingLoop:
+    """舊的固定間隔輪詢主循環"""
+
+    def __init__(self, busy_sleep: float):
+        self.busy_sleep = busy_sleep
+        self.stop_event = threading.Event()
+        self.wakeups = 0
+        self.pending = []  # 狀態變化發生時間
+        self.latencies = []
+        self.lock = threading.Lock()
+
+    def push(self):
+        with self.lock:
+            self.pending.append(time.perf_counter())
+
+    def run(self):
+        while not self.stop_event.is_set():
+            self.wakeups += 1
+            with self.lock:
+                pending, self.pending = self.pending, []
+            now = time.perf_counter()
+            self.latencies.extend((now - t) * 1000 for t in pending)
+            if pending and self.busy_sleep:
+                # 舊 _monitor_system_state：佇列有項目時在循環內額外休眠
+                time.sleep(self.busy_sleep)
+            time.sleep(0.1)
+
+
+class _EventLoop:
+    """事件驅動主循環"""
+
+    def __init__(self, heartbeat: float):
+        self.scheduler = LoopScheduler()
+        self.scheduler.schedule_interval("snapshot", 5.0)
+        self.scheduler.schedule_interval("status_log", 10.0)
+        self.scheduler.schedule_interval("boredom", 60.0)
+        self.scheduler.schedule_interval("monitor", heartbeat)
+        self.stop_event = threading.Event()
+        self.wakeups = 0
+        self.pending = []
+        self.latencies = []
+        self.lock = threading.Lock()
+
+    def push(self):
+        with self.lock:
+            self.pending.append(time.perf_counter())
+        self.scheduler.notify("state_queue")
+
+    def run(self):
+        while not self.stop_event.is_set():
+            self.scheduler.wait()
+            self.wakeups += 1
+            with self.lock:
+                pending, self.pending = self.pending, []
+            now = time.perf_counter()
+            self.latencies.extend((now - t) * 1000 for t in pending)
+
+    def stop(self):
+        self.stop_event.set()
+        self.scheduler.close()
+
+
+def _measure(loop, idle_seconds: float, events: int):
+    """量測閒置喚醒率與事件延遲"""
+    thread = threading.Thread(target=loop.run, daemon=True)
+    thread.start()
+
+    time.sleep(0.2)
+    start_wakeups = loop.wakeups
+    cpu_start = time.process_time()
+    time.sleep(idle_seconds)
+    idle_rate = (loop.wakeups - start_wakeups) / idle_seconds
+    idle_cpu_ms = (time.process_time() - cpu_start) * 1000 / idle_seconds
+
+    rng = random.Random(0)
+    for _ in range(events):
+        time.sleep(rng.uniform(0.15, 0.35))
+        loop.push()
+    time.sleep(1.0)
+
+    if hasattr(loop, "stop"):
+        loop.stop()
+    else:
+        loop.stop_event.set()
+    thread.join(timeout=2.0)
+
+    latencies = sorted(loop.latencies)
+    p95 = latencies[int(len(latencies) * 0.95) - 1] if latencies else 0.0
+    return {
+        "idle_wakeups_per_s": idle_rate,
+        "idle_cpu_ms_per_s": idle_cpu_ms,
+        "latency_avg_ms": statistics.mean(latencies) if latencies else 0.0,
+        "latency_p95_ms": p95,
+        "latency_max_ms": latencies[-1] if latencies else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="主循環喚醒基準測試")
+    parser.add_argument("--idle", type=float, default=5.0, help="閒置量測秒數")
+    parser.add_argument("--events", type=int, default=30, help="模擬狀態變化次數")
+    parser.add_argument("--heartbeat", type=float, default=1.0, help="事件驅動模式的保底心跳（秒）")
+    parser.add_argument("--busy-sleep", type=float, default=0.2,
+                        help="輪詢模式在佇列有項目時的額外休眠（舊實作 0.2~0.5 秒）")
+    args = parser.parse_args()
+
+    results = {
+        "polling (100ms)": _measure(_PollingLoop(args.busy_sleep), args.idle, args.events),
+        "event-driven": _measure(_EventLoop(args.heartbeat), args.idle, args.events),
+    }
+
+    print(f"{'mode':<18}{'idle wake/s':>13}{'idle cpu ms/s':>15}{'lat avg ms':>12}{'lat p95 ms':>12}{'lat max ms':>12}")
+    for name, r in results.items():
+        print(f"{name:<18}{r['idle_wakeups_per_s']:>13.2f}{r['idle_cpu_ms_per_s']:>15.3f}"
+              f"{r['latency_avg_ms']:>12.2f}{r['latency_p95_ms']:>12.2f}{r['latency_max_ms']:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+"""
+TTS 音頻傳遞基準測試 - 暫存 WAV 往返 vs 記憶體 PCM 緩衝
+
+以合成的波形（與 BigVGAN 輸出相同的 [1, samples] float32、22050 Hz）
+比較每段音頻從「合成完成」到「可交給播放器的 int16 緩衝」的開銷：
+- 檔案路徑（舊實作）：寫入 16-bit WAV → sf.read → 音量 → int16 → 刪除檔案
+- 記憶體路徑（新實作）：音量 → 截斷 → int16
+
+不需要載入 TTS 模型，量測的是每段被移除的 I/O 開銷。
+
+用法:
+    python -m devtools.benchmarks.tts_audio_path_benchmark [--durations 1 3 8] [--repeats 30]
+"""
+
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+import numpy as np
+import soundfile as sf
+
+SAMPLE_RATE = 22050
+
+
+def _file_round_trip(audio: np.ndarray, tmp_dir: str, volume: float) -> np.ndarray:
+    """舊實作：寫暫存檔再讀回"""
+    path = os.path.join(tmp_dir, f"chunk_{time.perf_counter_ns()}.wav")
+    try:
+        import torch
+        import torchaudio
+        torchaudio.save(path, torch.from_numpy(audio), sample_rate=SAMPLE_RATE,
+                        encoding="PCM_S", bits_per_sample=16)
+    except ImportError:
+        sf.write(path, audio.reshape(-1), SAMPLE_RATE, subtype="PCM_16")
+    data, _sr = sf.read(path)
+    data = data * volume
+    pcm = (data * 32767).astype(np.int16)
+    os.remove(path)
+    return pcm
+
+
+def _in_memory(audio: np.ndarray, volume: float) -> np.ndarray:
+    """新實作：與 TTSModule._to_pcm16 相同的轉換"""
+    audio = np.asarray(audio, dtype=np.float32).reshape(-1)
+    if volume != 1.0:
+        audio = audio * volume
+    return (np.clip(audio, -1.0, 1.0) * 32767).astype(np.int16)
+
+
+def _time_ms(fn, repeats: int):
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return statistics.median(samples), samples[int(len(samples) * 0.95) - 1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="TTS 音頻傳遞基準測試")
+    parser.add_argument("--durations", type=float, nargs="+", default=[1.0, 3.0, 8.0],
+                        help="每段音頻長度（秒）")
+    parser.add_argument("--repeats", type=int, default=30)
+    parser.add_argument("--volume", type=float, default=0.7)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"{'audio s':>8}{'file p50 ms':>13}{'file p95 ms':>13}{'mem p50 ms':>12}{'mem p95 ms':>12}{'saved ms':>10}")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for duration in args.durations:
+            audio = (rng.standard_normal((1, int(duration * SAMPLE_RATE))) * 0.2).astype(np.float32)
+
+            # 兩條路徑輸出應一致（除了 WAV 量化的 ±1 誤差）
+            diff = np.abs(_file_round_trip(audio, tmp_dir, args.volume).astype(np.int32)
+                          - _in_memory(audio, args.volume).astype(np.int32)).max()
+            assert diff <= 1, f"輸出不一致: {diff}"
+
+            file_p50, file_p95 = _time_ms(lambda: _file_round_trip(audio, tmp_dir, args.volume), args.repeats)
+            mem_p50, mem_p95 = _time_ms(lambda: _in_memory(audio, args.volume), args.repeats)
+            print(f"{duration:>8.1f}{file_p50:>13.3f}{file_p95:>13.3f}{mem_p50:>12.3f}{mem_p95:>12.3f}"
+                  f"{file_p50 - mem_p50:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+"""
+TTS CFM 延遲設定檔基準測試 - 步數 / 解算器 / CFG 截止 對延遲與音質的影響
+
+以同一組句子分別用各 CFM 設定檔合成（GPT 為確定性解碼，CFM 初始噪聲固定種子），
+報告：
+- RTF（合成牆鐘時間 / 音頻時長，越低越好）
+- 與 quality（25 步 Euler，原行為）輸出的對數頻譜距離 LSD（dB，越低越接近）
+
+需要已下載的模型與角色檔案。
+
+用法:
+    python -m devtools.benchmarks.tts_cfm_profile_benchmark --character models/tts/uep.pt [--profiles quality balanced fast] [--device cpu]
+"""
+
+import argparse
+import os
+import statistics
+import time
+
+import torch
+
+from modules.tts_module.lite_engine import IndexTTSLite
+
+SENTENCES = [
+    "Okay!",
+    "Hmm, let me think about that.",
+    "The weather is lovely today, so let's take a walk in the park.",
+    "Your meeting with the design team starts in about twenty minutes, so you still have time for coffee.",
+]
+
+N_FFT = 1024
+HOP = 256
+
+
+def _log_spectral_distance(reference: torch.Tensor, candidate: torch.Tensor) -> float:
+    """對數功率譜距離 (dB)：逐幀 RMS 後取平均"""
+    length = min(reference.shape[-1], candidate.shape[-1])
+    window = torch.hann_window(N_FFT)
+    specs = []
+    for audio in (reference, candidate):
+        spec = torch.stft(audio.reshape(-1)[:length].float(), N_FFT, HOP, window=window, return_complex=True)
+        specs.append(10 * torch.log10(spec.abs().pow(2).clamp_min(1e-10)))
+    per_frame = (specs[0] - specs[1]).pow(2).mean(dim=0).sqrt()
+    return float(per_frame.mean())
+
+
+def _synthesize(engine: IndexTTSLite, text: str, profile: str, seed: int):
+    torch.manual_seed(seed)
+    start = time.perf_counter()
+    audio = engine.synthesize_audio(text, verbose=False, cfm_profile=profile)
+    wall = time.perf_counter() - start
+    if audio is None:
+        raise RuntimeError(f"合成失敗: {profile} / {text}")
+    return audio, wall
+
+
+def main():
+    parser = argparse.ArgumentParser(description="TTS CFM 延遲設定檔基準測試")
+    parser.add_argument("--model-dir", default="modules/tts_module/checkpoints")
+    parser.add_argument("--character", default="models/tts/uep.pt")
+    parser.add_argument("--device", default="cpu")
+    parser.add_argument("--profiles", nargs="+", default=["quality", "balanced", "fast"])
+    parser.add_argument("--repeats", type=int, default=2)
+    parser.add_argument("--threads", type=int, default=None, help="torch CPU 執行緒數")
+    args = parser.parse_args()
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+
+    engine = IndexTTSLite(
+        cfg_path=os.path.join(args.model_dir, "config.yaml"),
+        model_dir=args.model_dir,
+        use_fp16=args.device != "cpu",
+        device=args.device
+    )
+    engine._warmup_config = {"enable": False}
+    engine.load_character(args.character, verbose=False)
+
+    # 預熱一次，避免首次呼叫的初始化開銷計入 quality
+    engine.synthesize_audio(SENTENCES[0], verbose=False)
+
+    references = {}
+    print(f"{'profile':<10}{'steps':>6}{'solver':>10}{'cutoff':>8}{'chars':>7}{'audio s':>9}{'RTF':>8}{'LSD dB':>9}")
+    for profile in args.profiles:
+        settings = engine.get_cfm_profile(profile)
+        for seed, text in enumerate(SENTENCES):
+            walls = []
+            for _ in range(args.repeats):
+                audio, wall = _synthesize(engine, text, profile, seed)
+                walls.append(wall)
+            duration = audio.shape[-1] / engine.sample_rate
+            if profile == args.profiles[0]:
+                references[text] = audio
+            lsd = _log_spectral_distance(references[text], audio)
+            print(f"{profile:<10}{settings['steps']:>6}{settings['solver']:>10}{settings['cfg_cutoff']:>8.2f}"
+                  f"{len(text):>7}{duration:>9.2f}{statistics.median(walls) / duration:>8.3f}{lsd:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
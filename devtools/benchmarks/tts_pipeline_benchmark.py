@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+"""
+TTS 分階段管線基準測試 - 逐段合成 vs 階段重疊
+
+以多句回覆（每句一段，與 TTSChunker 的輸出相同）比較 TTSStagePipeline：
+- serial：逐段完整跑完 GPT → S2Mel → BigVGAN 才處理下一段（舊行為）
+- overlapped：三個階段各一條執行緒，段落 N+1 的 GPT 與段落 N 的 S2Mel / BigVGAN 重疊
+
+報告首段音頻延遲（TTFA）與整體 RTF（合成牆鐘時間 / 音頻時長）。
+需要已下載的模型與角色檔案。
+
+用法:
+    python -m devtools.benchmarks.tts_pipeline_benchmark --character models/tts/uep.pt [--sentences 2 4 6] [--device cpu]
+"""
+
+import argparse
+import os
+import time
+
+import torch
+
+from modules.tts_module.lite_engine import IndexTTSLite
+from modules.tts_module.stage_pipeline import TTSStagePipeline
+
+SENTENCES = [
+    "Sure, I can help with that.",
+    "I checked your calendar and you have two meetings this afternoon.",
+    "The first one starts at two o'clock with the design team.",
+    "The second is a quick sync with Alex at four thirty.",
+    "Would you like me to set a reminder fifteen minutes before each one?",
+    "I can also move the second meeting if you need more time.",
+]
+
+
+def _run(engine: IndexTTSLite, chunks, overlap: bool, cpu_threads):
+    pipeline = TTSStagePipeline(engine, depth=1, overlap=overlap, cpu_threads=cpu_threads)
+    start = time.perf_counter()
+    first_audio = None
+    audio_seconds = 0.0
+    for _idx, _chunk, audio, _timing in pipeline.run(chunks, lambda chunk: {}):
+        if audio is None:
+            raise RuntimeError("合成失敗")
+        if first_audio is None:
+            first_audio = time.perf_counter() - start
+        audio_seconds += audio.shape[-1] / engine.sample_rate
+    wall = time.perf_counter() - start
+    return first_audio, wall, audio_seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description="TTS 分階段管線基準測試")
+    parser.add_argument("--model-dir", default="modules/tts_module/checkpoints")
+    parser.add_argument("--character", default="models/tts/uep.pt")
+    parser.add_argument("--device", default="cpu")
+    parser.add_argument("--sentences", type=int, nargs="+", default=[2, 4, 6])
+    parser.add_argument("--cpu-threads", type=int, default=None,
+                        help="管線執行期間的 torch 執行緒數（預設一半核心）")
+    args = parser.parse_args()
+
+    engine = IndexTTSLite(
+        cfg_path=os.path.join(args.model_dir, "config.yaml"),
+        model_dir=args.model_dir,
+        use_fp16=args.device != "cpu",
+        device=args.device
+    )
+    engine._warmup_config = {"enable": False}
+    engine.load_character(args.character, verbose=False)
+    engine.synthesize_audio(SENTENCES[0], verbose=False)  # 預熱
+
+    print(f"{'sentences':>10}{'mode':>12}{'audio s':>9}{'TTFA s':>9}{'wall s':>9}{'RTF':>8}")
+    for n in args.sentences:
+        chunks = [SENTENCES[i % len(SENTENCES)] for i in range(n)]
+        for mode, overlap in (("serial", False), ("overlapped", True)):
+            torch.manual_seed(0)
+            ttfa, wall, audio_seconds = _run(engine, chunks, overlap, args.cpu_threads)
+            print(f"{n:>10}{mode:>12}{audio_seconds:>9.2f}{ttfa:>9.2f}{wall:>9.2f}{wall / audio_seconds:>8.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+"""
+TTS 多段合成吞吐量基準測試 - 逐段 vs 批次
+
+以 N 句文本（每句切為一個 segment）比較 IndexTTSLite.synthesize_audio 在
+segment_batch_size=1（逐段）與 segment_batch_size=N（整批）下的吞吐量，
+以「每牆鐘秒生成的音頻秒數」表示（越高越好）。
+
+需要已下載的模型與角色檔案。
+
+用法:
+    python -m devtools.benchmarks.tts_segment_batch_benchmark --character models/tts/uep.pt [--segments 1 4 8] [--device cpu]
+"""
+
+import argparse
+import os
+import time
+
+import torch
+
+from modules.tts_module.lite_engine import IndexTTSLite
+
+SENTENCES = [
+    "The weather is lovely today, so let's take a walk in the park.",
+    "I finished reading the report and left a few notes for you.",
+    "Remember to drink some water and stretch after sitting for a while.",
+    "Your meeting with the design team starts in about twenty minutes.",
+    "I found three files that match the name you asked me about.",
+    "The download completed successfully and the folder is ready.",
+    "It looks like it might rain this evening, so bring an umbrella.",
+    "Let me know if you want me to read the summary out loud.",
+]
+
+
+def _run(engine: IndexTTSLite, text: str, batch_size: int, repeats: int):
+    engine.segment_batch_size = batch_size
+    audio_seconds = 0.0
+    start = time.perf_counter()
+    for _ in range(repeats):
+        audio = engine.synthesize_audio(text, verbose=False)
+        if audio is None:
+            raise RuntimeError("合成失敗")
+        audio_seconds += audio.shape[-1] / engine.sample_rate
+    wall = time.perf_counter() - start
+    return audio_seconds, wall
+
+
+def main():
+    parser = argparse.ArgumentParser(description="TTS 多段合成吞吐量基準測試")
+    parser.add_argument("--model-dir", default="modules/tts_module/checkpoints")
+    parser.add_argument("--character", default="models/tts/uep.pt")
+    parser.add_argument("--device", default="cpu")
+    parser.add_argument("--segments", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--repeats", type=int, default=1)
+    parser.add_argument("--threads", type=int, default=None, help="torch CPU 執行緒數")
+    args = parser.parse_args()
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+
+    engine = IndexTTSLite(
+        cfg_path=os.path.join(args.model_dir, "config.yaml"),
+        model_dir=args.model_dir,
+        use_fp16=args.device != "cpu",
+        device=args.device
+    )
+    engine._warmup_config = {"enable": False}
+    engine.load_character(args.character, verbose=False)
+
+    # 每句恰好一個 segment：上限設為最長句子的 token 數
+    engine.max_text_tokens_per_segment = max(len(engine.tokenizer.tokenize(s)) for s in SENTENCES)
+
+    print(f"{'segments':>9}{'mode':>10}{'audio s':>10}{'wall s':>10}{'audio s / wall s':>18}")
+    for n in args.segments:
+        text = " ".join(SENTENCES[i % len(SENTENCES)] for i in range(n))
+        for mode, batch_size in (("serial", 1), ("batched", n)):
+            audio_seconds, wall = _run(engine, text, batch_size, args.repeats)
+            print(f"{n:>9}{mode:>10}{audio_seconds:>10.2f}{wall:>10.2f}{audio_seconds / wall:>18.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+"""
+VAD 基準測試 - 逐窗口 Python 迴圈 vs 向量化 / 串流 VAD
+
+以合成音訊（低噪聲背景 + 已知起訖時間的語音替代訊號）比較：
+1. 整段偵測吞吐量：舊 detect_voice_activity（逐 25ms 窗口呼叫 _compute_energy）
+   vs 向量化實作，並確認兩者事件一致
+2. 語音結束偵測延遲：舊持續監聽（固定 2 秒錄音後才檢查、靜音 1.5 秒）
+   vs 串流 VAD（20ms 幀推入、相同 1.5 秒 hangover）
+3. 串流 VAD 每幀處理成本
+
+用法:
+    python -m devtools.benchmarks.vad_benchmark [--seconds 60] [--repeats 5]
+"""
+
+import argparse
+import statistics
+import time
+
+import numpy as np
+
+from modules.stt_module.vad import VoiceActivityDetection
+
+SAMPLE_RATE = 16000
+
+
+def _synthetic_audio(seconds: float, seed: int = 0):
+    """每 6 秒一句 1~2.5 秒的語音，返回音訊與 (起, 迄) 列表"""
+    rng = np.random.default_rng(seed)
+    audio = rng.standard_normal(int(seconds * SAMPLE_RATE)) * 50
+    bursts = []
+    start = 1.0
+    while start + 3.0 < seconds:
+        length = rng.uniform(1.0, 2.5)
+        t = np.arange(int(length * SAMPLE_RATE)) / SAMPLE_RATE
+        begin = int(start * SAMPLE_RATE)
+        audio[begin:begin + len(t)] += 8000 * np.sin(2 * np.pi * rng.uniform(150, 300) * t)
+        bursts.append((start, start + length))
+        start += 6.0
+    return audio.astype(np.int16), bursts
+
+
+def _legacy_detect(vad: VoiceActivityDetection, audio_data: np.ndarray, window_size: float = 0.025):
+    """舊實作：逐窗口 Python 迴圈（與重構前的 detect_voice_activity 相同）"""
+    audio_float = audio_data.astype(np.float32) / 32768.0
+    window_samples = int(window_size * vad.sample_rate)
+    n_windows = len(audio_float) // window_samples
+    events = []
+    current_state = "silence"
+    current_start_time = 0.0
+    for i in range(n_windows):
+        window = audio_float[i * window_samples:(i + 1) * window_samples]
+        energy = np.mean(window ** 2)
+        time_stamp = i * window_size
+        is_speech = energy > vad.energy_threshold
+        if current_state == "silence" and is_speech:
+            events.append(('speech_start', round(time_stamp, 6)))
+            current_state = "speech"
+            current_start_time = time_stamp
+        elif current_state == "speech" and not is_speech:
+            if time_stamp - current_start_time >= vad.speech_duration_threshold:
+                events.append(('speech_end', round(time_stamp, 6)))
+            current_state = "silence"
+            current_start_time = time_stamp
+    if current_state == "speech" and n_windows * window_size - current_start_time >= vad.speech_duration_threshold:
+        events.append(('speech_end', round(n_windows * window_size, 6)))
+    return events
+
+
+def _legacy_has_speech(vad, chunk):
+    """舊 has_sufficient_speech：語音總長 >= 0.05 秒"""
+    total, start = 0.0, 0.0
+    for event, ts in _legacy_detect(vad, chunk):
+        if event == 'speech_start':
+            start = ts
+        else:
+            total += ts - start
+    return total >= 0.05
+
+
+def _legacy_end_latency(vad, audio, bursts, chunk=2.0, silence=1.5):
+    """模擬舊持續監聽：每 2 秒錄一段後才檢查，靜音滿 1.5 秒（以段開始時間計）才送出"""
+    detections = []
+    last_speech = None
+    n_chunks = int(len(audio) / SAMPLE_RATE // chunk)
+    for i in range(n_chunks):
+        chunk_start = i * chunk
+        data = audio[int(chunk_start * SAMPLE_RATE):int((chunk_start + chunk) * SAMPLE_RATE)]
+        if _legacy_has_speech(vad, data):
+            last_speech = chunk_start
+        elif last_speech is not None and chunk_start - last_speech >= silence:
+            detections.append(chunk_start + chunk)  # 這段錄完才得知
+            last_speech = None
+    return [d - end for d, (_, end) in zip(detections, bursts)]
+
+
+def _streaming(vad, audio, silence=1.5, frame=0.02):
+    stream = vad.create_stream(silence_duration=silence, frame_duration=frame)
+    frame_samples = stream.frame_samples
+    ends, push_us = [], []
+    for i in range(0, len(audio), frame_samples):
+        start = time.perf_counter()
+        events = stream.push(audio[i:i + frame_samples])
+        push_us.append((time.perf_counter() - start) * 1e6)
+        ends.extend(e for e in events if e['event_type'] == 'speech_end')
+    return ends, push_us
+
+
+def main():
+    parser = argparse.ArgumentParser(description="VAD 基準測試")
+    parser.add_argument("--seconds", type=float, default=60.0, help="合成音訊長度（秒）")
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    audio, bursts = _synthetic_audio(args.seconds)
+    vad = VoiceActivityDetection(SAMPLE_RATE)
+
+    # 1. 整段偵測
+    new_events = [(e['event_type'], round(e['timestamp'], 6)) for e in vad.detect_voice_activity(audio)]
+    assert new_events == _legacy_detect(vad, audio), "向量化結果與舊實作不一致"
+
+    def best_ms(fn):
+        samples = []
+        for _ in range(args.repeats):
+            start = time.perf_counter()
+            fn()
+            samples.append((time.perf_counter() - start) * 1000)
+        return min(samples)
+
+    legacy_ms = best_ms(lambda: _legacy_detect(vad, audio))
+    vector_ms = best_ms(lambda: vad.detect_voice_activity(audio))
+    print(f"整段偵測 ({args.seconds:.0f}s 音訊, {len(bursts)} 句)")
+    print(f"  legacy loop   {legacy_ms:9.2f} ms")
+    print(f"  vectorized    {vector_ms:9.2f} ms   ({legacy_ms / vector_ms:.1f}x)")
+
+    # 2. 語音結束偵測延遲（相同 1.5 秒靜音策略）
+    legacy_latency = _legacy_end_latency(vad, audio, bursts)
+    ends, push_us = _streaming(vad, audio)
+    stream_latency = [e['detected_at'] - end for e, (_, end) in zip(ends, bursts)]
+    print("語音結束 → 送出識別的延遲（靜音閾值 1.5s）")
+    for name, values in (("legacy 2s chunks", legacy_latency), ("streaming 20ms", stream_latency)):
+        print(f"  {name:<17} avg {statistics.mean(values):6.3f}s  max {max(values):6.3f}s  (n={len(values)})")
+
+    # 3. 每幀成本
+    push_us.sort()
+    print("串流 VAD 每幀 (20ms) 處理成本")
+    print(f"  p50 {statistics.median(push_us):7.1f} us   p99 {push_us[int(len(push_us) * 0.99) - 1]:7.1f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+"""
+工作流程圖編譯基準測試 - 每會話驗證 / 逐一掃描 vs 編譯快取 / 轉換索引
+
+以合成的線性工作流程（每步驟兩個無條件轉換，只有第一個生效）量測：
+  - 建立會話：建構 WorkflowDefinition + WorkflowEngine
+      validate: 改版前的作法，每個會話各自 validate()
+      cold:     每次清空快取，完整編譯（含結構檢查）
+      cached:   同類型會話共用編譯結果
+  - 推進步驟：get_next_step 從入口走到結束
+      scan:     改版前逐一掃描轉換列表
+      indexed:  編譯後的 (步驟, 結果類型) 索引
+  - 載入 workflow_definitions.yaml：每次解析 vs 依修改時間快取
+
+用法:
+    python -m devtools.benchmarks.workflow_graph_benchmark [--steps 10 50 200] [--rounds 2000]
+"""
+
+import argparse
+import statistics
+import time
+from types import SimpleNamespace
+
+from modules.sys_module.workflows import (
+    WorkflowDefinition, WorkflowEngine, StepResult, StepTemplate, clear_compiled_graphs
+)
+from modules.sys_module.workflows import workflow_registry
+
+
+def _session():
+    data = {}
+    return SimpleNamespace(
+        session_id="bench",
+        get_data=lambda key, default=None: data.get(key, default),
+        add_data=data.__setitem__
+    )
+
+
+class LegacyDefinition(WorkflowDefinition):
+    """改版前的 get_next_step：每次逐一掃描轉換列表"""
+
+    def get_next_step(self, current_step, result):
+        if result.skip_to:
+            return result.skip_to
+        if result.next_step:
+            return result.next_step
+        if result.cancel or result.complete:
+            return None
+        if current_step in self.transitions:
+            for to_step, condition in self.transitions[current_step]:
+                if to_step == "END":
+                    return None
+                if condition is None or condition(result):
+                    return to_step
+        return None
+
+
+def _definition(session, steps: int, definition_class=WorkflowDefinition) -> WorkflowDefinition:
+    definition = definition_class(workflow_type=f"bench_{steps}", name="bench")
+    step_ids = [f"step_{i}" for i in range(steps)]
+    for step_id in step_ids:
+        definition.add_step(StepTemplate.create_processing_step(
+            session=session,
+            step_id=step_id,
+            processor=lambda s: StepResult.success("ok")
+        ))
+    for current, following in zip(step_ids, step_ids[1:]):
+        definition.add_transition(current, following)
+        definition.add_transition(current, step_ids[0])
+    definition.add_transition(step_ids[-1], "END")
+    definition.set_entry_point(step_ids[0])
+    return definition
+
+
+def _percentiles(samples):
+    samples = sorted(samples)
+    return statistics.median(samples), samples[min(len(samples) - 1, int(len(samples) * 0.99))]
+
+
+def _bench_sessions(mode: str, steps: int, rounds: int):
+    clear_compiled_graphs()
+    samples = []
+    for _ in range(rounds):
+        if mode == "cold":
+            clear_compiled_graphs()
+        start = time.perf_counter()
+        session = _session()
+        definition = _definition(session, steps)
+        if mode == "validate":
+            definition.validate()
+        else:
+            WorkflowEngine(definition, session)
+        samples.append(time.perf_counter() - start)
+    return _percentiles(samples)
+
+
+def _bench_advance(mode: str, steps: int, rounds: int):
+    clear_compiled_graphs()
+    definition = _definition(_session(), steps, LegacyDefinition if mode == "scan" else WorkflowDefinition)
+    definition.compile()
+    result = StepResult.success("ok")
+    samples = []
+    for _ in range(rounds):
+        current = definition.entry_point
+        start = time.perf_counter()
+        while current is not None:
+            current = definition.get_next_step(current, result)
+        samples.append((time.perf_counter() - start) / steps)
+    return _percentiles(samples)
+
+
+def _bench_yaml(rounds: int):
+    results = {}
+    for mode, load in (("parse", workflow_registry._load_workflow_definitions),
+                       ("cached", workflow_registry.get_workflow_definitions)):
+        samples = []
+        for _ in range(rounds):
+            start = time.perf_counter()
+            load()
+            samples.append(time.perf_counter() - start)
+        results[mode] = _percentiles(samples)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="工作流程圖編譯基準測試")
+    parser.add_argument("--steps", type=int, nargs="+", default=[10, 50, 200])
+    parser.add_argument("--rounds", type=int, default=2000)
+    args = parser.parse_args()
+
+    print("建立會話（定義 + 引擎）")
+    print(f"{'mode':>10}{'steps':>7}{'p50 us':>10}{'p99 us':>10}")
+    for steps in args.steps:
+        rounds = max(50, args.rounds // steps)
+        for mode in ("validate", "cold", "cached"):
+            p50, p99 = _bench_sessions(mode, steps, rounds)
+            print(f"{mode:>10}{steps:>7}{p50 * 1e6:>10.1f}{p99 * 1e6:>10.1f}")
+
+    print("\n推進步驟（每步）")
+    print(f"{'mode':>10}{'steps':>7}{'p50 ns':>10}{'p99 ns':>10}")
+    for steps in args.steps:
+        for mode in ("scan", "indexed"):
+            p50, p99 = _bench_advance(mode, steps, args.rounds)
+            print(f"{mode:>10}{steps:>7}{p50 * 1e9:>10.0f}{p99 * 1e9:>10.0f}")
+
+    print("\n載入 workflow_definitions.yaml")
+    print(f"{'mode':>10}{'p50 us':>10}{'p99 us':>10}")
+    for mode, (p50, p99) in _bench_yaml(max(20, args.rounds // 20)).items():
+        print(f"{mode:>10}{p50 * 1e6:>10.1f}{p99 * 1e6:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
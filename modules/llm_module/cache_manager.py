@@ -7,10 +7,16 @@ Context Caching Manager - 基於Gemini 2.5 Flash-Lite的顯性/隱性快取管
 2. 隱性快取：短期重複內容的自動快取
 3. CHAT/WORK模式的不同TTL策略
 4. 成本優化和命中率統計
+5. 本地快取：O(1) LRU、條目數與位元組雙上限、惰性 TTL 加定期清掃
+6. 語意回應快取：相近輸入重用無副作用的 CHAT 回應
 """
 
 import time, os
+import sys
+import json
 import hashlib
+import threading
+from collections import OrderedDict
 from typing import Dict, Any, Optional, List, Callable, TYPE_CHECKING
 from dataclasses import dataclass, field
 from enum import Enum
@@ -20,6 +26,7 @@ from enum import Enum
 # from google.genai import types
 from configs.config_loader import load_module_config
 from utils.debug_helper import debug_log, info_log, error_log
+from .semantic_cache import SemanticResponseCache
 
 if TYPE_CHECKING:
     from .schemas import LLMOutput
@@ -32,6 +39,12 @@ class CacheType(Enum):
     STYLE_POLICY = "style_policy"    # 風格策略 - 24h TTL
     SESSION_ANCHOR = "session_anchor" # 會話錨點 - 30分鐘 TTL
     TASK_SPEC = "task_spec"         # 任務規格 - 5-30分鐘 TTL
+    
+    # 本地快取類型
+    LLM_RESPONSE = "llm_response"    # LLM 回應
+    IDENTITY = "identity"            # 身份上下文
+    MEMORY = "memory"                # 記憶上下文
+    LOCAL = "local"                  # 未分類的本地快取
 
 
 @dataclass
@@ -56,6 +69,8 @@ class LocalCacheEntry:
     hit_count: int = 0
     last_access: float = field(default_factory=time.time)
     metadata: Dict[str, Any] = field(default_factory=dict)
+    cache_type: CacheType = CacheType.LOCAL
+    size_bytes: int = 0
     
     def is_expired(self, ttl_seconds: int) -> bool:
         """檢查是否過期"""
@@ -78,7 +93,10 @@ class CacheStats:
     local_hit_count: int = 0
     local_miss_count: int = 0
     local_evictions: int = 0
+    local_expirations: int = 0
     local_total_entries: int = 0
+    local_resident_bytes: int = 0
+    local_by_type: Dict[str, Dict[str, int]] = field(default_factory=dict)
 
 
 class CacheManager:
@@ -126,10 +144,18 @@ class CacheManager:
         self.caches: Dict[str, CacheInfo] = {}
         self.stats = CacheStats()
         
-        # 本地快取管理
-        self.local_cache: Dict[str, LocalCacheEntry] = {}
+        # 本地快取管理（LRU 順序：最久未使用在前）
+        self.local_cache: "OrderedDict[str, LocalCacheEntry]" = OrderedDict()
+        self._local_expiry_order: "OrderedDict[str, float]" = OrderedDict()  # 依寫入時間排序，供清掃使用
+        self._local_lock = threading.RLock()
         self.max_local_entries = self.config.get("max_local_entries", 100)
+        self.max_local_bytes = self.config.get("max_local_bytes", 32 * 1024 * 1024)  # 32MB
         self.local_ttl_seconds = self.config.get("local_ttl_seconds", 1800)  # 30分鐘
+        self.local_sweep_interval = self.config.get("local_sweep_interval", 60)  # 秒
+        self._last_local_sweep = time.time()
+        
+        # 語意回應快取（預設停用，見 config.yaml 的 semantic_cache）
+        self.semantic_cache = SemanticResponseCache(self.config.get("semantic_cache", {}))
         
         # TTL設定（基於實際使用頻率，優化成本效益）
         self.default_ttl = {
@@ -496,8 +522,15 @@ class CacheManager:
                     "miss_count": self.stats.local_miss_count,
                     "hit_rate": self.stats.local_hit_count / (self.stats.local_hit_count + self.stats.local_miss_count) if (self.stats.local_hit_count + self.stats.local_miss_count) > 0 else 0.0,
                     "evictions": self.stats.local_evictions,
-                    "ttl_seconds": self.local_ttl_seconds
+                    "expirations": self.stats.local_expirations,
+                    "resident_bytes": self.stats.local_resident_bytes,
+                    "max_bytes": self.max_local_bytes,
+                    "ttl_seconds": self.local_ttl_seconds,
+                    "by_type": {cache_type: dict(type_stats)
+                                for cache_type, type_stats in self.stats.local_by_type.items()}
                 },
+                # 語意回應快取統計
+                "semantic_cache": self.semantic_cache.get_stats(),
                 # 使用頻率追蹤
                 "usage_tracking": {
                     "tracked_content_count": len(self.usage_tracker),
@@ -679,80 +712,167 @@ JSON 輸出格式：嚴格遵循指定的 schema
         key_string = "|".join(key_parts)
         return hashlib.md5(key_string.encode('utf-8')).hexdigest()
     
-    def get_local_cache(self, cache_key: str) -> Optional[Any]:
+    def _local_type_stats(self, cache_type: CacheType) -> Dict[str, int]:
+        """取得（必要時建立）指定類型的本地快取統計"""
+        type_stats = self.stats.local_by_type.get(cache_type.value)
+        if type_stats is None:
+            type_stats = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0,
+                          "entries": 0, "resident_bytes": 0}
+            self.stats.local_by_type[cache_type.value] = type_stats
+        return type_stats
+    
+    @staticmethod
+    def _estimate_size(content: Any) -> int:
+        """估算快取內容的位元組數"""
+        try:
+            if isinstance(content, str):
+                return sys.getsizeof(content)
+            if hasattr(content, "model_dump_json"):
+                return len(content.model_dump_json())
+            if isinstance(content, (dict, list, tuple)):
+                return len(json.dumps(content, ensure_ascii=False, default=str).encode("utf-8"))
+            return sys.getsizeof(content)
+        except Exception:
+            return sys.getsizeof(content)
+    
+    def _remove_local_entry(self, cache_key: str, reason: Optional[str] = None) -> None:
+        """移除本地快取條目並更新統計（呼叫者持有鎖）"""
+        entry = self.local_cache.pop(cache_key, None)
+        self._local_expiry_order.pop(cache_key, None)
+        if entry is None:
+            return
+        
+        type_stats = self._local_type_stats(entry.cache_type)
+        type_stats["entries"] -= 1
+        type_stats["resident_bytes"] -= entry.size_bytes
+        self.stats.local_resident_bytes -= entry.size_bytes
+        
+        if reason == "eviction":
+            type_stats["evictions"] += 1
+            self.stats.local_evictions += 1
+        elif reason == "expiration":
+            type_stats["expirations"] += 1
+            self.stats.local_expirations += 1
+    
+    def get_local_cache(self, cache_key: str, cache_type: Optional[CacheType] = None) -> Optional[Any]:
         """從本地快取獲取內容"""
         current_time = time.time()
         
-        if cache_key not in self.local_cache:
-            self.stats.local_miss_count += 1
-            return None
-        
-        entry = self.local_cache[cache_key]
-        
-        # 檢查是否過期
-        if entry.is_expired(self.local_ttl_seconds):
-            del self.local_cache[cache_key]
-            self.stats.local_miss_count += 1
-            debug_log(3, f"[CacheManager] 本地快取過期: {cache_key[:8]}...")
-            return None
-        
-        # 更新訪問統計
-        entry.hit_count += 1
-        entry.last_access = current_time
-        self.stats.local_hit_count += 1
+        with self._local_lock:
+            self._maybe_sweep_local_cache(current_time)
+            entry = self.local_cache.get(cache_key)
+            
+            if entry is None:
+                self.stats.local_miss_count += 1
+                self._local_type_stats(cache_type or CacheType.LOCAL)["misses"] += 1
+                return None
+            
+            # 惰性檢查是否過期
+            if entry.is_expired(self.local_ttl_seconds):
+                self._remove_local_entry(cache_key, "expiration")
+                self.stats.local_miss_count += 1
+                self._local_type_stats(entry.cache_type)["misses"] += 1
+                debug_log(3, f"[CacheManager] 本地快取過期: {cache_key[:8]}...")
+                return None
+            
+            # 更新訪問統計
+            self.local_cache.move_to_end(cache_key)
+            entry.hit_count += 1
+            entry.last_access = current_time
+            self.stats.local_hit_count += 1
+            self._local_type_stats(entry.cache_type)["hits"] += 1
         
         debug_log(3, f"[CacheManager] 本地快取命中: {cache_key[:8]}... (命中次數: {entry.hit_count})")
         return entry.content
     
-    def put_local_cache(self, cache_key: str, content: Any, metadata: Optional[Dict[str, Any]] = None) -> None:
+    def put_local_cache(self, cache_key: str, content: Any, metadata: Optional[Dict[str, Any]] = None,
+                        cache_type: Optional[CacheType] = None) -> None:
         """存入本地快取"""
         current_time = time.time()
+        metadata = metadata or {}
         
-        # 檢查是否需要淘汰舊條目
-        if len(self.local_cache) >= self.max_local_entries:
-            self._evict_lru_local_cache()
+        if cache_type is None:
+            try:
+                cache_type = CacheType(metadata.get("type", CacheType.LOCAL.value))
+            except ValueError:
+                cache_type = CacheType.LOCAL
         
-        # 創建快取條目
-        entry = LocalCacheEntry(
-            content=content,
-            timestamp=current_time,
-            metadata=metadata or {}
-        )
+        size_bytes = self._estimate_size(content)
+        if size_bytes > self.max_local_bytes:
+            debug_log(2, f"[CacheManager] 內容超過本地快取上限，不快取: {size_bytes} bytes")
+            return
         
-        self.local_cache[cache_key] = entry
-        self.stats.local_total_entries += 1
+        with self._local_lock:
+            self._maybe_sweep_local_cache(current_time)
+            
+            # 覆寫同鍵條目
+            self._remove_local_entry(cache_key)
+            
+            # 檢查是否需要淘汰舊條目（條目數與位元組雙上限）
+            while self.local_cache and (
+                len(self.local_cache) >= self.max_local_entries
+                or self.stats.local_resident_bytes + size_bytes > self.max_local_bytes
+            ):
+                self._evict_lru_local_cache()
+            
+            # 創建快取條目
+            entry = LocalCacheEntry(
+                content=content,
+                timestamp=current_time,
+                metadata=metadata,
+                cache_type=cache_type,
+                size_bytes=size_bytes
+            )
+            
+            self.local_cache[cache_key] = entry
+            self._local_expiry_order[cache_key] = current_time
+            self.stats.local_total_entries += 1
+            self.stats.local_resident_bytes += size_bytes
+            type_stats = self._local_type_stats(cache_type)
+            type_stats["entries"] += 1
+            type_stats["resident_bytes"] += size_bytes
         
         debug_log(3, f"[CacheManager] 本地快取存入: {cache_key[:8]}...")
     
     def _evict_lru_local_cache(self) -> None:
-        """淘汰最久未使用的本地快取條目"""
-        if not self.local_cache:
-            return
-        
-        # 找到最久未使用的條目
-        oldest_key = min(self.local_cache.keys(), 
-                        key=lambda k: self.local_cache[k].last_access)
-        
-        del self.local_cache[oldest_key]
-        self.stats.local_evictions += 1
+        """淘汰最久未使用的本地快取條目（O(1)）"""
+        with self._local_lock:
+            if not self.local_cache:
+                return
+            
+            oldest_key = next(iter(self.local_cache))
+            self._remove_local_entry(oldest_key, "eviction")
         
         debug_log(3, f"[CacheManager] 淘汰本地快取條目: {oldest_key[:8]}...")
     
+    def _maybe_sweep_local_cache(self, current_time: float) -> None:
+        """距上次清掃超過間隔時清理過期條目（呼叫者持有鎖）"""
+        if current_time - self._last_local_sweep >= self.local_sweep_interval:
+            self.cleanup_expired_local_cache()
+    
     def get_cached_response(self, text: str, mode: str = "chat") -> Optional["LLMOutput"]:
         """獲取快取的LLM回應"""
         cache_key = self.generate_cache_key("llm_response", text, mode=mode)
-        return self.get_local_cache(cache_key)
+        return self.get_local_cache(cache_key, CacheType.LLM_RESPONSE)
     
     def cache_response(self, cache_key: str, response: "LLMOutput") -> None:
         """快取LLM回應"""
-        self.put_local_cache(cache_key, response, {"type": "llm_response"})
+        self.put_local_cache(cache_key, response, {"type": "llm_response"}, CacheType.LLM_RESPONSE)
+    
+    def get_semantic_response(self, text: str, mode: str, fingerprint: str) -> Optional[tuple]:
+        """查找語意相近的快取回應，返回 (LLMOutput, 相似度) 或 None"""
+        return self.semantic_cache.lookup(text, mode, fingerprint)
+    
+    def cache_semantic_response(self, text: str, mode: str, fingerprint: str, response: "LLMOutput") -> bool:
+        """以語意快取保存無副作用的回應"""
+        return self.semantic_cache.store(text, mode, fingerprint, response)
     
     def cache_identity_context(self, identity_data: Dict[str, Any]) -> str:
         """快取身份上下文"""
         identity_str = str(identity_data)
         cache_key = self.generate_cache_key("identity", identity_str)
         
-        cached = self.get_local_cache(cache_key)
+        cached = self.get_local_cache(cache_key, CacheType.IDENTITY)
         if cached:
             return cached
         
@@ -761,20 +881,20 @@ JSON 輸出格式：嚴格遵循指定的 schema
         self.put_local_cache(cache_key, formatted, {
             "type": "identity", 
             "identity_id": identity_data.get("current_identity")
-        })
+        }, CacheType.IDENTITY)
         return formatted
     
     def cache_memory_context(self, memory_content: str, identity_id: Optional[str] = None) -> str:
         """快取記憶上下文"""
         cache_key = self.generate_cache_key("memory", memory_content, identity_id=identity_id or "")
         
-        cached = self.get_local_cache(cache_key)
+        cached = self.get_local_cache(cache_key, CacheType.MEMORY)
         if cached:
             return cached
         
         # 格式化記憶內容
         formatted = f"相關記憶：\n{memory_content}"
-        self.put_local_cache(cache_key, formatted, {"type": "memory", "identity_id": identity_id})
+        self.put_local_cache(cache_key, formatted, {"type": "memory", "identity_id": identity_id}, CacheType.MEMORY)
         return formatted
     
     def _format_identity_context(self, identity_data: Dict[str, Any]) -> str:
@@ -807,17 +927,19 @@ JSON 輸出格式：嚴格遵循指定的 schema
             return "身份上下文處理失敗"
     
     def cleanup_expired_local_cache(self) -> int:
-        """清理過期的本地快取"""
+        """清理過期的本地快取（依寫入時間順序，只走訪過期條目）"""
         expired_count = 0
-        expired_keys = []
         
-        for key, entry in self.local_cache.items():
-            if entry.is_expired(self.local_ttl_seconds):
-                expired_keys.append(key)
-        
-        for key in expired_keys:
-            del self.local_cache[key]
-            expired_count += 1
+        with self._local_lock:
+            self._last_local_sweep = time.time()
+            deadline = self._last_local_sweep - self.local_ttl_seconds
+            
+            while self._local_expiry_order:
+                key, timestamp = next(iter(self._local_expiry_order.items()))
+                if timestamp >= deadline:
+                    break
+                self._remove_local_entry(key, "expiration")
+                expired_count += 1
         
         if expired_count > 0:
             debug_log(2, f"[CacheManager] 清理本地快取: {expired_count}個過期條目")
@@ -1,7 +1,8 @@
 # modules/llm_module/gemini_client.py
 
 import os
-from typing import Any, Optional
+import time
+from typing import Any, Callable, Optional
 from dotenv import load_dotenv
 from google import genai
 from google.genai import types
@@ -9,6 +10,119 @@ from utils.debug_helper import debug_log, info_log, error_log
 
 load_dotenv()
 
+
+class StreamingTextExtractor:
+    """
+    從串流中的部分 JSON 逐步取出頂層 "text" 欄位內容
+
+    JSON schema 模式下 Gemini 以 {"text": "...", "confidence": ...} 逐段輸出；
+    每次 feed 新片段，返回 text 欄位新增的已解碼文字。
+    若輸出不是 JSON 物件（function calling 模式的純文本），則原樣透傳。
+    """
+
+    _ESCAPES = {'"': '"', '\\': '\\', '/': '/', 'b': '\b', 'f': '\f', 'n': '\n', 'r': '\r', 't': '\t'}
+
+    def __init__(self, field: str = "text"):
+        self.field = field
+        self.raw = ""
+        self.text = ""
+        self.mode: Optional[str] = None      # "json" | "plain"
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._unicode: Optional[str] = None  # 收集中的 \uXXXX
+        self._high_surrogate: Optional[int] = None
+        self._string_buffer = ""             # 頂層鍵名
+        self._last_key: Optional[str] = None
+        self._expect_value = False
+        self._capturing = False
+        self._done = False
+
+    def feed(self, chunk: str) -> str:
+        """輸入一段原始輸出，返回新增的文字"""
+        if not chunk:
+            return ""
+        self.raw += chunk
+
+        if self.mode is None:
+            stripped = self.raw.lstrip()
+            if not stripped:
+                return ""
+            self.mode = "json" if stripped[0] == "{" else "plain"
+            if self.mode == "plain":
+                self.text = self.raw
+                return self.raw
+
+        if self.mode == "plain":
+            self.text += chunk
+            return chunk
+
+        delta = []
+        for ch in chunk:
+            if self._done:
+                break
+            if self._in_string:
+                self._feed_string_char(ch, delta)
+            elif ch == '"':
+                self._in_string = True
+                self._string_buffer = ""
+                self._capturing = self._depth == 1 and self._expect_value and self._last_key == self.field
+            elif ch in "{[":
+                self._depth += 1
+                self._expect_value = False
+            elif ch in "}]":
+                self._depth -= 1
+            elif ch == ":" and self._depth == 1:
+                self._expect_value = True
+            elif ch == "," and self._depth == 1:
+                self._expect_value = False
+                self._last_key = None
+
+        new_text = "".join(delta)
+        self.text += new_text
+        return new_text
+
+    def _feed_string_char(self, ch: str, delta: list):
+        """處理字串內的一個字元（含跳脫序列）"""
+        if self._unicode is not None:
+            self._unicode += ch
+            if len(self._unicode) < 4:
+                return
+            code = int(self._unicode, 16)
+            self._unicode = None
+            if 0xD800 <= code <= 0xDBFF:
+                self._high_surrogate = code
+                return
+            if 0xDC00 <= code <= 0xDFFF and self._high_surrogate is not None:
+                code = 0x10000 + ((self._high_surrogate - 0xD800) << 10) + (code - 0xDC00)
+            self._high_surrogate = None
+            self._emit(chr(code), delta)
+        elif self._escape:
+            self._escape = False
+            if ch == "u":
+                self._unicode = ""
+            else:
+                self._emit(self._ESCAPES.get(ch, ch), delta)
+        elif ch == "\\":
+            self._escape = True
+        elif ch == '"':
+            self._in_string = False
+            if self._capturing:
+                self._capturing = False
+                self._done = True
+            elif self._depth == 1 and not self._expect_value:
+                self._last_key = self._string_buffer
+            elif self._depth == 1:
+                self._expect_value = False
+        else:
+            self._emit(ch, delta)
+
+    def _emit(self, text: str, delta: list):
+        if self._capturing:
+            delta.append(text)
+        elif self._depth == 1 and not self._expect_value:
+            self._string_buffer += text
+
 class GeminiWrapper:
     def __init__(self, config: dict):
         self.model_name = config.get("model", "gemini-2.5-flash-lite")
@@ -327,20 +441,9 @@ class GeminiWrapper:
 
 
 
-    # [修改] 允許 str 或 list[str]
-    def query(self, prompt: str, mode: str = "chat", cached_content=None, tools=None, system_instruction: Optional[str] = None, tool_choice: str = "ANY") -> dict:
-        """
-        查詢 Gemini API
-        
-        Args:
-            prompt: 用戶輸入
-            mode: 模式（chat/work/internal/mischief）
-            cached_content: 快取內容 ID
-            tools: MCP 工具列表
-            system_instruction: 自定義系統提示詞（用於 internal/mischief 模式）
-            tool_choice: Function calling 模式 ("ANY" 強制調用 | "AUTO" 自動決定 | "NONE" 不調用)
-        """
-        contents = [types.Content(role="user", parts=[types.Part(text=prompt)])]
+    def _build_generate_config(self, mode: str, cached_content=None, tools=None,
+                               system_instruction: Optional[str] = None, tool_choice: str = "ANY"):
+        """構建 generate_content / generate_content_stream 共用的請求配置"""
         # 支持 mischief 模式
         if mode == "mischief":
             schema = self._create_mischief_schema()
@@ -385,6 +488,52 @@ class GeminiWrapper:
             else:
                 config.cached_content = cached_content
 
+        return config
+
+    def _parse_text_payload(self, text: str, tools=None) -> dict:
+        """將文字回應解析為 payload（JSON schema 模式或 function calling 模式的純文本）"""
+        import json
+        # 當使用 tools 時，Gemini 可能返回純文本而非 JSON
+        if tools:
+            # 🔧 修復：Gemini 在 function calling 模式下可能返回雙重編碼的 JSON
+            try:
+                # 嘗試解析外層 JSON
+                parsed = json.loads(text)
+                if isinstance(parsed, dict) and 'text' in parsed:
+                    # 解碼內層的 Unicode 轉義序列
+                    decoded_text = parsed['text'].encode().decode('unicode_escape')
+                    payload = {"text": decoded_text}
+                    # 保留其他字段
+                    for key, value in parsed.items():
+                        if key != 'text':
+                            payload[key] = value
+                    return payload
+                return {"text": text}
+            except (json.JSONDecodeError, UnicodeDecodeError, AttributeError):
+                # Fallback: 當作純文本處理
+                return {"text": text}
+        try:
+            return json.loads(text)
+        except json.JSONDecodeError:
+            # Fallback: 若 JSON 解析失敗，當作純文本處理
+            return {"text": text}
+
+    # [修改] 允許 str 或 list[str]
+    def query(self, prompt: str, mode: str = "chat", cached_content=None, tools=None, system_instruction: Optional[str] = None, tool_choice: str = "ANY") -> dict:
+        """
+        查詢 Gemini API
+        
+        Args:
+            prompt: 用戶輸入
+            mode: 模式（chat/work/internal/mischief）
+            cached_content: 快取內容 ID
+            tools: MCP 工具列表
+            system_instruction: 自定義系統提示詞（用於 internal/mischief 模式）
+            tool_choice: Function calling 模式 ("ANY" 強制調用 | "AUTO" 自動決定 | "NONE" 不調用)
+        """
+        contents = [types.Content(role="user", parts=[types.Part(text=prompt)])]
+        config = self._build_generate_config(mode, cached_content, tools, system_instruction, tool_choice)
+
         result = self.client.models.generate_content(
             model=self.model_name,
             contents=contents, # type: ignore
@@ -436,7 +585,6 @@ class GeminiWrapper:
         
         part = candidate.content.parts[0] # type: ignore
 
-        import json
         payload: dict[str, Any] = {}
         
         # ✅ 處理 function call 回應
@@ -454,31 +602,7 @@ class GeminiWrapper:
                 "text": ""  # function call 時沒有文本回應
             }
         elif hasattr(part, 'text') and part.text:
-            # 當使用 tools 時，Gemini 可能返回純文本而非 JSON
-            if tools:
-                # 🔧 修復：Gemini 在 function calling 模式下可能返回雙重編碼的 JSON
-                try:
-                    # 嘗試解析外層 JSON
-                    parsed = json.loads(part.text)
-                    if isinstance(parsed, dict) and 'text' in parsed:
-                        # 解碼內層的 Unicode 轉義序列
-                        decoded_text = parsed['text'].encode().decode('unicode_escape')
-                        payload = {"text": decoded_text}
-                        # 保留其他字段
-                        for key, value in parsed.items():
-                            if key != 'text':
-                                payload[key] = value
-                    else:
-                        payload = {"text": part.text}
-                except (json.JSONDecodeError, UnicodeDecodeError, AttributeError):
-                    # Fallback: 當作純文本處理
-                    payload = {"text": part.text}
-            else:
-                try:
-                    payload = json.loads(part.text)
-                except json.JSONDecodeError:
-                    # Fallback: 若 JSON 解析失敗，當作純文本處理
-                    payload = {"text": part.text}
+            payload = self._parse_text_payload(part.text, tools)
         elif hasattr(part, 'struct') and part.struct:  # type: ignore
             payload = part.struct  # type: ignore
         else:
@@ -491,3 +615,83 @@ class GeminiWrapper:
             "total_input_tokens": getattr(meta, "total_token_count", 0) if meta else 0,
         }
         return payload
+
+    def query_stream(self, prompt: str, mode: str = "chat", cached_content=None, tools=None,
+                     system_instruction: Optional[str] = None, tool_choice: str = "ANY",
+                     on_text: Optional[Callable[[str], None]] = None) -> dict:
+        """
+        串流查詢 Gemini API（generate_content_stream）
+
+        參數與 query 相同；on_text 會在回應文字逐段抵達時被呼叫（僅傳入新增部分），
+        讓下游（TTS）在完整回應生成前即可開始處理。返回值格式與 query 一致，
+        並在 _meta 中附上首段文字延遲與串流片段數。
+        """
+        contents = [types.Content(role="user", parts=[types.Part(text=prompt)])]
+        config = self._build_generate_config(mode, cached_content, tools, system_instruction, tool_choice)
+
+        start_time = time.time()
+        extractor = StreamingTextExtractor()
+        function_call = None
+        last_chunk = None
+        chunk_count = 0
+        first_text_latency = None
+
+        try:
+            stream = self.client.models.generate_content_stream(
+                model=self.model_name,
+                contents=contents, # type: ignore
+                config=config
+            )
+
+            for chunk in stream:
+                last_chunk = chunk
+                chunk_count += 1
+                candidates = getattr(chunk, "candidates", None) or []
+                content = getattr(candidates[0], "content", None) if candidates else None
+                for part in (getattr(content, "parts", None) or []):
+                    if getattr(part, "function_call", None):
+                        function_call = part.function_call
+                    elif getattr(part, "text", None):
+                        delta = extractor.feed(part.text)
+                        if delta:
+                            if first_text_latency is None:
+                                first_text_latency = time.time() - start_time
+                                debug_log(3, f"[Gemini] 串流首段文字延遲: {first_text_latency:.3f}s")
+                            if on_text:
+                                on_text(delta)
+
+        except Exception as e:
+            if not extractor.text and function_call is None:
+                # 尚未輸出任何內容，改用一般查詢
+                error_log(f"[Gemini] 串流查詢失敗，改用一般查詢: {e}")
+                return self.query(prompt, mode=mode, cached_content=cached_content, tools=tools,
+                                  system_instruction=system_instruction, tool_choice=tool_choice)
+            error_log(f"[Gemini] 串流中斷，返回已接收的部分回應: {e}")
+            return {"text": extractor.text, "error": "stream_interrupted"}
+
+        if function_call is not None:
+            args_dict = {k: v for k, v in function_call.args.items()} if getattr(function_call, "args", None) else {}
+            payload: dict[str, Any] = {
+                "function_call": {
+                    "name": function_call.name,
+                    "args": args_dict
+                },
+                "text": ""
+            }
+        elif extractor.raw:
+            payload = self._parse_text_payload(extractor.raw, tools)
+            if not isinstance(payload, dict):
+                payload = {"text": extractor.text}
+        else:
+            error_log("[Gemini] 串流未返回任何內容")
+            return {"text": "Welp...I did not come up with any response, sorry."}
+
+        meta = getattr(last_chunk, "usage_metadata", None)
+        payload["_meta"] = {
+            "cached_input_tokens": getattr(meta, "cached_content_used_input_tokens", 0) if meta else 0,
+            "total_input_tokens": getattr(meta, "total_token_count", 0) if meta else 0,
+            "streamed": True,
+            "stream_chunks": chunk_count,
+            "first_text_latency": first_text_latency,
+        }
+        return payload
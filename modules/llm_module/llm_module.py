@@ -53,6 +53,9 @@ class LLMModule(BaseModule):
         # 統一快取管理器 (整合Gemini顯性快取 + 本地快取)
         self.cache_manager = cache_manager
         
+        # 串流輸出設定：CHAT 回應逐句推送給 TTS，縮短首段語音延遲
+        self.streaming_config = self.config.get("streaming", {})
+        
         # 狀態和會話管理
         self.state_manager = state_manager
         self.status_manager = status_manager
@@ -1247,6 +1250,7 @@ Response requirements:
         """處理 CHAT 模式 - 與 MEM 協作的日常對話"""
         start_time = time.time()
         debug_log(2, "[LLM] 處理 CHAT 模式")
+        tts_stream = None
         
         try:
             # 1. 檢查 Context Cache (記憶改由 LLM 透過工具主動檢索)
@@ -1268,6 +1272,46 @@ Response requirements:
             elif llm_input.processing_context and isinstance(llm_input.processing_context, dict):
                 intent_metadata = llm_input.processing_context.get('intent_metadata')
             
+            # 1b. 語意快取：僅限一般閒聊（非降級 WORK、非記憶檢索意圖），且上下文指紋須一致
+            semantic_fingerprint = None
+            if (not llm_input.ignore_cache and not intent_metadata
+                    and not self._should_force_memory_tool_use(llm_input.text)):
+                semantic_fingerprint = self.cache_manager.semantic_cache.context_fingerprint(
+                    llm_input.identity_context,
+                    llm_input.memory_context,
+                    conversation_history=getattr(llm_input, 'conversation_history', None),
+                    session_id=self.session_info.get('session_id', '')
+                )
+                semantic_hit = self.cache_manager.get_semantic_response(
+                    llm_input.text, "chat", semantic_fingerprint
+                )
+                if semantic_hit:
+                    cached_output, similarity = semantic_hit
+                    info_log(f"[LLM] 語意快取命中 (相似度 {similarity:.3f})，跳過 Gemini 查詢")
+                    
+                    # 命中的回合照常寫入對話記憶與學習記錄，只跳過模型查詢
+                    memory_operations = self._process_chat_memory_operations(
+                        llm_input, {}, cached_output.text
+                    )
+                    self._record_chat_interaction(llm_input, cached_output.text)
+                    
+                    output = cached_output.model_copy(update={
+                        "processing_time": time.time() - start_time,
+                        "metadata": {
+                            **(cached_output.metadata or {}),
+                            "cached": True,
+                            "cache_tier": "semantic",
+                            "semantic_similarity": similarity,
+                            "memory_operations_count": len(memory_operations),
+                            "memory_operations": memory_operations
+                        }
+                    })
+                    self._publish_llm_response_event(output, "CHAT", {
+                        "memory_context_used": bool(llm_input.memory_context),
+                        "cached": True
+                    })
+                    return output
+            
             # 2. 構建 CHAT 提示（記憶改由 MCP 工具檢索）
             prompt = self.prompt_manager.build_chat_prompt(
                 user_input=llm_input.text,
@@ -1295,9 +1339,12 @@ Response requirements:
                 tool_choice_strategy = "ANY"
                 debug_log(2, "[LLM] 記憶意圖強制使用工具 (tool_choice=ANY)")
             
-            # 6. 呼叫 Gemini API (使用快取 + MCP 工具)
-            response_data = self.model.query(
-                prompt, 
+            # 6. 呼叫 Gemini API (使用快取 + MCP 工具)；啟用串流時回應文字邊生成邊送往 TTS
+            tts_stream, speech_chunker = self._open_tts_stream()
+            response_data = self._query_model(
+                prompt,
+                tts_stream,
+                speech_chunker,
                 mode="chat",
                 cached_content=cached_content_ids.get("persona"),
                 tools=mcp_tools,
@@ -1355,8 +1402,10 @@ Based on this memory retrieval result, please provide your response to the user.
 Remember to respond in a natural, conversational way using the actual data from the tool result."""
                     
                     # 再次查詢，不帶工具（只要文字回應）
-                    follow_up_response = self.model.query(
+                    follow_up_response = self._query_model(
                         follow_up_prompt,
+                        tts_stream,
+                        speech_chunker,
                         mode="chat",
                         cached_content=cached_content_ids.get("persona"),
                         tools=None,  # 不再提供工具
@@ -1441,19 +1490,9 @@ Remember to respond in a natural, conversational way using the actual data from
                     
                     identity_id = (ctx.get("identity") or {}).get("id") or ctx.get("identity_id") or "default"
                     self.learning_engine.process_learning_signals(identity_id, response_data["learning_signals"])
-                    
-                # 保留舊的互動記錄（用於統計和分析）
-                identity_id = (ctx.get("identity") or {}).get("id") or ctx.get("identity_id") or "default"
-                self.learning_engine.record_interaction(
-                    identity_id=identity_id,
-                    interaction_type="CHAT",
-                    user_input=llm_input.text,
-                    system_response=response_text,
-                    metadata={
-                        "memory_used": bool(llm_input.memory_context),
-                        "identity_used": bool(llm_input.identity_context)
-                    }
-                )
+            
+            # 保留舊的互動記錄（用於統計和分析）
+            self._record_chat_interaction(llm_input, response_text)
             
             # 5. 處理會話控制建議
             session_control_result = self._process_session_control(
@@ -1479,7 +1518,23 @@ Remember to respond in a natural, conversational way using the actual data from
                 }
             )
             
-            self.cache_manager.cache_response(cache_key, output)
+            if tts_stream is not None:
+                self._finish_tts_stream(tts_stream, speech_chunker, response_text)
+                output.metadata["tts_stream_id"] = tts_stream.stream_id
+            
+            # 串流 ID 只對本次回應有效，快取副本不保留，命中時由 TTS 整段合成
+            cached_output = output.model_copy(update={
+                "metadata": {k: v for k, v in output.metadata.items() if k != "tts_stream_id"}
+            })
+            self.cache_manager.cache_response(cache_key, cached_output)
+            
+            # 語意快取只保存無副作用的回應：無工具調用、狀態更新、模型指定的記憶操作，且不結束會話
+            # （自動產生的對話記憶儲存在命中時會重新執行，不影響快取）
+            if (semantic_fingerprint and not function_call_info and not status_updates
+                    and not response_data.get("memory_operations") and not session_control_result):
+                self.cache_manager.cache_semantic_response(
+                    llm_input.text, "chat", semantic_fingerprint, cached_output
+                )
             
             # 發布 LLM 回應生成事件
             event_extra_data = {
@@ -1497,6 +1552,8 @@ Remember to respond in a natural, conversational way using the actual data from
             
         except Exception as e:
             error_log(f"[LLM] CHAT 模式處理錯誤: {e}")
+            if tts_stream is not None:
+                tts_stream.close(error=str(e))
             return LLMOutput(
                 text="聊天處理時發生錯誤，請稍後再試。",
                 success=False,
@@ -1507,6 +1564,67 @@ Remember to respond in a natural, conversational way using the actual data from
                 metadata={"mode": "CHAT", "error_type": "processing_error"}
             )
     
+    def _record_chat_interaction(self, llm_input: "LLMInput", response_text: str):
+        """記錄 CHAT 互動到學習引擎（新回應與語意快取命中共用）"""
+        if not self.learning_engine.learning_enabled:
+            return
+        ctx = llm_input.identity_context or {}
+        identity_id = (ctx.get("identity") or {}).get("id") or ctx.get("identity_id") or "default"
+        self.learning_engine.record_interaction(
+            identity_id=identity_id,
+            interaction_type="CHAT",
+            user_input=llm_input.text,
+            system_response=response_text,
+            metadata={
+                "memory_used": bool(llm_input.memory_context),
+                "identity_used": bool(llm_input.identity_context)
+            }
+        )
+    
+    def _open_tts_stream(self):
+        """啟用串流輸出時向 TTS 開啟文字串流，返回 (TextStream, StreamingTextChunker) 或 (None, None)"""
+        if not self.streaming_config.get("enabled", False):
+            return None, None
+        try:
+            from core.framework import core_framework
+            tts_module = core_framework.get_module('tts')
+            if not tts_module or not hasattr(tts_module, 'start_text_stream'):
+                return None, None
+            tts_stream = tts_module.start_text_stream()
+            if tts_stream is None:
+                return None, None
+            from utils.tts_chunker import StreamingTextChunker
+            speech_chunker = StreamingTextChunker(
+                max_chars=self.streaming_config.get("max_chars", 150),
+                min_chars=self.streaming_config.get("min_chars", 40),
+                first_min_chars=self.streaming_config.get("first_min_chars", 12)
+            )
+            return tts_stream, speech_chunker
+        except Exception as e:
+            error_log(f"[LLM] 開啟 TTS 文字串流失敗，改用完整回應: {e}")
+            return None, None
+    
+    def _query_model(self, prompt: str, tts_stream=None, speech_chunker=None, **kwargs) -> dict:
+        """查詢 Gemini；有 TTS 文字串流時使用串流查詢並逐句推送"""
+        if tts_stream is None:
+            return self.model.query(prompt, **kwargs)
+        
+        def on_text(delta: str):
+            for chunk in speech_chunker.feed(delta):
+                tts_stream.put(chunk)
+        
+        return self.model.query_stream(prompt, on_text=on_text, **kwargs)
+    
+    def _finish_tts_stream(self, tts_stream, speech_chunker, response_text: str):
+        """送出剩餘文字並關閉串流；若回應未經串流（如工具格式化結果）則整段補送"""
+        chunks = speech_chunker.flush()
+        if tts_stream.chunk_count == 0 and not chunks and response_text:
+            chunks = speech_chunker.feed(response_text) + speech_chunker.flush()
+        for chunk in chunks:
+            tts_stream.put(chunk)
+        tts_stream.close()
+        debug_log(2, f"[LLM] TTS 文字串流已關閉: {tts_stream.chunk_count} 段")
+    
     def _handle_work_mode(self, llm_input: "LLMInput", status: Dict[str, Any]) -> "LLMOutput":
         """處理 WORK 模式 - 通過 MCP 與 SYS 協作的工作任務
         
@@ -0,0 +1,291 @@
+# modules/llm_module/semantic_cache.py
+"""
+語意回應快取 - 以輸入語意相似度重用無副作用的 CHAT 回應
+
+功能：
+- 正規化輸入文本（全半形、大小寫、空白與句末標點）後編碼為向量
+- 每個 (模式, 上下文指紋) 維護一個小型正規化向量矩陣，以內積找最近鄰
+- 各模式獨立的相似度閾值；上下文指紋（身份、記憶上下文、會話 ID 與最近對話）必須完全一致
+- 條目數上限（LRU）與 TTL
+- 命中率與節省延遲統計
+"""
+
+import hashlib
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Any, List, Optional, Tuple
+
+import numpy as np
+
+from utils.debug_helper import debug_log, info_log, error_log
+
+
+# 句首句末可忽略的標點（含全形）
+_EDGE_PUNCTUATION = " \t\r\n.,!?;:~…。，！？；：、～\"'「」『』()（）"
+_WHITESPACE = re.compile(r"\s+")
+
+
+@dataclass
+class SemanticCacheEntry:
+    """語意快取條目"""
+    key: str
+    normalized_text: str
+    response: Any
+    created_at: float
+    processing_time: float = 0.0
+    hit_count: int = 0
+
+
+class _ContextBucket:
+    """同一 (模式, 上下文指紋) 下的條目與向量矩陣"""
+
+    def __init__(self, dim: int):
+        self.keys: List[str] = []
+        self.matrix = np.zeros((0, dim), dtype=np.float32)
+
+    def add(self, key: str, vector: np.ndarray):
+        self.keys.append(key)
+        self.matrix = np.vstack([self.matrix, vector[None, :]])
+
+    def remove(self, key: str):
+        row = self.keys.index(key)
+        del self.keys[row]
+        self.matrix = np.delete(self.matrix, row, axis=0)
+
+    def nearest(self, vector: np.ndarray) -> Tuple[Optional[str], float]:
+        if not self.keys:
+            return None, 0.0
+        scores = self.matrix @ vector
+        row = int(np.argmax(scores))
+        return self.keys[row], float(scores[row])
+
+
+class SemanticResponseCache:
+    """語意回應快取"""
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None, encoder=None):
+        self.config = config or {}
+        self.enabled = self.config.get("enabled", False)
+        self.embedding_model = self.config.get("embedding_model", "all-MiniLM-L6-v2")
+        self.max_entries = self.config.get("max_entries", 512)
+        self.ttl_seconds = self.config.get("ttl_seconds", 900)
+        self.default_threshold = self.config.get("default_threshold", 0.95)
+        self.history_turns = self.config.get("history_turns", 4)
+        self.thresholds: Dict[str, float] = {
+            str(mode).lower(): float(value)
+            for mode, value in (self.config.get("thresholds") or {"chat": 0.93}).items()
+        }
+
+        # 編碼器：需提供 encode(List[str]) -> ndarray；未注入時延遲載入 sentence-transformers
+        self.encoder = encoder
+        self._encoder_failed = False
+
+        # LRU 順序：最久未使用在前
+        self._entries: "OrderedDict[str, SemanticCacheEntry]" = OrderedDict()
+        self._entry_bucket: Dict[str, Tuple[str, str]] = {}
+        self._buckets: Dict[Tuple[str, str], _ContextBucket] = {}
+        self._lock = threading.RLock()
+
+        # 統計
+        self.stats = {
+            "lookups": 0,
+            "hits": 0,
+            "misses": 0,
+            "stores": 0,
+            "evictions": 0,
+            "expirations": 0,
+            "encode_failures": 0,
+            "saved_latency_ms": 0.0,
+            "lookup_time_ms": 0.0
+        }
+
+    # === 正規化與指紋 ===
+
+    @staticmethod
+    def normalize_text(text: str) -> str:
+        """正規化輸入：NFKC、小寫、合併空白、去除首尾標點"""
+        normalized = unicodedata.normalize("NFKC", text or "").lower()
+        normalized = _WHITESPACE.sub(" ", normalized)
+        return normalized.strip(_EDGE_PUNCTUATION)
+
+    def context_fingerprint(self, identity_context: Optional[Dict[str, Any]], memory_context: Optional[str],
+                            conversation_history: Optional[List[Any]] = None,
+                            session_id: Optional[str] = None) -> str:
+        """
+        上下文指紋，任一部分變化即視為不同上下文
+
+        包含身份、記憶上下文、會話 ID 與最近 history_turns 輪對話，
+        避免不同對話中相同的簡短追問（如「為什麼？」）共用同一個回應。
+        """
+        identity_str = repr(sorted((identity_context or {}).items(), key=lambda item: str(item[0])))
+        recent = (conversation_history or [])[-self.history_turns:] if self.history_turns > 0 else []
+        history_str = "\0".join(f"{self._entry_field(entry, 'role')}:{self._entry_field(entry, 'content')}"
+                                 for entry in recent)
+        payload = f"{identity_str}\0{memory_context or ''}\0{session_id or ''}\0{history_str}"
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+    @staticmethod
+    def _entry_field(entry: Any, field: str) -> str:
+        """對話條目可能是 ConversationEntry 或字典"""
+        value = entry.get(field) if isinstance(entry, dict) else getattr(entry, field, None)
+        return str(value or "")
+
+    def threshold_for(self, mode: str) -> float:
+        """取得模式對應的相似度閾值"""
+        return self.thresholds.get(str(mode).lower(), self.default_threshold)
+
+    # === 編碼 ===
+
+    def _get_encoder(self):
+        """取得編碼器，首次使用時載入 sentence-transformers 模型"""
+        if self.encoder is None and not self._encoder_failed:
+            try:
+                from sentence_transformers import SentenceTransformer
+                self.encoder = SentenceTransformer(self.embedding_model)
+                info_log(f"[SemanticCache] 嵌入模型已載入: {self.embedding_model}")
+            except Exception as e:
+                self._encoder_failed = True
+                error_log(f"[SemanticCache] 嵌入模型載入失敗，語意快取停用: {e}")
+        return self.encoder
+
+    def _encode(self, text: str) -> Optional[np.ndarray]:
+        """編碼並 L2 正規化，失敗時返回 None"""
+        encoder = self._get_encoder()
+        if encoder is None:
+            return None
+        try:
+            vector = np.asarray(encoder.encode([text]), dtype=np.float32).reshape(-1)
+            norm = float(np.linalg.norm(vector))
+            if norm == 0.0:
+                return None
+            return vector / norm
+        except Exception as e:
+            self.stats["encode_failures"] += 1
+            error_log(f"[SemanticCache] 文本編碼失敗: {e}")
+            return None
+
+    # === 對外介面 ===
+
+    def lookup(self, text: str, mode: str, fingerprint: str) -> Optional[Tuple[Any, float]]:
+        """查找語意相近的已快取回應，返回 (回應, 相似度) 或 None"""
+        if not self.enabled:
+            return None
+
+        start = time.perf_counter()
+        try:
+            normalized = self.normalize_text(text)
+            if not normalized:
+                return None
+            vector = self._encode(normalized)
+
+            with self._lock:
+                self.stats["lookups"] += 1
+                bucket = self._buckets.get((str(mode).lower(), fingerprint)) if vector is not None else None
+                key, similarity = bucket.nearest(vector) if bucket else (None, 0.0)
+
+                entry = self._entries.get(key) if key else None
+                if entry is not None and time.time() - entry.created_at > self.ttl_seconds:
+                    self._remove_entry(key)
+                    self.stats["expirations"] += 1
+                    entry = None
+
+                if entry is None or similarity < self.threshold_for(mode):
+                    self.stats["misses"] += 1
+                    return None
+
+                self._entries.move_to_end(key)
+                entry.hit_count += 1
+                self.stats["hits"] += 1
+                lookup_ms = (time.perf_counter() - start) * 1000
+                self.stats["saved_latency_ms"] += max(entry.processing_time * 1000 - lookup_ms, 0.0)
+                debug_log(2, f"[SemanticCache] 命中 (相似度 {similarity:.3f}): '{entry.normalized_text[:40]}'")
+                return entry.response, similarity
+
+        except Exception as e:
+            error_log(f"[SemanticCache] 查找失敗: {e}")
+            return None
+        finally:
+            with self._lock:
+                self.stats["lookup_time_ms"] += (time.perf_counter() - start) * 1000
+
+    def store(self, text: str, mode: str, fingerprint: str, response: Any,
+              processing_time: Optional[float] = None) -> bool:
+        """快取回應；呼叫者須確保該回應不帶副作用。processing_time 預設取回應本身的處理時間"""
+        if not self.enabled:
+            return False
+
+        try:
+            normalized = self.normalize_text(text)
+            if not normalized:
+                return False
+            vector = self._encode(normalized)
+            if vector is None:
+                return False
+
+            bucket_key = (str(mode).lower(), fingerprint)
+            key = hashlib.blake2b(f"{bucket_key[0]}\0{fingerprint}\0{normalized}".encode("utf-8"),
+                                  digest_size=16).hexdigest()
+
+            with self._lock:
+                if key in self._entries:
+                    self._remove_entry(key)
+
+                bucket = self._buckets.get(bucket_key)
+                if bucket is None:
+                    bucket = self._buckets[bucket_key] = _ContextBucket(vector.shape[0])
+                bucket.add(key, vector)
+                self._entries[key] = SemanticCacheEntry(
+                    key=key,
+                    normalized_text=normalized,
+                    response=response,
+                    created_at=time.time(),
+                    processing_time=(processing_time if processing_time is not None
+                                     else getattr(response, "processing_time", None)) or 0.0
+                )
+                self._entry_bucket[key] = bucket_key
+                self.stats["stores"] += 1
+
+                while len(self._entries) > self.max_entries:
+                    oldest_key = next(iter(self._entries))
+                    self._remove_entry(oldest_key)
+                    self.stats["evictions"] += 1
+
+            return True
+
+        except Exception as e:
+            error_log(f"[SemanticCache] 寫入失敗: {e}")
+            return False
+
+    def _remove_entry(self, key: str):
+        """移除條目及其向量（呼叫者持有鎖）"""
+        self._entries.pop(key, None)
+        bucket_key = self._entry_bucket.pop(key, None)
+        bucket = self._buckets.get(bucket_key) if bucket_key else None
+        if bucket is not None:
+            bucket.remove(key)
+            if not bucket.keys:
+                del self._buckets[bucket_key]
+
+    def clear(self):
+        """清空快取（統計保留）"""
+        with self._lock:
+            self._entries.clear()
+            self._entry_bucket.clear()
+            self._buckets.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """獲取命中率與節省延遲統計"""
+        with self._lock:
+            stats = dict(self.stats)
+            stats["enabled"] = self.enabled
+            stats["entries"] = len(self._entries)
+            stats["contexts"] = len(self._buckets)
+            stats["max_entries"] = self.max_entries
+            stats["thresholds"] = dict(self.thresholds)
+            stats["hit_rate"] = stats["hits"] / stats["lookups"] if stats["lookups"] else 0.0
+            stats["avg_lookup_ms"] = stats["lookup_time_ms"] / stats["lookups"] if stats["lookups"] else 0.0
+            return stats
@@ -1952,8 +1952,7 @@ class MEMModule(BaseModule):
         """模組關閉"""
         info_log("[MEM] 模組關閉")
         if self.memory_manager:
-            # 如果需要，可以在這裡添加記憶管理器的清理邏輯
-            pass
+            self.memory_manager.shutdown()
     
     def _reload_from_user_settings(self, key_path: str, value: Any) -> bool:
         """
@@ -1498,6 +1498,14 @@ class MemoryManager:
                 message=f"刪除異常: {str(e)}"
             )
     
+    def shutdown(self):
+        """關閉記憶管理器（寫回待寫的存取統計並持久化存儲）"""
+        try:
+            info_log("[MemoryManager] 關閉記憶管理器...")
+            self.storage_manager.shutdown()
+        except Exception as e:
+            error_log(f"[MemoryManager] 關閉失敗: {e}")
+    
     def cleanup_resources(self):
         """清理資源"""
         try:
@@ -4,19 +4,30 @@ MEM模組存儲層
 
 包含：
 - 向量索引管理 (FAISS)
-- 元資料存儲
+- 元資料存儲 (JSON / SQLite)
+- 嵌入向量存儲 (記憶體映射)
+- 嵌入向量服務 (快取與批次編碼)
+- 存取統計批次寫回
 - 身份隔離管理
 - 統一存儲介面
 """
 
 from .vector_index import VectorIndexManager
 from .metadata_storage import MetadataStorageManager
+from .sqlite_metadata_storage import SQLiteMetadataStorageManager
+from .embedding_store import EmbeddingStore
+from .embedding_service import EmbeddingService
+from .access_tracker import AccessTracker
 from .identity_isolation import IdentityIsolationManager
 from .storage_manager import MemoryStorageManager
 
 __all__ = [
     "VectorIndexManager",
     "MetadataStorageManager", 
+    "SQLiteMetadataStorageManager",
+    "EmbeddingStore",
+    "EmbeddingService",
+    "AccessTracker",
     "IdentityIsolationManager",
     "MemoryStorageManager"
 ]
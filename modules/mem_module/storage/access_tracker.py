@@ -0,0 +1,136 @@
+# modules/mem_module/storage/access_tracker.py
+"""
+存取統計追蹤器 - 記憶搜索的延遲批次寫回
+
+功能：
+- 搜索時只在記憶體中累加 access_count / accessed_at，不觸碰存儲
+- 背景線程定時寫回，待寫筆數超過閾值時提前喚醒
+- 關閉時強制寫回，寫回失敗的增量會併回待寫佇列
+- 提供待寫與已寫回計數供統計使用
+"""
+
+import threading
+import time
+from typing import Dict, Any, Callable, Optional, Tuple
+
+from utils.debug_helper import debug_log, info_log, error_log
+
+
+class AccessTracker:
+    """記憶存取統計的寫回緩衝"""
+
+    def __init__(self, config: Dict[str, Any],
+                 flush_callback: Callable[[Dict[str, Tuple[int, float]]], bool]):
+        self.config = config
+        self.flush_callback = flush_callback
+
+        # 寫回配置
+        self.flush_interval = config.get("access_flush_interval", 30.0)    # 秒
+        self.flush_threshold = config.get("access_flush_threshold", 256)   # 待寫記憶數
+
+        # 待寫緩衝: memory_id -> (存取次數增量, 最後存取時間)
+        self._pending: Dict[str, Tuple[int, float]] = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        # 統計
+        self.stats = {
+            "recorded_accesses": 0,
+            "flushed_accesses": 0,
+            "flushed_memories": 0,
+            "flush_batches": 0,
+            "failed_flushes": 0,
+            "last_flush_time": None
+        }
+
+    def start(self):
+        """啟動背景寫回線程"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._flush_loop, name="MemAccessFlusher", daemon=True)
+        self._thread.start()
+        debug_log(2, f"[AccessTracker] 背景寫回已啟動，間隔 {self.flush_interval}s，閾值 {self.flush_threshold}")
+
+    def stop(self) -> bool:
+        """停止背景線程並寫回剩餘的存取統計"""
+        self._stop_event.set()
+        self._wakeup.set()
+        if self._thread and self._thread.is_alive():
+            self._thread.join(timeout=5.0)
+        self._thread = None
+        return self.flush()
+
+    def record(self, memory_id: str, accessed_at: float = None):
+        """記錄一次存取（僅更新記憶體）"""
+        accessed_at = accessed_at or time.time()
+        with self._lock:
+            count, last = self._pending.get(memory_id, (0, 0.0))
+            self._pending[memory_id] = (count + 1, max(last, accessed_at))
+            self.stats["recorded_accesses"] += 1
+            should_wake = len(self._pending) >= self.flush_threshold
+
+        if should_wake:
+            self._wakeup.set()
+
+    def pending_count(self, memory_id: str) -> int:
+        """尚未寫回的存取次數"""
+        with self._lock:
+            return self._pending.get(memory_id, (0, 0.0))[0]
+
+    def flush(self) -> bool:
+        """將待寫的存取統計一次寫回存儲"""
+        with self._flush_lock:
+            with self._lock:
+                if not self._pending:
+                    return True
+                batch = self._pending
+                self._pending = {}
+
+            try:
+                success = self.flush_callback(batch)
+            except Exception as e:
+                error_log(f"[AccessTracker] 寫回存取統計失敗: {e}")
+                success = False
+
+            if not success:
+                # 併回待寫佇列，下次再試
+                with self._lock:
+                    for memory_id, (count, last) in batch.items():
+                        pending_count, pending_last = self._pending.get(memory_id, (0, 0.0))
+                        self._pending[memory_id] = (pending_count + count, max(pending_last, last))
+                    self.stats["failed_flushes"] += 1
+                return False
+
+            with self._lock:
+                self.stats["flushed_accesses"] += sum(count for count, _ in batch.values())
+                self.stats["flushed_memories"] += len(batch)
+                self.stats["flush_batches"] += 1
+                self.stats["last_flush_time"] = time.time()
+
+            debug_log(3, f"[AccessTracker] 寫回 {len(batch)} 個記憶的存取統計")
+            return True
+
+    def _flush_loop(self):
+        """背景寫回循環：定時或超過閾值時寫回"""
+        while not self._stop_event.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            if self._stop_event.is_set():
+                break
+            self.flush()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """獲取寫回統計"""
+        with self._lock:
+            stats = dict(self.stats)
+            stats["pending_memories"] = len(self._pending)
+            stats["pending_accesses"] = sum(count for count, _ in self._pending.values())
+            # 逐筆更新模式下每次存取都是一次存儲寫入
+            stats["writes_avoided"] = stats["flushed_accesses"] - stats["flush_batches"]
+            stats["flush_interval"] = self.flush_interval
+            stats["flush_threshold"] = self.flush_threshold
+            return stats
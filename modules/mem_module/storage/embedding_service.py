@@ -0,0 +1,289 @@
+# modules/mem_module/storage/embedding_service.py
+"""
+嵌入向量服務 - 帶快取與批次合併的文本編碼層
+
+功能：
+- 以 (模型名稱, 文本) 內容雜湊為鍵的 LRU 快取，以位元組數為上限
+- encode_batch：同一時間窗口內的並發請求合併為一次模型呼叫
+- 可選的磁碟快取（EmbeddingStore），重啟後不必重新編碼相同文本；超過條目上限時淘汰最久未使用的條目
+- 命中、未命中、淘汰與模型呼叫次數統計
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Any
+
+import numpy as np
+
+from utils.debug_helper import debug_log, info_log, error_log
+from .embedding_store import EmbeddingStore
+
+
+class _PendingBatch:
+    """等待合併編碼的一批文本"""
+
+    def __init__(self):
+        self.texts: Dict[str, str] = {}            # 快取鍵 -> 文本
+        self.results: Dict[str, np.ndarray] = {}
+        self.error: Optional[Exception] = None
+        self.closed = False
+        self.done = threading.Event()
+
+
+class EmbeddingService:
+    """嵌入向量服務"""
+
+    def __init__(self, config: Dict[str, Any], model=None):
+        self.config = config
+        self.model = model
+        self.model_name = config.get("embedding_model", "all-MiniLM-L6-v2")
+
+        # 記憶體快取配置
+        self.cache_max_bytes = config.get("embedding_cache_max_bytes", 64 * 1024 * 1024)
+
+        # 批次合併配置
+        self.batch_window = config.get("embedding_batch_window_ms", 2) / 1000.0
+        self.batch_size = config.get("batch_size", 32)
+
+        # 磁碟快取配置
+        self.disk_cache_enabled = config.get("embedding_disk_cache", False)
+        self.disk_cache_max_entries = config.get("embedding_disk_cache_max_entries", 200000)
+        self.disk_cache: Optional[EmbeddingStore] = None
+        if self.disk_cache_enabled:
+            self.disk_cache = EmbeddingStore({
+                "embedding_store_file": config.get("embedding_disk_cache_file", "memory/embedding_cache"),
+                "snapshot_interval": config.get("embedding_disk_cache_snapshot_interval", 5000),
+            })
+
+        # 快取狀態
+        self._cache: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._cache_bytes = 0
+        self._cache_lock = threading.Lock()
+        self._disk_order: "OrderedDict[str, None]" = OrderedDict()  # 磁碟快取鍵，最久未使用在前
+
+        # 批次合併狀態
+        self._pending: Optional[_PendingBatch] = None
+        self._pending_lock = threading.Lock()
+        self._model_lock = threading.Lock()
+
+        # 統計
+        self.stats = {
+            "requests": 0,
+            "cache_hits": 0,
+            "disk_hits": 0,
+            "cache_misses": 0,
+            "evictions": 0,
+            "model_calls": 0,
+            "texts_encoded": 0,
+            "coalesced_requests": 0
+        }
+
+    def initialize(self) -> bool:
+        """初始化磁碟快取（記憶體快取不需初始化）"""
+        if self.disk_cache is not None and not self.disk_cache.initialize():
+            info_log("[EmbeddingService] 磁碟快取初始化失敗，僅使用記憶體快取", "WARNING")
+            self.disk_cache = None
+        if self.disk_cache is not None:
+            # 重啟後以寫入順序作為初始使用順序
+            with self._cache_lock:
+                self._disk_order = OrderedDict.fromkeys(self.disk_cache.offsets)
+        return True
+
+    def set_model(self, model):
+        """設定（或替換）嵌入模型"""
+        self.model = model
+
+    def cache_key(self, text: str) -> str:
+        """以模型名稱與文本內容計算快取鍵"""
+        return hashlib.blake2b(f"{self.model_name}\0{text}".encode('utf-8'), digest_size=16).hexdigest()
+
+    # === 對外介面 ===
+
+    def encode(self, text: str) -> Optional[np.ndarray]:
+        """編碼單一文本，返回 float32 向量（呼叫者可自由修改的複本）"""
+        vectors = self.encode_batch([text])
+        return vectors[0] if vectors is not None else None
+
+    def encode_batch(self, texts: List[str]) -> Optional[np.ndarray]:
+        """編碼多個文本，返回 (len(texts), dim) 的 float32 矩陣，失敗時返回 None"""
+        try:
+            if not texts:
+                return None
+
+            keys = [self.cache_key(text) for text in texts]
+            vectors: Dict[str, np.ndarray] = {}
+            missing: Dict[str, str] = {}
+
+            with self._cache_lock:
+                self.stats["requests"] += len(texts)
+                for key, text in zip(keys, texts):
+                    if key in vectors or key in missing:
+                        continue
+                    cached = self._cache.get(key)
+                    if cached is not None:
+                        self._cache.move_to_end(key)
+                        vectors[key] = cached
+                        self.stats["cache_hits"] += 1
+                    else:
+                        missing[key] = text
+
+            if missing and self.disk_cache is not None:
+                found_keys, matrix = self.disk_cache.get_many(list(missing.keys()))
+                for key, vector in zip(found_keys, matrix):
+                    vectors[key] = vector
+                    del missing[key]
+                self._cache_put({key: vectors[key] for key in found_keys})
+                with self._cache_lock:
+                    self.stats["disk_hits"] += len(found_keys)
+                    for key in found_keys:
+                        if key in self._disk_order:
+                            self._disk_order.move_to_end(key)
+
+            if missing:
+                with self._cache_lock:
+                    self.stats["cache_misses"] += len(missing)
+                encoded = self._encode_coalesced(missing)
+                if encoded is None:
+                    return None
+                vectors.update(encoded)
+
+            return np.stack([vectors[key] for key in keys]).astype(np.float32, copy=True)
+
+        except Exception as e:
+            error_log(f"[EmbeddingService] 批次編碼失敗: {e}")
+            return None
+
+    # === 批次合併 ===
+
+    def _encode_coalesced(self, texts: Dict[str, str]) -> Optional[Dict[str, np.ndarray]]:
+        """加入當前批次；第一個加入者負責等待窗口並呼叫模型"""
+        with self._pending_lock:
+            batch = self._pending
+            leader = batch is None or batch.closed
+            if leader:
+                batch = _PendingBatch()
+                self._pending = batch
+            else:
+                with self._cache_lock:
+                    self.stats["coalesced_requests"] += 1
+            batch.texts.update(texts)
+
+        if leader:
+            self._run_batch(batch)
+        else:
+            batch.done.wait()
+
+        if batch.error is not None:
+            error_log(f"[EmbeddingService] 模型編碼失敗: {batch.error}")
+            return None
+        return {key: batch.results[key] for key in texts}
+
+    def _run_batch(self, batch: _PendingBatch):
+        """等待合併窗口後，一次模型呼叫編碼整批文本"""
+        try:
+            if self.batch_window > 0:
+                time.sleep(self.batch_window)
+
+            # 等待模型期間抵達的請求仍會併入本批
+            with self._model_lock:
+                with self._pending_lock:
+                    batch.closed = True
+                    if self._pending is batch:
+                        self._pending = None
+
+                if self.model is None:
+                    raise RuntimeError("嵌入模型未初始化")
+
+                keys = list(batch.texts.keys())
+                matrix = self.model.encode([batch.texts[key] for key in keys],
+                                           convert_to_numpy=True, batch_size=self.batch_size)
+                matrix = np.asarray(matrix, dtype=np.float32).reshape(len(keys), -1)
+
+            batch.results = {key: matrix[i] for i, key in enumerate(keys)}
+            with self._cache_lock:
+                self.stats["model_calls"] += 1
+                self.stats["texts_encoded"] += len(keys)
+            self._cache_put(batch.results)
+
+            if self.disk_cache is not None:
+                self._disk_put(keys, matrix)
+
+            debug_log(4, f"[EmbeddingService] 模型編碼 {len(keys)} 個文本")
+
+        except Exception as e:
+            batch.error = e
+        finally:
+            with self._pending_lock:
+                batch.closed = True
+                if self._pending is batch:
+                    self._pending = None
+            batch.done.set()
+
+    # === 快取維護 ===
+
+    def _cache_put(self, vectors: Dict[str, np.ndarray]):
+        """寫入記憶體快取，超過位元組上限時淘汰最久未使用的條目"""
+        with self._cache_lock:
+            for key, vector in vectors.items():
+                if key in self._cache:
+                    self._cache.move_to_end(key)
+                    continue
+                vector = np.array(vector, dtype=np.float32)
+                vector.setflags(write=False)
+                self._cache[key] = vector
+                self._cache_bytes += vector.nbytes
+
+            while self._cache_bytes > self.cache_max_bytes and self._cache:
+                _, evicted = self._cache.popitem(last=False)
+                self._cache_bytes -= evicted.nbytes
+                self.stats["evictions"] += 1
+
+    def _disk_put(self, keys: List[str], matrix: np.ndarray):
+        """寫入磁碟快取，超過條目上限時淘汰最久未使用的條目"""
+        try:
+            rows = [i for i, key in enumerate(keys) if key not in self.disk_cache]
+            if not rows:
+                return
+
+            with self._cache_lock:
+                overflow = len(self.disk_cache) + len(rows) - self.disk_cache_max_entries
+                evicted = []
+                while overflow > len(evicted) and self._disk_order:
+                    evicted.append(self._disk_order.popitem(last=False)[0])
+                for i in rows:
+                    self._disk_order[keys[i]] = None
+            if evicted:
+                self.disk_cache.delete_many(evicted)
+                debug_log(3, f"[EmbeddingService] 磁碟快取淘汰 {len(evicted)} 條最久未使用的向量")
+
+            self.disk_cache.put_many([keys[i] for i in rows], matrix[rows])
+            self.disk_cache.save()
+        except Exception as e:
+            info_log(f"[EmbeddingService] 寫入磁碟快取失敗: {e}", "WARNING")
+
+    def clear_cache(self):
+        """清空記憶體快取"""
+        with self._cache_lock:
+            self._cache.clear()
+            self._cache_bytes = 0
+
+    def shutdown(self):
+        """持久化磁碟快取"""
+        if self.disk_cache is not None:
+            self.disk_cache.save(force=True)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """獲取服務統計資訊"""
+        with self._cache_lock:
+            stats = dict(self.stats)
+            stats["cache_entries"] = len(self._cache)
+            stats["cache_bytes"] = self._cache_bytes
+            stats["cache_max_bytes"] = self.cache_max_bytes
+            lookups = stats["cache_hits"] + stats["disk_hits"] + stats["cache_misses"]
+            stats["hit_rate"] = (stats["cache_hits"] + stats["disk_hits"]) / lookups if lookups else 0.0
+        if self.disk_cache is not None:
+            stats["disk_cache_entries"] = len(self.disk_cache)
+            stats["disk_cache_max_entries"] = self.disk_cache_max_entries
+        return stats
@@ -0,0 +1,366 @@
+# modules/mem_module/storage/embedding_store.py
+"""
+嵌入向量存儲 - 基於記憶體映射 float32 檔案的向量儲存
+
+功能：
+- 以 memory_id 為鍵的嵌入向量存取
+- 僅追加（append-only）的向量寫入
+- 啟動時延遲映射，不解析任何浮點文字
+- 刪除留下墓碑，由壓縮（compaction）回收空間
+- 偏移變更寫入追加式日誌，單次寫入成本與總量無關
+
+檔案格式：
+- <base>.<世代>.f32      連續的 float32 向量列，每列 dimension 個值
+- <base>.idx.json        偏移表快照 {generation, dimension, offsets}，只含整數
+- <base>.<世代>.idx.log  快照之後的偏移變更日誌（每行一筆 put / delete）
+
+世代 0 的資料檔與日誌沿用舊檔名 <base>.f32 / <base>.idx.log。
+壓縮寫出新世代的資料檔，原子性寫入記錄新世代的快照是唯一的切換點；
+切換前崩潰仍載入舊世代，舊世代檔案在切換後才刪除。
+"""
+
+import json
+import os
+import re
+import threading
+from typing import Dict, List, Optional, Tuple, Any
+from pathlib import Path
+
+import numpy as np
+
+from utils.debug_helper import debug_log, info_log, error_log
+
+
+class EmbeddingStore:
+    """記憶體映射嵌入向量存儲"""
+
+    def __init__(self, config: Dict[str, Any]):
+        self.config = config
+
+        # 基本配置
+        self.store_file = config.get("embedding_store_file", "memory/mem_embeddings")
+        self.offset_file = f"{self.store_file}.idx.json"
+        self.temp_suffix = ".tmp"
+        self._set_generation(0)
+
+        # 日誌累積到此筆數時，save() 會寫出新快照並清空日誌
+        self.snapshot_interval = config.get("snapshot_interval", 5000)
+
+        # 壓縮配置：墓碑列數與比例同時超過閾值才壓縮
+        self.compaction_min_dead_rows = config.get("compaction_min_dead_rows", 1000)
+        self.compaction_dead_ratio = config.get("compaction_dead_ratio", 0.3)
+
+        # 狀態
+        self.dimension: Optional[int] = config.get("vector_dimension")
+        self.offsets: Dict[str, int] = {}  # memory_id -> 列號
+        self._total_rows = 0               # 檔案中的總列數（含墓碑）
+        self._mmap: Optional[np.memmap] = None
+        self._journal_entries = 0          # 快照之後的日誌筆數
+
+        # 線程安全
+        self._lock = threading.RLock()
+
+        self.is_initialized = False
+
+    def _data_path(self, generation: int) -> str:
+        if generation == 0:
+            return f"{self.store_file}.f32"
+        return f"{self.store_file}.{generation}.f32"
+
+    def _journal_path(self, generation: int) -> str:
+        if generation == 0:
+            return f"{self.store_file}.idx.log"
+        return f"{self.store_file}.{generation}.idx.log"
+
+    def _set_generation(self, generation: int):
+        self.generation = generation
+        self.data_file = self._data_path(generation)
+        self.journal_file = self._journal_path(generation)
+
+    def initialize(self) -> bool:
+        """載入偏移表（向量本身延遲映射）"""
+        try:
+            with self._lock:
+                Path(self.store_file).parent.mkdir(parents=True, exist_ok=True)
+
+                if os.path.exists(self.offset_file):
+                    with open(self.offset_file, 'r', encoding='utf-8') as f:
+                        table = json.load(f)
+                    self.dimension = table.get("dimension") or self.dimension
+                    self.offsets = table.get("offsets", {})
+                    self._set_generation(table.get("generation", 0))
+
+                self._replay_journal()
+                self._remove_stale_files()
+                self._total_rows = self._rows_on_disk()
+
+                # 偏移表可能比資料檔新（寫入中途崩潰），丟棄指向不存在列的條目
+                invalid = [mid for mid, row in self.offsets.items() if row >= self._total_rows]
+                for memory_id in invalid:
+                    del self.offsets[memory_id]
+                if invalid:
+                    info_log(f"[EmbeddingStore] 丟棄 {len(invalid)} 個無效偏移", "WARNING")
+                    self._write_snapshot()
+
+                self.is_initialized = True
+                debug_log(2, f"[EmbeddingStore] 初始化完成，向量數: {len(self.offsets)}，總列數: {self._total_rows}")
+                return True
+
+        except Exception as e:
+            error_log(f"[EmbeddingStore] 初始化失敗: {e}")
+            return False
+
+    def _replay_journal(self):
+        """重放快照之後的偏移日誌，忽略崩潰留下的殘缺末行"""
+        if not os.path.exists(self.journal_file):
+            return
+        with open(self.journal_file, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    break
+                if entry[0] == "p":
+                    self.offsets[entry[1]] = entry[2]
+                    self.dimension = self.dimension or entry[3]
+                elif entry[0] == "d":
+                    self.offsets.pop(entry[1], None)
+                self._journal_entries += 1
+
+    def _append_journal(self, entries: List[list]):
+        """追加偏移變更到日誌"""
+        with open(self.journal_file, 'a', encoding='utf-8') as f:
+            f.write("".join(json.dumps(entry, ensure_ascii=False) + "\n" for entry in entries))
+        self._journal_entries += len(entries)
+
+    def _rows_on_disk(self) -> int:
+        """根據資料檔大小計算完整列數"""
+        if not self.dimension or not os.path.exists(self.data_file):
+            return 0
+        row_bytes = self.dimension * 4
+        size = os.path.getsize(self.data_file)
+        if size % row_bytes:
+            # 追加中途崩潰留下的殘缺列，截斷以保持列對齊
+            info_log(f"[EmbeddingStore] 截斷殘缺列 ({size % row_bytes} bytes)", "WARNING")
+            with open(self.data_file, 'r+b') as f:
+                f.truncate(size - size % row_bytes)
+        return size // row_bytes
+
+    def _get_mmap(self) -> Optional[np.memmap]:
+        """延遲建立（或在檔案增長後重建）唯讀映射"""
+        if self._total_rows == 0:
+            return None
+        if self._mmap is None or self._mmap.shape[0] < self._total_rows:
+            self._mmap = np.memmap(self.data_file, dtype=np.float32, mode='r',
+                                   shape=(self._total_rows, self.dimension))
+        return self._mmap
+
+    def _release_mmap(self):
+        """釋放映射（Windows 上替換檔案前必須先關閉）"""
+        if self._mmap is not None:
+            mmap_obj = getattr(self._mmap, '_mmap', None)
+            self._mmap = None
+            if mmap_obj is not None:
+                mmap_obj.close()
+
+    def put(self, memory_id: str, vector) -> bool:
+        """追加一個向量，同一 memory_id 再次寫入時舊列成為墓碑"""
+        try:
+            with self._lock:
+                array = np.asarray(vector, dtype=np.float32).reshape(-1)
+                if self.dimension is None:
+                    self.dimension = int(array.shape[0])
+                elif array.shape[0] != self.dimension:
+                    error_log(f"[EmbeddingStore] 向量維度不匹配: {array.shape[0]} != {self.dimension}")
+                    return False
+
+                with open(self.data_file, 'ab') as f:
+                    f.write(array.tobytes())
+
+                # 先寫向量再記日誌，日誌永遠不會指向不存在的列
+                self._append_journal([["p", memory_id, self._total_rows, self.dimension]])
+                self.offsets[memory_id] = self._total_rows
+                self._total_rows += 1
+                return True
+
+        except Exception as e:
+            error_log(f"[EmbeddingStore] 寫入向量失敗: {e}")
+            return False
+
+    def put_many(self, memory_ids: List[str], vectors) -> bool:
+        """批次追加向量（一次寫入）"""
+        try:
+            with self._lock:
+                matrix = np.asarray(vectors, dtype=np.float32)
+                if matrix.ndim != 2 or matrix.shape[0] != len(memory_ids):
+                    error_log(f"[EmbeddingStore] 批次向量形狀不符: {matrix.shape}")
+                    return False
+                if not memory_ids:
+                    return True
+                if self.dimension is None:
+                    self.dimension = int(matrix.shape[1])
+                elif matrix.shape[1] != self.dimension:
+                    error_log(f"[EmbeddingStore] 向量維度不匹配: {matrix.shape[1]} != {self.dimension}")
+                    return False
+
+                with open(self.data_file, 'ab') as f:
+                    f.write(np.ascontiguousarray(matrix).tobytes())
+
+                self._append_journal([
+                    ["p", memory_id, self._total_rows + i, self.dimension]
+                    for i, memory_id in enumerate(memory_ids)
+                ])
+                for i, memory_id in enumerate(memory_ids):
+                    self.offsets[memory_id] = self._total_rows + i
+                self._total_rows += len(memory_ids)
+                return True
+
+        except Exception as e:
+            error_log(f"[EmbeddingStore] 批次寫入向量失敗: {e}")
+            return False
+
+    def get(self, memory_id: str) -> Optional[np.ndarray]:
+        """取得單一向量（複本）"""
+        with self._lock:
+            row = self.offsets.get(memory_id)
+            if row is None:
+                return None
+            mmap = self._get_mmap()
+            return np.array(mmap[row]) if mmap is not None else None
+
+    def get_many(self, memory_ids: List[str]) -> Tuple[List[str], np.ndarray]:
+        """批次取得向量，返回 (找到的ID, 向量矩陣)"""
+        with self._lock:
+            found_ids = [mid for mid in memory_ids if mid in self.offsets]
+            mmap = self._get_mmap()
+            if not found_ids or mmap is None:
+                return [], np.zeros((0, self.dimension or 0), dtype=np.float32)
+            rows = np.fromiter((self.offsets[mid] for mid in found_ids), dtype=np.int64, count=len(found_ids))
+            return found_ids, np.asarray(mmap[rows], dtype=np.float32)
+
+    def delete(self, memory_id: str) -> bool:
+        """刪除向量（留下墓碑）"""
+        with self._lock:
+            if self.offsets.pop(memory_id, None) is None:
+                return False
+            self._append_journal([["d", memory_id]])
+            return True
+
+    def delete_many(self, memory_ids: List[str]) -> int:
+        """批次刪除向量（一次寫入日誌），返回實際刪除數"""
+        with self._lock:
+            deleted = [mid for mid in memory_ids if self.offsets.pop(mid, None) is not None]
+            if deleted:
+                self._append_journal([["d", memory_id] for memory_id in deleted])
+            return len(deleted)
+
+    def clear(self):
+        """清空所有向量"""
+        with self._lock:
+            self._release_mmap()
+            self.offsets = {}
+            self._total_rows = 0
+            if os.path.exists(self.data_file):
+                os.remove(self.data_file)
+            self._write_snapshot()
+
+    def __contains__(self, memory_id: str) -> bool:
+        return memory_id in self.offsets
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+    @property
+    def dead_rows(self) -> int:
+        return self._total_rows - len(self.offsets)
+
+    def save(self, force: bool = False) -> bool:
+        """變更已即時寫入日誌；此處只在需要時壓縮或寫出新快照"""
+        try:
+            with self._lock:
+                dead = self.dead_rows
+                if dead >= self.compaction_min_dead_rows and dead > self._total_rows * self.compaction_dead_ratio:
+                    return self.compact()
+
+                if self._journal_entries and (force or self._journal_entries >= self.snapshot_interval):
+                    return self._write_snapshot()
+                return True
+
+        except Exception as e:
+            error_log(f"[EmbeddingStore] 儲存偏移表失敗: {e}")
+            return False
+
+    def _write_snapshot(self, generation: Optional[int] = None,
+                        offsets: Optional[Dict[str, int]] = None) -> bool:
+        """原子性寫入偏移表快照並清空日誌（預設為當前世代與偏移表）"""
+        generation = self.generation if generation is None else generation
+        offsets = self.offsets if offsets is None else offsets
+        temp_file = self.offset_file + self.temp_suffix
+        with open(temp_file, 'w', encoding='utf-8') as f:
+            json.dump({"generation": generation, "dimension": self.dimension, "offsets": offsets}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_file, self.offset_file)
+        # 同世代的日誌重放是冪等的，快照後才刪除不會造成錯誤偏移
+        journal_file = self._journal_path(generation)
+        if os.path.exists(journal_file):
+            os.remove(journal_file)
+        self._journal_entries = 0
+        return True
+
+    def compact(self) -> bool:
+        """將存活向量寫為新世代的資料檔，再以快照原子性切換，回收墓碑空間"""
+        try:
+            with self._lock:
+                live_ids = list(self.offsets.keys())
+                _, vectors = self.get_many(live_ids)
+
+                generation = self.generation + 1
+                with open(self._data_path(generation), 'wb') as f:
+                    f.write(np.ascontiguousarray(vectors, dtype=np.float32).tobytes())
+                    f.flush()
+                    os.fsync(f.fileno())
+
+                offsets = {memory_id: row for row, memory_id in enumerate(live_ids)}
+                self._write_snapshot(generation, offsets)  # 切換點：之前崩潰仍保留舊世代
+
+                reclaimed = self.dead_rows
+                self._release_mmap()
+                self._set_generation(generation)
+                self.offsets = offsets
+                self._total_rows = len(live_ids)
+                self._remove_stale_files()
+
+                info_log(f"[EmbeddingStore] 壓縮完成，回收 {reclaimed} 列，剩餘 {self._total_rows} 列，世代 {generation}")
+                return True
+
+        except Exception as e:
+            error_log(f"[EmbeddingStore] 壓縮失敗: {e}")
+            return False
+
+    def _remove_stale_files(self):
+        """移除非當前世代的資料檔與日誌、殘留暫存檔（無法移除時留待下次）"""
+        directory, base = os.path.split(self.store_file)
+        pattern = re.compile(rf"{re.escape(base)}(\.\d+)?\.(f32|idx\.log)(\.tmp)?")
+        current = {os.path.basename(self.data_file), os.path.basename(self.journal_file)}
+        for name in os.listdir(directory or "."):
+            stale = (pattern.fullmatch(name) and name not in current) \
+                or name == os.path.basename(self.offset_file) + self.temp_suffix
+            if stale:
+                try:
+                    os.remove(os.path.join(directory, name))
+                except OSError as e:
+                    debug_log(3, f"[EmbeddingStore] 暫時無法移除 {name}: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """獲取存儲統計資訊"""
+        return {
+            "vector_count": len(self.offsets),
+            "generation": self.generation,
+            "total_rows": self._total_rows,
+            "dead_rows": self.dead_rows,
+            "journal_entries": self._journal_entries,
+            "dimension": self.dimension,
+            "data_bytes": self._total_rows * (self.dimension or 0) * 4,
+            "store_file": self.store_file
+        }
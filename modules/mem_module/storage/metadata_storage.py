@@ -7,6 +7,7 @@
 - 記憶的增刪改查操作
 - 身份隔離的資料過濾
 - 自動備份與恢復
+- 嵌入向量交由 EmbeddingStore 以二進位格式保存，JSON 只含純量欄位
 """
 
 import json
@@ -14,11 +15,14 @@ import os
 import threading
 import shutil
 from datetime import datetime
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 from pathlib import Path
 
+import numpy as np
+
 from utils.debug_helper import debug_log, info_log, error_log
 from ..schemas import MemoryEntry, MemoryType, MemoryImportance
+from .embedding_store import EmbeddingStore
 
 
 class MetadataStorageManager:
@@ -37,6 +41,14 @@ class MetadataStorageManager:
         self.backup_interval = config.get("backup_interval", 3600)  # 1小時
         self.max_backups = config.get("max_backups", 5)
         
+        # 嵌入向量存儲（與元資料檔同目錄）
+        embedding_config = dict(config.get("embedding_store", {}))
+        embedding_config.setdefault(
+            "embedding_store_file",
+            os.path.join(os.path.dirname(self.metadata_file), "mem_embeddings")
+        )
+        self.embedding_store = EmbeddingStore(embedding_config)
+        
         # 記憶體快取
         self.metadata_cache: List[Dict[str, Any]] = []
         self.cache_by_id: Dict[str, Dict[str, Any]] = {}
@@ -60,6 +72,10 @@ class MetadataStorageManager:
                 metadata_dir = Path(self.metadata_file).parent
                 metadata_dir.mkdir(parents=True, exist_ok=True)
                 
+                if not self.embedding_store.initialize():
+                    error_log("[MetadataStorage] 嵌入向量存儲初始化失敗")
+                    return False
+                
                 # 載入現有資料
                 if self._metadata_file_exists():
                     if self._load_metadata():
@@ -74,6 +90,9 @@ class MetadataStorageManager:
                 # 重建快取索引
                 self._rebuild_cache_indexes()
                 
+                # 舊格式：向量內嵌於JSON，遷移到嵌入向量存儲
+                self._migrate_inline_embeddings()
+                
                 self.is_initialized = True
                 info_log(f"[MetadataStorage] 元資料存儲初始化完成")
                 return True
@@ -124,6 +143,30 @@ class MetadataStorageManager:
             error_log(f"[MetadataStorage] 載入元資料失敗: {e}")
             return False
     
+    def _migrate_inline_embeddings(self) -> int:
+        """將JSON內嵌的 embedding_vector 移入嵌入向量存儲並重寫精簡的元資料檔"""
+        memory_ids = []
+        vectors = []
+        found_inline = False
+        for memory_data in self.metadata_cache:
+            if 'embedding_vector' not in memory_data:
+                continue
+            found_inline = True
+            embedding_vector = memory_data.pop('embedding_vector')
+            memory_id = memory_data.get('memory_id')
+            if embedding_vector and memory_id and memory_id not in self.embedding_store:
+                memory_ids.append(memory_id)
+                vectors.append(embedding_vector)
+        
+        migrated = 0
+        if vectors and self.embedding_store.put_many(memory_ids, vectors):
+            migrated = len(memory_ids)
+        
+        if found_inline:
+            info_log(f"[MetadataStorage] 已遷移 {migrated} 個內嵌向量到嵌入向量存儲")
+            self._save_metadata()
+        return migrated
+    
     def _save_metadata(self) -> bool:
         """儲存元資料到檔案"""
         try:
@@ -149,6 +192,9 @@ class MetadataStorageManager:
                 # 原子性替換
                 shutil.move(self.temp_file, self.metadata_file)
                 
+                # 向量已即時追加，這裡只需寫入偏移表
+                self.embedding_store.save()
+                
                 self._dirty = False
                 debug_log(3, f"[MetadataStorage] 元資料儲存成功，條目數: {len(self.metadata_cache)}")
                 return True
@@ -189,14 +235,18 @@ class MetadataStorageManager:
         """添加記憶條目"""
         try:
             with self._lock:
-                # 轉換為字典格式
-                memory_data = memory_entry.dict()
+                # 轉換為字典格式（向量另存，不進入JSON）
+                memory_data = memory_entry.dict(exclude={'embedding_vector'})
                 
                 # 檢查是否已存在
                 if memory_entry.memory_id in self.cache_by_id:
                     info_log("WARNING", f"[MetadataStorage] 記憶條目已存在: {memory_entry.memory_id}")
                     return False
                 
+                if memory_entry.embedding_vector:
+                    if not self.embedding_store.put(memory_entry.memory_id, memory_entry.embedding_vector):
+                        return False
+                
                 # 添加到快取
                 self.metadata_cache.append(memory_data)
                 self.cache_by_id[memory_entry.memory_id] = memory_data
@@ -228,6 +278,30 @@ class MetadataStorageManager:
             error_log(f"[MetadataStorage] 獲取記憶條目失敗: {e}")
             return None
     
+    def get_all_memory_ids(self) -> List[str]:
+        """獲取所有記憶ID（依插入順序）"""
+        with self._lock:
+            return [m.get('memory_id') for m in self.metadata_cache if m.get('memory_id')]
+    
+    def has_embedding(self, memory_id: str) -> bool:
+        """檢查記憶是否有嵌入向量"""
+        return memory_id in self.embedding_store
+    
+    def get_embedding(self, memory_id: str) -> Optional[np.ndarray]:
+        """獲取單一記憶的嵌入向量"""
+        return self.embedding_store.get(memory_id)
+    
+    def get_embeddings(self, memory_ids: List[str]):
+        """批次獲取嵌入向量，返回 (有向量的ID列表, float32矩陣)"""
+        return self.embedding_store.get_many(memory_ids)
+    
+    def put_embeddings(self, memory_ids: List[str], vectors) -> bool:
+        """批次寫入嵌入向量（不觸碰元資料）"""
+        with self._lock:
+            if not self.embedding_store.put_many(memory_ids, vectors):
+                return False
+            return self.embedding_store.save()
+    
     def get_memories_by_token(self, memory_token: str) -> List[Dict[str, Any]]:
         """根據記憶令牌獲取記憶條目"""
         try:
@@ -245,6 +319,13 @@ class MetadataStorageManager:
                     info_log("WARNING", f"[MetadataStorage] 記憶條目不存在: {memory_id}")
                     return False
                 
+                # 向量更新寫入嵌入向量存儲
+                if 'embedding_vector' in updates:
+                    updates = dict(updates)
+                    embedding_vector = updates.pop('embedding_vector')
+                    if embedding_vector is not None:
+                        self.embedding_store.put(memory_id, embedding_vector)
+                
                 # 更新資料
                 memory_data = self.cache_by_id[memory_id]
                 memory_data.update(updates)
@@ -262,7 +343,36 @@ class MetadataStorageManager:
         except Exception as e:
             error_log(f"[MetadataStorage] 更新記憶條目失敗: {e}")
             return False
-    
+
+    def increment_access_stats(self, deltas: Dict[str, Tuple[int, float]]) -> bool:
+        """批次累加存取統計（整批只儲存一次）
+
+        Args:
+            deltas: memory_id -> (存取次數增量, 最後存取時間)
+        """
+        try:
+            with self._lock:
+                updated = 0
+                for memory_id, (count, accessed_at) in deltas.items():
+                    memory_data = self.cache_by_id.get(memory_id)
+                    if memory_data is None:
+                        continue  # 寫回前已被刪除
+                    memory_data['access_count'] = memory_data.get('access_count', 0) + count
+                    memory_data['accessed_at'] = max(self._to_timestamp(memory_data.get('accessed_at')) or 0.0,
+                                                     accessed_at)
+                    updated += 1
+
+                if updated:
+                    self._dirty = True
+                    if self.auto_backup:
+                        return self._save_metadata()
+
+                return True
+
+        except Exception as e:
+            error_log(f"[MetadataStorage] 批次更新存取統計失敗: {e}")
+            return False
+
     def delete_memory(self, memory_id: str) -> bool:
         """刪除記憶條目"""
         try:
@@ -277,6 +387,7 @@ class MetadataStorageManager:
                 # 從快取中移除
                 self.metadata_cache = [m for m in self.metadata_cache if m.get('memory_id') != memory_id]
                 del self.cache_by_id[memory_id]
+                self.embedding_store.delete(memory_id)
                 
                 # 更新記憶令牌索引
                 if memory_token and memory_token in self.cache_by_token:
@@ -309,39 +420,7 @@ class MetadataStorageManager:
                     return memories
                 
                 # 應用過濾器
-                filtered_memories = []
-                
-                for memory in memories:
-                    # 記憶類型過濾
-                    if 'memory_types' in filters:
-                        if memory.get('memory_type') not in filters['memory_types']:
-                            continue
-                    
-                    # 主題過濾
-                    if 'topic_filter' in filters and filters['topic_filter']:
-                        topic = memory.get('topic', '') or ''  # 確保 topic 不是 None
-                        if filters['topic_filter'].lower() not in topic.lower():
-                            continue
-                    
-                    # 重要性過濾
-                    if 'importance_filter' in filters:
-                        if memory.get('importance') not in filters['importance_filter']:
-                            continue
-                    
-                    # 時間範圍過濾
-                    if 'time_range' in filters:
-                        created_at = memory.get('created_at')
-                        if created_at:
-                            # 這裡可以添加時間範圍檢查邏輯
-                            pass
-                    
-                    # 歸檔狀態過濾
-                    if 'include_archived' in filters:
-                        is_archived = memory.get('is_archived', False)
-                        if not filters['include_archived'] and is_archived:
-                            continue
-                    
-                    filtered_memories.append(memory)
+                filtered_memories = [m for m in memories if self.matches_filters(m, filters)]
                 
                 debug_log(3, f"[MetadataStorage] 搜索完成，找到 {len(filtered_memories)} 個結果")
                 return filtered_memories
@@ -350,6 +429,59 @@ class MetadataStorageManager:
             error_log(f"[MetadataStorage] 搜索記憶失敗: {e}")
             return []
     
+    def matches_filters(self, memory: Dict[str, Any], filters: Dict[str, Any]) -> bool:
+        """檢查單一記憶條目是否符合過濾條件"""
+        # 記憶類型過濾
+        if 'memory_types' in filters:
+            if memory.get('memory_type') not in filters['memory_types']:
+                return False
+        
+        # 主題過濾
+        if 'topic_filter' in filters and filters['topic_filter']:
+            topic = memory.get('topic', '') or ''  # 確保 topic 不是 None
+            if filters['topic_filter'].lower() not in topic.lower():
+                return False
+        
+        # 重要性過濾
+        if 'importance_filter' in filters:
+            if memory.get('importance') not in filters['importance_filter']:
+                return False
+        
+        # 時間範圍過濾
+        if 'time_range' in filters and filters['time_range']:
+            created_ts = self._to_timestamp(memory.get('created_at'))
+            if created_ts is not None:
+                start_ts = self._to_timestamp(filters['time_range'].get('start'))
+                end_ts = self._to_timestamp(filters['time_range'].get('end'))
+                if start_ts is not None and created_ts < start_ts:
+                    return False
+                if end_ts is not None and created_ts > end_ts:
+                    return False
+        
+        # 歸檔狀態過濾
+        if 'include_archived' in filters:
+            is_archived = memory.get('is_archived', False)
+            if not filters['include_archived'] and is_archived:
+                return False
+        
+        return True
+    
+    @staticmethod
+    def _to_timestamp(value: Any) -> Optional[float]:
+        """將 datetime / ISO 字串 / 數值轉為時間戳"""
+        if value is None:
+            return None
+        if isinstance(value, (int, float)):
+            return float(value)
+        if isinstance(value, datetime):
+            return value.timestamp()
+        if isinstance(value, str):
+            try:
+                return datetime.fromisoformat(value.replace('Z', '+00:00')).timestamp()
+            except ValueError:
+                return None
+        return None
+    
     def get_memory_stats(self, memory_token: str = None) -> Dict[str, Any]:
         """獲取記憶統計資訊"""
         try:
@@ -399,6 +531,8 @@ class MetadataStorageManager:
             with self._lock:
                 if memory_token:
                     # 只清空指定身份的記憶
+                    for m in self.cache_by_token.get(memory_token, []):
+                        self.embedding_store.delete(m.get('memory_id'))
                     self.metadata_cache = [
                         m for m in self.metadata_cache 
                         if m.get('memory_token') != memory_token
@@ -416,6 +550,7 @@ class MetadataStorageManager:
                     self.metadata_cache = []
                     self.cache_by_id = {}
                     self.cache_by_token = {}
+                    self.embedding_store.clear()
                 
                 self._dirty = True
                 
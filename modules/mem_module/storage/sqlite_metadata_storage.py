@@ -0,0 +1,419 @@
+# modules/mem_module/storage/sqlite_metadata_storage.py
+"""
+SQLite 元資料存儲管理器 - MetadataStorageManager 的資料庫後端
+
+功能：
+- WAL 模式的 SQLite 存儲，單列增刪改，不再整檔重寫
+- (memory_token, memory_type, importance, created_at) 二級索引支援過濾查詢
+- 一次性從既有 JSON 元資料檔遷移
+- 嵌入向量仍由 EmbeddingStore 保存
+
+對外介面與 MetadataStorageManager 相同，可在 config.yaml 的
+storage.metadata_backend 選擇 "json" 或 "sqlite"。
+"""
+
+import json
+import os
+import sqlite3
+from datetime import datetime
+from typing import List, Dict, Any, Optional, Tuple
+from pathlib import Path
+
+from utils.debug_helper import debug_log, info_log, error_log
+from ..schemas import MemoryEntry, MemoryType
+from .metadata_storage import MetadataStorageManager
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS memories (
+    memory_id    TEXT PRIMARY KEY,
+    memory_token TEXT NOT NULL,
+    memory_type  TEXT,
+    importance   TEXT,
+    created_at   REAL,
+    topic        TEXT,
+    is_archived  INTEGER NOT NULL DEFAULT 0,
+    data         TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_memories_filter
+    ON memories (memory_token, memory_type, importance, created_at);
+CREATE INDEX IF NOT EXISTS idx_memories_token_created
+    ON memories (memory_token, created_at);
+"""
+
+
+class SQLiteMetadataStorageManager(MetadataStorageManager):
+    """SQLite 元資料存儲管理器"""
+
+    def __init__(self, config: Dict[str, Any]):
+        super().__init__(config)
+
+        self.db_file = config.get("db_file", f"{os.path.splitext(self.metadata_file)[0]}.db")
+        self.migrated_suffix = ".migrated"
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def initialize(self) -> bool:
+        """初始化資料庫並在需要時遷移 JSON 元資料"""
+        try:
+            with self._lock:
+                info_log("[SQLiteMetadata] 初始化 SQLite 元資料存儲...")
+
+                Path(self.db_file).parent.mkdir(parents=True, exist_ok=True)
+
+                if not self.embedding_store.initialize():
+                    error_log("[SQLiteMetadata] 嵌入向量存儲初始化失敗")
+                    return False
+
+                self._conn = sqlite3.connect(self.db_file, check_same_thread=False)
+                self._conn.row_factory = sqlite3.Row
+                self._conn.execute("PRAGMA journal_mode=WAL")
+                self._conn.execute("PRAGMA synchronous=NORMAL")
+                self._conn.executescript(_SCHEMA)
+                self._conn.commit()
+
+                # 一次性遷移既有 JSON
+                if self._count_rows() == 0 and self._metadata_file_exists():
+                    self.migrate_from_json(self.metadata_file)
+
+                self.is_initialized = True
+                info_log(f"[SQLiteMetadata] 初始化完成，條目數: {self._count_rows()}")
+                return True
+
+        except Exception as e:
+            error_log(f"[SQLiteMetadata] 初始化失敗: {e}")
+            return False
+
+    def close(self):
+        """關閉資料庫連線"""
+        with self._lock:
+            if self._conn is not None:
+                self.embedding_store.save(force=True)
+                self._conn.close()
+                self._conn = None
+
+    # === 遷移 ===
+
+    def migrate_from_json(self, json_file: str) -> int:
+        """從 JSON 元資料檔匯入所有記憶，成功後將原檔改名為 .migrated"""
+        try:
+            with self._lock:
+                with open(json_file, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+
+                memories = data.get('memories', []) if isinstance(data, dict) else data
+                if not isinstance(memories, list):
+                    info_log("[SQLiteMetadata] 未知的元資料格式，跳過遷移", "WARNING")
+                    return 0
+
+                # 內嵌向量一併移入嵌入向量存儲
+                vector_ids = []
+                vectors = []
+                for memory_data in memories:
+                    embedding_vector = memory_data.pop('embedding_vector', None)
+                    memory_id = memory_data.get('memory_id')
+                    if embedding_vector and memory_id and memory_id not in self.embedding_store:
+                        vector_ids.append(memory_id)
+                        vectors.append(embedding_vector)
+                if vectors:
+                    self.embedding_store.put_many(vector_ids, vectors)
+                    self.embedding_store.save()
+
+                rows = [self._row_values(m) for m in memories if m.get('memory_id') and m.get('memory_token')]
+                with self._conn:
+                    self._conn.executemany(
+                        "INSERT OR REPLACE INTO memories "
+                        "(memory_id, memory_token, memory_type, importance, created_at, topic, is_archived, data) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                        rows
+                    )
+
+                os.replace(json_file, json_file + self.migrated_suffix)
+                info_log(f"[SQLiteMetadata] 已從 JSON 遷移 {len(rows)} 個記憶條目")
+                return len(rows)
+
+        except Exception as e:
+            error_log(f"[SQLiteMetadata] JSON 遷移失敗: {e}")
+            return 0
+
+    # === 內部工具 ===
+
+    def _row_values(self, memory_data: Dict[str, Any]) -> Tuple:
+        """將記憶字典轉為資料表欄位"""
+        memory_type = memory_data.get('memory_type')
+        importance = memory_data.get('importance')
+        return (
+            memory_data.get('memory_id'),
+            memory_data.get('memory_token'),
+            memory_type.value if hasattr(memory_type, 'value') else memory_type,
+            importance.value if hasattr(importance, 'value') else importance,
+            self._to_timestamp(memory_data.get('created_at')),
+            memory_data.get('topic'),
+            1 if memory_data.get('is_archived', False) else 0,
+            json.dumps(memory_data, ensure_ascii=False, default=str),
+        )
+
+    def _count_rows(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM memories").fetchone()[0]
+
+    def _fetch(self, sql: str, params: Tuple = ()) -> List[Dict[str, Any]]:
+        return [json.loads(row['data']) for row in self._conn.execute(sql, params)]
+
+    # === 增刪改查 ===
+
+    def add_memory(self, memory_entry: MemoryEntry) -> bool:
+        """添加記憶條目（單列插入）"""
+        try:
+            with self._lock:
+                memory_data = memory_entry.dict(exclude={'embedding_vector'})
+
+                if self._conn.execute(
+                    "SELECT 1 FROM memories WHERE memory_id = ?", (memory_entry.memory_id,)
+                ).fetchone():
+                    info_log(f"[SQLiteMetadata] 記憶條目已存在: {memory_entry.memory_id}", "WARNING")
+                    return False
+
+                if memory_entry.embedding_vector:
+                    if not self.embedding_store.put(memory_entry.memory_id, memory_entry.embedding_vector):
+                        return False
+
+                with self._conn:
+                    self._conn.execute(
+                        "INSERT INTO memories "
+                        "(memory_id, memory_token, memory_type, importance, created_at, topic, is_archived, data) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                        self._row_values(memory_data)
+                    )
+                self.embedding_store.save()
+
+                debug_log(3, f"[SQLiteMetadata] 添加記憶條目: {memory_entry.memory_id}")
+                return True
+
+        except Exception as e:
+            error_log(f"[SQLiteMetadata] 添加記憶條目失敗: {e}")
+            return False
+
+    def get_memory_by_id(self, memory_id: str) -> Optional[Dict[str, Any]]:
+        """根據ID獲取記憶條目"""
+        try:
+            with self._lock:
+                rows = self._fetch("SELECT data FROM memories WHERE memory_id = ?", (memory_id,))
+                return rows[0] if rows else None
+        except Exception as e:
+            error_log(f"[SQLiteMetadata] 獲取記憶條目失敗: {e}")
+            return None
+
+    def get_memories_by_token(self, memory_token: str) -> List[Dict[str, Any]]:
+        """根據記憶令牌獲取記憶條目"""
+        try:
+            with self._lock:
+                return self._fetch(
+                    "SELECT data FROM memories WHERE memory_token = ? ORDER BY rowid", (memory_token,)
+                )
+        except Exception as e:
+            error_log(f"[SQLiteMetadata] 獲取記憶令牌記憶失敗: {e}")
+            return []
+
+    def get_all_memory_ids(self) -> List[str]:
+        """獲取所有記憶ID（依插入順序）"""
+        with self._lock:
+            return [row[0] for row in self._conn.execute("SELECT memory_id FROM memories ORDER BY rowid")]
+
+    def update_memory(self, memory_id: str, updates: Dict[str, Any]) -> bool:
+        """更新記憶條目（單列讀改寫）"""
+        try:
+            with self._lock:
+                memory_data = self.get_memory_by_id(memory_id)
+                if memory_data is None:
+                    info_log(f"[SQLiteMetadata] 記憶條目不存在: {memory_id}", "WARNING")
+                    return False
+
+                if 'embedding_vector' in updates:
+                    updates = dict(updates)
+                    embedding_vector = updates.pop('embedding_vector')
+                    if embedding_vector is not None:
+                        self.embedding_store.put(memory_id, embedding_vector)
+                        self.embedding_store.save()
+
+                memory_data.update(updates)
+                memory_data['updated_at'] = datetime.now().isoformat()
+
+                values = self._row_values(memory_data)
+                with self._conn:
+                    self._conn.execute(
+                        "UPDATE memories SET memory_token = ?, memory_type = ?, importance = ?, "
+                        "created_at = ?, topic = ?, is_archived = ?, data = ? WHERE memory_id = ?",
+                        values[1:] + (memory_id,)
+                    )
+
+                debug_log(3, f"[SQLiteMetadata] 更新記憶條目: {memory_id}")
+                return True
+
+        except Exception as e:
+            error_log(f"[SQLiteMetadata] 更新記憶條目失敗: {e}")
+            return False
+
+    def increment_access_stats(self, deltas: Dict[str, Tuple[int, float]]) -> bool:
+        """批次累加存取統計（單一交易）"""
+        try:
+            with self._lock:
+                memory_ids = list(deltas.keys())
+                rows = []
+                # 分段查詢，避免超過 SQLite 參數上限
+                for start in range(0, len(memory_ids), 500):
+                    chunk = memory_ids[start:start + 500]
+                    for row in self._conn.execute(
+                        f"SELECT memory_id, data FROM memories WHERE memory_id IN ({','.join('?' * len(chunk))})",
+                        chunk
+                    ):
+                        memory_data = json.loads(row['data'])
+                        count, accessed_at = deltas[row['memory_id']]
+                        memory_data['access_count'] = memory_data.get('access_count', 0) + count
+                        memory_data['accessed_at'] = max(self._to_timestamp(memory_data.get('accessed_at')) or 0.0,
+                                                         accessed_at)
+                        rows.append((json.dumps(memory_data, ensure_ascii=False, default=str), row['memory_id']))
+
+                if rows:
+                    with self._conn:
+                        self._conn.executemany("UPDATE memories SET data = ? WHERE memory_id = ?", rows)
+
+                debug_log(3, f"[SQLiteMetadata] 批次更新存取統計: {len(rows)} 個記憶")
+                return True
+
+        except Exception as e:
+            error_log(f"[SQLiteMetadata] 批次更新存取統計失敗: {e}")
+            return False
+
+    def delete_memory(self, memory_id: str) -> bool:
+        """刪除記憶條目（單列刪除）"""
+        try:
+            with self._lock:
+                with self._conn:
+                    cursor = self._conn.execute("DELETE FROM memories WHERE memory_id = ?", (memory_id,))
+                if cursor.rowcount == 0:
+                    info_log(f"[SQLiteMetadata] 記憶條目不存在: {memory_id}", "WARNING")
+                    return False
+
+                self.embedding_store.delete(memory_id)
+                self.embedding_store.save()
+                debug_log(3, f"[SQLiteMetadata] 刪除記憶條目: {memory_id}")
+                return True
+
+        except Exception as e:
+            error_log(f"[SQLiteMetadata] 刪除記憶條目失敗: {e}")
+            return False
+
+    def search_memories(self, memory_token: str, filters: Dict[str, Any] = None) -> List[Dict[str, Any]]:
+        """以索引欄位在資料庫端過濾，主題等非索引條件再於記憶體中比對"""
+        try:
+            with self._lock:
+                filters = filters or {}
+                clauses = ["memory_token = ?"]
+                params: List[Any] = [memory_token]
+
+                if 'memory_types' in filters:
+                    types = list(filters['memory_types'])
+                    clauses.append(f"memory_type IN ({','.join('?' * len(types))})")
+                    params.extend(types)
+
+                if 'importance_filter' in filters:
+                    levels = list(filters['importance_filter'])
+                    clauses.append(f"importance IN ({','.join('?' * len(levels))})")
+                    params.extend(levels)
+
+                if filters.get('time_range'):
+                    start_ts = self._to_timestamp(filters['time_range'].get('start'))
+                    end_ts = self._to_timestamp(filters['time_range'].get('end'))
+                    # 與 JSON 後端一致：沒有 created_at 的條目不受時間範圍限制
+                    if start_ts is not None:
+                        clauses.append("(created_at IS NULL OR created_at >= ?)")
+                        params.append(start_ts)
+                    if end_ts is not None:
+                        clauses.append("(created_at IS NULL OR created_at <= ?)")
+                        params.append(end_ts)
+
+                if 'include_archived' in filters and not filters['include_archived']:
+                    clauses.append("is_archived = 0")
+
+                sql = f"SELECT data FROM memories WHERE {' AND '.join(clauses)} ORDER BY rowid"
+                memories = self._fetch(sql, tuple(params))
+
+                if filters.get('topic_filter'):
+                    memories = [m for m in memories if self.matches_filters(m, {'topic_filter': filters['topic_filter']})]
+
+                debug_log(3, f"[SQLiteMetadata] 搜索完成，找到 {len(memories)} 個結果")
+                return memories
+
+        except Exception as e:
+            error_log(f"[SQLiteMetadata] 搜索記憶失敗: {e}")
+            return []
+
+    def get_memory_stats(self, memory_token: str = None) -> Dict[str, Any]:
+        """獲取記憶統計資訊（資料庫聚合）"""
+        try:
+            with self._lock:
+                where, params = ("WHERE memory_token = ?", (memory_token,)) if memory_token else ("", ())
+
+                stats = {
+                    "total_memories": 0,
+                    "memories_by_type": {},
+                    "memories_by_importance": {},
+                    "active_snapshots": 0,
+                    "archived_snapshots": 0
+                }
+
+                for row in self._conn.execute(
+                    f"SELECT memory_type, importance, is_archived, COUNT(*) AS n FROM memories {where} "
+                    "GROUP BY memory_type, importance, is_archived", params
+                ):
+                    count = row['n']
+                    memory_type = row['memory_type'] or 'unknown'
+                    importance = row['importance'] or 'medium'
+                    stats["total_memories"] += count
+                    stats["memories_by_type"][memory_type] = stats["memories_by_type"].get(memory_type, 0) + count
+                    stats["memories_by_importance"][importance] = stats["memories_by_importance"].get(importance, 0) + count
+                    if memory_type == MemoryType.SNAPSHOT:
+                        if row['is_archived']:
+                            stats["archived_snapshots"] += count
+                        else:
+                            stats["active_snapshots"] += count
+
+                stats["backend"] = "sqlite"
+                return stats
+
+        except Exception as e:
+            error_log(f"[SQLiteMetadata] 獲取統計資訊失敗: {e}")
+            return {}
+
+    def force_save(self) -> bool:
+        """將 WAL 內容檢查點寫回主資料庫"""
+        try:
+            with self._lock:
+                self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+                return self.embedding_store.save(force=True)
+        except Exception as e:
+            error_log(f"[SQLiteMetadata] 檢查點失敗: {e}")
+            return False
+
+    def clear_all_memories(self, memory_token: str = None) -> bool:
+        """清空記憶（可指定身份）"""
+        try:
+            with self._lock:
+                if memory_token:
+                    for memory_id in [row[0] for row in self._conn.execute(
+                        "SELECT memory_id FROM memories WHERE memory_token = ?", (memory_token,)
+                    )]:
+                        self.embedding_store.delete(memory_id)
+                    with self._conn:
+                        self._conn.execute("DELETE FROM memories WHERE memory_token = ?", (memory_token,))
+                else:
+                    self.embedding_store.clear()
+                    with self._conn:
+                        self._conn.execute("DELETE FROM memories")
+
+                self.embedding_store.save()
+                info_log(f"[SQLiteMetadata] 清空記憶完成，身份: {memory_token or '全部'}")
+                return True
+
+        except Exception as e:
+            error_log(f"[SQLiteMetadata] 清空記憶失敗: {e}")
+            return False
@@ -24,7 +24,10 @@ from ..schemas import (
 
 from .vector_index import VectorIndexManager
 from .metadata_storage import MetadataStorageManager
+from .sqlite_metadata_storage import SQLiteMetadataStorageManager
 from .identity_isolation import IdentityIsolationManager
+from .access_tracker import AccessTracker
+from .embedding_service import EmbeddingService
 
 
 class MemoryStorageManager:
@@ -40,7 +43,11 @@ class MemoryStorageManager:
         
         # 初始化子系統
         self.vector_manager = VectorIndexManager(vector_config)
-        self.metadata_manager = MetadataStorageManager(metadata_config)
+        self.metadata_backend = config.get("metadata_backend", "json")
+        if self.metadata_backend == "sqlite":
+            self.metadata_manager = SQLiteMetadataStorageManager(metadata_config)
+        else:
+            self.metadata_manager = MetadataStorageManager(metadata_config)
         
         # 使用傳入的 identity_manager 或創建新的
         if identity_manager:
@@ -54,15 +61,33 @@ class MemoryStorageManager:
         self.embedding_model_name = config.get("embedding_model", "all-MiniLM-L6-v2")
         self.embedding_model: Optional[SentenceTransformer] = None
         
+        # 嵌入向量服務（內容雜湊快取 + 批次合併，可選磁碟快取）
+        service_config = dict(config)
+        service_config.setdefault("embedding_model", self.embedding_model_name)
+        service_config.setdefault(
+            "embedding_disk_cache_file",
+            os.path.join(config.get("base_path", "memory"), "embedding_cache")
+        )
+        self.embedding_service = EmbeddingService(service_config)
+        
         # 同步管理
         self._sync_lock = threading.RLock()
         self._index_metadata_map: Dict[int, str] = {}  # vector_index -> memory_id
         self._memory_vector_map: Dict[str, int] = {}   # memory_id -> vector_index
+        self._vector_id_map: Dict[int, str] = {}       # FAISS向量ID -> memory_id
+        self._index_consistent = False                 # FAISS索引是否與元資料一致
         
         # 性能配置
         self.batch_size = config.get("batch_size", 32)
         self.auto_save_interval = config.get("auto_save_interval", 300)  # 5分鐘
         
+        # 檢索配置
+        self.retrieval_mode = config.get("retrieval_mode", "index")  # index / brute_force
+        self.index_oversample = max(1, config.get("index_oversample", 4))
+        
+        # 存取統計延遲批次寫回（搜索不再逐筆寫入存儲）
+        self.access_tracker = AccessTracker(config, self.metadata_manager.increment_access_stats)
+        
         # 狀態追蹤
         self.is_initialized = False
         self.last_sync_time = None
@@ -75,6 +100,8 @@ class MemoryStorageManager:
             # 初始化嵌入模型
             info_log(f"[StorageManager] 載入嵌入模型: {self.embedding_model_name}")
             self.embedding_model = SentenceTransformer(self.embedding_model_name)
+            self.embedding_service.set_model(self.embedding_model)
+            self.embedding_service.initialize()
             
             # 初始化子系統
             if not self.identity_manager.initialize():
@@ -93,6 +120,11 @@ class MemoryStorageManager:
             if not self._rebuild_index_mapping():
                 info_log("WARNING", "[StorageManager] 重建索引映射失敗")
             
+            # 確保FAISS索引與元資料一致
+            self._sync_vector_index()
+            
+            self.access_tracker.start()
+            
             self.is_initialized = True
             self.last_sync_time = time.time()
             
@@ -111,16 +143,17 @@ class MemoryStorageManager:
                 
                 self._index_metadata_map = {}
                 self._memory_vector_map = {}
+                self._vector_id_map = {}
                 
-                # 獲取所有記憶條目
-                all_memories = self.metadata_manager.metadata_cache
+                # 獲取所有記憶ID
+                all_memory_ids = self.metadata_manager.get_all_memory_ids()
                 
                 vector_index = 0
-                for memory_data in all_memories:
-                    memory_id = memory_data.get('memory_id')
-                    if memory_id and memory_data.get('embedding_vector'):
+                for memory_id in all_memory_ids:
+                    if self.metadata_manager.has_embedding(memory_id):
                         self._index_metadata_map[vector_index] = memory_id
                         self._memory_vector_map[memory_id] = vector_index
+                        self._vector_id_map[VectorIndexManager.vector_id_for(memory_id)] = memory_id
                         vector_index += 1
                 
                 debug_log(3, f"[StorageManager] 索引映射重建完成，條目數: {len(self._memory_vector_map)}")
@@ -130,6 +163,38 @@ class MemoryStorageManager:
             error_log(f"[StorageManager] 重建索引映射失敗: {e}")
             return False
     
+    def _sync_vector_index(self) -> bool:
+        """檢查FAISS索引的向量ID是否與元資料一致，不一致時從元資料嵌入重新填充"""
+        try:
+            with self._sync_lock:
+                index_ids = set(self.vector_manager.get_vector_ids())
+                if index_ids == set(self._vector_id_map.keys()):
+                    self._index_consistent = True
+                    return True
+                
+                info_log(f"[StorageManager] FAISS索引與元資料不一致 "
+                         f"(索引: {len(index_ids)}, 元資料: {len(self._vector_id_map)})，重新填充索引", "WARNING")
+                
+                memory_ids, vector_array = self.metadata_manager.get_embeddings(list(self._vector_id_map.values()))
+                
+                self.vector_manager.clear_index()
+                if memory_ids:
+                    if not self.vector_manager.add_vectors(vector_array, memory_ids):
+                        self._index_consistent = False
+                        return False
+                
+                self._vector_id_map = {
+                    VectorIndexManager.vector_id_for(memory_id): memory_id for memory_id in memory_ids
+                }
+                self.vector_manager.save_index()
+                self._index_consistent = True
+                return True
+                
+        except Exception as e:
+            error_log(f"[StorageManager] 同步向量索引失敗: {e}")
+            self._index_consistent = False
+            return False
+    
     def store_memory(self, memory_entry: MemoryEntry) -> MemoryOperationResult:
         """存儲記憶條目"""
         start_time = time.time()
@@ -194,6 +259,7 @@ class MemoryStorageManager:
                 vector_index = self.vector_manager._vector_count - 1
                 self._index_metadata_map[vector_index] = memory_entry.memory_id
                 self._memory_vector_map[memory_entry.memory_id] = vector_index
+                self._vector_id_map[VectorIndexManager.vector_id_for(memory_entry.memory_id)] = memory_entry.memory_id
                 
                 debug_log(3, f"[StorageManager] 記憶存儲成功: {memory_entry.memory_id}")
                 
@@ -246,22 +312,34 @@ class MemoryStorageManager:
                 if hasattr(query, 'include_archived') and query.include_archived is not None:
                     metadata_filters['include_archived'] = query.include_archived
                 
-                candidate_memories = self.metadata_manager.search_memories(
-                    query.memory_token, 
-                    metadata_filters
-                )
-                
-                if not candidate_memories:
-                    debug_log(3, "[StorageManager] 沒有找到候選記憶")
-                    return []
+                # 優先走FAISS索引：先取top-k再套用元資料過濾
+                semantic_results = None
+                if self.retrieval_mode == "index" and self._index_consistent:
+                    semantic_results = self._perform_index_search(
+                        query.query_text,
+                        query.memory_token,
+                        metadata_filters,
+                        query.similarity_threshold,
+                        query.max_results
+                    )
                 
-                # 語意向量搜索
-                semantic_results = self._perform_semantic_search(
-                    query.query_text, 
-                    candidate_memories, 
-                    query.similarity_threshold,
-                    query.max_results
-                )
+                if semantic_results is None:
+                    candidate_memories = self.metadata_manager.search_memories(
+                        query.memory_token, 
+                        metadata_filters
+                    )
+                    
+                    if not candidate_memories:
+                        debug_log(3, "[StorageManager] 沒有找到候選記憶")
+                        return []
+                    
+                    # 語意向量搜索
+                    semantic_results = self._perform_semantic_search(
+                        query.query_text, 
+                        candidate_memories, 
+                        query.similarity_threshold,
+                        query.max_results
+                    )
                 
                 # 構建搜索結果
                 search_results = []
@@ -270,6 +348,9 @@ class MemoryStorageManager:
                         # 重構MemoryEntry物件
                         memory_entry = self._reconstruct_memory_entry(memory_data)
                         
+                        # 合併尚未寫回的存取次數
+                        memory_entry.access_count += self.access_tracker.pending_count(memory_entry.memory_id)
+                        
                         # 計算相關性評分
                         relevance_score = self._calculate_relevance_score(
                             memory_entry, query, similarity_score
@@ -296,14 +377,8 @@ class MemoryStorageManager:
                         
                         search_results.append(search_result)
                         
-                        # 更新存取記錄
-                        self.metadata_manager.update_memory(
-                            memory_entry.memory_id,
-                            {
-                                'accessed_at': time.time(),
-                                'access_count': memory_data.get('access_count', 0) + 1
-                            }
-                        )
+                        # 記錄存取（由 AccessTracker 批次寫回）
+                        self.access_tracker.record(memory_entry.memory_id)
                         
                     except Exception as e:
                         info_log("WARNING", f"[StorageManager] 處理搜索結果失敗: {e}")
@@ -323,13 +398,96 @@ class MemoryStorageManager:
                 error_log("[StorageManager] 嵌入模型未初始化")
                 return None
             
-            embedding = self.embedding_model.encode(text, convert_to_numpy=True)
-            return embedding.astype(np.float32)
+            return self.embedding_service.encode(text)
             
         except Exception as e:
             error_log(f"[StorageManager] 生成嵌入向量失敗: {e}")
             return None
     
+    def generate_embeddings(self, texts: List[str]) -> Optional[np.ndarray]:
+        """批次生成文本嵌入向量（經快取，並發請求合併為一次模型呼叫）"""
+        if not self.embedding_model:
+            error_log("[StorageManager] 嵌入模型未初始化")
+            return None
+        return self.embedding_service.encode_batch(texts)
+    
+    def _backfill_embeddings(self) -> int:
+        """
+        為缺少嵌入向量的記憶批次補算向量（磁碟快取命中時不需模型推論）
+        
+        模型推論不持有同步鎖；只在寫入時持鎖，並略過推論期間已被刪除的記憶。
+        """
+        with self._sync_lock:
+            missing = [
+                memory_id for memory_id in self.metadata_manager.get_all_memory_ids()
+                if not self.metadata_manager.has_embedding(memory_id)
+            ]
+        if not missing:
+            return 0
+        
+        backfilled = 0
+        for start in range(0, len(missing), self.batch_size):
+            chunk = [self.metadata_manager.get_memory_by_id(memory_id) for memory_id in missing[start:start + self.batch_size]]
+            chunk = [memory_data for memory_data in chunk if memory_data and memory_data.get('content')]
+            if not chunk:
+                continue
+            vectors = self.generate_embeddings([memory_data['content'] for memory_data in chunk])
+            if vectors is None:
+                break
+            with self._sync_lock:
+                rows = [i for i, memory_data in enumerate(chunk)
+                        if self.metadata_manager.get_memory_by_id(memory_data['memory_id'])]
+                if rows and self.metadata_manager.put_embeddings([chunk[i]['memory_id'] for i in rows], vectors[rows]):
+                    backfilled += len(rows)
+        
+        info_log(f"[StorageManager] 補算 {backfilled}/{len(missing)} 個記憶的嵌入向量")
+        return backfilled
+    
+    def _perform_index_search(self, query_text: str, memory_token: str, filters: Dict[str, Any],
+                              similarity_threshold: float, max_results: int) -> Optional[List[Tuple[Dict, float]]]:
+        """透過FAISS索引執行語意搜索，返回 None 表示需退回全量比對"""
+        try:
+            query_embedding = self._generate_embedding(query_text)
+            if query_embedding is None:
+                return None
+            
+            total_vectors = self.vector_manager.get_stats().get("vector_count", 0)
+            if total_vectors == 0:
+                return []
+            
+            # 過濾條件可能淘汰大部分命中，逐步擴大 top-k 直到湊滿結果或索引用盡
+            top_k = min(total_vectors, max_results * self.index_oversample)
+            while True:
+                scores, vector_ids = self.vector_manager.search_vectors(
+                    query_embedding, top_k=top_k, similarity_threshold=similarity_threshold
+                )
+                
+                results = []
+                for score, vector_id in zip(scores, vector_ids):
+                    memory_id = self._vector_id_map.get(vector_id)
+                    if not memory_id:
+                        continue
+                    memory_data = self.metadata_manager.get_memory_by_id(memory_id)
+                    if not memory_data or memory_data.get('memory_token') != memory_token:
+                        continue
+                    if filters and not self.metadata_manager.matches_filters(memory_data, filters):
+                        continue
+                    results.append((memory_data, float(score)))
+                    if len(results) >= max_results:
+                        break
+                
+                # 命中數少於 top_k 代表其餘向量已低於閾值，擴大也無意義
+                if len(results) >= max_results or len(vector_ids) < top_k or top_k >= total_vectors:
+                    break
+                top_k = min(total_vectors, top_k * 2)
+            
+            debug_log(3, f"[StorageManager] 索引搜索完成 (top_k={top_k})，結果數: {len(results)}")
+            return results
+            
+        except Exception as e:
+            error_log(f"[StorageManager] 索引搜索失敗，退回全量比對: {e}")
+            return None
+    
     def _perform_semantic_search(self, query_text: str, candidate_memories: List[Dict], 
                                 similarity_threshold: float, max_results: int) -> List[Tuple[Dict, float]]:
         """執行語意搜索"""
@@ -339,38 +497,16 @@ class MemoryStorageManager:
             if query_embedding is None:
                 return []
             
-            # 準備候選向量
-            candidate_vectors = []
-            valid_memories = []
-            
-            debug_log(3, f"[StorageManager] 準備處理 {len(candidate_memories)} 個候選記憶")
-            
-            for idx, memory_data in enumerate(candidate_memories):
-                embedding_vector = memory_data.get('embedding_vector')
-                debug_log(3, f"[StorageManager] 候選 {idx}: embedding_vector type={type(embedding_vector)}, is_list={isinstance(embedding_vector, list)}")
-                
-                if embedding_vector:
-                    # 確保向量是numpy array格式
-                    if isinstance(embedding_vector, list):
-                        debug_log(3, f"[StorageManager] 轉換 list 到 numpy array (長度: {len(embedding_vector)})")
-                        embedding_vector = np.array(embedding_vector, dtype=np.float32)
-                        debug_log(3, f"[StorageManager] 轉換後 shape={embedding_vector.shape}, dtype={embedding_vector.dtype}")
-                    elif not isinstance(embedding_vector, np.ndarray):
-                        debug_log(3, f"[StorageManager] 跳過無效格式: {type(embedding_vector)}")
-                        continue  # 跳過無效格式
-                    candidate_vectors.append(embedding_vector)
-                    valid_memories.append(memory_data)
-                    debug_log(3, f"[StorageManager] 成功添加候選向量 {idx}")
-                else:
-                    debug_log(3, f"[StorageManager] 候選 {idx} 沒有 embedding_vector")
-            
-            if not candidate_vectors:
+            # 從嵌入向量存儲批次取出候選向量
+            memory_by_id = {m.get('memory_id'): m for m in candidate_memories}
+            valid_ids, candidate_array = self.metadata_manager.get_embeddings(list(memory_by_id.keys()))
+            valid_memories = [memory_by_id[memory_id] for memory_id in valid_ids]
+            
+            if not valid_memories:
                 return []
             
-            debug_log(3, f"[StorageManager] 準備計算相似度，候選向量數: {len(candidate_vectors)}")
+            debug_log(3, f"[StorageManager] 準備計算相似度，候選向量數: {len(valid_memories)}")
             
-            # 計算相似度 - 使用 vstack 而非 array，因為元素已經是 numpy 數組
-            candidate_array = np.vstack(candidate_vectors)
             query_array = query_embedding.reshape(1, -1)
             
             debug_log(4, f"[StorageManager] candidate_array shape: {candidate_array.shape}, query_array shape: {query_array.shape}")
@@ -407,9 +543,7 @@ class MemoryStorageManager:
                 from datetime import datetime
                 memory_data['created_at'] = datetime.fromisoformat(memory_data['created_at'].replace('Z', '+00:00'))
             
-            # 確保必要字段存在，提供預設值
-            if 'embedding_vector' not in memory_data:
-                memory_data['embedding_vector'] = None
+            # 確保必要字段存在，提供預設值（向量不隨條目返回，需要時由嵌入向量存儲取得）
             if 'importance' not in memory_data:
                 memory_data['importance'] = MemoryImportance.MEDIUM
             if 'access_count' not in memory_data:
@@ -581,6 +715,10 @@ class MemoryStorageManager:
                         execution_time=time.time() - start_time
                     )
                 
+                # 從FAISS索引移除向量
+                self.vector_manager.remove_vectors([memory_id])
+                self._vector_id_map.pop(VectorIndexManager.vector_id_for(memory_id), None)
+                
                 # 清理映射關係
                 if memory_id in self._memory_vector_map:
                     vector_index = self._memory_vector_map[memory_id]
@@ -609,24 +747,40 @@ class MemoryStorageManager:
                 execution_time=time.time() - start_time
             )
     
-    def rebuild_index(self) -> bool:
-        """重建向量索引"""
+    def rebuild_index(self, background: bool = False) -> bool:
+        """
+        重建向量索引
+        
+        補算缺少的嵌入向量時不持有同步鎖，之後只在擷取來源向量時持鎖；
+        影子索引在背景建立，期間搜索照常使用現有索引。
+        
+        Args:
+            background: True 時啟動重建後立即返回，進度見 get_stats()["vector_index"]["rebuild"]
+        """
         try:
             info_log("[StorageManager] 開始重建向量索引...")
             
-            # 重建向量索引
-            if not self.vector_manager.rebuild_index():
-                error_log("[StorageManager] 向量索引重建失敗")
-                return False
+            # 補算缺少的嵌入向量（模型推論期間搜索與寫入不受阻塞）
+            self._backfill_embeddings()
             
-            # 重建映射關係
-            if not self._rebuild_index_mapping():
-                error_log("[StorageManager] 索引映射重建失敗")
-                return False
+            with self._sync_lock:
+                # 重建映射關係
+                if not self._rebuild_index_mapping():
+                    error_log("[StorageManager] 索引映射重建失敗")
+                    return False
+                
+                # 以嵌入向量存儲為來源；之後的增刪由索引管理器記錄並重放
+                memory_ids, vectors = self.metadata_manager.get_embeddings(list(self._vector_id_map.values()))
+                if not self.vector_manager.rebuild_index(vectors, memory_ids, background=True,
+                                                         on_complete=self._on_index_rebuilt):
+                    error_log("[StorageManager] 向量索引重建失敗")
+                    return False
+            
+            if background:
+                return True
             
-            # 儲存索引
-            if not self.vector_manager.save_index():
-                error_log("[StorageManager] 索引儲存失敗")
+            if not self.vector_manager.wait_for_rebuild():
+                error_log("[StorageManager] 向量索引重建失敗")
                 return False
             
             info_log("[StorageManager] 向量索引重建完成")
@@ -636,6 +790,38 @@ class MemoryStorageManager:
             error_log(f"[StorageManager] 重建索引失敗: {e}")
             return False
     
+    def _on_index_rebuilt(self):
+        """影子索引替換完成：索引已與元資料一致，持久化"""
+        self._index_consistent = True
+        if not self.vector_manager.save_index():
+            error_log("[StorageManager] 索引儲存失敗")
+    
+    def flush_access_stats(self) -> bool:
+        """立即寫回待寫的存取統計"""
+        return self.access_tracker.flush()
+    
+    def shutdown(self) -> bool:
+        """關閉存儲管理器：寫回存取統計並持久化"""
+        try:
+            info_log("[StorageManager] 關閉統一存儲管理器...")
+            flushed = self.access_tracker.stop()
+            if not flushed:
+                error_log("[StorageManager] 存取統計寫回失敗")
+            self.embedding_service.shutdown()
+            
+            with self._sync_lock:
+                self.metadata_manager.force_save()
+                self.vector_manager.save_index()
+                if hasattr(self.metadata_manager, 'close'):
+                    self.metadata_manager.close()
+            
+            self.is_initialized = False
+            return flushed
+            
+        except Exception as e:
+            error_log(f"[StorageManager] 關閉失敗: {e}")
+            return False
+    
     def get_stats(self) -> Dict[str, Any]:
         """獲取存儲統計資訊"""
         try:
@@ -649,8 +835,13 @@ class MemoryStorageManager:
                 "metadata_storage": metadata_stats,
                 "index_mapping": {
                     "total_mappings": len(self._memory_vector_map),
-                    "consistent": len(self._index_metadata_map) == len(self._memory_vector_map)
+                    "consistent": len(self._index_metadata_map) == len(self._memory_vector_map),
+                    "vector_index_consistent": self._index_consistent
                 },
+                "access_tracking": self.access_tracker.get_stats(),
+                "embedding_service": self.embedding_service.get_stats(),
+                "retrieval_mode": self.retrieval_mode,
+                "metadata_backend": self.metadata_backend,
                 "embedding_model": self.embedding_model_name,
                 "is_initialized": self.is_initialized,
                 "last_sync_time": self.last_sync_time
@@ -5,16 +5,19 @@
 功能：
 - FAISS索引的創建、載入、儲存
 - 向量的添加、搜索、刪除
-- 索引重建與優化
+- 索引重建與優化（背景建立影子索引後原子替換）
+- 向量數超過閾值時自動由 IndexFlatIP 切換為訓練過的 IVF / HNSW 索引
 - 身份隔離的向量檢索
 """
 
 import faiss
+import hashlib
 import numpy as np
 import os
 import pickle
 import threading
-from typing import List, Tuple, Optional, Dict, Any
+import time
+from typing import List, Tuple, Optional, Dict, Any, Set, Callable
 from pathlib import Path
 
 from utils.debug_helper import debug_log, info_log, error_log
@@ -24,6 +27,9 @@ from ..schemas import MemoryEntry, MemorySearchResult
 class VectorIndexManager:
     """FAISS向量索引管理器"""
     
+    FLAT_INDEX_TYPES = ("IndexFlatIP", "IndexFlatL2")
+    ANN_INDEX_TYPES = ("IndexIVFFlat", "IndexHNSWFlat")
+    
     def __init__(self, config: Dict[str, Any]):
         self.config = config
         
@@ -31,12 +37,26 @@ class VectorIndexManager:
         self.vector_dimension = config.get("vector_dimension", 384)
         self.index_file = config.get("index_file", "memory/mem_faiss_index")
         self.index_backup_file = f"{self.index_file}.backup"
+        self.tombstone_file = f"{self.index_file}.deleted.npy"  # HNSW 墓碑，與索引一同保存
         
         # FAISS相關
         self.index: Optional[faiss.Index] = None
-        self.index_type = config.get("index_type", "IndexFlatIP")  # 內積索引
+        configured_type = config.get("index_type", "IndexFlatIP")  # 內積索引
         self.nprobe = config.get("nprobe", 10)  # IVF索引參數
         
+        # 基礎索引一律為精確索引；近似索引需要訓練資料，只在重建時建立
+        self.base_index_type = configured_type if configured_type in self.FLAT_INDEX_TYPES else "IndexFlatIP"
+        self.ann_index_type = config.get(
+            "ann_index_type", configured_type if configured_type in self.ANN_INDEX_TYPES else "IndexIVFFlat"
+        )
+        self.ann_threshold = config.get("ann_threshold", 50000)  # 向量數超過此值時切換為近似索引
+        self.auto_rebuild = config.get("auto_rebuild", True)
+        self.ivf_nlist = config.get("ivf_nlist")  # 未設定時依向量數取 4*sqrt(n)
+        self.hnsw_m = config.get("hnsw_m", 32)
+        self.hnsw_ef_construction = config.get("hnsw_ef_construction", 80)
+        self.hnsw_ef_search = config.get("hnsw_ef_search", 64)
+        self.index_type = self.base_index_type
+        
         # 性能配置
         self.batch_size = config.get("batch_size", 100)
         self.enable_gpu = config.get("enable_gpu", False)
@@ -47,8 +67,25 @@ class VectorIndexManager:
         # 狀態追蹤
         self._vector_count = 0
         self._index_version = "1.0"
+        self._deleted_ids: Set[int] = set()  # HNSW 不支援移除，以墓碑過濾直到下次重建
         self.is_initialized = False
         
+        # 背景重建狀態
+        self._rebuild_thread: Optional[threading.Thread] = None
+        self._rebuild_log: Optional[List[Tuple]] = None  # 重建期間的增刪操作，替換前重放到影子索引
+        self._rebuild_generation = 0
+        self._rebuild_stats = {
+            "state": "idle",        # idle / running / completed / failed / cancelled
+            "phase": None,          # training / adding / swapping
+            "progress": 0.0,
+            "target_type": None,
+            "vectors": 0,
+            "started_at": None,
+            "last_duration": None,
+            "last_error": None,
+            "completed_rebuilds": 0
+        }
+        
     def initialize(self) -> bool:
         """初始化向量索引"""
         try:
@@ -83,34 +120,36 @@ class VectorIndexManager:
             error_log(f"[VectorIndex] 初始化失敗: {e}")
             return False
     
+    @staticmethod
+    def vector_id_for(memory_id: str) -> int:
+        """將記憶ID轉換為穩定的FAISS向量ID（跨行程一致，不受 hash 隨機化影響）"""
+        digest = hashlib.blake2b(memory_id.encode('utf-8'), digest_size=8).digest()
+        return int.from_bytes(digest, 'little') & 0x7FFFFFFFFFFFFFFF
+    
     def _index_file_exists(self) -> bool:
         """檢查索引文件是否存在"""
         return os.path.exists(self.index_file)
     
+    def _uses_inner_product(self) -> bool:
+        """是否以內積（餘弦）度量，需要歸一化向量"""
+        return self.base_index_type != "IndexFlatL2"
+    
     def _create_new_index(self) -> bool:
-        """創建新的FAISS索引"""
+        """創建新的（空的精確）FAISS索引"""
         try:
             debug_log(2, f"[VectorIndex] 創建新索引，維度: {self.vector_dimension}")
             
-            if self.index_type == "IndexFlatIP":
+            if self.base_index_type == "IndexFlatIP":
                 # 內積索引 (適合歸一化向量) 
                 # 使用 IndexIDMap 包裝以支援ID
                 base_index = faiss.IndexFlatIP(self.vector_dimension)
-                self.index = faiss.IndexIDMap(base_index)
-            elif self.index_type == "IndexFlatL2":
+            else:
                 # L2距離索引
                 base_index = faiss.IndexFlatL2(self.vector_dimension)
-                self.index = faiss.IndexIDMap(base_index)
-            elif self.index_type == "IndexIVFFlat":
-                # IVF索引 (適合大量向量)
-                nlist = min(100, max(1, int(self.vector_dimension / 4)))
-                quantizer = faiss.IndexFlatIP(self.vector_dimension)
-                base_index = faiss.IndexIVFFlat(quantizer, self.vector_dimension, nlist)
-                self.index = faiss.IndexIDMap(base_index)
-            else:
-                error_log(f"[VectorIndex] 不支援的索引類型: {self.index_type}")
-                return False
+            self.index = faiss.IndexIDMap(base_index)
             
+            self.index_type = self.base_index_type
+            self._deleted_ids = set()
             self._vector_count = 0
             return True
             
@@ -118,6 +157,50 @@ class VectorIndexManager:
             error_log(f"[VectorIndex] 創建索引失敗: {e}")
             return False
     
+    def _build_index(self, index_type: str, vectors: np.ndarray) -> faiss.Index:
+        """建立指定類型的空索引（IVF 以傳入的向量訓練）"""
+        metric = faiss.METRIC_INNER_PRODUCT if self._uses_inner_product() else faiss.METRIC_L2
+        
+        if index_type == "IndexIVFFlat":
+            # IVF 直接以自身的ID存儲；IndexIDMap 的 remove_ids 只適用於會重新編號的 Flat 索引
+            count = vectors.shape[0]
+            nlist = self.ivf_nlist or int(4 * np.sqrt(max(count, 1)))
+            nlist = max(1, min(nlist, count // 39 or 1))  # 每個分區至少 39 個訓練點
+            quantizer = faiss.IndexFlatIP(self.vector_dimension) if metric == faiss.METRIC_INNER_PRODUCT \
+                else faiss.IndexFlatL2(self.vector_dimension)
+            index = faiss.IndexIVFFlat(quantizer, self.vector_dimension, nlist, metric)
+            
+            train_size = min(count, nlist * 256)
+            if train_size < count:
+                sample = vectors[np.random.default_rng(0).choice(count, train_size, replace=False)]
+            else:
+                sample = vectors
+            index.train(sample)
+            index.nprobe = min(self.nprobe, nlist)
+            return index
+        
+        if index_type == "IndexHNSWFlat":
+            base_index = faiss.IndexHNSWFlat(self.vector_dimension, self.hnsw_m, metric)
+            base_index.hnsw.efConstruction = self.hnsw_ef_construction
+            base_index.hnsw.efSearch = self.hnsw_ef_search
+            return faiss.IndexIDMap(base_index)
+        
+        if metric == faiss.METRIC_INNER_PRODUCT:
+            return faiss.IndexIDMap(faiss.IndexFlatIP(self.vector_dimension))
+        return faiss.IndexIDMap(faiss.IndexFlatL2(self.vector_dimension))
+    
+    @staticmethod
+    def _detect_index_type(index: faiss.Index) -> str:
+        """判斷（載入的）索引實際類型"""
+        base = faiss.downcast_index(index.index) if isinstance(index, faiss.IndexIDMap) else index
+        if isinstance(base, faiss.IndexIVFFlat):
+            return "IndexIVFFlat"
+        if isinstance(base, faiss.IndexHNSWFlat):
+            return "IndexHNSWFlat"
+        if isinstance(base, faiss.IndexFlat) and base.metric_type == faiss.METRIC_L2:
+            return "IndexFlatL2"
+        return "IndexFlatIP"
+    
     def _load_index(self) -> bool:
         """載入現有的FAISS索引"""
         try:
@@ -125,11 +208,15 @@ class VectorIndexManager:
             
             # 載入FAISS索引
             self.index = faiss.read_index(self.index_file)
-            self._vector_count = self.index.ntotal
+            self.index_type = self._detect_index_type(self.index)
+            self._deleted_ids = self._load_tombstones()
+            self._vector_count = self.index.ntotal - len(self._deleted_ids)
             
-            # 設定IVF參數
-            if hasattr(self.index, 'nprobe'):
-                self.index.nprobe = self.nprobe
+            # 設定IVF / HNSW 搜索參數
+            if isinstance(self.index, faiss.IndexIVF):
+                self.index.nprobe = min(self.nprobe, self.index.nlist)
+            elif self.index_type == "IndexHNSWFlat":
+                faiss.downcast_index(self.index.index).hnsw.efSearch = self.hnsw_ef_search
             
             debug_log(3, f"[VectorIndex] 索引載入成功，向量數量: {self._vector_count}")
             return True
@@ -138,6 +225,30 @@ class VectorIndexManager:
             error_log(f"[VectorIndex] 載入索引失敗: {e}")
             return False
     
+    def _load_tombstones(self) -> Set[int]:
+        """載入與索引一同保存的墓碑，只保留仍在索引中的ID"""
+        if self.index_type != "IndexHNSWFlat" or not os.path.exists(self.tombstone_file):
+            return set()
+        try:
+            deleted = np.load(self.tombstone_file)
+        except Exception as e:
+            info_log(f"[VectorIndex] 載入墓碑失敗，已刪除的向量可能重新出現: {e}", "WARNING")
+            return set()
+        return set(np.intersect1d(deleted, self._index_ids(self.index)).tolist())
+    
+    def _save_tombstones(self):
+        """保存墓碑（先於索引寫入：中途失敗時舊索引配新墓碑仍只會過濾已刪除的向量）"""
+        if not self._deleted_ids:
+            if os.path.exists(self.tombstone_file):
+                os.remove(self.tombstone_file)
+            return
+        tmp_file = f"{self.tombstone_file}.tmp"
+        with open(tmp_file, "wb") as f:
+            np.save(f, np.fromiter(self._deleted_ids, dtype=np.int64, count=len(self._deleted_ids)))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_file, self.tombstone_file)
+    
     def save_index(self) -> bool:
         """儲存FAISS索引"""
         try:
@@ -152,7 +263,8 @@ class VectorIndexManager:
                 if os.path.exists(self.index_file):
                     os.rename(self.index_file, self.index_backup_file)
                 
-                # 儲存索引
+                # 儲存墓碑與索引
+                self._save_tombstones()
                 faiss.write_index(self.index, self.index_file)
                 
                 # 清理舊備份
@@ -189,20 +301,29 @@ class VectorIndexManager:
                     vectors = vectors.astype(np.float32)
                 
                 # 歸一化向量（如果使用內積索引）
-                if self.index_type == "IndexFlatIP":
+                if self._uses_inner_product():
                     faiss.normalize_L2(vectors)
                 
                 # 添加向量
                 if hasattr(self.index, 'add_with_ids') and vector_ids:
                     # 轉換ID為整數
-                    ids = np.array([hash(vid) % (2**31) for vid in vector_ids], dtype=np.int64)
+                    ids = np.array([self.vector_id_for(vid) for vid in vector_ids], dtype=np.int64)
                     self.index.add_with_ids(vectors, ids)
+                    self._deleted_ids.difference_update(ids.tolist())
+                    if self._rebuild_log is not None:
+                        self._rebuild_log.append(("add", ids, vectors.copy()))
                 else:
                     self.index.add(vectors)
                 
-                self._vector_count += vectors.shape[0]
+                self._vector_count = self.index.ntotal - len(self._deleted_ids)
                 debug_log(3, f"[VectorIndex] 添加 {vectors.shape[0]} 個向量，總數: {self._vector_count}")
                 
+                # 向量數超過閾值時在背景切換為近似索引
+                if (self.auto_rebuild and self.index_type in self.FLAT_INDEX_TYPES
+                        and self._vector_count >= self.ann_threshold and self._rebuild_log is None):
+                    info_log(f"[VectorIndex] 向量數達到 {self.ann_threshold}，背景切換為 {self.ann_index_type}")
+                    self.rebuild_index(background=True, on_complete=self.save_index)
+                
                 return True
                 
         except Exception as e:
@@ -230,21 +351,28 @@ class VectorIndexManager:
                     query_vector = query_vector.astype(np.float32)
                 
                 # 歸一化查詢向量
-                if self.index_type == "IndexFlatIP":
+                if self._uses_inner_product():
+                    query_vector = query_vector.copy()
                     faiss.normalize_L2(query_vector)
                 
-                # 搜索
-                k = min(top_k, self._vector_count)
+                # 搜索（墓碑會佔用名額，多取相應數量）
+                k = min(top_k + len(self._deleted_ids), self.index.ntotal)
+                if self.index_type == "IndexHNSWFlat":
+                    faiss.downcast_index(self.index.index).hnsw.efSearch = max(self.hnsw_ef_search, k)
                 scores, indices = self.index.search(query_vector, k)
                 
                 # 過濾結果
                 valid_scores = []
                 valid_indices = []
+                seen = set()
                 
                 for score, idx in zip(scores[0], indices[0]):
-                    if idx >= 0:  # 有效索引
+                    if idx >= 0 and idx not in self._deleted_ids and idx not in seen:  # 有效索引
+                        seen.add(idx)
+                        if len(valid_indices) >= top_k:
+                            break
                         # 轉換相似度
-                        if self.index_type == "IndexFlatIP":
+                        if self._uses_inner_product():
                             similarity = float(score)  # 內積已經是相似度
                         else:
                             similarity = 1.0 / (1.0 + float(score))  # L2距離轉相似度
@@ -260,39 +388,227 @@ class VectorIndexManager:
             error_log(f"[VectorIndex] 向量搜索失敗: {e}")
             return [], []
     
-    def rebuild_index(self) -> bool:
-        """重建索引（優化性能）"""
+    def remove_vectors(self, vector_ids: List[str]) -> int:
+        """從索引移除向量，返回實際移除數量"""
         try:
             with self._lock:
-                info_log("[VectorIndex] 開始重建索引...")
-                
-                if not self.index or self._vector_count == 0:
-                    info_log("WARNING", "[VectorIndex] 沒有需要重建的向量")
-                    return True
-                
-                # 獲取所有向量
-                all_vectors = np.zeros((self._vector_count, self.vector_dimension), dtype=np.float32)
-                for i in range(self._vector_count):
-                    all_vectors[i] = self.index.reconstruct(i)
-                
-                # 創建新索引
-                old_index_type = self.index_type
-                self._create_new_index()
+                if not self.is_initialized or not self.index or not vector_ids:
+                    return 0
                 
-                # 重新添加向量
-                if self.add_vectors(all_vectors):
-                    # 儲存重建後的索引
-                    if self.save_index():
-                        info_log(f"[VectorIndex] 索引重建完成，類型: {old_index_type}")
-                        return True
+                ids = np.array([self.vector_id_for(vid) for vid in vector_ids], dtype=np.int64)
+                removed = self._remove_ids(self.index, self.index_type, ids, self._deleted_ids)
+                if self._rebuild_log is not None:
+                    self._rebuild_log.append(("remove", ids))
+                self._vector_count = self.index.ntotal - len(self._deleted_ids)
+                debug_log(3, f"[VectorIndex] 移除 {removed} 個向量，總數: {self._vector_count}")
+                return removed
                 
-                error_log("[VectorIndex] 索引重建失敗")
-                return False
+        except Exception as e:
+            error_log(f"[VectorIndex] 移除向量失敗: {e}")
+            return 0
+    
+    def _remove_ids(self, index: faiss.Index, index_type: str, ids: np.ndarray, deleted_ids: Set[int]) -> int:
+        """從指定索引移除ID；HNSW 只記錄墓碑"""
+        if index_type == "IndexHNSWFlat":
+            present = set(self._index_ids(index).tolist()) - deleted_ids
+            hits = present.intersection(ids.tolist())
+            deleted_ids.update(hits)
+            return len(hits)
+        return int(index.remove_ids(ids))
+    
+    @staticmethod
+    def _index_ids(index: faiss.Index) -> np.ndarray:
+        """列出索引內的所有ID（含墓碑）"""
+        if hasattr(index, 'id_map'):
+            return faiss.vector_to_array(index.id_map)
+        if isinstance(index, faiss.IndexIVF):
+            invlists = index.invlists
+            chunks = [
+                faiss.rev_swig_ptr(invlists.get_ids(list_no), invlists.list_size(list_no)).copy()
+                for list_no in range(index.nlist) if invlists.list_size(list_no)
+            ]
+            return np.concatenate(chunks) if chunks else np.zeros(0, dtype=np.int64)
+        return np.zeros(0, dtype=np.int64)
+    
+    def get_vector_ids(self) -> List[int]:
+        """獲取索引中所有向量ID"""
+        try:
+            with self._lock:
+                if not self.index:
+                    return []
+                ids = self._index_ids(self.index)
+                if self._deleted_ids:
+                    ids = ids[~np.isin(ids, list(self._deleted_ids))]
+                return ids.tolist()
+        except Exception as e:
+            error_log(f"[VectorIndex] 獲取向量ID失敗: {e}")
+            return []
+    
+    def _extract_vectors(self) -> Tuple[np.ndarray, np.ndarray]:
+        """從現有索引取出 (ID, 向量)，不含墓碑"""
+        if isinstance(self.index, faiss.IndexIVF):
+            invlists = self.index.invlists
+            ids, vectors = [], []
+            for list_no in range(self.index.nlist):
+                size = invlists.list_size(list_no)
+                if not size:
+                    continue
+                ids.append(faiss.rev_swig_ptr(invlists.get_ids(list_no), size).copy())
+                codes = faiss.rev_swig_ptr(invlists.get_codes(list_no), size * invlists.code_size)
+                vectors.append(np.frombuffer(codes.copy(), dtype=np.float32).reshape(size, self.vector_dimension))
+            if not ids:
+                return np.zeros(0, dtype=np.int64), np.zeros((0, self.vector_dimension), dtype=np.float32)
+            ids, matrix = np.concatenate(ids), np.vstack(vectors)
+        else:
+            base = faiss.downcast_index(self.index.index)
+            ids = faiss.vector_to_array(self.index.id_map)
+            matrix = base.reconstruct_n(0, base.ntotal) if base.ntotal else \
+                np.zeros((0, self.vector_dimension), dtype=np.float32)
+        
+        if self._deleted_ids:
+            keep = ~np.isin(ids, list(self._deleted_ids))
+            ids, matrix = ids[keep], matrix[keep]
+        return ids, np.ascontiguousarray(matrix, dtype=np.float32)
+    
+    def _select_index_type(self, vector_count: int) -> str:
+        """依向量數選擇索引類型"""
+        return self.ann_index_type if vector_count >= self.ann_threshold else self.base_index_type
+    
+    def is_rebuilding(self) -> bool:
+        """是否有背景重建正在進行"""
+        return self._rebuild_log is not None
+    
+    def rebuild_index(self, vectors: Optional[np.ndarray] = None, vector_ids: Optional[List[str]] = None,
+                      background: bool = False, on_complete: Optional[Callable[[], Any]] = None) -> bool:
+        """
+        重建索引：在工作線程建立影子索引，完成後原子替換
+        
+        重建期間查詢與增刪照常作用於現有索引，增刪同時記錄並在替換前重放到影子索引。
+        
+        Args:
+            vectors: 重建來源向量；未提供時從現有索引取出
+            vector_ids: 對應的記憶ID
+            background: True 時立即返回，否則等待重建完成
+            on_complete: 替換完成後的回呼（在鎖外執行）
+        """
+        try:
+            with self._lock:
+                if not self.index:
+                    error_log("[VectorIndex] 索引未初始化")
+                    return False
+                if self._rebuild_log is not None:
+                    info_log("[VectorIndex] 已有重建進行中", "WARNING")
+                    return False
                 
+                if vectors is None:
+                    ids, matrix = self._extract_vectors()
+                else:
+                    ids = np.array([self.vector_id_for(vid) for vid in vector_ids], dtype=np.int64)
+                    matrix = np.array(vectors, dtype=np.float32).reshape(len(ids), self.vector_dimension)
+                    if self._uses_inner_product():
+                        faiss.normalize_L2(matrix)
+                
+                target_type = self._select_index_type(len(ids))
+                self._rebuild_generation += 1
+                self._rebuild_log = []
+                self._rebuild_stats.update({
+                    "state": "running",
+                    "phase": "training" if target_type == "IndexIVFFlat" else "adding",
+                    "progress": 0.0,
+                    "target_type": target_type,
+                    "vectors": len(ids),
+                    "started_at": time.time(),
+                    "last_error": None
+                })
+                info_log(f"[VectorIndex] 開始背景重建索引: {self.index_type} -> {target_type}，向量數 {len(ids)}")
+                
+                self._rebuild_thread = threading.Thread(
+                    target=self._run_rebuild,
+                    args=(self._rebuild_generation, target_type, ids, matrix, on_complete),
+                    name="VectorIndexRebuild",
+                    daemon=True
+                )
+                self._rebuild_thread.start()
+            
+            if background:
+                return True
+            return self.wait_for_rebuild()
+            
         except Exception as e:
             error_log(f"[VectorIndex] 重建索引異常: {e}")
             return False
     
+    def wait_for_rebuild(self, timeout: Optional[float] = None) -> bool:
+        """等待背景重建結束，返回是否成功替換"""
+        thread = self._rebuild_thread
+        if thread is not None:
+            thread.join(timeout)
+            if thread.is_alive():
+                return False
+        return self._rebuild_stats["state"] == "completed"
+    
+    def _run_rebuild(self, generation: int, target_type: str, ids: np.ndarray,
+                     matrix: np.ndarray, on_complete: Optional[Callable[[], Any]]):
+        """工作線程：訓練並填充影子索引，重放期間的增刪後替換"""
+        start_time = time.time()
+        try:
+            shadow = self._build_index(target_type, matrix)
+            
+            self._rebuild_stats["phase"] = "adding"
+            total = len(ids)
+            step = max(self.batch_size, 1)
+            for offset in range(0, total, step):
+                shadow.add_with_ids(matrix[offset:offset + step], ids[offset:offset + step])
+                self._rebuild_stats["progress"] = min(1.0, (offset + step) / total)
+            
+            with self._lock:
+                if generation != self._rebuild_generation:
+                    # 重建期間索引被清空，影子索引已過期
+                    self._rebuild_stats.update({"state": "cancelled", "phase": None})
+                    return
+                
+                self._rebuild_stats["phase"] = "swapping"
+                deleted_ids: Set[int] = set()
+                for entry in self._rebuild_log:
+                    if entry[0] == "add":
+                        shadow.add_with_ids(entry[2], entry[1])
+                        deleted_ids.difference_update(entry[1].tolist())
+                    else:
+                        self._remove_ids(shadow, target_type, entry[1], deleted_ids)
+                
+                old_type = self.index_type
+                self.index = shadow
+                self.index_type = target_type
+                self._deleted_ids = deleted_ids
+                self._vector_count = shadow.ntotal - len(deleted_ids)
+                self._rebuild_log = None
+                
+                duration = time.time() - start_time
+                self._rebuild_stats.update({
+                    "state": "completed",
+                    "phase": None,
+                    "progress": 1.0,
+                    "last_duration": duration,
+                    "completed_rebuilds": self._rebuild_stats["completed_rebuilds"] + 1
+                })
+                info_log(f"[VectorIndex] 索引重建完成: {old_type} -> {target_type}，"
+                         f"向量數 {self._vector_count}，耗時 {duration:.2f}s")
+            
+            if on_complete:
+                on_complete()
+                
+        except Exception as e:
+            error_log(f"[VectorIndex] 背景重建失敗: {e}")
+            with self._lock:
+                if generation == self._rebuild_generation:
+                    self._rebuild_log = None
+                self._rebuild_stats.update({
+                    "state": "failed",
+                    "phase": None,
+                    "last_error": str(e),
+                    "last_duration": time.time() - start_time
+                })
+    
     def _setup_gpu_index(self):
         """設定GPU加速索引"""
         try:
@@ -309,6 +625,10 @@ class VectorIndexManager:
             "vector_count": self._vector_count,
             "vector_dimension": self.vector_dimension,
             "index_type": self.index_type,
+            "ann_index_type": self.ann_index_type,
+            "ann_threshold": self.ann_threshold,
+            "deleted_vectors": len(self._deleted_ids),
+            "rebuild": dict(self._rebuild_stats),
             "index_version": self._index_version,
             "is_initialized": self.is_initialized,
             "enable_gpu": self.enable_gpu,
@@ -320,6 +640,9 @@ class VectorIndexManager:
         try:
             with self._lock:
                 info_log("[VectorIndex] 清空向量索引")
+                # 進行中的重建以舊資料為來源，一併作廢
+                self._rebuild_generation += 1
+                self._rebuild_log = None
                 self._create_new_index()
                 return True
         except Exception as e:
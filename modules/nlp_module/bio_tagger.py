@@ -10,7 +10,10 @@ from transformers import AutoTokenizer, AutoModelForTokenClassification
 from transformers import TrainingArguments, Trainer
 from transformers import DataCollatorForTokenClassification
 from typing import List, Dict, Any, Tuple, Optional
+import copy
 import json
+import threading
+from collections import OrderedDict
 from pathlib import Path
 import numpy as np
 from utils.debug_helper import debug_log, info_log, error_log
@@ -33,14 +36,38 @@ class BIOTagger:
         "I-UNKNOWN"            # Inside Unknown
     ]
     
-    def __init__(self, model_name: str = "distilbert-base-uncased"):
-        """初始化BIO標註器"""
+    QUANTIZATION_MODES = ("none", "int8")
+    
+    def __init__(self, model_name: str = "distilbert-base-uncased", quantization: str = "none",
+                 batch_size: int = 16, cache_size: int = 256):
+        """
+        初始化BIO標註器
+        
+        Args:
+            model_name: 預訓練模型名稱（找不到微調模型時使用）
+            quantization: "none" 或 "int8"（CPU 上對 Linear 層做動態量化）
+            batch_size: predict_batch 每次送入模型的最大文本數
+            cache_size: 完全相同文本的分段結果 LRU 快取容量，0 為停用
+        """
         self.model_name = model_name
         self.tokenizer = None
         self.model = None
         self.label2id = {label: i for i, label in enumerate(self.BIO_LABELS)}
         self.id2label = {i: label for i, label in enumerate(self.BIO_LABELS)}
         
+        if quantization not in self.QUANTIZATION_MODES:
+            error_log(f"[BIOTagger] 未知的量化模式: {quantization}，使用 none")
+            quantization = "none"
+        self.quantization = quantization
+        self.batch_size = max(1, batch_size)
+        
+        # 分段結果快取（text -> segments），只快取模型輸出
+        self.cache_size = max(0, cache_size)
+        self._cache: "OrderedDict[str, List[Dict[str, Any]]]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self.cache_hits = 0
+        self.cache_misses = 0
+        
         info_log(f"[BIOTagger] 初始化序列標註器: {model_name}")
     
     def load_model(self, model_path: Optional[str] = None):
@@ -66,6 +93,11 @@ class BIOTagger:
                     label2id=self.label2id
                 )
                 info_log(f"[BIOTagger] 載入預訓練模型: {self.model_name}")
+            
+            self.model.eval()
+            if self.quantization == "int8":
+                self._quantize_int8()
+            self.clear_cache()
                 
         except Exception as e:
             error_log(f"[BIOTagger] 模型載入失敗: {e}")
@@ -77,45 +109,134 @@ class BIOTagger:
             
         return True
     
+    def _quantize_int8(self):
+        """以 torch 動態量化將 Linear 層轉為 int8（僅適用 CPU 推論）"""
+        try:
+            device = next(self.model.parameters()).device # type: ignore
+            if device.type != "cpu":
+                info_log(f"[BIOTagger] int8 動態量化僅支援 CPU（目前 {device}），保留 fp32 模型", "WARNING")
+                return
+            self.model = torch.quantization.quantize_dynamic(self.model, {nn.Linear}, dtype=torch.qint8)
+            info_log("[BIOTagger] 已套用 int8 動態量化")
+        except Exception as e:
+            error_log(f"[BIOTagger] int8 量化失敗，保留 fp32 模型: {e}")
+    
+    def clear_cache(self):
+        """清空分段結果快取"""
+        with self._cache_lock:
+            self._cache.clear()
+    
+    def _cache_get(self, text: str) -> Optional[List[Dict[str, Any]]]:
+        if not self.cache_size:
+            return None
+        with self._cache_lock:
+            segments = self._cache.get(text)
+            if segments is None:
+                self.cache_misses += 1
+                return None
+            self._cache.move_to_end(text)
+            self.cache_hits += 1
+        # 呼叫端（後處理、驗證器）會修改分段字典（含巢狀欄位），回傳深複本
+        return copy.deepcopy(segments)
+    
+    def _cache_put(self, text: str, segments: List[Dict[str, Any]]):
+        if not self.cache_size:
+            return
+        with self._cache_lock:
+            self._cache[text] = copy.deepcopy(segments)
+            self._cache.move_to_end(text)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+    
     def predict(self, text: str) -> List[Dict[str, Any]]:
         """預測文本的BIO標籤並返回分段結果"""
+        return self.predict_batch([text])[0]
+    
+    def predict_batch(self, texts: List[str], batch_size: Optional[int] = None) -> List[List[Dict[str, Any]]]:
+        """
+        批次預測多段文本的分段結果
+        
+        快取命中與重複文本不會重新推論；其餘文本依長度排序後分批，
+        每批只填充到該批最長的序列（動態填充）。
+        
+        Args:
+            texts: 文本列表
+            batch_size: 每批文本數，預設使用 self.batch_size
+            
+        Returns:
+            與 texts 對應的分段結果列表
+        """
         if not self.model or not self.tokenizer:
             # 備用實現：簡單的規則分段
-            return self._fallback_segmentation(text)
+            return [self._fallback_segmentation(text) for text in texts]
+        
+        results: List[Optional[List[Dict[str, Any]]]] = [self._cache_get(text) for text in texts]
+        pending = list(dict.fromkeys(text for text, cached in zip(texts, results) if cached is None))
         
+        predicted: Dict[str, List[Dict[str, Any]]] = {}
+        if pending:
+            pending.sort(key=len)
+            size = max(1, batch_size or self.batch_size)
+            for start in range(0, len(pending), size):
+                predicted.update(self._predict_chunk(pending[start:start + size]))
+        
+        for i, text in enumerate(texts):
+            if results[i] is None:
+                results[i] = [dict(segment) for segment in predicted[text]]
+        return results # type: ignore
+    
+    def _predict_chunk(self, texts: List[str]) -> Dict[str, List[Dict[str, Any]]]:
+        """對一批文本執行一次模型前向，返回 text -> segments"""
         try:
-            # 分詞
-            inputs = self.tokenizer(
-                text, 
+            # 分詞（動態填充到本批最長序列）
+            inputs = self.tokenizer( # type: ignore
+                texts,
                 return_tensors="pt",
                 truncation=True,
+                padding=True,
                 is_split_into_words=False,
                 return_offsets_mapping=True
             )
             
             # 預測
             with torch.no_grad():
-                outputs = self.model(**{k: v for k, v in inputs.items() if k != 'offset_mapping'})
+                outputs = self.model(**{k: v for k, v in inputs.items() if k != 'offset_mapping'}) # type: ignore
                 predictions = torch.argmax(outputs.logits, dim=-1)
                 # 計算 softmax 機率作為 confidence
                 probabilities = torch.softmax(outputs.logits, dim=-1)
                 confidences = torch.max(probabilities, dim=-1).values
             
-            # 獲取token到字符的映射
-            offset_mapping = inputs['offset_mapping'][0]
-            tokens = self.tokenizer.convert_ids_to_tokens(inputs['input_ids'][0])
-            predicted_labels = [self.id2label[pred.item()] for pred in predictions[0]] # type: ignore
-            token_confidences = confidences[0].tolist()
-            
-            # 將BIO標籤轉換為分段（傳遞 confidence 值）
-            segments = self._bio_to_segments(text, tokens, predicted_labels, offset_mapping, token_confidences)
+            segments_by_text = {}
+            for i, text in enumerate(texts):
+                # 只保留非填充位置
+                valid = inputs['attention_mask'][i].bool()
+                offset_mapping = inputs['offset_mapping'][i][valid]
+                tokens = self.tokenizer.convert_ids_to_tokens(inputs['input_ids'][i][valid]) # type: ignore
+                predicted_labels = [self.id2label[pred] for pred in predictions[i][valid].tolist()]
+                token_confidences = confidences[i][valid].tolist()
+                
+                # 將BIO標籤轉換為分段（傳遞 confidence 值）
+                segments = self._bio_to_segments(text, tokens, predicted_labels, offset_mapping, token_confidences)
+                self._cache_put(text, segments)
+                segments_by_text[text] = segments
             
-            debug_log(3, f"[BIOTagger] 識別到 {len(segments)} 個分段")
-            return segments
+            debug_log(3, f"[BIOTagger] 批次預測 {len(texts)} 段文本")
+            return segments_by_text
             
         except Exception as e:
             error_log(f"[BIOTagger] 預測失敗: {e}")
-            return self._fallback_segmentation(text)
+            return {text: self._fallback_segmentation(text) for text in texts}
+    
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """獲取分段快取統計"""
+        total = self.cache_hits + self.cache_misses
+        return {
+            "size": len(self._cache),
+            "capacity": self.cache_size,
+            "hits": self.cache_hits,
+            "misses": self.cache_misses,
+            "hit_rate": self.cache_hits / total if total else 0.0
+        }
     
     def _fallback_segmentation(self, text: str) -> List[Dict[str, Any]]:
         """備用分段實現 - 基於簡單規則"""
@@ -5,7 +5,7 @@
 支援 4 種意圖類型：CALL, CHAT, WORK (含 work_mode metadata), UNKNOWN
 """
 
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 from pathlib import Path
 from modules.nlp_module.intent_types import IntentSegment, IntentType
 from modules.nlp_module.bio_tagger import BIOTagger
@@ -19,14 +19,22 @@ class IntentSegmenter:
     意圖分段器 - 基於 BIOS Tagger 的多意圖分段實現
     """
     
-    def __init__(self, model_path: Optional[str] = None):
+    def __init__(self, model_path: Optional[str] = None, config: Optional[Dict[str, Any]] = None):
         """
         初始化意圖分段器
         
         Args:
             model_path: BIOS Tagger 模型路徑，若為 None 則使用預設路徑
+            config: NLP 模組設定，若為 None 則讀取 nlp_module/config.yaml
         """
-        self.bio_tagger = BIOTagger()
+        if config is None:
+            from configs.config_loader import load_module_config
+            config = load_module_config("nlp_module") or {}
+        self.bio_tagger = BIOTagger(
+            quantization=config.get("bio_quantization", "none"),
+            batch_size=config.get("bio_batch_size", 16),
+            cache_size=config.get("bio_cache_size", 256)
+        )
         self.model_loaded = False
         self.confidence_threshold = 0.7  # 置信度閖值
         
@@ -58,7 +66,24 @@ class IntentSegmenter:
         
         # Step 1: 使用 BIOS Tagger 預測
         segments_raw = self.bio_tagger.predict(text)
+        return self._build_segments(text, segments_raw)
+    
+    def segment_intents_batch(self, texts: List[str]) -> List[List[IntentSegment]]:
+        """
+        批次分段多段文本，BIOS Tagger 推論以批次執行
         
+        Args:
+            texts: 使用者輸入文本列表
+            
+        Returns:
+            List[List[IntentSegment]]: 與 texts 對應的意圖分段列表
+        """
+        debug_log(3, f"[IntentSegmenter] 批次分段輸入: {len(texts)} 段")
+        segments_raw = self.bio_tagger.predict_batch(texts)
+        return [self._build_segments(text, raw) for text, raw in zip(texts, segments_raw)]
+    
+    def _build_segments(self, text: str, segments_raw: List[Dict[str, Any]]) -> List[IntentSegment]:
+        """後處理、校驗 BIOS Tagger 原始分段並轉換為 IntentSegment"""
         if not segments_raw:
             debug_log(2, "[IntentSegmenter] BIOS Tagger 未返回分段，使用備用方案")
             return self._fallback_segment(text)
@@ -201,16 +226,19 @@ class IntentSegmenter:
 _intent_segmenter: Optional[IntentSegmenter] = None
 
 
-def get_intent_segmenter() -> IntentSegmenter:
+def get_intent_segmenter(config: Optional[Dict[str, Any]] = None) -> IntentSegmenter:
     """
     獲取全局 IntentSegmenter 實例（單例模式）
     
+    Args:
+        config: NLP 模組設定，僅在首次建立實例時使用
+    
     Returns:
         IntentSegmenter: 全局意圖分段器實例
     """
     global _intent_segmenter
     if _intent_segmenter is None:
-        _intent_segmenter = IntentSegmenter()
+        _intent_segmenter = IntentSegmenter(config=config)
     return _intent_segmenter
 
 
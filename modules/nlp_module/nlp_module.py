@@ -360,7 +360,7 @@ class NLPModule(BaseModule):
         """
         try:
             # Use new IntentSegmenter for Stage 4
-            intent_segmenter = get_intent_segmenter()
+            intent_segmenter = get_intent_segmenter(self.config or None)
             segments = intent_segmenter.segment_intents(input_data.text)
             
             if not segments:
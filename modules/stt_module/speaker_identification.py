@@ -6,7 +6,6 @@
 
 import os
 import time
-import pickle
 import tempfile
 import numpy as np
 from typing import Dict, List, Optional, Tuple, Any
@@ -18,6 +17,8 @@ load_dotenv()
 
 from utils.debug_helper import debug_log, info_log, error_log
 from core.working_context import working_context_manager, ContextType
+from .speaker_index import SpeakerEmbeddingIndex
+from .speaker_store import SpeakerEmbeddingStore, read_legacy_database
 
 # 延遲導入避免循環依賴
 from typing import TYPE_CHECKING
@@ -63,10 +64,14 @@ class SpeakerIdentification:
         # 說話人資料庫
         self.speaker_database = {}  # {speaker_id: {'embeddings': [], 'metadata': {}}}
         self.speaker_counter = 0
+        self.embedding_index = SpeakerEmbeddingIndex()  # 向量化匹配用的連續嵌入矩陣
+        self._dbscan_cache = None  # (索引版本, 參數, 列索引, 聚類標籤)
         self.similarity_threshold = 0.999995  # 基於原始 pyannote 嵌入的閾值
         
-        # 儲存路徑
-        self.database_path = "memory/speaker_models.pkl"
+        # 儲存路徑（僅追加的嵌入存儲目錄；舊版 pickle 於首次載入時遷移）
+        self.database_path = "memory/speaker_store"
+        self.legacy_database_path = "memory/speaker_models.pkl"
+        self.speaker_store: Optional[SpeakerEmbeddingStore] = None
         
         # 載入 HuggingFace Token
         self.hf_token = os.getenv("HUGGING_FACE_TOKEN")
@@ -301,44 +306,13 @@ class SpeakerIdentification:
                 pass
             
             # 檢查是否為已知說話人（只檢查達到最小樣本數的說話人）
-            qualified_speakers = self._get_qualified_speakers()
-            best_match_id = None
-            best_similarity = 0.0
-            best_distance_score = float('inf')
-            all_distances = {}
+            best_match_id, best_similarity, best_distance_score, all_distances = self._best_known_match(embedding)
             
             # 使用多距離計算或單純餘弦相似度
             if self.use_multi_distance:
-                debug_log(3, f"[Speaker] 使用多距離計算進行說話人識別")
-                
-                for known_id, data in qualified_speakers.items():
-                    for known_embedding in data['embeddings']:
-                        # 計算多種距離
-                        distances = self._calculate_multi_distance(embedding, known_embedding)
-                        combined_score = self._combine_distances(distances)
-                        
-                        # 保存最佳匹配
-                        if combined_score < best_distance_score:
-                            best_distance_score = combined_score
-                            best_match_id = known_id
-                            
-                            # 同時計算餘弦相似度以保持兼容性
-                            cosine_similarity = 1 - distances['cosine']
-                            best_similarity = cosine_similarity
-                            all_distances = distances
-                
                 # 閾值判斷 - 多距離評分較低表示更相似
                 similarity_check = best_distance_score < self.multi_distance_threshold
             else:
-                # 傳統餘弦相似度計算
-                for known_id, data in qualified_speakers.items():
-                    for known_embedding in data['embeddings']:
-                        similarity = 1 - cosine(  # type: ignore
-                        embedding, known_embedding)
-                        if similarity > best_similarity:
-                            best_similarity = similarity
-                            best_match_id = known_id
-                
                 # 傳統閾值判斷
                 similarity_check = best_similarity > self.similarity_threshold
             
@@ -454,43 +428,14 @@ class SpeakerIdentification:
                 pass
             
             # 檢查是否為已知說話人（只檢查達到最小樣本數的說話人）
-            qualified_speakers = self._get_qualified_speakers()
-            best_match_id = None
-            best_similarity = 0.0
-            best_distance_score = float('inf')
+            best_match_id, best_similarity, best_distance_score, _ = self._best_known_match(embedding)
             
             # 使用多距離計算或單純餘弦相似度
             if self.use_multi_distance:
-                debug_log(3, f"[Speaker] 使用多距離計算進行說話人映射")
-                
-                for known_id, data in qualified_speakers.items():
-                    for known_embedding in data['embeddings']:
-                        # 計算多種距離
-                        distances = self._calculate_multi_distance(embedding, known_embedding)
-                        combined_score = self._combine_distances(distances)
-                        
-                        # 保存最佳匹配
-                        if combined_score < best_distance_score:
-                            best_distance_score = combined_score
-                            best_match_id = known_id
-                            
-                            # 同時計算餘弦相似度以保持兼容性
-                            cosine_similarity = 1 - distances['cosine']
-                            best_similarity = cosine_similarity
-                
                 # 閾值判斷 - 多距離評分較低表示更相似
                 similarity_check = best_distance_score < self.multi_distance_threshold
                 debug_log(3, f"[Speaker] 多距離分數: {best_distance_score:.3f}, 餘弦相似度: {best_similarity:.3f}")
             else:
-                # 傳統餘弦相似度計算
-                for known_id, data in qualified_speakers.items():
-                    for known_embedding in data['embeddings']:
-                        similarity = 1 - cosine(  # type: ignore
-                        embedding, known_embedding)
-                        if similarity > best_similarity:
-                            best_similarity = similarity
-                            best_match_id = known_id
-                
                 # 傳統閾值判斷
                 similarity_check = best_similarity > self.similarity_threshold
             
@@ -725,45 +670,14 @@ class SpeakerIdentification:
                 pass
             
             # 檢查已知說話人（只檢查達到最小樣本數的說話人）
-            qualified_speakers = self._get_qualified_speakers()
-            best_match_id = None
-            best_similarity = 0.0
-            best_distance_score = float('inf')
-            all_distances = {}
+            best_match_id, best_similarity, best_distance_score, all_distances = self._best_known_match(embedding)
             
             # 使用多距離計算或單純餘弦相似度
             if self.use_multi_distance:
-                debug_log(3, f"[Speaker] 使用多距離計算進行回退識別")
-                
-                for known_id, data in qualified_speakers.items():
-                    for known_embedding in data['embeddings']:
-                        # 計算多種距離
-                        distances = self._calculate_multi_distance(embedding, known_embedding)
-                        combined_score = self._combine_distances(distances)
-                        
-                        # 保存最佳匹配
-                        if combined_score < best_distance_score:
-                            best_distance_score = combined_score
-                            best_match_id = known_id
-                            all_distances = distances
-                            
-                            # 同時計算餘弦相似度以保持兼容性
-                            cosine_similarity = 1 - distances.get('cosine', 0)
-                            best_similarity = cosine_similarity
-                
                 # 閾值判斷 - 多距離評分較低表示更相似
                 # 在回退模式中我們使用較寬鬆的閾值
                 similarity_check = best_distance_score < self.fallback_multi_distance_threshold
             else:
-                # 傳統餘弦相似度計算
-                for known_id, data in qualified_speakers.items():
-                    for known_embedding in data['embeddings']:
-                        similarity = 1 - cosine(  # type: ignore
-                        embedding, known_embedding)
-                        if similarity > best_similarity:
-                            best_similarity = similarity
-                            best_match_id = known_id
-                
                 # 傳統閾值判斷
                 similarity_check = best_similarity > self.similarity_threshold
             
@@ -854,33 +768,33 @@ class SpeakerIdentification:
                 voice_features=None
             )
     
+    def _get_speaker_store(self) -> SpeakerEmbeddingStore:
+        """依目前的 database_path 取得嵌入存儲"""
+        if self.speaker_store is None or self.speaker_store.directory != self.database_path:
+            self.speaker_store = SpeakerEmbeddingStore(self.database_path, legacy_path=self.legacy_database_path)
+        return self.speaker_store
+
     def _load_speaker_database(self):
-        """載入說話人資料庫"""
+        """載入說話人資料庫（嵌入以記憶體映射延遲讀取）"""
         try:
-            if os.path.exists(self.database_path):
-                with open(self.database_path, 'rb') as f:
-                    data = pickle.load(f)
-                    self.speaker_database = data.get('database', {})
-                    self.speaker_counter = data.get('counter', 0)
-                info_log(f"[Speaker] 載入說話人資料庫: {len(self.speaker_database)} 位說話人")
-            else:
+            store = self._get_speaker_store()
+            is_new = not store.exists()
+            self.speaker_database, self.speaker_counter = store.load()
+            if is_new:
                 info_log("[Speaker] 創建新的說話人資料庫")
+            else:
+                info_log(f"[Speaker] 載入說話人資料庫: {len(self.speaker_database)} 位說話人")
         except Exception as e:
             error_log(f"[Speaker] 載入資料庫失敗: {e}")
             self.speaker_database = {}
             self.speaker_counter = 0
+        self.embedding_index.rebuild(self.speaker_database)
     
     def _save_speaker_database(self):
-        """儲存說話人資料庫"""
+        """儲存說話人資料庫（只追加自上次儲存後的變更）"""
         try:
-            os.makedirs(os.path.dirname(self.database_path), exist_ok=True)
-            data = {
-                'database': self.speaker_database,
-                'counter': self.speaker_counter
-            }
-            with open(self.database_path, 'wb') as f:
-                pickle.dump(data, f)
-            debug_log(3, f"[Speaker] 儲存說話人資料庫: {len(self.speaker_database)} 位說話人")
+            if self._get_speaker_store().sync(self.speaker_database, self.speaker_counter):
+                debug_log(3, f"[Speaker] 儲存說話人資料庫: {len(self.speaker_database)} 位說話人")
         except Exception as e:
             error_log(f"[Speaker] 儲存資料庫失敗: {e}")
     
@@ -914,6 +828,8 @@ class SpeakerIdentification:
             
             # 移動數據
             self.speaker_database[new_id] = self.speaker_database.pop(old_id)
+            self.embedding_index.rename(old_id, new_id)
+            self._get_speaker_store().rename(old_id, new_id)
             self._save_speaker_database()
             
             info_log(f"[Speaker] 說話人 '{old_id}' 已重新命名為 '{new_id}'")
@@ -931,6 +847,7 @@ class SpeakerIdentification:
                 return False
             
             del self.speaker_database[speaker_id]
+            self.embedding_index.remove(speaker_id)
             self._save_speaker_database()
             
             info_log(f"[Speaker] 說話人 '{speaker_id}' 已刪除")
@@ -945,6 +862,7 @@ class SpeakerIdentification:
         try:
             self.speaker_database.clear()
             self.speaker_counter = 0
+            self.embedding_index.clear()
             self._save_speaker_database()
             
             info_log("[Speaker] 所有說話人數據已清空")
@@ -955,39 +873,50 @@ class SpeakerIdentification:
             return False
     
     def backup_speakers(self, backup_path: str) -> bool:
-        """備份說話人數據到指定路徑"""
+        """備份說話人數據到指定目錄（壓縮後的存儲快照）"""
         try:
-            import shutil
-            
-            if os.path.exists(self.database_path):
-                shutil.copy2(self.database_path, backup_path)
-                info_log(f"[Speaker] 說話人數據已備份至: {backup_path}")
-                return True
-            else:
+            store = self._get_speaker_store()
+            if not store.exists():
                 error_log("[Speaker] 原始數據庫不存在，無法備份")
                 return False
+
+            if store.export(backup_path):
+                info_log(f"[Speaker] 說話人數據已備份至: {backup_path}")
+                return True
+            error_log(f"[Speaker] 備份寫入失敗: {backup_path}")
+            return False
                 
         except Exception as e:
             error_log(f"[Speaker] 備份失敗: {e}")
             return False
     
     def restore_speakers(self, backup_path: str) -> bool:
-        """從備份恢復說話人數據"""
+        """從備份恢復說話人數據（備份目錄或舊版 pickle 檔）"""
         try:
-            import shutil
-            
             if not os.path.exists(backup_path):
                 error_log(f"[Speaker] 備份檔案不存在: {backup_path}")
                 return False
             
+            if os.path.isdir(backup_path):
+                source = SpeakerEmbeddingStore(backup_path)
+                if not source.exists():
+                    error_log(f"[Speaker] 備份目錄中沒有說話人資料: {backup_path}")
+                    return False
+                database, counter = source.read()
+            else:
+                database, counter = read_legacy_database(backup_path)
+            
             # 備份當前數據（如果存在）
-            if os.path.exists(self.database_path):
+            store = self._get_speaker_store()
+            if store.exists():
                 current_backup = f"{self.database_path}.pre_restore"
-                shutil.copy2(self.database_path, current_backup)
+                store.export(current_backup)
                 info_log(f"[Speaker] 當前數據已備份至: {current_backup}")
             
-            # 恢復備份
-            shutil.copy2(backup_path, self.database_path)
+            # 恢復備份（新世代原子性替換）
+            if not store.compact(database, counter):
+                error_log(f"[Speaker] 恢復寫入失敗: {backup_path}")
+                return False
             
             # 重新載入
             self._load_speaker_database()
@@ -1006,9 +935,7 @@ class SpeakerIdentification:
             total_samples = sum(len(data.get('embeddings', [])) for data in self.speaker_database.values())
             
             # 計算資料庫檔案大小
-            file_size = 0
-            if os.path.exists(self.database_path):
-                file_size = os.path.getsize(self.database_path)
+            file_size = self._get_speaker_store().disk_usage()
             
             return {
                 'total_speakers': total_speakers,
@@ -1122,8 +1049,8 @@ class SpeakerIdentification:
         
         return distances
     
-    def _combine_distances(self, distances: Dict[str, float]) -> float:
-        """結合多種距離成單一分數"""
+    def _combine_distances(self, distances: Dict[str, Any]) -> Any:
+        """結合多種距離成單一分數（距離可為純量或 _best_known_match 的向量化陣列）"""
         combined = 0
         total_weight = 0
         
@@ -1132,10 +1059,10 @@ class SpeakerIdentification:
                 # 正規化不同類型的距離
                 if dist_type == 'magnitude':
                     # 向量大小差異正規化
-                    normalized_dist = min(distances[dist_type] / 50.0, 1.0)
+                    normalized_dist = np.minimum(distances[dist_type] / 50.0, 1.0)
                 elif dist_type == 'euclidean':
                     # 歐幾里得距離正規化
-                    normalized_dist = min(distances[dist_type] / 100.0, 1.0)
+                    normalized_dist = np.minimum(distances[dist_type] / 100.0, 1.0)
                 else:
                     # 餘弦和相關距離已經在 [0, 1] 範圍內
                     normalized_dist = distances[dist_type]
@@ -1178,41 +1105,57 @@ class SpeakerIdentification:
         # 計算樣本的平均嵌入
         avg_embedding = np.mean(embeddings, axis=0)
         
-        best_match_id = None
-        best_similarity = 0.0
-        best_distance_score = float('inf')
+        best_match_id, best_similarity, best_distance_score, _ = self._best_known_match(avg_embedding, qualified_speakers)
+        if best_match_id is None:
+            return None
         
-        # 使用多距離計算或單純餘弦相似度
+        # 檢查是否滿足閾值
         if self.use_multi_distance:
-            for known_id, data in qualified_speakers.items():
-                for known_embedding in data['embeddings']:
-                    distances = self._calculate_multi_distance(avg_embedding, known_embedding)
-                    combined_score = self._combine_distances(distances)
-                    
-                    if combined_score < best_distance_score:
-                        best_distance_score = combined_score
-                        best_match_id = known_id
-                        cosine_similarity = 1 - distances['cosine']
-                        best_similarity = cosine_similarity
-            
-            # 檢查是否滿足閾值
             if best_distance_score < self.multi_distance_threshold:
-                return best_match_id, best_similarity # type: ignore
-        else:
-            for known_id, data in qualified_speakers.items():
-                for known_embedding in data['embeddings']:
-                    similarity = 1 - cosine(  # type: ignore
-                        avg_embedding, known_embedding)
-                    if similarity > best_similarity:
-                        best_similarity = similarity
-                        best_match_id = known_id
-            
-            # 檢查是否滿足閾值
-            if best_similarity > self.similarity_threshold:
-                return best_match_id, best_similarity # type: ignore
+                return best_match_id, best_similarity
+        elif best_similarity > self.similarity_threshold:
+            return best_match_id, best_similarity
         
         return None
 
+    def _best_known_match(self, embedding: np.ndarray,
+                          qualified_speakers: Optional[Dict] = None) -> Tuple[Optional[str], float, float, Dict[str, float]]:
+        """
+        以嵌入索引向量化比對所有合格說話人的樣本（一次矩陣-向量乘積）
+        
+        Returns:
+            (best_match_id, best_similarity, best_distance_score, best_distances)
+            非多距離模式下 best_distance_score 為 inf、best_distances 為空
+        """
+        if qualified_speakers is None:
+            qualified_speakers = self._get_qualified_speakers()
+        no_match = (None, 0.0, float('inf'), {})
+        
+        self.embedding_index.sync(self.speaker_database)
+        rows = self.embedding_index.rows_for(qualified_speakers.keys())
+        if len(rows) == 0:
+            return no_match
+        
+        distances = self.embedding_index.distances(
+            embedding, rows,
+            multi=self.use_multi_distance,
+            use_magnitude=self.use_magnitude_difference,
+            use_enhanced=self.use_enhanced_features
+        )
+        
+        if self.use_multi_distance:
+            scores = np.broadcast_to(self._combine_distances(distances), rows.shape)
+            best = int(np.argmin(scores))
+            best_distances = {name: float(values[best]) for name, values in distances.items()}
+            return (self.embedding_index.speaker_at(rows[best]), 1 - best_distances['cosine'],
+                    float(scores[best]), best_distances)
+        
+        similarities = 1 - distances['cosine']
+        best = int(np.argmax(similarities))
+        if similarities[best] <= 0:
+            return no_match
+        return self.embedding_index.speaker_at(rows[best]), float(similarities[best]), float('inf'), {}
+
     def get_working_context_status(self) -> Dict[str, Any]:
         """獲取工作上下文狀態"""
         context_info = working_context_manager.get_all_contexts_info()
@@ -1233,19 +1176,16 @@ class SpeakerIdentification:
             # 備份現有資料庫
             backup_path = f"{self.database_path}.backup_{int(time.time())}"
             try:
-                with open(backup_path, 'wb') as f:
-                    data = {
-                        'database': self.speaker_database,
-                        'counter': self.speaker_counter
-                    }
-                    pickle.dump(data, f)
-                info_log(f"[Speaker] 資料庫已備份至: {backup_path}")
+                self._save_speaker_database()
+                if self._get_speaker_store().export(backup_path):
+                    info_log(f"[Speaker] 資料庫已備份至: {backup_path}")
             except Exception as e:
                 error_log(f"[Speaker] 備份失敗: {e}")
         
         # 清空資料庫
         self.speaker_database = {}
         self.speaker_counter = 0
+        self.embedding_index.clear()
         self._save_speaker_database()
         info_log("[Speaker] 說話人資料庫已重建")
     
@@ -1287,26 +1227,30 @@ class SpeakerIdentification:
             if not qualified_speakers:
                 return None
 
-            # 構建現有嵌入矩陣與對應說話人映射
-            embeddings = []
-            labels = []  # 對應的 speaker_id
-            for spk_id, data in qualified_speakers.items():
-                for emb in data.get('embeddings', []):
-                    embeddings.append(emb)
-                    labels.append(spk_id)
-
-            if len(embeddings) == 0:
+            # 直接使用嵌入索引的連續矩陣
+            self.embedding_index.sync(self.speaker_database)
+            rows = self.embedding_index.rows_for(qualified_speakers.keys())
+            if len(rows) == 0:
                 return None
 
-            X = np.vstack(embeddings)
-
-            # 使用 sklearn DBSCAN
-            db = DBSCAN(eps=self.dbscan_eps, min_samples=self.dbscan_min_samples, metric=self.dbscan_metric)  # type: ignore
-            clusters = db.fit_predict(X)
+            # 聚類結果只在索引內容或參數變更時重新計算
+            params = (self.dbscan_eps, self.dbscan_min_samples, self.dbscan_metric)
+            cache = self._dbscan_cache
+            if (cache is not None and cache[0] == self.embedding_index.version and cache[1] == params
+                    and np.array_equal(cache[2], rows)):
+                clusters = cache[3]
+            else:
+                X = self.embedding_index.matrix[rows]
+                db = DBSCAN(eps=self.dbscan_eps, min_samples=self.dbscan_min_samples, metric=self.dbscan_metric)  # type: ignore
+                clusters = db.fit_predict(X)
+                self._dbscan_cache = (self.embedding_index.version, params, rows, clusters)
 
             # 把新 embedding 與所有 embeddings 做距離比較，看是否屬於某個 cluster
             # 若某些點形成 cluster >=0，找出這些 cluster 中最接近新 embedding 的點
-            dists = np.array([cosine(embedding, e) if self.dbscan_metric == 'cosine' else euclidean(embedding, e) for e in embeddings])
+            if self.dbscan_metric == 'cosine':
+                dists = self.embedding_index.distances(embedding, rows, multi=False)['cosine']
+            else:
+                dists = np.linalg.norm(self.embedding_index.matrix[rows] - np.asarray(embedding, dtype=np.float64), axis=1)
             # 取得最小距離索引
             min_idx = int(np.argmin(dists))
             min_cluster = clusters[min_idx]
@@ -1316,11 +1260,11 @@ class SpeakerIdentification:
             # 在此 cluster 中，取得最接近的新樣本索引並回傳其 speaker_id
             cluster_indices = np.where(clusters == min_cluster)[0]
             best_local_idx = cluster_indices[np.argmin(dists[cluster_indices])]
-            matched_speaker = labels[best_local_idx]
+            matched_speaker = self.embedding_index.speaker_at(rows[best_local_idx])
 
             # 計算多重距離細項供回傳
-            matched_embedding = embeddings[best_local_idx]
-            distances = self._calculate_multi_distance(embedding, matched_embedding) if self.use_multi_distance else {'cosine': cosine(embedding, matched_embedding)}
+            matched_embedding = self.embedding_index.matrix[rows[best_local_idx]]
+            distances = self._calculate_multi_distance(embedding, matched_embedding) if self.use_multi_distance else {'cosine': float(dists[best_local_idx])}
             similarity = 1 - distances.get('cosine', 0)
 
             return matched_speaker, similarity, distances # type: ignore
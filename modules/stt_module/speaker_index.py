@@ -0,0 +1,277 @@
+# modules/stt_module/speaker_index.py
+"""
+說話人嵌入索引 - 以連續矩陣進行向量化的說話人匹配
+
+所有已註冊樣本存放在一個連續的 [N, D] 矩陣，搭配每列的說話人槽位陣列：
+- 餘弦 / 歐幾里得 / 相關係數距離都由同一次矩陣-向量乘積推導
+- 每列的範數、平均、標準差與增強特徵在加入時預先計算
+- 新增樣本只附加到尾端（容量倍增），重新命名只改槽位名稱，刪除時壓縮一次
+
+speaker_database 仍是資料來源；sync() 依各說話人的樣本數增量同步，
+因此其他地方直接附加到 embeddings 列表的樣本也會在下次匹配前併入索引。
+"""
+
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+from utils.debug_helper import debug_log
+
+# 與 SpeakerIdentification._extract_enhanced_features 的鍵順序一致
+ENHANCED_FEATURES = (
+    "magnitude", "mean", "std", "skewness", "kurtosis", "positive_ratio",
+    "max_value", "min_value",
+    "segment_0_energy", "segment_1_energy", "segment_2_energy", "segment_3_energy"
+)
+
+
+def enhanced_feature_matrix(matrix: np.ndarray) -> np.ndarray:
+    """逐列計算增強特徵，結果與 _extract_enhanced_features 相同，形狀 [N, 12]"""
+    matrix = np.atleast_2d(np.asarray(matrix, dtype=np.float64))
+    n, dim = matrix.shape
+    mean = matrix.mean(axis=1)
+    std = matrix.std(axis=1)
+    safe_std = np.where(std > 0, std, 1.0)
+    z = (matrix - mean[:, None]) / safe_std[:, None]
+    skewness = np.where(std > 0, np.mean(z ** 3, axis=1), 0.0)
+    kurtosis = np.where(std > 0, np.mean(z ** 4, axis=1) - 3, 0.0)
+
+    features = np.empty((n, len(ENHANCED_FEATURES)), dtype=np.float64)
+    features[:, 0] = np.linalg.norm(matrix, axis=1)
+    features[:, 1] = mean
+    features[:, 2] = std
+    features[:, 3] = skewness
+    features[:, 4] = kurtosis
+    features[:, 5] = np.sum(matrix > 0, axis=1) / dim
+    features[:, 6] = matrix.max(axis=1)
+    features[:, 7] = matrix.min(axis=1)
+    squared = matrix ** 2
+    for i, columns in enumerate(np.array_split(np.arange(dim), 4)):
+        features[:, 8 + i] = squared[:, columns].sum(axis=1)
+    return features
+
+
+class SpeakerEmbeddingIndex:
+    """說話人嵌入索引"""
+
+    def __init__(self, initial_capacity: int = 256):
+        self.initial_capacity = max(1, initial_capacity)
+        self.clear()
+
+    def clear(self):
+        """清空索引"""
+        self.version = getattr(self, "version", -1) + 1  # 內容變更計數，供上層快取判斷
+        self.dim: Optional[int] = None
+        self._size = 0
+        self._matrix = np.empty((0, 0), dtype=np.float64)
+        self._row_slot = np.empty(0, dtype=np.int32)
+        self._norms = np.empty(0, dtype=np.float64)
+        self._means = np.empty(0, dtype=np.float64)
+        self._stds = np.empty(0, dtype=np.float64)
+        self._features = np.empty((0, len(ENHANCED_FEATURES)), dtype=np.float64)
+
+        self._slots: Dict[str, int] = {}       # speaker_id -> 槽位
+        self._slot_ids: List[Optional[str]] = []  # 槽位 -> speaker_id（已刪除為 None）
+        self._consumed: Dict[str, int] = {}    # 已同步的來源樣本數（含維度不符而略過者）
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def speaker_ids(self) -> List[str]:
+        return list(self._slots.keys())
+
+    # === 維護 ===
+
+    def rebuild(self, database: Dict[str, Dict]):
+        """由 speaker_database 完整重建"""
+        self.clear()
+        self.sync(database)
+
+    def sync(self, database: Dict[str, Dict]) -> bool:
+        """
+        依 speaker_database 增量同步：附加新樣本、移除已不存在的說話人
+
+        Returns:
+            索引是否有變更
+        """
+        changed = False
+        for speaker_id in [sid for sid in self._slots if sid not in database]:
+            self.remove(speaker_id)
+            changed = True
+
+        for speaker_id, data in database.items():
+            embeddings = data.get('embeddings', [])
+            consumed = self._consumed.get(speaker_id)
+            if consumed == len(embeddings):
+                continue
+            if consumed is not None and consumed > len(embeddings):
+                # 樣本被刪減或替換，整位說話人重新載入
+                self.remove(speaker_id)
+                consumed = None
+            self.add(speaker_id, embeddings[consumed or 0:])
+            changed = True
+        return changed
+
+    def add(self, speaker_id: str, embeddings: Iterable[np.ndarray]):
+        """附加某說話人的樣本"""
+        embeddings = list(embeddings)
+        slot = self._slots.get(speaker_id)
+        if slot is None:
+            slot = len(self._slot_ids)
+            self._slots[speaker_id] = slot
+            self._slot_ids.append(speaker_id)
+            self._consumed[speaker_id] = 0
+        self._consumed[speaker_id] += len(embeddings)
+        if not embeddings:
+            return
+
+        rows = [np.asarray(e, dtype=np.float64).reshape(-1) for e in embeddings]
+        if self.dim is None:
+            self.dim = rows[0].shape[0]
+        valid = [row for row in rows if row.shape[0] == self.dim]
+        if len(valid) < len(rows):
+            debug_log(2, f"[SpeakerIndex] 略過 {len(rows) - len(valid)} 個維度不符的樣本 ({speaker_id})")
+        if not valid:
+            return
+
+        block = np.vstack(valid)
+        self._ensure_capacity(self._size + len(block))
+        end = self._size + len(block)
+        self._matrix[self._size:end] = block
+        self._row_slot[self._size:end] = slot
+        self._norms[self._size:end] = np.linalg.norm(block, axis=1)
+        self._means[self._size:end] = block.mean(axis=1)
+        self._stds[self._size:end] = block.std(axis=1)
+        self._features[self._size:end] = enhanced_feature_matrix(block)
+        self._size = end
+        self.version += 1
+
+    def rename(self, old_id: str, new_id: str) -> bool:
+        """重新命名說話人（只改槽位名稱，不搬動資料）"""
+        slot = self._slots.pop(old_id, None)
+        if slot is None:
+            return False
+        self._slots[new_id] = slot
+        self._slot_ids[slot] = new_id
+        self._consumed[new_id] = self._consumed.pop(old_id)
+        self.version += 1
+        return True
+
+    def remove(self, speaker_id: str) -> bool:
+        """移除說話人的所有樣本並壓縮矩陣"""
+        slot = self._slots.pop(speaker_id, None)
+        if slot is None:
+            return False
+        self._slot_ids[slot] = None
+        self._consumed.pop(speaker_id, None)
+        keep = np.flatnonzero(self._row_slot[:self._size] != slot)
+        n = len(keep)
+        for name in ("_matrix", "_row_slot", "_norms", "_means", "_stds", "_features"):
+            array = getattr(self, name)
+            array[:n] = array[keep]
+        self._size = n
+        if not self._slots:
+            self.clear()
+        self.version += 1
+        return True
+
+    def _ensure_capacity(self, needed: int):
+        capacity = self._matrix.shape[0]
+        if needed <= capacity and self._matrix.shape[1] == self.dim:
+            return
+        new_capacity = max(self.initial_capacity, capacity)
+        while new_capacity < needed:
+            new_capacity *= 2
+
+        def grow(array, shape, dtype):
+            grown = np.empty(shape, dtype=dtype)
+            if self._size:
+                grown[:self._size] = array[:self._size]
+            return grown
+
+        self._matrix = grow(self._matrix, (new_capacity, self.dim), np.float64)
+        self._row_slot = grow(self._row_slot, new_capacity, np.int32)
+        self._norms = grow(self._norms, new_capacity, np.float64)
+        self._means = grow(self._means, new_capacity, np.float64)
+        self._stds = grow(self._stds, new_capacity, np.float64)
+        self._features = grow(self._features, (new_capacity, len(ENHANCED_FEATURES)), np.float64)
+
+    # === 查詢 ===
+
+    @property
+    def matrix(self) -> np.ndarray:
+        """[N, D] 原始嵌入（唯讀視圖）"""
+        view = self._matrix[:self._size]
+        view.flags.writeable = False
+        return view
+
+    def rows_for(self, speaker_ids: Optional[Iterable[str]] = None) -> np.ndarray:
+        """指定說話人（None 為全部）的列索引"""
+        if speaker_ids is None:
+            return np.arange(self._size)
+        slot_mask = np.zeros(len(self._slot_ids), dtype=bool)
+        for speaker_id in speaker_ids:
+            slot = self._slots.get(speaker_id)
+            if slot is not None:
+                slot_mask[slot] = True
+        return np.flatnonzero(slot_mask[self._row_slot[:self._size]])
+
+    def speaker_at(self, row: int) -> Optional[str]:
+        return self._slot_ids[self._row_slot[row]]
+
+    def distances(self, query: np.ndarray, rows: np.ndarray, multi: bool = True,
+                  use_magnitude: bool = True, use_enhanced: bool = True) -> Dict[str, np.ndarray]:
+        """
+        查詢嵌入對指定列的距離，與 _calculate_multi_distance 的定義一致
+
+        Args:
+            query: [D] 查詢嵌入
+            rows: rows_for() 的結果
+            multi: False 時只計算 cosine
+
+        Returns:
+            {距離名稱: [len(rows)] 陣列}
+        """
+        query = np.asarray(query, dtype=np.float64).reshape(-1)
+        if self.dim is None or query.shape[0] != self.dim:
+            raise ValueError(f"嵌入維度不符: {query.shape[0]} != {self.dim}")
+
+        dots = self._matrix[rows] @ query  # 唯一的矩陣-向量乘積
+        norms = self._norms[rows]
+        query_norm = float(np.linalg.norm(query))
+        denom = norms * query_norm
+        cos_sim = np.divide(dots, denom, out=np.zeros_like(dots), where=denom > 0)
+        result = {'cosine': 1.0 - cos_sim}
+        if not multi:
+            return result
+
+        # 單位向量間的歐幾里得距離：|a|² + |b|² - 2a·b（零向量正規化後仍為零）
+        unit_sq = (norms > 0).astype(np.float64) + (1.0 if query_norm > 0 else 0.0)
+        result['euclidean'] = np.sqrt(np.maximum(unit_sq - 2.0 * cos_sim, 0.0))
+
+        if use_magnitude:
+            result['magnitude'] = np.abs(norms - query_norm)
+
+        # 皮爾森相關：cov = E[ab] - E[a]E[b]
+        query_mean = float(query.mean())
+        query_std = float(query.std())
+        means = self._means[rows]
+        stds = self._stds[rows]
+        valid = (stds > 0) & (query_std > 0)
+        cov = dots / self.dim - means * query_mean
+        corr = np.divide(cov, stds * query_std, out=np.zeros_like(cov), where=valid)
+        result['correlation'] = np.where(valid, 1.0 - np.abs(np.clip(corr, -1.0, 1.0)), 1.0)
+
+        if use_enhanced:
+            query_features = enhanced_feature_matrix(query[None, :])[0]
+            result['enhanced'] = np.linalg.norm(self._features[rows] - query_features, axis=1)
+        return result
+
+    def get_stats(self) -> Dict[str, int]:
+        return {
+            "speakers": len(self._slots),
+            "rows": self._size,
+            "capacity": int(self._matrix.shape[0]),
+            "dim": self.dim or 0
+        }
@@ -0,0 +1,472 @@
+# modules/stt_module/speaker_store.py
+"""
+說話人嵌入存儲 - 僅追加的樣本資料檔加上 JSON lines 索引
+
+取代每次變更都整份重寫的 speaker_models.pkl：
+- 新樣本只追加其位元組到資料檔，並在索引追加一行記錄
+- 載入時只重放索引，嵌入以唯讀記憶體映射延遲讀取
+- 壓縮寫出新世代的資料檔與索引，以 os.replace 原子性切換
+- 首次載入時自動從舊版 pickle 遷移
+
+目錄格式：
+- embeddings.<世代>.bin  原始樣本位元組（維度與 dtype 記錄在索引中）
+- index.jsonl            第一行為 ["h", 格式版本, 世代]，其後每行一筆：
+    ["s", speaker_id, 位元組偏移, 樣本數, 維度, dtype]   樣本區塊
+    ["m", speaker_id, metadata]                          元數據（整份覆寫）
+    ["r", old_id, new_id]                                重新命名
+    ["d", speaker_id]                                    刪除
+    ["c", counter]                                       說話人計數器
+
+先寫資料、後寫索引，索引永遠不會指向不存在的位元組；
+崩潰留下的殘缺末行在載入時截斷，未被引用的位元組由壓縮回收。
+"""
+
+import json
+import os
+import pickle
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from utils.debug_helper import debug_log, info_log, error_log
+
+FORMAT_VERSION = 1
+INDEX_FILE = "index.jsonl"
+DATA_PREFIX = "embeddings."
+DATA_SUFFIX = ".bin"
+
+
+def read_legacy_database(path: str) -> Tuple[Dict[str, Dict], int]:
+    """讀取舊版 pickle 說話人資料庫，返回 (database, counter)"""
+    with open(path, 'rb') as f:
+        data = pickle.load(f)
+    return data.get('database', {}), data.get('counter', 0)
+
+
+def _json_default(value):
+    """metadata 中的 numpy 純量等非 JSON 型別"""
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, (set, tuple)):
+        return list(value)
+    return str(value)
+
+
+def _dump_metadata(metadata: Optional[Dict]) -> str:
+    return json.dumps(metadata or {}, ensure_ascii=False, sort_keys=True, default=_json_default)
+
+
+def _sample_blocks(embeddings) -> List[np.ndarray]:
+    """將連續且維度、dtype 相同的樣本合併為 [k, D] 區塊"""
+    blocks, run = [], []
+    for embedding in embeddings:
+        sample = np.asarray(embedding)
+        if sample.dtype.kind != 'f':
+            sample = sample.astype(np.float64)
+        sample = np.ascontiguousarray(sample.reshape(-1))
+        if run and (sample.shape != run[0].shape or sample.dtype != run[0].dtype):
+            blocks.append(np.vstack(run))
+            run = []
+        run.append(sample)
+    if run:
+        blocks.append(np.vstack(run))
+    return blocks
+
+
+class SpeakerEmbeddingStore:
+    """說話人嵌入存儲"""
+
+    def __init__(self, directory: str, legacy_path: Optional[str] = None,
+                 compaction_min_dead_bytes: int = 1 << 20,
+                 compaction_dead_ratio: float = 0.3,
+                 compaction_min_log_records: int = 5000,
+                 fsync: bool = True):
+        self.directory = directory
+        self.legacy_path = legacy_path
+        self.index_file = os.path.join(directory, INDEX_FILE)
+        self.temp_suffix = ".tmp"
+
+        # 壓縮配置：未引用位元組或索引行數過多時重寫
+        self.compaction_min_dead_bytes = compaction_min_dead_bytes
+        self.compaction_dead_ratio = compaction_dead_ratio
+        self.compaction_min_log_records = compaction_min_log_records
+        self.fsync = fsync
+
+        # 已持久化的狀態，sync() 依此計算差異
+        self.generation = 0
+        self._persisted: Dict[str, int] = {}     # speaker_id -> 已寫入樣本數
+        self._sample_bytes: Dict[str, int] = {}  # speaker_id -> 已寫入樣本位元組
+        self._metadata: Dict[str, str] = {}      # speaker_id -> 已寫入的 metadata JSON
+        self._counter = 0
+        self._data_size = 0                      # 資料檔大小（含未引用位元組）
+        self._log_records = 0                    # 索引行數（不含標頭）
+        self._mmap: Optional[np.memmap] = None
+
+        self._lock = threading.RLock()
+        self.loaded = False
+
+    def _data_file(self, generation: int) -> str:
+        return os.path.join(self.directory, f"{DATA_PREFIX}{generation}{DATA_SUFFIX}")
+
+    def exists(self) -> bool:
+        """磁碟上是否已有資料（新格式或待遷移的舊版 pickle）"""
+        return os.path.exists(self.index_file) or bool(self.legacy_path and os.path.exists(self.legacy_path))
+
+    # === 讀取 ===
+
+    def _replay(self) -> Dict[str, Any]:
+        """重放索引，遇到殘缺末行即停止"""
+        state = {'generation': 0, 'speakers': {}, 'counter': 0, 'records': 0, 'valid_bytes': 0}
+        if not os.path.exists(self.index_file):
+            return state
+
+        speakers = state['speakers']
+        with open(self.index_file, 'rb') as f:
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    entry = json.loads(line)
+                except (json.JSONDecodeError, UnicodeDecodeError):
+                    break
+                state['valid_bytes'] += len(line)
+
+                op = entry[0]
+                if op == "h":
+                    state['generation'] = entry[2]
+                    continue
+                if op == "s":
+                    speakers.setdefault(entry[1], {'blocks': [], 'metadata': None})['blocks'].append(tuple(entry[2:6]))
+                elif op == "m":
+                    speakers.setdefault(entry[1], {'blocks': [], 'metadata': None})['metadata'] = entry[2]
+                elif op == "r":
+                    if entry[1] in speakers:
+                        speakers[entry[2]] = speakers.pop(entry[1])
+                elif op == "d":
+                    speakers.pop(entry[1], None)
+                elif op == "c":
+                    state['counter'] = entry[1]
+                state['records'] += 1
+        return state
+
+    @staticmethod
+    def _views(mmap: Optional[np.memmap], size: int, blocks) -> Tuple[List[np.ndarray], int]:
+        """由區塊記錄建立唯讀樣本視圖（不讀取資料），返回 (樣本列表, 略過的樣本數)"""
+        embeddings: List[np.ndarray] = []
+        skipped = 0
+        for offset, count, dim, dtype in blocks:
+            if mmap is None or offset + count * dim * np.dtype(dtype).itemsize > size:
+                skipped += count
+                continue
+            block = np.frombuffer(mmap, dtype=dtype, count=count * dim, offset=offset)
+            embeddings.extend(block.reshape(count, dim))
+        return embeddings, skipped
+
+    def _map(self, generation: int) -> Tuple[Optional[np.memmap], int]:
+        data_file = self._data_file(generation)
+        size = os.path.getsize(data_file) if os.path.exists(data_file) else 0
+        return (np.memmap(data_file, dtype=np.uint8, mode='r') if size else None), size
+
+    def _materialize(self, state: Dict[str, Any]) -> Tuple[Dict[str, Dict], Optional[np.memmap], int, int]:
+        mmap, size = self._map(state['generation'])
+        database: Dict[str, Dict] = {}
+        skipped = 0
+        for speaker_id, entry in state['speakers'].items():
+            embeddings, missing = self._views(mmap, size, entry['blocks'])
+            skipped += missing
+            database[speaker_id] = {'embeddings': embeddings, 'metadata': entry['metadata'] or {}}
+        return database, mmap, size, skipped
+
+    def read(self) -> Tuple[Dict[str, Dict], int]:
+        """唯讀讀取磁碟上的內容（不改變存儲狀態），返回 (database, counter)"""
+        with self._lock:
+            if not os.path.exists(self.index_file) and self.legacy_path and os.path.exists(self.legacy_path):
+                return read_legacy_database(self.legacy_path)
+            state = self._replay()
+            database, _, _, _ = self._materialize(state)
+            return database, state['counter']
+
+    def load(self) -> Tuple[Dict[str, Dict], int]:
+        """
+        載入說話人資料庫，必要時先遷移舊版 pickle
+
+        Returns:
+            (database, counter)，嵌入為資料檔的唯讀記憶體映射視圖
+        """
+        with self._lock:
+            os.makedirs(self.directory, exist_ok=True)
+            if not os.path.exists(self.index_file):
+                if self.legacy_path and os.path.exists(self.legacy_path):
+                    self._migrate_legacy()
+                else:
+                    self.compact({}, 0, rebind=False)
+
+            state = self._replay()
+            index_size = os.path.getsize(self.index_file)
+            if state['valid_bytes'] < index_size:
+                info_log(f"[SpeakerStore] 截斷殘缺索引末行 ({index_size - state['valid_bytes']} bytes)", "WARNING")
+                with open(self.index_file, 'r+b') as f:
+                    f.truncate(state['valid_bytes'])
+
+            database, self._mmap, self._data_size, skipped = self._materialize(state)
+            if skipped:
+                info_log(f"[SpeakerStore] 略過 {skipped} 個超出資料檔範圍的樣本", "WARNING")
+
+            self.generation = state['generation']
+            self._counter = state['counter']
+            self._log_records = state['records']
+            self._mark_persisted(database)
+            self._remove_stale_files()
+            self.loaded = True
+
+            if skipped or self._needs_compaction():
+                self.compact(database, self._counter)
+
+            debug_log(2, f"[SpeakerStore] 載入完成: {len(database)} 位說話人，"
+                         f"{sum(self._persisted.values())} 個樣本，世代 {self.generation}")
+            return database, self._counter
+
+    def _migrate_legacy(self):
+        """將舊版 pickle 轉為新格式，成功後保留為 .migrated"""
+        database, counter = read_legacy_database(self.legacy_path)
+        if not self.compact(database, counter, rebind=False):
+            raise RuntimeError("舊版說話人資料庫遷移失敗")
+        migrated_path = f"{self.legacy_path}.migrated"
+        os.replace(self.legacy_path, migrated_path)
+        info_log(f"[SpeakerStore] 已從 {self.legacy_path} 遷移 {len(database)} 位說話人，原檔保留為 {migrated_path}")
+
+    def _mark_persisted(self, database: Dict[str, Dict]):
+        self._persisted = {sid: len(data.get('embeddings', [])) for sid, data in database.items()}
+        self._sample_bytes = {
+            sid: sum(np.asarray(e).nbytes for e in data.get('embeddings', []))
+            for sid, data in database.items()
+        }
+        self._metadata = {sid: _dump_metadata(data.get('metadata')) for sid, data in database.items()}
+
+    def _forget(self, speaker_id: str):
+        self._persisted.pop(speaker_id, None)
+        self._sample_bytes.pop(speaker_id, None)
+        self._metadata.pop(speaker_id, None)
+
+    # === 寫入 ===
+
+    def sync(self, database: Dict[str, Dict], counter: int) -> bool:
+        """
+        將 speaker_database 的變更增量寫入：只追加新樣本、變更的元數據與刪除記錄
+
+        尚未載入時（無法計算差異）改以完整快照覆寫，與舊版整份儲存的語義一致。
+        """
+        with self._lock:
+            if not self.loaded:
+                return self.compact(database, counter)
+
+            try:
+                ops: List[list] = []
+                for speaker_id in [sid for sid in self._persisted if sid not in database]:
+                    ops.append(["d", speaker_id])
+                    self._forget(speaker_id)
+
+                for speaker_id, data in database.items():
+                    embeddings = data.get('embeddings', [])
+                    persisted = self._persisted.get(speaker_id)
+                    if persisted is not None and persisted > len(embeddings):
+                        # 樣本被刪減或替換，刪除後整位重寫
+                        ops.append(["d", speaker_id])
+                        self._forget(speaker_id)
+                        persisted = None
+                    for block in _sample_blocks(embeddings[persisted or 0:]):
+                        ops.append(["s", speaker_id, block])
+                    self._persisted[speaker_id] = len(embeddings)
+
+                    metadata = _dump_metadata(data.get('metadata'))
+                    if metadata != self._metadata.get(speaker_id):
+                        ops.append(["m", speaker_id, json.loads(metadata)])
+                        self._metadata[speaker_id] = metadata
+
+                if counter != self._counter:
+                    ops.append(["c", counter])
+                    self._counter = counter
+                if not ops:
+                    return True
+
+                entries = self._write_samples(ops)
+                self._append_log(entries)
+
+                if self._needs_compaction():
+                    return self.compact(database, counter)
+                return True
+
+            except Exception as e:
+                # 記憶體狀態可能已與磁碟不一致，下次儲存改寫完整快照
+                self.loaded = False
+                error_log(f"[SpeakerStore] 增量寫入失敗: {e}")
+                return False
+
+    def _write_samples(self, ops: List[list]) -> List[list]:
+        """一次追加所有樣本區塊，將 ["s", id, block] 換成帶偏移的索引記錄"""
+        blocks = [op[2] for op in ops if op[0] == "s"]
+        if not blocks:
+            return ops
+
+        with open(self._data_file(self.generation), 'ab') as f:
+            offset = f.seek(0, os.SEEK_END)
+            f.write(b"".join(block.tobytes() for block in blocks))
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+
+        entries = []
+        for op in ops:
+            if op[0] == "s":
+                speaker_id, block = op[1], op[2]
+                entries.append(["s", speaker_id, offset, int(block.shape[0]), int(block.shape[1]), block.dtype.str])
+                self._sample_bytes[speaker_id] = self._sample_bytes.get(speaker_id, 0) + block.nbytes
+                offset += block.nbytes
+            else:
+                entries.append(op)
+        self._data_size = offset
+        return entries
+
+    def _append_log(self, entries: List[list]):
+        with open(self.index_file, 'a', encoding='utf-8') as f:
+            f.write("".join(json.dumps(entry, ensure_ascii=False) + "\n" for entry in entries))
+            f.flush()
+        self._log_records += len(entries)
+
+    def rename(self, old_id: str, new_id: str) -> bool:
+        """重新命名說話人（只追加一行記錄，不搬動樣本）"""
+        with self._lock:
+            if not self.loaded or old_id not in self._persisted:
+                return False
+            try:
+                self._append_log([["r", old_id, new_id]])
+            except Exception as e:
+                self.loaded = False
+                error_log(f"[SpeakerStore] 重新命名記錄失敗: {e}")
+                return False
+            for state in (self._persisted, self._sample_bytes, self._metadata):
+                if old_id in state:
+                    state[new_id] = state.pop(old_id)
+            return True
+
+    def _needs_compaction(self) -> bool:
+        live = sum(self._sample_bytes.values())
+        dead = self._data_size - live
+        if dead >= self.compaction_min_dead_bytes and dead > live * self.compaction_dead_ratio:
+            return True
+        # 快照約為每位說話人兩行；其餘都是被覆寫的元數據或已刪除的記錄
+        return (self._log_records >= self.compaction_min_log_records
+                and self._log_records > 4 * (2 * len(self._persisted) + 1))
+
+    def _disk_generation(self) -> int:
+        if not os.path.exists(self.index_file):
+            return 0
+        try:
+            with open(self.index_file, 'rb') as f:
+                header = json.loads(f.readline())
+            return int(header[2]) if header and header[0] == "h" else 0
+        except Exception:
+            return 0
+
+    def compact(self, database: Dict[str, Dict], counter: int, rebind: bool = True) -> bool:
+        """
+        將 database 寫為新世代的資料檔與索引，並以 os.replace 原子性切換
+
+        Args:
+            database: 完整的說話人資料庫
+            counter: 說話人計數器
+            rebind: 是否將 database 中的嵌入換成新資料檔的映射視圖，
+                    讓舊資料檔的映射得以釋放
+        """
+        with self._lock:
+            try:
+                os.makedirs(self.directory, exist_ok=True)
+                generation = max(self.generation, self._disk_generation()) + 1
+                data_file = self._data_file(generation)
+
+                layout: Dict[str, List[Tuple[int, int, int, str]]] = {}
+                entries: List[list] = []
+                offset = 0
+                with open(data_file, 'wb') as f:
+                    for speaker_id, data in database.items():
+                        layout[speaker_id] = []
+                        for block in _sample_blocks(data.get('embeddings', [])):
+                            f.write(block.tobytes())
+                            record = (offset, int(block.shape[0]), int(block.shape[1]), block.dtype.str)
+                            layout[speaker_id].append(record)
+                            entries.append(["s", speaker_id, *record])
+                            offset += block.nbytes
+                        entries.append(["m", speaker_id, json.loads(_dump_metadata(data.get('metadata')))])
+                    f.flush()
+                    if self.fsync:
+                        os.fsync(f.fileno())
+                entries.append(["c", counter])
+
+                temp_index = self.index_file + self.temp_suffix
+                with open(temp_index, 'w', encoding='utf-8') as f:
+                    f.write(json.dumps(["h", FORMAT_VERSION, generation]) + "\n")
+                    f.write("".join(json.dumps(entry, ensure_ascii=False) + "\n" for entry in entries))
+                    f.flush()
+                    if self.fsync:
+                        os.fsync(f.fileno())
+                os.replace(temp_index, self.index_file)  # 切換點：之前崩潰仍保留舊世代
+
+                previous_size = self._data_size
+                self.generation = generation
+                self._counter = counter
+                self._log_records = len(entries)
+                self._data_size = offset
+                self._mmap = None
+                if rebind:
+                    self._mmap, size = self._map(generation)
+                    for speaker_id, data in database.items():
+                        data.setdefault('embeddings', [])[:] = self._views(self._mmap, size, layout[speaker_id])[0]
+                self._mark_persisted(database)
+                self.loaded = True
+                self._remove_stale_files()
+
+                debug_log(2, f"[SpeakerStore] 壓縮完成: 世代 {generation}，"
+                             f"資料 {previous_size} -> {offset} bytes")
+                return True
+
+            except Exception as e:
+                error_log(f"[SpeakerStore] 壓縮失敗: {e}")
+                return False
+
+    def _remove_stale_files(self):
+        """移除非當前世代的資料檔與殘留暫存檔（仍被映射時留待下次）"""
+        current = os.path.basename(self._data_file(self.generation))
+        for name in os.listdir(self.directory):
+            stale_data = name.startswith(DATA_PREFIX) and name.endswith(DATA_SUFFIX) and name != current
+            if stale_data or name == INDEX_FILE + self.temp_suffix:
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except OSError as e:
+                    debug_log(3, f"[SpeakerStore] 暫時無法移除 {name}: {e}")
+
+    # === 備份 ===
+
+    def export(self, target_dir: str) -> bool:
+        """將磁碟上的內容匯出為 target_dir 下的壓縮快照"""
+        database, counter = self.read()
+        return SpeakerEmbeddingStore(target_dir, fsync=self.fsync).compact(database, counter, rebind=False)
+
+    def disk_usage(self) -> int:
+        if not os.path.isdir(self.directory):
+            return 0
+        return sum(os.path.getsize(os.path.join(self.directory, name)) for name in os.listdir(self.directory))
+
+    def get_stats(self) -> Dict[str, Any]:
+        live = sum(self._sample_bytes.values())
+        return {
+            "speakers": len(self._persisted),
+            "samples": sum(self._persisted.values()),
+            "generation": self.generation,
+            "log_records": self._log_records,
+            "data_bytes": self._data_size,
+            "dead_bytes": self._data_size - live,
+            "directory": self.directory
+        }
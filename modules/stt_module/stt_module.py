@@ -554,27 +554,46 @@ class STTModule(BaseModule):
                 activation_reason="識別失敗：未知錯誤"
             ).model_dump()
 
+    def _open_input_stream(self, frames_per_buffer: Optional[int] = None, stream_callback=None):
+        """開啟 PyAudio 輸入流（stream_callback 不為 None 時為回調模式）"""
+        if self.pyaudio_instance is None:
+            error_log("[STT] PyAudio 未初始化")
+            return None
+        
+        # 創建音頻流
+        stream_params = {
+            "format": self.pa_config["format"],
+            "channels": self.pa_config["channels"],
+            "rate": self.pa_config["rate"],
+            "input": True,
+            "frames_per_buffer": frames_per_buffer or self.pa_config["frames_per_buffer"]
+        }
+        
+        # 只有當設備索引被明確指定時才添加
+        if self.device_index is not None:
+            stream_params["input_device_index"] = self.device_index
+        if stream_callback is not None:
+            stream_params["stream_callback"] = stream_callback
+        
+        return self.pyaudio_instance.open(**stream_params)
+    
+    @staticmethod
+    def _normalize_audio(audio_array: np.ndarray) -> np.ndarray:
+        """簡單的音頻前處理：歸一化到最大振幅的 90%"""
+        if len(audio_array) > 0:
+            # 檢查音頻是否全為靜音
+            peak = np.max(np.abs(audio_array))
+            if peak > 0:
+                norm_factor = 0.9 * 32767 / peak
+                audio_array = (audio_array * norm_factor).astype(np.int16)
+        return audio_array
+    
     def _record_audio(self, duration: float) -> np.ndarray:
         """使用 PyAudio 錄製音頻"""
         try:
-            # 創建音頻流
-            stream_params = {
-                "format": self.pa_config["format"],
-                "channels": self.pa_config["channels"],
-                "rate": self.pa_config["rate"],
-                "input": True,
-                "frames_per_buffer": self.pa_config["frames_per_buffer"]
-            }
-            
-            # 只有當設備索引被明確指定時才添加
-            if self.device_index is not None:
-                stream_params["input_device_index"] = self.device_index
-            
-            if self.pyaudio_instance is None:
-                error_log("[STT] PyAudio 未初始化")
+            stream = self._open_input_stream()
+            if stream is None:
                 return np.array([])
-                
-            stream = self.pyaudio_instance.open(**stream_params)
             
             frames = []
             frames_to_record = int(self.sample_rate * duration / self.pa_config["frames_per_buffer"])
@@ -592,12 +611,7 @@ class STTModule(BaseModule):
             audio_array = np.frombuffer(audio_data, dtype=np.int16)
             
             # 簡單的音頻前處理：歸一化並增強
-            if len(audio_array) > 0:
-                # 檢查音頻是否全為靜音
-                if np.max(np.abs(audio_array)) > 0:
-                    # 歸一化到最大振幅的 90%
-                    norm_factor = 0.9 * 32767 / np.max(np.abs(audio_array))
-                    audio_array = (audio_array * norm_factor).astype(np.int16)
+            audio_array = self._normalize_audio(audio_array)
             
             info_log(f"[STT] 錄音完成，長度: {len(audio_array) / self.sample_rate:.2f} 秒")
             return audio_array
@@ -667,7 +681,7 @@ class STTModule(BaseModule):
         info_log("[STT] 模組已關閉")
 
     def _continuous_recognition(self, input_data: STTInput) -> dict:
-        """持續背景監聽 - 持續錄音，檢測到完整語音片段後合併發送給NLP模組"""
+        """持續背景監聽 - 回調式輸入流 + 串流 VAD，每段語音結束後立即識別並發送給NLP模組"""
         try:
             info_log("[STT] 開始持續背景監聽模式（智能語音片段合併）...")
             
@@ -675,13 +689,19 @@ class STTModule(BaseModule):
             duration = input_data.duration or 30.0
             start_time = time.time()
             
-            # VAD 參數配置
-            chunk_duration = 2.0  # 每次錄音的片段長度（秒）
-            silence_threshold = 1.5  # 靜音持續時間閾值（秒），超過此時間視為語音結束
-            max_speech_duration = 30.0  # 單次語音最大長度（秒），防止無限累積
+            # 串流 VAD 配置：小幀回調推入環形緩衝，語音起訖在幀級別觸發
+            vad_config = self.config.get("streaming_vad", {})
+            stream_vad = self.vad_module.create_stream(
+                frame_duration=vad_config.get("frame_ms", 20) / 1000.0,
+                start_duration=vad_config.get("start_ms", 60) / 1000.0,
+                silence_duration=vad_config.get("silence_duration", 1.5),  # 靜音超過此時間視為語音結束
+                pre_roll=vad_config.get("pre_roll", 0.3),
+                max_utterance=vad_config.get("max_utterance", 30.0)  # 單次語音最大長度，防止無限累積
+            )
             
-            info_log(f"[STT] 持續監聽配置: 總時長={duration}s, 片段長度={chunk_duration}s, "
-                    f"靜音閾值={silence_threshold}s, 最大語音長度={max_speech_duration}s")
+            info_log(f"[STT] 持續監聽配置: 總時長={duration}s, 幀長={stream_vad.frame_duration * 1000:.0f}ms, "
+                    f"靜音閾值={stream_vad.silence_frames * stream_vad.frame_duration:.2f}s, "
+                    f"最大語音長度={stream_vad.max_utterance_samples / self.sample_rate:.0f}s")
             
             # 創建語者上下文，用於累積語者資訊
             context_id = None
@@ -694,87 +714,65 @@ class STTModule(BaseModule):
                 )
                 debug_log(2, f"[STT] 已建立持續監聽的語音累積上下文: {context_id}")
             
-            # 語音片段緩衝區
-            audio_buffer = []  # 存儲待合併的音頻片段
-            last_speech_time = None  # 最後檢測到語音的時間
-            speech_start_time = None  # 當前語音片段開始時間
+            # PortAudio 回調只負責把幀排入佇列；識別期間的音訊繼續累積，不會遺失
+            max_queued_frames = int(vad_config.get("max_queue_seconds", 60.0) / stream_vad.frame_duration)
+            frame_queue: "queue.Queue[bytes]" = queue.Queue(maxsize=max(1, max_queued_frames))
+            dropped = [0]
             
-            # 持續監聽直到達到指定時間或收到停止信號
-            while time.time() - start_time < duration and not self.should_stop_listening:
-                current_time = time.time()
-                
-                # 錄製音頻片段
-                audio_chunk = self._record_audio(chunk_duration)
-                
-                if audio_chunk is None or len(audio_chunk) == 0:
-                    debug_log(3, "[STT] 錄音失敗或音頻為空，繼續監聽")
-                    continue
-                
-                # 使用VAD檢查是否有語音內容
-                has_speech = self.vad_module.has_sufficient_speech(audio_chunk, min_duration=0.05)
-                
-                if has_speech:
-                    # 檢測到語音
-                    debug_log(3, "[STT] 檢測到語音內容，加入緩衝區")
-                    
-                    # 如果這是新的語音片段開始
-                    if speech_start_time is None:
-                        speech_start_time = current_time
+            def audio_callback(in_data, frame_count, time_info, status):
+                try:
+                    frame_queue.put_nowait(in_data)
+                except queue.Full:
+                    dropped[0] += 1
+                return (None, pyaudio.paContinue)
+            
+            stream = self._open_input_stream(stream_vad.frame_samples, stream_callback=audio_callback)
+            if stream is None:
+                raise RuntimeError("無法開啟麥克風輸入流")
+            
+            def handle_events(events):
+                for event in events:
+                    if event['event_type'] == 'speech_start':
+                        self.vad_triggers += 1
                         info_log("[STT] 🎤 語音開始...")
-                    
-                    # 將音頻添加到緩衝區
-                    audio_buffer.append(audio_chunk)
-                    last_speech_time = current_time
-                    
-                    # 檢查是否超過最大語音長度
-                    if current_time - speech_start_time > max_speech_duration:
-                        info_log(f"[STT] 語音片段達到最大長度 ({max_speech_duration}s)，強制處理")
+                    elif event['event_type'] == 'speech_cancel':
+                        debug_log(3, f"[STT] 語音過短 ({event['duration']:.2f}s)，略過")
+                    elif event['event_type'] == 'speech_end':
+                        reason = "達到最大長度，強制處理" if event.get('forced') else "開始處理..."
+                        info_log(f"[STT] 📝 語音結束 (時長: {event['duration']:.2f}s)，{reason}")
                         self._process_audio_buffer(
-                            audio_buffer, 
-                            context_id, 
+                            [self._normalize_audio(event['audio'])],
+                            context_id,
                             input_data.enable_speaker_id
                         )
-                        # 重置緩衝區
-                        audio_buffer = []
-                        last_speech_time = None
-                        speech_start_time = None
-                    
-                else:
-                    # 未檢測到語音（靜音）
-                    if audio_buffer:
-                        # 計算靜音持續時間
-                        silence_duration = current_time - last_speech_time if last_speech_time else 0
-                        debug_log(3, f"[STT] 靜音持續: {silence_duration:.2f}s / {silence_threshold}s")
-                        
-                        # 如果靜音時間超過閾值，處理緩衝區中的音頻
-                        if silence_duration >= silence_threshold:
-                            speech_duration = (last_speech_time - speech_start_time) if (last_speech_time and speech_start_time) else 0
-                            info_log(f"[STT] 📝 語音結束 (時長: {speech_duration:.2f}s)，開始處理...")
-                            
-                            self._process_audio_buffer(
-                                audio_buffer, 
-                                context_id, 
-                                input_data.enable_speaker_id
-                            )
-                            
-                            # 重置緩衝區
-                            audio_buffer = []
-                            last_speech_time = None
-                            speech_start_time = None
-                    else:
-                        debug_log(3, "[STT] 靜音狀態，等待語音...")
+            
+            try:
+                if hasattr(stream, "start_stream"):
+                    stream.start_stream()
                 
-                # 短暫休息避免過度佔用CPU
-                time.sleep(0.05)
-            
-            # 監聽結束時，如果緩衝區還有未處理的音頻，處理它
-            if audio_buffer:
-                info_log("[STT] 監聽結束，處理剩餘音頻緩衝區...")
-                self._process_audio_buffer(
-                    audio_buffer, 
-                    context_id, 
-                    input_data.enable_speaker_id
-                )
+                # 持續監聽直到達到指定時間或收到停止信號
+                while time.time() - start_time < duration and not self.should_stop_listening:
+                    try:
+                        data = frame_queue.get(timeout=0.1)
+                    except queue.Empty:
+                        continue
+                    handle_events(stream_vad.push(np.frombuffer(data, dtype=np.int16)))
+            finally:
+                try:
+                    stream.stop_stream()
+                    stream.close()
+                except Exception as e:
+                    debug_log(2, f"[STT] 關閉輸入流失敗: {e}")
+            
+            # 監聽結束時，如果還有未處理的語音，處理它
+            pending_events = stream_vad.flush()
+            if pending_events:
+                info_log("[STT] 監聽結束，處理剩餘語音...")
+            handle_events(pending_events)
+            
+            if dropped[0]:
+                debug_log(1, f"[STT] 音訊佇列已滿，丟棄 {dropped[0]} 幀")
+            debug_log(2, f"[STT] 串流 VAD 統計: {stream_vad.get_stats()}")
             
             # 監聽結束
             if context_id and self.working_context_manager:
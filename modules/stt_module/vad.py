@@ -18,6 +18,16 @@ except ImportError:
 
 from utils.debug_helper import debug_log, info_log, error_log
 
+
+def frame_energies(audio_float: np.ndarray, frame_samples: int) -> np.ndarray:
+    """以單次 reshape 計算每個完整幀的平均能量（不足一幀的尾端捨棄）"""
+    n_frames = len(audio_float) // frame_samples if frame_samples > 0 else 0
+    if n_frames == 0:
+        return np.zeros(0, dtype=np.float32)
+    frames = audio_float[:n_frames * frame_samples].reshape(n_frames, frame_samples)
+    return np.einsum('ij,ij->i', frames, frames) / frame_samples
+
+
 class VoiceActivityDetection:
     """語音活動檢測類"""
     
@@ -66,64 +76,48 @@ class VoiceActivityDetection:
             # 正規化音頻
             audio_float = audio_data.astype(np.float32) / 32768.0
             
-            # 計算窗口大小
+            # 計算窗口大小，一次 reshape 後以向量化運算求出所有窗口能量
             window_samples = int(window_size * self.sample_rate)
-            n_windows = len(audio_float) // window_samples
+            energies = frame_energies(audio_float, window_samples)
+            n_windows = len(energies)
+            is_speech = energies > self.energy_threshold
+            
+            # 只在狀態切換處產生事件：找出每段連續語音窗口 [start, end)
+            padded = np.concatenate(([False], is_speech, [False]))
+            edges = np.flatnonzero(np.diff(padded.astype(np.int8)))
+            run_starts, run_ends = edges[0::2], edges[1::2]
             
             events = []
-            current_state = "silence"
-            current_start_time = 0.0
-            
-            for i in range(n_windows):
-                start_idx = i * window_samples
-                end_idx = min((i + 1) * window_samples, len(audio_float))
-                window = audio_float[start_idx:end_idx]
-                
-                # 計算窗口能量
-                energy = self._compute_energy(window)
-                time_stamp = i * window_size
-                
-                # 判斷語音活動
-                is_speech = self._is_speech(energy)
-                
-                if current_state == "silence" and is_speech:
-                    # 從靜音轉為語音
-                    events.append({
-                        'event_type': 'speech_start',
-                        'timestamp': time_stamp,
-                        'confidence': min(energy / self.energy_threshold, 1.0),
-                        'energy_level': energy
-                    })
-                    current_state = "speech"
-                    current_start_time = time_stamp
-                    
-                elif current_state == "speech" and not is_speech:
+            for start, end in zip(run_starts, run_ends):
+                start_time = float(start * window_size)
+                events.append({
+                    'event_type': 'speech_start',
+                    'timestamp': start_time,
+                    'confidence': min(energies[start] / self.energy_threshold, 1.0),
+                    'energy_level': energies[start]
+                })
+                speech_duration = float((end - start) * window_size)
+                if end < n_windows:
                     # 從語音轉為靜音
-                    speech_duration = time_stamp - current_start_time
                     if speech_duration >= self.speech_duration_threshold:
                         events.append({
                             'event_type': 'speech_end',
-                            'timestamp': time_stamp,
+                            'timestamp': float(end * window_size),
                             'confidence': 0.8,
-                            'energy_level': energy,
+                            'energy_level': energies[end],
                             'duration': speech_duration
                         })
-                    current_state = "silence"
-                    current_start_time = time_stamp
-            
-            # 🔧 BUGFIX: 如果音頻末尾還在說話，補充一個 speech_end 事件
-            if current_state == "speech":
-                final_duration = (n_windows * window_size) - current_start_time
-                if final_duration >= self.speech_duration_threshold:
+                elif speech_duration >= self.speech_duration_threshold:
+                    # 🔧 BUGFIX: 如果音頻末尾還在說話，補充一個 speech_end 事件
                     events.append({
                         'event_type': 'speech_end',
                         'timestamp': n_windows * window_size,
                         'confidence': 0.8,
                         'energy_level': 0.0,
-                        'duration': final_duration,
+                        'duration': speech_duration,
                         'is_incomplete': True  # 標記為未完成的語音片段
                     })
-                    debug_log(3, f"[VAD] 檢測到未完成的語音片段: {final_duration:.3f}s")
+                    debug_log(3, f"[VAD] 檢測到未完成的語音片段: {speech_duration:.3f}s")
             
             debug_log(3, f"[VAD] 檢測到 {len(events)} 個語音事件")
             return events
@@ -244,6 +238,203 @@ class VoiceActivityDetection:
             error_log(f"[VAD] 品質評估失敗: {str(e)}")
             return 0.5  # 中等品質
     
+    def create_stream(self, **overrides) -> "StreamingVAD":
+        """建立使用目前閾值的串流 VAD（靈敏度熱重載後新建立的串流即套用新值）"""
+        params = {
+            'sample_rate': self.sample_rate,
+            'energy_threshold': self.energy_threshold,
+            'silence_duration': self.silence_duration_threshold,
+            'min_speech_duration': self.speech_duration_threshold
+        }
+        params.update({key: value for key, value in overrides.items() if value is not None})
+        return StreamingVAD(**params)
+    
     def shutdown(self):
         """關閉 VAD 模組"""
         info_log("[VAD] 語音活動檢測模組已關閉")
+
+
+class StreamingVAD:
+    """串流語音活動檢測
+    
+    音訊以小幀（預設 20ms）推入預先配置的環形緩衝區，每次推入以向量化運算
+    計算新幀能量，再逐幀套用起始確認與 hangover 狀態機：
+    - 連續 start_duration 的語音幀 → speech_start（起點回溯到第一個語音幀）
+    - 語音中連續 silence_duration 的靜音幀 → speech_end，附帶整段語音音訊
+    - 語音長度達 max_utterance → 強制 speech_end 並重新等待語音
+    事件在觸發條件成立的那一幀立即產生，延遲為一幀而非整段錄音長度。
+    
+    不是執行緒安全的：由單一消費者執行緒呼叫 push()（音訊回調只負責排入佇列）。
+    """
+    
+    def __init__(self, sample_rate: int = 16000, energy_threshold: float = 0.00065,
+                 frame_duration: float = 0.02, start_duration: float = 0.06,
+                 silence_duration: float = 0.8, min_speech_duration: float = 0.3,
+                 pre_roll: float = 0.3, max_utterance: float = 30.0):
+        self.sample_rate = sample_rate
+        self.energy_threshold = energy_threshold
+        self.frame_samples = max(1, int(frame_duration * sample_rate))
+        self.frame_duration = self.frame_samples / sample_rate
+        self.start_frames = max(1, int(round(start_duration / self.frame_duration)))
+        self.silence_frames = max(1, int(round(silence_duration / self.frame_duration)))
+        self.min_speech_duration = min_speech_duration
+        self.pre_roll_samples = int(pre_roll * sample_rate)
+        self.max_utterance_samples = int(max_utterance * sample_rate)
+        
+        # 環形緩衝：可容納最長語音 + 前導音訊
+        self._capacity = self.max_utterance_samples + self.pre_roll_samples + 2 * self.frame_samples
+        self._ring = np.zeros(self._capacity, dtype=np.int16)
+        self._written = 0  # 累計寫入樣本數（單調遞增）
+        
+        # 尚未湊滿一幀的尾端
+        self._pending = np.zeros(self.frame_samples, dtype=np.int16)
+        self._pending_len = 0
+        self._frames = 0  # 已處理幀數
+        
+        # 狀態機
+        self.in_speech = False
+        self._speech_run = 0
+        self._silence_run = 0
+        self._utterance_start = 0  # 樣本索引
+        self._last_speech_end = 0
+        
+        self.stats = {'frames': 0, 'push_calls': 0, 'process_time_ms': 0.0, 'utterances': 0}
+    
+    # === 推入 ===
+    
+    def push(self, pcm: np.ndarray) -> List[Dict]:
+        """推入 int16 PCM，返回本次觸發的事件"""
+        started = time.perf_counter()
+        pcm = np.asarray(pcm, dtype=np.int16).reshape(-1)
+        self._write_ring(pcm)
+        
+        # 與上次剩餘的樣本組成完整幀
+        if self._pending_len:
+            data = np.concatenate((self._pending[:self._pending_len], pcm))
+        else:
+            data = pcm
+        n_frames = len(data) // self.frame_samples
+        remainder = len(data) - n_frames * self.frame_samples
+        if remainder:
+            self._pending[:remainder] = data[n_frames * self.frame_samples:]
+        self._pending_len = remainder
+        
+        events: List[Dict] = []
+        if n_frames:
+            energies = frame_energies(data[:n_frames * self.frame_samples].astype(np.float32) / 32768.0,
+                                      self.frame_samples)
+            for energy in energies:
+                self._step(float(energy), events)
+        
+        self.stats['push_calls'] += 1
+        self.stats['frames'] += n_frames
+        self.stats['process_time_ms'] += (time.perf_counter() - started) * 1000
+        return events
+    
+    def flush(self) -> List[Dict]:
+        """串流結束：仍在語音中時產生未完成的 speech_end"""
+        events: List[Dict] = []
+        if self.in_speech:
+            self._end_utterance(self._frames * self.frame_samples, events, is_incomplete=True)
+        return events
+    
+    def _step(self, energy: float, events: List[Dict]):
+        """處理一幀（增量 hangover）"""
+        frame_start = self._frames * self.frame_samples
+        self._frames += 1
+        frame_end = frame_start + self.frame_samples
+        is_speech = energy > self.energy_threshold
+        
+        if not self.in_speech:
+            self._speech_run = self._speech_run + 1 if is_speech else 0
+            if self._speech_run >= self.start_frames:
+                self.in_speech = True
+                self._silence_run = 0
+                self._utterance_start = frame_end - self._speech_run * self.frame_samples
+                self._last_speech_end = frame_end
+                events.append({
+                    'event_type': 'speech_start',
+                    'timestamp': self._utterance_start / self.sample_rate,
+                    'detected_at': frame_end / self.sample_rate,
+                    'confidence': min(energy / self.energy_threshold, 1.0),
+                    'energy_level': energy
+                })
+            return
+        
+        if is_speech:
+            self._silence_run = 0
+            self._last_speech_end = frame_end
+        else:
+            self._silence_run += 1
+        
+        if self._silence_run >= self.silence_frames:
+            self._end_utterance(frame_end, events)
+        elif frame_end - self._utterance_start >= self.max_utterance_samples:
+            self._end_utterance(frame_end, events, forced=True)
+    
+    def _end_utterance(self, detected_sample: int, events: List[Dict], forced: bool = False,
+                       is_incomplete: bool = False):
+        end_sample = detected_sample if (forced or is_incomplete) else self._last_speech_end
+        duration = (end_sample - self._utterance_start) / self.sample_rate
+        self.in_speech = False
+        self._speech_run = 0
+        self._silence_run = 0
+        
+        if duration < self.min_speech_duration:
+            events.append({
+                'event_type': 'speech_cancel',
+                'timestamp': end_sample / self.sample_rate,
+                'duration': duration
+            })
+            return
+        
+        # 語音音訊：前導 + 語音 + 一小段尾音（最多 0.2 秒）
+        tail = min(detected_sample - end_sample, int(0.2 * self.sample_rate))
+        audio = self.get_audio(self._utterance_start - self.pre_roll_samples, end_sample + tail)
+        self.stats['utterances'] += 1
+        event = {
+            'event_type': 'speech_end',
+            'timestamp': end_sample / self.sample_rate,
+            'detected_at': detected_sample / self.sample_rate,
+            'confidence': 0.8,
+            'duration': duration,
+            'audio': audio
+        }
+        if forced:
+            event['forced'] = True
+        if is_incomplete:
+            event['is_incomplete'] = True
+        events.append(event)
+    
+    # === 環形緩衝 ===
+    
+    def _write_ring(self, pcm: np.ndarray):
+        if len(pcm) > self._capacity:
+            # 只保留最後一整圈
+            self._written += len(pcm) - self._capacity
+            pcm = pcm[-self._capacity:]
+        pos = self._written % self._capacity
+        first = min(len(pcm), self._capacity - pos)
+        self._ring[pos:pos + first] = pcm[:first]
+        if first < len(pcm):
+            self._ring[:len(pcm) - first] = pcm[first:]
+        self._written += len(pcm)
+    
+    def get_audio(self, start_sample: int, end_sample: int) -> np.ndarray:
+        """取出 [start, end) 的音訊（超出緩衝保留範圍的部分會被截掉）"""
+        start_sample = max(start_sample, self._written - self._capacity, 0)
+        end_sample = min(end_sample, self._written)
+        if end_sample <= start_sample:
+            return np.zeros(0, dtype=np.int16)
+        start_pos = start_sample % self._capacity
+        length = end_sample - start_sample
+        if start_pos + length <= self._capacity:
+            return self._ring[start_pos:start_pos + length].copy()
+        first = self._capacity - start_pos
+        return np.concatenate((self._ring[start_pos:], self._ring[:length - first]))
+    
+    def get_stats(self) -> Dict:
+        """處理統計"""
+        stats = dict(self.stats)
+        stats['avg_push_us'] = (stats['process_time_ms'] * 1000 / stats['push_calls']) if stats['push_calls'] else 0.0
+        return stats
@@ -3,7 +3,7 @@ import threading
 import time
 import os
 import json
-from datetime import datetime
+from datetime import datetime, timedelta
 
 # 導入事件系統
 from modules.sys_module.actions.monitoring_events import (
@@ -12,14 +12,18 @@ from modules.sys_module.actions.monitoring_events import (
     publish_todo_event
 )
 from pathlib import Path
-from typing import Dict, List, Any, Optional, Callable
+from typing import Dict, List, Any, Optional, Callable, Iterable, Tuple
 from concurrent.futures import ThreadPoolExecutor
 from utils.debug_helper import info_log, error_log, debug_log
+from modules.sys_module.actions.task_database import TaskDatabase
+from modules.sys_module.actions.deadline_queue import DeadlineQueue
 
 # 將資料庫放在 memory 目錄中
 _DB_DIR = Path(__file__).parent.parent.parent.parent / "memory"
 _DB_DIR.mkdir(exist_ok=True)
 _DB = str(_DB_DIR / "uep_tasks.db")
+# 共用存取層：每執行緒一條池化連線（WAL），非即時寫入走批次寫入佇列
+_db = TaskDatabase(_DB)
 
 # ==================== 監控線程池管理器 ====================
 
@@ -350,27 +354,26 @@ class MonitoringThreadPool:
         
         try:
             # 從資料庫查詢所有 SUSPENDED 狀態的工作流
-            conn = sqlite3.connect(_DB)
-            c = conn.cursor()
-            
-            c.execute("""
-                SELECT task_id, workflow_type, trigger_conditions, metadata, next_check_at
-                FROM background_workflows
-                WHERE status = 'SUSPENDED'
-                ORDER BY created_at ASC
-            """)
+            with _db.connection() as conn:
+                c = conn.cursor()
             
-            suspended_workflows = []
-            for row in c.fetchall():
-                suspended_workflows.append({
-                    "task_id": row[0],
-                    "workflow_type": row[1],
-                    "trigger_conditions": json.loads(row[2]) if row[2] else None,
-                    "metadata": json.loads(row[3]) if row[3] else None,
-                    "next_check_at": row[4]
-                })
+                c.execute("""
+                    SELECT task_id, workflow_type, trigger_conditions, metadata, next_check_at
+                    FROM background_workflows
+                    WHERE status = 'SUSPENDED'
+                    ORDER BY created_at ASC
+                """)
+            
+                suspended_workflows = []
+                for row in c.fetchall():
+                    suspended_workflows.append({
+                        "task_id": row[0],
+                        "workflow_type": row[1],
+                        "trigger_conditions": json.loads(row[2]) if row[2] else None,
+                        "metadata": json.loads(row[3]) if row[3] else None,
+                        "next_check_at": row[4]
+                    })
             
-            conn.close()
             
             info_log(f"[MonitoringThreadPool] 找到 {len(suspended_workflows)} 個暫停的監控任務")
             
@@ -535,108 +538,112 @@ def stop_clipboard_monitor(timeout: int = 5) -> bool:
         return False
 
 def _init_db():
-    conn = sqlite3.connect(_DB)
-    c = conn.cursor()
-    
-    # 提醒表
-    c.execute("""
-    CREATE TABLE IF NOT EXISTS reminders (
-      id INTEGER PRIMARY KEY,
-      time TEXT NOT NULL,
-      message TEXT NOT NULL
-    )""")
-    
-    # 日曆事件表
-    c.execute("""
-    CREATE TABLE IF NOT EXISTS calendar_events (
-      id INTEGER PRIMARY KEY AUTOINCREMENT,
-      summary TEXT NOT NULL,
-      description TEXT,
-      start_time TEXT NOT NULL,
-      end_time TEXT NOT NULL,
-      location TEXT,
-      created_at TEXT NOT NULL,
-      updated_at TEXT NOT NULL,
-      last_notified_at TEXT,
-      last_notified_stage TEXT
-    )""")
-    
-    # 待辦事項表
-    c.execute("""
-    CREATE TABLE IF NOT EXISTS todos (
-      id INTEGER PRIMARY KEY AUTOINCREMENT,
-      task_name TEXT NOT NULL,
-      task_description TEXT,
-      priority TEXT NOT NULL DEFAULT 'none',
-      status TEXT NOT NULL DEFAULT 'pending',
-      created_at TEXT NOT NULL,
-      updated_at TEXT NOT NULL,
-      deadline TEXT,
-      completed_at TEXT,
-      last_notified_at TEXT,
-      last_notified_stage TEXT
-    )""")
-    
-    # 背景工作流追蹤表
-    c.execute("""
-    CREATE TABLE IF NOT EXISTS background_workflows (
-      task_id TEXT PRIMARY KEY,
-      workflow_type TEXT NOT NULL,
-      trigger_conditions TEXT,
-      status TEXT NOT NULL,
-      created_at TEXT NOT NULL,
-      updated_at TEXT NOT NULL,
-      last_check_at TEXT,
-      next_check_at TEXT,
-      metadata TEXT,
-      error_message TEXT
-    )""")
-    
-    # 工作流干預審計表
-    c.execute("""
-    CREATE TABLE IF NOT EXISTS workflow_interventions (
-      id INTEGER PRIMARY KEY AUTOINCREMENT,
-      task_id TEXT NOT NULL,
-      action TEXT NOT NULL,
-      parameters TEXT,
-      performed_at TEXT NOT NULL,
-      performed_by TEXT,
-      result TEXT,
-      FOREIGN KEY (task_id) REFERENCES background_workflows(task_id)
-    )""")
-    
-    # 為常用查詢建立索引
-    c.execute("CREATE INDEX IF NOT EXISTS idx_todos_status ON todos(status)")
-    c.execute("CREATE INDEX IF NOT EXISTS idx_todos_priority ON todos(priority)")
-    c.execute("CREATE INDEX IF NOT EXISTS idx_todos_deadline ON todos(deadline)")
-    c.execute("CREATE INDEX IF NOT EXISTS idx_bg_workflows_status ON background_workflows(status)")
-    c.execute("CREATE INDEX IF NOT EXISTS idx_bg_workflows_type ON background_workflows(workflow_type)")
-    c.execute("CREATE INDEX IF NOT EXISTS idx_bg_workflows_next_check ON background_workflows(next_check_at)")
-    c.execute("CREATE INDEX IF NOT EXISTS idx_interventions_task ON workflow_interventions(task_id)")
-    
-    conn.commit()
-    
-    # 添加缺失的欄位（如果不存在）
-    try:
-        c.execute("ALTER TABLE calendar_events ADD COLUMN last_notified_at TEXT")
-        c.execute("ALTER TABLE calendar_events ADD COLUMN last_notified_stage TEXT")
-        conn.commit()
-        info_log("已添加 calendar_events 通知追蹤欄位")
-    except sqlite3.OperationalError:
-        pass  # 欄位已存在
+    with _db.connection() as conn:
+        c = conn.cursor()
+    
+        # 提醒表
+        c.execute("""
+        CREATE TABLE IF NOT EXISTS reminders (
+          id INTEGER PRIMARY KEY,
+          time TEXT NOT NULL,
+          message TEXT NOT NULL
+        )""")
+    
+        # 日曆事件表
+        c.execute("""
+        CREATE TABLE IF NOT EXISTS calendar_events (
+          id INTEGER PRIMARY KEY AUTOINCREMENT,
+          summary TEXT NOT NULL,
+          description TEXT,
+          start_time TEXT NOT NULL,
+          end_time TEXT NOT NULL,
+          location TEXT,
+          created_at TEXT NOT NULL,
+          updated_at TEXT NOT NULL,
+          last_notified_at TEXT,
+          last_notified_stage TEXT
+        )""")
+    
+        # 待辦事項表
+        c.execute("""
+        CREATE TABLE IF NOT EXISTS todos (
+          id INTEGER PRIMARY KEY AUTOINCREMENT,
+          task_name TEXT NOT NULL,
+          task_description TEXT,
+          priority TEXT NOT NULL DEFAULT 'none',
+          status TEXT NOT NULL DEFAULT 'pending',
+          created_at TEXT NOT NULL,
+          updated_at TEXT NOT NULL,
+          deadline TEXT,
+          completed_at TEXT,
+          last_notified_at TEXT,
+          last_notified_stage TEXT
+        )""")
+    
+        # 背景工作流追蹤表
+        c.execute("""
+        CREATE TABLE IF NOT EXISTS background_workflows (
+          task_id TEXT PRIMARY KEY,
+          workflow_type TEXT NOT NULL,
+          trigger_conditions TEXT,
+          status TEXT NOT NULL,
+          created_at TEXT NOT NULL,
+          updated_at TEXT NOT NULL,
+          last_check_at TEXT,
+          next_check_at TEXT,
+          metadata TEXT,
+          error_message TEXT
+        )""")
+    
+        # 工作流干預審計表
+        c.execute("""
+        CREATE TABLE IF NOT EXISTS workflow_interventions (
+          id INTEGER PRIMARY KEY AUTOINCREMENT,
+          task_id TEXT NOT NULL,
+          action TEXT NOT NULL,
+          parameters TEXT,
+          performed_at TEXT NOT NULL,
+          performed_by TEXT,
+          result TEXT,
+          FOREIGN KEY (task_id) REFERENCES background_workflows(task_id)
+        )""")
+    
+        # 為常用查詢建立索引
+        c.execute("CREATE INDEX IF NOT EXISTS idx_todos_status ON todos(status)")
+        c.execute("CREATE INDEX IF NOT EXISTS idx_todos_priority ON todos(priority)")
+        c.execute("CREATE INDEX IF NOT EXISTS idx_todos_deadline ON todos(deadline)")
+        c.execute("CREATE INDEX IF NOT EXISTS idx_bg_workflows_status ON background_workflows(status)")
+        c.execute("CREATE INDEX IF NOT EXISTS idx_bg_workflows_type ON background_workflows(workflow_type)")
+        c.execute("CREATE INDEX IF NOT EXISTS idx_bg_workflows_next_check ON background_workflows(next_check_at)")
+        c.execute("CREATE INDEX IF NOT EXISTS idx_interventions_task ON workflow_interventions(task_id)")
     
-    try:
-        c.execute("ALTER TABLE todos ADD COLUMN last_notified_at TEXT")
-        c.execute("ALTER TABLE todos ADD COLUMN last_notified_stage TEXT")
         conn.commit()
-        info_log("已添加 todos 通知追蹤欄位")
-    except sqlite3.OperationalError:
-        pass  # 欄位已存在
     
-    conn.close()
+        # 添加缺失的欄位（如果不存在）
+        try:
+            c.execute("ALTER TABLE calendar_events ADD COLUMN last_notified_at TEXT")
+            c.execute("ALTER TABLE calendar_events ADD COLUMN last_notified_stage TEXT")
+            conn.commit()
+            info_log("已添加 calendar_events 通知追蹤欄位")
+        except sqlite3.OperationalError:
+            pass  # 欄位已存在
+    
+        try:
+            c.execute("ALTER TABLE todos ADD COLUMN last_notified_at TEXT")
+            c.execute("ALTER TABLE todos ADD COLUMN last_notified_stage TEXT")
+            conn.commit()
+            info_log("已添加 todos 通知追蹤欄位")
+        except sqlite3.OperationalError:
+            pass  # 欄位已存在
 
 _init_db()
 
+def _notify_schedule_changed(source: str):
+    """資料變更後喚醒背景事件排程器，重新計算該來源的到期時間"""
+    scheduler = BackgroundEventScheduler._instance
+    if scheduler is not None and scheduler.is_running:
+        scheduler.notify(source)
+
 def set_reminder(dt, message: str):
     """新增提醒
     
@@ -649,30 +656,14 @@ def set_reminder(dt, message: str):
         if isinstance(dt, str):
             dt = datetime.fromisoformat(dt)
         
-        conn = sqlite3.connect(_DB)
-        conn.execute("INSERT INTO reminders (time, message) VALUES (?, ?)",
-                     (dt.isoformat(), message))
-        conn.commit()
-        conn.close()
+        _db.execute("INSERT INTO reminders (time, message) VALUES (?, ?)",
+                    (dt.isoformat(), message))
+        _notify_schedule_changed("reminders")
         info_log(f"[AUTO] 設定提醒：{dt} -> {message}")
     except Exception as e:
         error_log(f"[AUTO] 設定提醒失敗: {e}")
 
-def _checker_loop():
-    while True:
-        now = datetime.utcnow().isoformat()
-        conn = sqlite3.connect(_DB)
-        c = conn.cursor()
-        for row in c.execute("SELECT id, time, message FROM reminders WHERE time<=?", (now,)):
-            _, t, msg = row
-            info_log(f"[AUTO] 提醒觸發：{msg}")
-            c.execute("DELETE FROM reminders WHERE id=?", (row[0],))
-        conn.commit()
-        conn.close()
-        time.sleep(30)
-
-# 啟動背景檢查
-threading.Thread(target=_checker_loop, daemon=True).start()
+# 到期提醒由 BackgroundEventScheduler 依到期時間觸發（不再另開輪詢線程）
 
 def generate_backup_script(target_folder: str, dest_folder: str, output_path: str):
     """產生備份腳本 (.bat / .sh)"""
@@ -1328,203 +1319,200 @@ def local_calendar(
         操作結果（dict）
     """
     try:
-        conn = sqlite3.connect(_DB)
-        c = conn.cursor()
-        now = datetime.now().isoformat()
+        with _db.connection() as conn:
+            c = conn.cursor()
+            now = datetime.now().isoformat()
         
-        if action == "create":
-            # 建立事件
-            if not summary or not start_time:
-                return {"status": "error", "message": "缺少必要參數：summary, start_time"}
+            if action == "create":
+                # 建立事件
+                if not summary or not start_time:
+                    return {"status": "error", "message": "缺少必要參數：summary, start_time"}
             
-            # 如果沒有指定結束時間，預設 1 小時後
-            if not end_time:
-                from datetime import timedelta
-                start_dt = datetime.fromisoformat(start_time)
-                end_dt = start_dt + timedelta(hours=1)
-                end_time = end_dt.isoformat()
+                # 如果沒有指定結束時間，預設 1 小時後
+                if not end_time:
+                    from datetime import timedelta
+                    start_dt = datetime.fromisoformat(start_time)
+                    end_dt = start_dt + timedelta(hours=1)
+                    end_time = end_dt.isoformat()
             
-            c.execute("""
-                INSERT INTO calendar_events 
-                (summary, description, start_time, end_time, location, created_at, updated_at)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-            """, (summary, description, start_time, end_time, location, now, now))
+                c.execute("""
+                    INSERT INTO calendar_events 
+                    (summary, description, start_time, end_time, location, created_at, updated_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                """, (summary, description, start_time, end_time, location, now, now))
+            
+                event_id = c.lastrowid
+                conn.commit()
+            
+                info_log(f"[AUTO] 已建立日曆事件：{summary} ({start_time})")
+            
+                # 發布事件：新增項目
+                _notify_schedule_changed("calendar_events")
+                publish_calendar_event(
+                    MonitoringEventType.ITEM_ADDED,
+                    item_id=event_id,
+                    item_data={
+                        "summary": summary,
+                        "description": description,
+                        "start_time": start_time,
+                        "end_time": end_time,
+                        "location": location
+                    }
+                )
             
-            event_id = c.lastrowid
-            conn.commit()
-            conn.close()
-            
-            info_log(f"[AUTO] 已建立日曆事件：{summary} ({start_time})")
-            
-            # 發布事件：新增項目
-            publish_calendar_event(
-                MonitoringEventType.ITEM_ADDED,
-                item_id=event_id,
-                item_data={
-                    "summary": summary,
-                    "description": description,
-                    "start_time": start_time,
-                    "end_time": end_time,
-                    "location": location
+                return {
+                    "status": "ok",
+                    "message": f"已建立事件：{summary}",
+                    "event_id": event_id
                 }
-            )
-            
-            return {
-                "status": "ok",
-                "message": f"已建立事件：{summary}",
-                "event_id": event_id
-            }
         
-        elif action == "list":
-            # 列出事件（可選時間範圍）
-            if start_time:
-                # 列出指定時間之後的事件
-                c.execute("""
-                    SELECT id, summary, description, start_time, end_time, location
-                    FROM calendar_events
-                    WHERE start_time >= ?
-                    ORDER BY start_time ASC
-                """, (start_time,))
-            else:
-                # 列出所有未來事件
+            elif action == "list":
+                # 列出事件（可選時間範圍）
+                if start_time:
+                    # 列出指定時間之後的事件
+                    c.execute("""
+                        SELECT id, summary, description, start_time, end_time, location
+                        FROM calendar_events
+                        WHERE start_time >= ?
+                        ORDER BY start_time ASC
+                    """, (start_time,))
+                else:
+                    # 列出所有未來事件
+                    c.execute("""
+                        SELECT id, summary, description, start_time, end_time, location
+                        FROM calendar_events
+                        WHERE start_time >= ?
+                        ORDER BY start_time ASC
+                    """, (now,))
+            
+                events = []
+                for row in c.fetchall():
+                    events.append({
+                        "id": row[0],
+                        "summary": row[1],
+                        "description": row[2],
+                        "start_time": row[3],
+                        "end_time": row[4],
+                        "location": row[5]
+                    })
+            
+                info_log(f"[AUTO] 查詢到 {len(events)} 個事件")
+                return {"status": "ok", "events": events}
+        
+            elif action == "get":
+                # 取得單一事件
+                if event_id < 0:
+                    return {"status": "error", "message": "缺少 event_id"}
+            
                 c.execute("""
-                    SELECT id, summary, description, start_time, end_time, location
+                    SELECT id, summary, description, start_time, end_time, location, created_at, updated_at
                     FROM calendar_events
-                    WHERE start_time >= ?
-                    ORDER BY start_time ASC
-                """, (now,))
-            
-            events = []
-            for row in c.fetchall():
-                events.append({
-                    "id": row[0],
-                    "summary": row[1],
-                    "description": row[2],
-                    "start_time": row[3],
-                    "end_time": row[4],
-                    "location": row[5]
-                })
-            
-            conn.close()
-            info_log(f"[AUTO] 查詢到 {len(events)} 個事件")
-            return {"status": "ok", "events": events}
-        
-        elif action == "get":
-            # 取得單一事件
-            if event_id < 0:
-                return {"status": "error", "message": "缺少 event_id"}
-            
-            c.execute("""
-                SELECT id, summary, description, start_time, end_time, location, created_at, updated_at
-                FROM calendar_events
-                WHERE id = ?
-            """, (event_id,))
-            
-            row = c.fetchone()
-            conn.close()
-            
-            if not row:
-                return {"status": "error", "message": f"找不到事件 ID: {event_id}"}
-            
-            return {
-                "status": "ok",
-                "event": {
-                    "id": row[0],
-                    "summary": row[1],
-                    "description": row[2],
-                    "start_time": row[3],
-                    "end_time": row[4],
-                    "location": row[5],
-                    "created_at": row[6],
-                    "updated_at": row[7]
+                    WHERE id = ?
+                """, (event_id,))
+            
+                row = c.fetchone()
+            
+                if not row:
+                    return {"status": "error", "message": f"找不到事件 ID: {event_id}"}
+            
+                return {
+                    "status": "ok",
+                    "event": {
+                        "id": row[0],
+                        "summary": row[1],
+                        "description": row[2],
+                        "start_time": row[3],
+                        "end_time": row[4],
+                        "location": row[5],
+                        "created_at": row[6],
+                        "updated_at": row[7]
+                    }
                 }
-            }
         
-        elif action == "update":
-            # 更新事件
-            if event_id < 0:
-                return {"status": "error", "message": "缺少 event_id"}
-            
-            # 構建更新語句
-            updates = []
-            params = []
-            
-            if summary:
-                updates.append("summary = ?")
-                params.append(summary)
-            if description:
-                updates.append("description = ?")
-                params.append(description)
-            if start_time:
-                updates.append("start_time = ?")
-                params.append(start_time)
-            if end_time:
-                updates.append("end_time = ?")
-                params.append(end_time)
-            if location:
-                updates.append("location = ?")
-                params.append(location)
-            
-            if not updates:
-                return {"status": "error", "message": "沒有要更新的欄位"}
-            
-            updates.append("updated_at = ?")
-            params.append(now)
-            params.append(event_id)
-            
-            c.execute(f"""
-                UPDATE calendar_events
-                SET {', '.join(updates)}
-                WHERE id = ?
-            """, params)
-            
-            conn.commit()
-            conn.close()
-            
-            info_log(f"[AUTO] 已更新事件 ID: {event_id}")
-            
-            # 發布事件：更新項目
-            update_data = {}
-            if summary:
-                update_data["summary"] = summary
-            if description:
-                update_data["description"] = description
-            if start_time:
-                update_data["start_time"] = start_time
-            if end_time:
-                update_data["end_time"] = end_time
-            if location:
-                update_data["location"] = location
-            
-            publish_calendar_event(
-                MonitoringEventType.ITEM_UPDATED,
-                item_id=event_id,
-                item_data=update_data
-            )
+            elif action == "update":
+                # 更新事件
+                if event_id < 0:
+                    return {"status": "error", "message": "缺少 event_id"}
+            
+                # 構建更新語句
+                updates = []
+                params = []
+            
+                if summary:
+                    updates.append("summary = ?")
+                    params.append(summary)
+                if description:
+                    updates.append("description = ?")
+                    params.append(description)
+                if start_time:
+                    updates.append("start_time = ?")
+                    params.append(start_time)
+                if end_time:
+                    updates.append("end_time = ?")
+                    params.append(end_time)
+                if location:
+                    updates.append("location = ?")
+                    params.append(location)
+            
+                if not updates:
+                    return {"status": "error", "message": "沒有要更新的欄位"}
+            
+                updates.append("updated_at = ?")
+                params.append(now)
+                params.append(event_id)
+            
+                c.execute(f"""
+                    UPDATE calendar_events
+                    SET {', '.join(updates)}
+                    WHERE id = ?
+                """, params)
+            
+                conn.commit()
+            
+                info_log(f"[AUTO] 已更新事件 ID: {event_id}")
+            
+                # 發布事件：更新項目
+                update_data = {}
+                if summary:
+                    update_data["summary"] = summary
+                if description:
+                    update_data["description"] = description
+                if start_time:
+                    update_data["start_time"] = start_time
+                if end_time:
+                    update_data["end_time"] = end_time
+                if location:
+                    update_data["location"] = location
+            
+                _notify_schedule_changed("calendar_events")
+                publish_calendar_event(
+                    MonitoringEventType.ITEM_UPDATED,
+                    item_id=event_id,
+                    item_data=update_data
+                )
             
-            return {"status": "ok", "message": f"已更新事件 ID: {event_id}"}
+                return {"status": "ok", "message": f"已更新事件 ID: {event_id}"}
         
-        elif action == "delete":
-            # 刪除事件
-            if event_id < 0:
-                return {"status": "error", "message": "缺少 event_id"}
+            elif action == "delete":
+                # 刪除事件
+                if event_id < 0:
+                    return {"status": "error", "message": "缺少 event_id"}
             
-            c.execute("DELETE FROM calendar_events WHERE id = ?", (event_id,))
-            conn.commit()
-            conn.close()
+                c.execute("DELETE FROM calendar_events WHERE id = ?", (event_id,))
+                conn.commit()
             
-            info_log(f"[AUTO] 已刪除事件 ID: {event_id}")
+                info_log(f"[AUTO] 已刪除事件 ID: {event_id}")
             
-            # 發布事件：刪除項目
-            publish_calendar_event(
-                MonitoringEventType.ITEM_DELETED,
-                item_id=event_id
-            )
-            return {"status": "ok", "message": f"已刪除事件 ID: {event_id}"}
+                # 發布事件：刪除項目
+                _notify_schedule_changed("calendar_events")
+                publish_calendar_event(
+                    MonitoringEventType.ITEM_DELETED,
+                    item_id=event_id
+                )
+                return {"status": "ok", "message": f"已刪除事件 ID: {event_id}"}
         
-        else:
-            conn.close()
-            return {"status": "error", "message": f"未知動作：{action}"}
+            else:
+                return {"status": "error", "message": f"未知動作：{action}"}
     
     except Exception as e:
         error_log(f"[AUTO] 本地日曆操作失敗：{e}")
@@ -1558,275 +1546,271 @@ def local_todo(
         操作結果（dict）
     """
     try:
-        conn = sqlite3.connect(_DB)
-        c = conn.cursor()
-        now = datetime.now().isoformat()
+        with _db.connection() as conn:
+            c = conn.cursor()
+            now = datetime.now().isoformat()
         
-        # 驗證優先級
-        valid_priorities = ["none", "low", "medium", "high"]
-        if priority not in valid_priorities:
-            priority = "none"
+            # 驗證優先級
+            valid_priorities = ["none", "low", "medium", "high"]
+            if priority not in valid_priorities:
+                priority = "none"
         
-        if action == "create":
-            # 建立任務
-            if not task_name:
-                return {"status": "error", "message": "缺少必要參數：task_name"}
+            if action == "create":
+                # 建立任務
+                if not task_name:
+                    return {"status": "error", "message": "缺少必要參數：task_name"}
             
-            c.execute("""
-                INSERT INTO todos 
-                (task_name, task_description, priority, status, created_at, updated_at, deadline)
-                VALUES (?, ?, ?, 'pending', ?, ?, ?)
-            """, (task_name, task_description, priority, now, now, deadline or None))
+                c.execute("""
+                    INSERT INTO todos 
+                    (task_name, task_description, priority, status, created_at, updated_at, deadline)
+                    VALUES (?, ?, ?, 'pending', ?, ?, ?)
+                """, (task_name, task_description, priority, now, now, deadline or None))
+            
+                task_id = c.lastrowid
+                conn.commit()
+            
+                info_log(f"[AUTO] 已建立待辦事項：{task_name} (優先級：{priority})")
+            
+                # 發布事件：新增項目
+                _notify_schedule_changed("todos")
+                publish_todo_event(
+                    MonitoringEventType.ITEM_ADDED,
+                    item_id=task_id,
+                    item_data={
+                        "task_name": task_name,
+                        "task_description": task_description,
+                        "priority": priority,
+                        "deadline": deadline,
+                        "status": "pending"
+                    }
+                )
             
-            task_id = c.lastrowid
-            conn.commit()
-            conn.close()
-            
-            info_log(f"[AUTO] 已建立待辦事項：{task_name} (優先級：{priority})")
-            
-            # 發布事件：新增項目
-            publish_todo_event(
-                MonitoringEventType.ITEM_ADDED,
-                item_id=task_id,
-                item_data={
-                    "task_name": task_name,
-                    "task_description": task_description,
-                    "priority": priority,
-                    "deadline": deadline,
-                    "status": "pending"
+                return {
+                    "status": "ok",
+                    "message": f"已建立任務：{task_name}",
+                    "task_id": task_id
                 }
-            )
-            
-            return {
-                "status": "ok",
-                "message": f"已建立任務：{task_name}",
-                "task_id": task_id
-            }
         
-        elif action == "list":
-            # 列出任務（僅未完成）
-            c.execute("""
-                SELECT id, task_name, task_description, priority, status, deadline, created_at
-                FROM todos
-                WHERE status != 'completed'
-                ORDER BY 
-                    CASE priority
-                        WHEN 'high' THEN 1
-                        WHEN 'medium' THEN 2
-                        WHEN 'low' THEN 3
-                        ELSE 4
-                    END,
-                    deadline ASC,
-                    created_at ASC
-            """)
-            
-            tasks = []
-            for row in c.fetchall():
-                tasks.append({
-                    "id": row[0],
-                    "task_name": row[1],
-                    "task_description": row[2],
-                    "priority": row[3],
-                    "status": row[4],
-                    "deadline": row[5],
-                    "created_at": row[6]
-                })
-            
-            conn.close()
-            info_log(f"[AUTO] 查詢到 {len(tasks)} 個待辦事項")
-            return {"status": "ok", "tasks": tasks}
-        
-        elif action == "search":
-            # 搜尋任務（支援分詞模糊匹配）
-            if not search_query:
-                return {"status": "error", "message": "缺少 search_query"}
-            
-            # 分詞：移除常見的連接詞，提取關鍵字
-            keywords = [word.strip().lower() for word in search_query.split() 
-                       if word.strip().lower() not in ['the', 'a', 'an', 'one', 'some', 'my']]
-            
-            if not keywords:
-                # 如果過濾後沒有關鍵字，使用原始查詢
-                keywords = [search_query.lower()]
-            
-            # 構建查詢條件：任何一個關鍵字匹配即可
-            where_conditions = []
-            params = []
-            for keyword in keywords:
-                where_conditions.append("(task_name LIKE ? OR task_description LIKE ?)")
-                params.extend([f"%{keyword}%", f"%{keyword}%"])
-            
-            query = f"""
-                SELECT id, task_name, task_description, priority, status, deadline, created_at
-                FROM todos
-                WHERE ({' OR '.join(where_conditions)})
-                AND status != 'completed'
-                ORDER BY 
-                    CASE priority
-                        WHEN 'high' THEN 1
-                        WHEN 'medium' THEN 2
-                        WHEN 'low' THEN 3
-                        ELSE 4
-                    END,
-                    created_at DESC
-            """
-            
-            c.execute(query, params)
-            
-            tasks = []
-            for row in c.fetchall():
-                tasks.append({
-                    "id": row[0],
-                    "task_name": row[1],
-                    "task_description": row[2],
-                    "priority": row[3],
-                    "status": row[4],
-                    "deadline": row[5],
-                    "created_at": row[6]
-                })
-            
-            conn.close()
-            info_log(f"[AUTO] 搜尋「{search_query}」找到 {len(tasks)} 個結果")
-            return {"status": "ok", "tasks": tasks}
-        
-        elif action == "get":
-            # 取得單一任務
-            if task_id < 0:
-                return {"status": "error", "message": "缺少 task_id"}
-            
-            c.execute("""
-                SELECT id, task_name, task_description, priority, status, deadline, created_at, updated_at, completed_at
-                FROM todos
-                WHERE id = ?
-            """, (task_id,))
-            
-            row = c.fetchone()
-            conn.close()
-            
-            if not row:
-                return {"status": "error", "message": f"找不到任務 ID: {task_id}"}
+            elif action == "list":
+                # 列出任務（僅未完成）
+                c.execute("""
+                    SELECT id, task_name, task_description, priority, status, deadline, created_at
+                    FROM todos
+                    WHERE status != 'completed'
+                    ORDER BY 
+                        CASE priority
+                            WHEN 'high' THEN 1
+                            WHEN 'medium' THEN 2
+                            WHEN 'low' THEN 3
+                            ELSE 4
+                        END,
+                        deadline ASC,
+                        created_at ASC
+                """)
+            
+                tasks = []
+                for row in c.fetchall():
+                    tasks.append({
+                        "id": row[0],
+                        "task_name": row[1],
+                        "task_description": row[2],
+                        "priority": row[3],
+                        "status": row[4],
+                        "deadline": row[5],
+                        "created_at": row[6]
+                    })
+            
+                info_log(f"[AUTO] 查詢到 {len(tasks)} 個待辦事項")
+                return {"status": "ok", "tasks": tasks}
+        
+            elif action == "search":
+                # 搜尋任務（支援分詞模糊匹配）
+                if not search_query:
+                    return {"status": "error", "message": "缺少 search_query"}
+            
+                # 分詞：移除常見的連接詞，提取關鍵字
+                keywords = [word.strip().lower() for word in search_query.split() 
+                           if word.strip().lower() not in ['the', 'a', 'an', 'one', 'some', 'my']]
+            
+                if not keywords:
+                    # 如果過濾後沒有關鍵字，使用原始查詢
+                    keywords = [search_query.lower()]
+            
+                # 構建查詢條件：任何一個關鍵字匹配即可
+                where_conditions = []
+                params = []
+                for keyword in keywords:
+                    where_conditions.append("(task_name LIKE ? OR task_description LIKE ?)")
+                    params.extend([f"%{keyword}%", f"%{keyword}%"])
+            
+                query = f"""
+                    SELECT id, task_name, task_description, priority, status, deadline, created_at
+                    FROM todos
+                    WHERE ({' OR '.join(where_conditions)})
+                    AND status != 'completed'
+                    ORDER BY 
+                        CASE priority
+                            WHEN 'high' THEN 1
+                            WHEN 'medium' THEN 2
+                            WHEN 'low' THEN 3
+                            ELSE 4
+                        END,
+                        created_at DESC
+                """
+            
+                c.execute(query, params)
+            
+                tasks = []
+                for row in c.fetchall():
+                    tasks.append({
+                        "id": row[0],
+                        "task_name": row[1],
+                        "task_description": row[2],
+                        "priority": row[3],
+                        "status": row[4],
+                        "deadline": row[5],
+                        "created_at": row[6]
+                    })
+            
+                info_log(f"[AUTO] 搜尋「{search_query}」找到 {len(tasks)} 個結果")
+                return {"status": "ok", "tasks": tasks}
+        
+            elif action == "get":
+                # 取得單一任務
+                if task_id < 0:
+                    return {"status": "error", "message": "缺少 task_id"}
             
-            return {
-                "status": "ok",
-                "task": {
-                    "id": row[0],
-                    "task_name": row[1],
-                    "task_description": row[2],
-                    "priority": row[3],
-                    "status": row[4],
-                    "deadline": row[5],
-                    "created_at": row[6],
-                    "updated_at": row[7],
-                    "completed_at": row[8]
+                c.execute("""
+                    SELECT id, task_name, task_description, priority, status, deadline, created_at, updated_at, completed_at
+                    FROM todos
+                    WHERE id = ?
+                """, (task_id,))
+            
+                row = c.fetchone()
+            
+                if not row:
+                    return {"status": "error", "message": f"找不到任務 ID: {task_id}"}
+            
+                return {
+                    "status": "ok",
+                    "task": {
+                        "id": row[0],
+                        "task_name": row[1],
+                        "task_description": row[2],
+                        "priority": row[3],
+                        "status": row[4],
+                        "deadline": row[5],
+                        "created_at": row[6],
+                        "updated_at": row[7],
+                        "completed_at": row[8]
+                    }
                 }
-            }
         
-        elif action == "update":
-            # 更新任務
-            if task_id < 0:
-                return {"status": "error", "message": "缺少 task_id"}
-            
-            # 構建更新語句
-            updates = []
-            params = []
-            
-            if task_name:
-                updates.append("task_name = ?")
-                params.append(task_name)
-            if task_description:
-                updates.append("task_description = ?")
-                params.append(task_description)
-            if priority:
-                updates.append("priority = ?")
-                params.append(priority)
-            if deadline:
-                updates.append("deadline = ?")
-                params.append(deadline)
-            
-            if not updates:
-                return {"status": "error", "message": "沒有要更新的欄位"}
-            
-            updates.append("updated_at = ?")
-            params.append(now)
-            params.append(task_id)
-            
-            c.execute(f"""
-                UPDATE todos
-                SET {', '.join(updates)}
-                WHERE id = ?
-            """, params)
-            
-            conn.commit()
-            conn.close()
-            
-            info_log(f"[AUTO] 已更新任務 ID: {task_id}")
-            
-            # 發布事件：更新項目
-            update_data = {}
-            if task_name:
-                update_data["task_name"] = task_name
-            if task_description:
-                update_data["task_description"] = task_description
-            if priority:
-                update_data["priority"] = priority
-            if deadline:
-                update_data["deadline"] = deadline
-            
-            publish_todo_event(
-                MonitoringEventType.ITEM_UPDATED,
-                item_id=task_id,
-                item_data=update_data
-            )
+            elif action == "update":
+                # 更新任務
+                if task_id < 0:
+                    return {"status": "error", "message": "缺少 task_id"}
+            
+                # 構建更新語句
+                updates = []
+                params = []
+            
+                if task_name:
+                    updates.append("task_name = ?")
+                    params.append(task_name)
+                if task_description:
+                    updates.append("task_description = ?")
+                    params.append(task_description)
+                if priority:
+                    updates.append("priority = ?")
+                    params.append(priority)
+                if deadline:
+                    updates.append("deadline = ?")
+                    params.append(deadline)
+            
+                if not updates:
+                    return {"status": "error", "message": "沒有要更新的欄位"}
+            
+                updates.append("updated_at = ?")
+                params.append(now)
+                params.append(task_id)
+            
+                c.execute(f"""
+                    UPDATE todos
+                    SET {', '.join(updates)}
+                    WHERE id = ?
+                """, params)
+            
+                conn.commit()
+            
+                info_log(f"[AUTO] 已更新任務 ID: {task_id}")
+            
+                # 發布事件：更新項目
+                update_data = {}
+                if task_name:
+                    update_data["task_name"] = task_name
+                if task_description:
+                    update_data["task_description"] = task_description
+                if priority:
+                    update_data["priority"] = priority
+                if deadline:
+                    update_data["deadline"] = deadline
+            
+                _notify_schedule_changed("todos")
+                publish_todo_event(
+                    MonitoringEventType.ITEM_UPDATED,
+                    item_id=task_id,
+                    item_data=update_data
+                )
             
-            return {"status": "ok", "message": f"已更新任務 ID: {task_id}"}
+                return {"status": "ok", "message": f"已更新任務 ID: {task_id}"}
         
-        elif action == "complete":
-            # 完成任務
-            if task_id < 0:
-                return {"status": "error", "message": "缺少 task_id"}
+            elif action == "complete":
+                # 完成任務
+                if task_id < 0:
+                    return {"status": "error", "message": "缺少 task_id"}
             
-            c.execute("""
-                UPDATE todos
-                SET status = 'completed', completed_at = ?, updated_at = ?
-                WHERE id = ?
-            """, (now, now, task_id))
+                c.execute("""
+                    UPDATE todos
+                    SET status = 'completed', completed_at = ?, updated_at = ?
+                    WHERE id = ?
+                """, (now, now, task_id))
             
-            conn.commit()
-            conn.close()
+                conn.commit()
             
-            info_log(f"[AUTO] 已完成任務 ID: {task_id}")
+                info_log(f"[AUTO] 已完成任務 ID: {task_id}")
             
-            # 發布事件：項目完成
-            publish_todo_event(
-                MonitoringEventType.ITEM_COMPLETED,
-                item_id=task_id,
-                item_data={"completed_at": now}
-            )
+                # 發布事件：項目完成
+                _notify_schedule_changed("todos")
+                publish_todo_event(
+                    MonitoringEventType.ITEM_COMPLETED,
+                    item_id=task_id,
+                    item_data={"completed_at": now}
+                )
             
-            return {"status": "ok", "message": f"已完成任務 ID: {task_id}"}
+                return {"status": "ok", "message": f"已完成任務 ID: {task_id}"}
         
-        elif action == "delete":
-            # 刪除任務
-            if task_id < 0:
-                return {"status": "error", "message": "缺少 task_id"}
+            elif action == "delete":
+                # 刪除任務
+                if task_id < 0:
+                    return {"status": "error", "message": "缺少 task_id"}
             
-            c.execute("DELETE FROM todos WHERE id = ?", (task_id,))
-            conn.commit()
-            conn.close()
+                c.execute("DELETE FROM todos WHERE id = ?", (task_id,))
+                conn.commit()
             
-            info_log(f"[AUTO] 已刪除任務 ID: {task_id}")
+                info_log(f"[AUTO] 已刪除任務 ID: {task_id}")
             
-            # 發布事件：刪除項目
-            publish_todo_event(
-                MonitoringEventType.ITEM_DELETED,
-                item_id=task_id
-            )
+                # 發布事件：刪除項目
+                _notify_schedule_changed("todos")
+                publish_todo_event(
+                    MonitoringEventType.ITEM_DELETED,
+                    item_id=task_id
+                )
             
-            return {"status": "ok", "message": f"已刪除任務 ID: {task_id}"}
+                return {"status": "ok", "message": f"已刪除任務 ID: {task_id}"}
         
-        else:
-            conn.close()
-            return {"status": "error", "message": f"未知動作：{action}"}
+            else:
+                return {"status": "error", "message": f"未知動作：{action}"}
     
     except Exception as e:
         error_log(f"[AUTO] 待辦事項操作失敗：{e}")
@@ -1856,13 +1840,12 @@ def register_background_workflow(
         是否註冊成功
     """
     try:
-        conn = sqlite3.connect(_DB)
         now = datetime.now().isoformat()
         
         trigger_json = json.dumps(trigger_conditions) if trigger_conditions else None
         metadata_json = json.dumps(metadata) if metadata else None
         
-        conn.execute("""
+        _db.execute("""
             INSERT INTO background_workflows 
             (task_id, workflow_type, trigger_conditions, status, created_at, updated_at, next_check_at, metadata)
             VALUES (?, ?, ?, ?, ?, ?, ?, ?)
@@ -1877,9 +1860,7 @@ def register_background_workflow(
             metadata_json
         ))
         
-        conn.commit()
-        conn.close()
-        
+        _notify_schedule_changed("background_workflows")
         info_log(f"[AUTO] 已註冊背景工作流：{task_id} (類型: {workflow_type})")
         return True
         
@@ -1899,11 +1880,8 @@ def get_active_workflows(workflow_type: Optional[str] = None) -> List[Dict[str,
         工作流資訊列表
     """
     try:
-        conn = sqlite3.connect(_DB)
-        c = conn.cursor()
-        
         if workflow_type:
-            c.execute("""
+            rows = _db.query("""
                 SELECT task_id, workflow_type, trigger_conditions, status, 
                        created_at, updated_at, last_check_at, next_check_at, metadata
                 FROM background_workflows
@@ -1911,7 +1889,7 @@ def get_active_workflows(workflow_type: Optional[str] = None) -> List[Dict[str,
                 ORDER BY created_at DESC
             """, (workflow_type,))
         else:
-            c.execute("""
+            rows = _db.query("""
                 SELECT task_id, workflow_type, trigger_conditions, status, 
                        created_at, updated_at, last_check_at, next_check_at, metadata
                 FROM background_workflows
@@ -1920,7 +1898,7 @@ def get_active_workflows(workflow_type: Optional[str] = None) -> List[Dict[str,
             """)
         
         workflows = []
-        for row in c.fetchall():
+        for row in rows:
             workflows.append({
                 "task_id": row[0],
                 "workflow_type": row[1],
@@ -1933,7 +1911,6 @@ def get_active_workflows(workflow_type: Optional[str] = None) -> List[Dict[str,
                 "metadata": json.loads(row[8]) if row[8] else None
             })
         
-        conn.close()
         return workflows
         
     except Exception as e:
@@ -1952,19 +1929,13 @@ def get_workflow_by_id(task_id: str) -> Optional[Dict[str, Any]]:
         工作流資訊，若不存在則返回 None
     """
     try:
-        conn = sqlite3.connect(_DB)
-        c = conn.cursor()
-        
-        c.execute("""
+        row = _db.query_one("""
             SELECT task_id, workflow_type, trigger_conditions, status, 
                    created_at, updated_at, last_check_at, next_check_at, metadata, error_message
             FROM background_workflows
             WHERE task_id = ?
         """, (task_id,))
         
-        row = c.fetchone()
-        conn.close()
-        
         if not row:
             return None
         
@@ -2009,7 +1980,6 @@ def update_workflow_status(
         是否更新成功
     """
     try:
-        conn = sqlite3.connect(_DB)
         now = datetime.now().isoformat()
         
         # 構建動態更新語句
@@ -2034,15 +2004,13 @@ def update_workflow_status(
         
         params.append(task_id)
         
-        conn.execute(f"""
+        _db.execute(f"""
             UPDATE background_workflows
             SET {', '.join(updates)}
             WHERE task_id = ?
         """, params)
         
-        conn.commit()
-        conn.close()
-        
+        _notify_schedule_changed("background_workflows")
         debug_log(3, f"[AUTO] 已更新工作流狀態：{task_id} -> {status}")
         return True
         
@@ -2062,11 +2030,9 @@ def delete_workflow(task_id: str) -> bool:
         是否刪除成功
     """
     try:
-        conn = sqlite3.connect(_DB)
-        conn.execute("DELETE FROM background_workflows WHERE task_id = ?", (task_id,))
-        conn.commit()
-        conn.close()
+        _db.execute("DELETE FROM background_workflows WHERE task_id = ?", (task_id,))
         
+        _notify_schedule_changed("background_workflows")
         info_log(f"[AUTO] 已刪除工作流記錄：{task_id}")
         return True
         
@@ -2096,20 +2062,17 @@ def log_intervention(
         是否記錄成功
     """
     try:
-        conn = sqlite3.connect(_DB)
         now = datetime.now().isoformat()
         
         params_json = json.dumps(parameters) if parameters else None
         
-        conn.execute("""
+        # 審計紀錄不需立即讀回，交給寫入佇列批次提交（讀取前會先 flush）
+        _db.submit("""
             INSERT INTO workflow_interventions 
             (task_id, action, parameters, performed_at, performed_by, result)
             VALUES (?, ?, ?, ?, ?, ?)
         """, (task_id, action, params_json, now, performed_by, result))
         
-        conn.commit()
-        conn.close()
-        
         debug_log(3, f"[AUTO] 已記錄干預操作：{action} on {task_id}")
         return True
         
@@ -2129,10 +2092,8 @@ def get_workflow_interventions(task_id: str) -> List[Dict[str, Any]]:
         干預記錄列表
     """
     try:
-        conn = sqlite3.connect(_DB)
-        c = conn.cursor()
-        
-        c.execute("""
+        _db.flush(timeout=5.0)
+        rows = _db.query("""
             SELECT id, action, parameters, performed_at, performed_by, result
             FROM workflow_interventions
             WHERE task_id = ?
@@ -2140,7 +2101,7 @@ def get_workflow_interventions(task_id: str) -> List[Dict[str, Any]]:
         """, (task_id,))
         
         interventions = []
-        for row in c.fetchall():
+        for row in rows:
             interventions.append({
                 "id": row[0],
                 "action": row[1],
@@ -2150,7 +2111,6 @@ def get_workflow_interventions(task_id: str) -> List[Dict[str, Any]]:
                 "result": row[5]
             })
         
-        conn.close()
         return interventions
         
     except Exception as e:
@@ -2172,10 +2132,7 @@ def get_workflows_due_for_check(current_time: Optional[str] = None) -> List[Dict
         if current_time is None:
             current_time = datetime.now().isoformat()
         
-        conn = sqlite3.connect(_DB)
-        c = conn.cursor()
-        
-        c.execute("""
+        rows = _db.query("""
             SELECT task_id, workflow_type, trigger_conditions, status, 
                    created_at, updated_at, last_check_at, next_check_at, metadata
             FROM background_workflows
@@ -2186,7 +2143,7 @@ def get_workflows_due_for_check(current_time: Optional[str] = None) -> List[Dict
         """, (current_time,))
         
         workflows = []
-        for row in c.fetchall():
+        for row in rows:
             workflows.append({
                 "task_id": row[0],
                 "workflow_type": row[1],
@@ -2199,7 +2156,6 @@ def get_workflows_due_for_check(current_time: Optional[str] = None) -> List[Dict
                 "metadata": json.loads(row[8]) if row[8] else None
             })
         
-        conn.close()
         return workflows
         
     except Exception as e:
@@ -2214,7 +2170,8 @@ class BackgroundEventScheduler:
     背景事件排程器 - 處理非使用者導致的系統循環
     
     這個類負責：
-    1. 定期檢查資料庫中到期的觸發條件（提醒、日曆事件等）
+    1. 以最小堆維護各項目的下一次到期時間，睡眠到最早的到期時間才檢查資料庫
+       （提醒、日曆事件等）；透過 API 的新增 / 修改會立即喚醒重新排程
     2. 在條件滿足時主動發布系統事件
     3. 觸發 Controller 的事件處理流程（非使用者輸入觸發）
     4. 管理自己的背景檢查線程
@@ -2238,10 +2195,13 @@ class BackgroundEventScheduler:
         ]
     }
     
+    # 需要排程的資料來源（同時為檢查順序）
+    SCHEDULE_SOURCES = ("reminders", "calendar_events", "todos", "background_workflows")
+    
     _instance = None
     _lock = threading.Lock()
     
-    def __new__(cls):
+    def __new__(cls, *args, **kwargs):
         """單例模式"""
         if cls._instance is None:
             with cls._lock:
@@ -2250,25 +2210,39 @@ class BackgroundEventScheduler:
                     cls._instance._initialized = False
         return cls._instance
     
-    def __init__(self):
-        """初始化背景事件排程器"""
+    def __init__(self, clock: Optional[Callable[[], datetime]] = None):
+        """
+        初始化背景事件排程器
+        
+        Args:
+            clock: 取得目前時間的函數（預設 datetime.now，測試時可注入假時鐘）
+        """
         if self._initialized:
             return
         
-        self.check_interval = 30  # 預設每 30 秒檢查一次
+        self._clock = clock or datetime.now
+        self.resync_interval = 600  # 沒有任何到期項目時，最久多少秒重新同步一次資料庫
+        self.retry_delay = 30       # 檢查後仍處於到期狀態的項目（例如發布失敗）延後重試的秒數
         self.is_running = False
         self.stop_event = threading.Event()
         self.scheduler_thread = None
+        self.deadlines = DeadlineQueue(self._now)
+        # 已處理過的工作流檢查：task_id -> next_check_at，避免同一個過期時間反覆觸發
+        self._handled_workflow_checks: Dict[str, str] = {}
         self._initialized = True
         
         info_log("[BackgroundEventScheduler] 背景事件排程器已初始化")
     
-    def start(self, check_interval: int = 30) -> bool:
+    def _now(self) -> datetime:
+        return self._clock()
+    
+    def start(self, resync_interval: float = 600) -> bool:
         """
         啟動背景事件排程器
         
         Args:
-            check_interval: 檢查間隔（秒），預設 30 秒
+            resync_interval: 沒有到期項目時重新同步資料庫的最長間隔（秒），
+                用來涵蓋繞過 API 直接寫入資料庫的變更
             
         Returns:
             是否成功啟動
@@ -2278,8 +2252,10 @@ class BackgroundEventScheduler:
             return False
         
         try:
-            self.check_interval = check_interval
+            self.resync_interval = resync_interval
             self.stop_event.clear()
+            # 所有來源標記為待載入，第一次喚醒時建立到期時間堆
+            self.deadlines.reset(self.SCHEDULE_SOURCES)
             self.is_running = True
             
             # 啟動背景檢查線程
@@ -2290,7 +2266,7 @@ class BackgroundEventScheduler:
             )
             self.scheduler_thread.start()
             
-            info_log(f"[BackgroundEventScheduler] 排程器已啟動（檢查間隔 {check_interval} 秒）")
+            info_log(f"[BackgroundEventScheduler] 排程器已啟動（重新同步間隔 {resync_interval} 秒）")
             return True
             
         except Exception as e:
@@ -2315,8 +2291,9 @@ class BackgroundEventScheduler:
         try:
             info_log("[BackgroundEventScheduler] 正在停止排程器...")
             
-            # 設置停止事件
+            # 設置停止事件並喚醒等待中的線程
             self.stop_event.set()
+            self.deadlines.close()
             
             # 等待線程退出
             if self.scheduler_thread and self.scheduler_thread.is_alive():
@@ -2326,6 +2303,10 @@ class BackgroundEventScheduler:
                     error_log("[BackgroundEventScheduler] 停止排程器超時")
                     return False
             
+            # 寫入執行緒是 daemon，行程結束時佇列中的通知標記會遺失，重啟後重複通知
+            if not _db.flush(timeout=timeout):
+                error_log("[BackgroundEventScheduler] 提交通知標記超時")
+            
             self.is_running = False
             info_log("[BackgroundEventScheduler] 排程器已停止")
             return True
@@ -2334,84 +2315,228 @@ class BackgroundEventScheduler:
             error_log(f"[BackgroundEventScheduler] 停止排程器失敗：{e}")
             return False
     
+    def notify(self, *sources: str) -> None:
+        """
+        資料已變更，喚醒排程器重新計算到期時間
+        
+        Args:
+            sources: 變更的來源（SCHEDULE_SOURCES 之一），未指定時重新載入全部
+        """
+        self.deadlines.notify(*(sources or self.SCHEDULE_SOURCES))
+    
     def _scheduler_loop(self) -> None:
         """
         排程器主循環（在獨立線程中運行）
         
-        定期檢查：
+        睡眠到最早的到期時間（或被資料變更喚醒），只檢查有項目到期的來源：
         1. 提醒（reminders 表）
-        2. 日曆事件（calendar_events 表）
-        3. 待辦事項（todos 表）- 檢查過期任務
-        4. 其他到期的觸發條件（background_workflows 表）
+        2. 日曆事件通知階段（calendar_events 表）
+        3. 待辦事項通知階段（todos 表）
+        4. 背景工作流的 next_check_at（background_workflows 表）
         """
         info_log("[BackgroundEventScheduler] 排程器循環已啟動")
         
         while not self.stop_event.is_set():
             try:
-                # 檢查到期的提醒
-                self._check_reminders()
-                
-                # 檢查即將開始的日曆事件（提前 15 分鐘通知）
-                self._check_calendar_events()
-                
-                # 檢查過期的待辦事項
-                self._check_todos()
-                
-                # 檢查其他到期的背景工作流觸發條件
-                self._check_workflow_triggers()
+                due, changed = self.deadlines.wait(max_wait=self.resync_interval)
+                if self.stop_event.is_set():
+                    break
+                self.run_pending(due, changed)
                 
             except Exception as e:
                 error_log(f"[BackgroundEventScheduler] 檢查循環異常：{e}")
-            
-            # 等待下次檢查（可被中斷）
-            self.stop_event.wait(self.check_interval)
+                # 避免資料庫持續異常時空轉
+                self.stop_event.wait(self.retry_delay)
         
         info_log("[BackgroundEventScheduler] 排程器循環已退出")
     
+    def run_pending(self, due: List[Tuple[str, Any]], changed: List[str]) -> None:
+        """
+        執行到期來源的檢查，並重新載入受影響來源的到期時間
+        
+        Args:
+            due: 已到期的項目鍵 (來源, 項目 ID)
+            changed: 資料已變更、需要重新載入的來源
+        """
+        if not due and not changed:
+            # 等到重新同步間隔仍沒有事件：全部重新載入
+            changed = list(self.SCHEDULE_SOURCES)
+        
+        fired: Dict[str, List[Any]] = {}
+        for source, item_id in due:
+            fired.setdefault(source, []).append(item_id)
+        
+        checks = {
+            "reminders": self._check_reminders,
+            "calendar_events": self._check_calendar_events,
+            "todos": self._check_todos,
+            "background_workflows": self._check_workflow_triggers
+        }
+        for source in self.SCHEDULE_SOURCES:
+            if source in fired:
+                checks[source]()
+        
+        for source in self.SCHEDULE_SOURCES:
+            if source in fired or source in changed:
+                self._reload_deadlines(source, fired.get(source, ()))
+    
+    # ==================== 到期時間計算 ====================
+    
+    @classmethod
+    def _stage_offsets(cls, source: str) -> List[Tuple[str, timedelta]]:
+        """通知階段相對錨點（開始 / 截止時間）的提前量，由遠到近"""
+        offsets = []
+        for stage in cls.NOTIFICATION_STAGES[source]:
+            if stage.get("at_deadline"):
+                offset = timedelta(0)
+            else:
+                offset = timedelta(hours=stage.get("hours_before", 0), minutes=stage.get("minutes_before", 0))
+            offsets.append((stage["stage_name"], offset))
+        return sorted(offsets, key=lambda item: item[1], reverse=True)
+    
+    @classmethod
+    def _current_stage(cls, source: str, anchor: datetime, now: datetime) -> Optional[str]:
+        """目前應處於的通知階段（最接近錨點且已到達的階段）"""
+        current = None
+        for stage_name, offset in cls._stage_offsets(source):
+            if anchor - offset <= now:
+                current = stage_name
+        return current
+    
+    @classmethod
+    def _next_stage_due(cls, source: str, anchor: datetime, now: datetime,
+                        last_stage: Optional[str]) -> Optional[datetime]:
+        """下一次需要通知的時間：目前階段尚未通知則為現在，否則為下一個階段邊界"""
+        current = cls._current_stage(source, anchor, now)
+        if current is not None and current != last_stage:
+            return now
+        for _, offset in cls._stage_offsets(source):
+            boundary = anchor - offset
+            if boundary > now:
+                return boundary
+        return None
+    
+    @staticmethod
+    def _parse_time(value: Optional[str]) -> Optional[datetime]:
+        """解析資料庫中的 ISO 時間字串，帶時區者轉為本地時間"""
+        if not value:
+            return None
+        try:
+            parsed = datetime.fromisoformat(value)
+        except ValueError:
+            debug_log(2, f"[BackgroundEventScheduler] 無法解析時間：{value}")
+            return None
+        if parsed.tzinfo is not None:
+            parsed = parsed.astimezone().replace(tzinfo=None)
+        return parsed
+    
+    def _reload_deadlines(self, source: str, fired: Iterable[Any] = ()) -> None:
+        """從資料庫重新計算某個來源所有項目的下一次到期時間"""
+        # 通知標記經由寫入佇列提交，先確保讀到的是最新狀態
+        _db.flush(timeout=5.0)
+        now = self._now()
+        deadlines: Dict[Any, Optional[datetime]] = {}
+        
+        if source == "reminders":
+            for reminder_id, trigger_time in _db.query("SELECT id, time FROM reminders"):
+                deadlines[reminder_id] = self._parse_time(trigger_time)
+        
+        elif source == "calendar_events":
+            rows = _db.query("""
+                SELECT id, start_time, last_notified_stage
+                FROM calendar_events
+                WHERE start_time >= ?
+            """, (now.isoformat(),))
+            for event_id, start_time, last_stage in rows:
+                start = self._parse_time(start_time)
+                if start is not None:
+                    deadlines[event_id] = self._next_stage_due(source, start, now, last_stage)
+        
+        elif source == "todos":
+            rows = _db.query("""
+                SELECT id, deadline, last_notified_stage
+                FROM todos
+                WHERE deadline IS NOT NULL AND status != 'completed'
+            """)
+            for todo_id, deadline, last_stage in rows:
+                anchor = self._parse_time(deadline)
+                if anchor is not None:
+                    deadlines[todo_id] = self._next_stage_due(source, anchor, now, last_stage)
+        
+        elif source == "background_workflows":
+            rows = _db.query("""
+                SELECT task_id, next_check_at
+                FROM background_workflows
+                WHERE status = 'RUNNING' AND next_check_at IS NOT NULL
+            """)
+            handled = {}
+            for task_id, next_check_at in rows:
+                if self._handled_workflow_checks.get(task_id) == next_check_at:
+                    handled[task_id] = next_check_at
+                    continue
+                deadlines[task_id] = self._parse_time(next_check_at)
+            self._handled_workflow_checks = handled
+        
+        # 檢查過後仍處於到期狀態（例如發布事件失敗）的項目延後重試，避免空轉
+        retry_at = now + timedelta(seconds=self.retry_delay)
+        for item_id in fired:
+            due = deadlines.get(item_id)
+            if due is not None and due <= now:
+                deadlines[item_id] = retry_at
+        
+        self.deadlines.replace(source, {item_id: due for item_id, due in deadlines.items() if due is not None})
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """排程器狀態與到期時間堆統計"""
+        return {
+            "is_running": self.is_running,
+            "resync_interval": self.resync_interval,
+            **self.deadlines.get_stats()
+        }
+    
     def _check_reminders(self) -> None:
         """檢查到期的提醒並發布事件"""
         try:
-            now = datetime.now().isoformat()
-            conn = sqlite3.connect(_DB)
-            c = conn.cursor()
+            now = self._now().isoformat()
+            with _db.connection() as conn:
+                c = conn.cursor()
             
-            # 查詢到期的提醒
-            c.execute("""
-                SELECT id, time, message 
-                FROM reminders 
-                WHERE time <= ?
-                ORDER BY time ASC
-            """, (now,))
+                # 查詢到期的提醒
+                c.execute("""
+                    SELECT id, time, message 
+                    FROM reminders 
+                    WHERE time <= ?
+                    ORDER BY time ASC
+                """, (now,))
             
-            triggered_reminders = c.fetchall()
+                triggered_reminders = c.fetchall()
             
-            for reminder in triggered_reminders:
-                reminder_id, trigger_time, message = reminder
+                for reminder in triggered_reminders:
+                    reminder_id, trigger_time, message = reminder
                 
-                try:
-                    # 發布提醒觸發事件
-                    from core.event_bus import event_bus, SystemEvent
+                    try:
+                        # 發布提醒觸發事件
+                        from core.event_bus import event_bus, SystemEvent
                     
-                    event_bus.publish(
-                        SystemEvent.REMINDER_TRIGGERED,
-                        {
-                            "reminder_id": reminder_id,
-                            "trigger_time": trigger_time,
-                            "message": message,
-                            "source": "background_scheduler"
-                        }
-                    )
+                        event_bus.publish(
+                            SystemEvent.REMINDER_TRIGGERED,
+                            {
+                                "reminder_id": reminder_id,
+                                "trigger_time": trigger_time,
+                                "message": message,
+                                "source": "background_scheduler"
+                            }
+                        )
                     
-                    info_log(f"[BackgroundEventScheduler] 提醒已觸發：{message}")
+                        info_log(f"[BackgroundEventScheduler] 提醒已觸發：{message}")
                     
-                    # 刪除已觸發的提醒
-                    c.execute("DELETE FROM reminders WHERE id = ?", (reminder_id,))
+                        # 刪除已觸發的提醒
+                        c.execute("DELETE FROM reminders WHERE id = ?", (reminder_id,))
                     
-                except Exception as e:
-                    error_log(f"[BackgroundEventScheduler] 處理提醒失敗：{e}")
+                    except Exception as e:
+                        error_log(f"[BackgroundEventScheduler] 處理提醒失敗：{e}")
             
-            conn.commit()
-            conn.close()
+                conn.commit()
             
             if triggered_reminders:
                 debug_log(2, f"[BackgroundEventScheduler] 已處理 {len(triggered_reminders)} 個提醒")
@@ -2422,16 +2547,13 @@ class BackgroundEventScheduler:
     def _check_calendar_events(self) -> None:
         """檢查日曆事件並根據通知階段發布事件"""
         try:
-            from datetime import timedelta
-            from core.event_bus import EventBus, SystemEvent
-            from core.states.state_manager import UEPState
+            from core.event_bus import SystemEvent
             
-            now = datetime.now()
-            conn = sqlite3.connect(_DB)
-            c = conn.cursor()
+            now = self._now()
             
-            # 查詢所有未開始的日曆事件
-            c.execute("""
+            # 查詢所有未開始的日曆事件（通知標記經由寫入佇列提交，先確保讀到最新階段）
+            _db.flush(timeout=5.0)
+            events = _db.query("""
                 SELECT id, summary, description, start_time, location,
                        last_notified_at, last_notified_stage
                 FROM calendar_events
@@ -2439,28 +2561,16 @@ class BackgroundEventScheduler:
                 ORDER BY start_time ASC
             """, (now.isoformat(),))
             
-            events = c.fetchall()
             notifications_sent = 0
             
             for event in events:
                 event_id, summary, description, start_time_str, location, last_notified_at, last_notified_stage = event
                 
                 try:
-                    start_time = datetime.fromisoformat(start_time_str)
-                    time_until_start = start_time - now
-                    
-                    # 判斷當前應該處於哪個通知階段
-                    current_stage = None
+                    start_time = self._parse_time(start_time_str)
                     
-                    if time_until_start.total_seconds() <= 900:
-                        # 15 分鐘內開始
-                        current_stage = "15min_before"
-                    elif time_until_start.total_seconds() <= 3600:
-                        # 1 小時內開始
-                        current_stage = "1h_before"
-                    elif time_until_start.total_seconds() <= 86400:
-                        # 24 小時內開始
-                        current_stage = "24h_before"
+                    # 判斷當前應該處於哪個通知階段（24h_before / 1h_before / 15min_before）
+                    current_stage = self._current_stage("calendar_events", start_time, now)
                     
                     # 如果有應該通知的階段，且該階段還沒通知過
                     if current_stage and current_stage != last_notified_stage:
@@ -2480,12 +2590,12 @@ class BackgroundEventScheduler:
                         )
                         
                         # 更新資料庫中的通知記錄
-                        c.execute("""
+                        # 通知標記不需立即讀回，交給寫入佇列批次提交
+                        _db.submit("""
                             UPDATE calendar_events 
                             SET last_notified_at = ?, last_notified_stage = ?
                             WHERE id = ?
                         """, (now.isoformat(), current_stage, event_id))
-                        conn.commit()
                         
                         notifications_sent += 1
                         info_log(f"[BackgroundEventScheduler] 日曆事件通知（{current_stage}）：{summary} (start: {start_time_str})")
@@ -2493,8 +2603,6 @@ class BackgroundEventScheduler:
                 except Exception as e:
                     error_log(f"[BackgroundEventScheduler] 處理日曆事件 {event_id} 失敗：{e}")
             
-            conn.close()
-            
             if notifications_sent > 0:
                 debug_log(2, f"[BackgroundEventScheduler] 已發送 {notifications_sent} 個日曆事件通知")
                 
@@ -2504,16 +2612,13 @@ class BackgroundEventScheduler:
     def _check_todos(self) -> None:
         """檢查待辦事項並根據通知階段發布事件"""
         try:
-            from datetime import timedelta
-            from core.event_bus import EventBus, SystemEvent
-            from core.states.state_manager import UEPState
+            from core.event_bus import SystemEvent
             
-            now = datetime.now()
-            conn = sqlite3.connect(_DB)
-            c = conn.cursor()
+            now = self._now()
             
-            # 查詢所有未完成且有 deadline 的待辦事項
-            c.execute("""
+            # 查詢所有未完成且有 deadline 的待辦事項（先提交佇列中的通知標記）
+            _db.flush(timeout=5.0)
+            todos = _db.query("""
                 SELECT id, task_name, task_description, priority, deadline, 
                        last_notified_at, last_notified_stage
                 FROM todos
@@ -2522,32 +2627,17 @@ class BackgroundEventScheduler:
                 ORDER BY priority DESC, deadline ASC
             """)
             
-            todos = c.fetchall()
             notifications_sent = 0
             
             for todo in todos:
                 todo_id, task_name, task_description, priority, deadline_str, last_notified_at, last_notified_stage = todo
                 
                 try:
-                    deadline = datetime.fromisoformat(deadline_str)
-                    time_until_deadline = deadline - now
+                    deadline = self._parse_time(deadline_str)
                     
-                    # 判斷當前應該處於哪個通知階段
-                    current_stage = None
-                    event_type = None
-                    
-                    if time_until_deadline.total_seconds() <= 0:
-                        # 已到期
-                        current_stage = "at_deadline"
-                        event_type = SystemEvent.TODO_OVERDUE
-                    elif time_until_deadline.total_seconds() <= 3600:
-                        # 1 小時內到期
-                        current_stage = "1h_before"
-                        event_type = SystemEvent.TODO_UPCOMING
-                    elif time_until_deadline.total_seconds() <= 86400:
-                        # 24 小時內到期
-                        current_stage = "24h_before"
-                        event_type = SystemEvent.TODO_UPCOMING
+                    # 判斷當前應該處於哪個通知階段（24h_before / 1h_before / at_deadline）
+                    current_stage = self._current_stage("todos", deadline, now)
+                    event_type = SystemEvent.TODO_OVERDUE if current_stage == "at_deadline" else SystemEvent.TODO_UPCOMING
                     
                     # 如果有應該通知的階段，且該階段還沒通知過
                     if current_stage and current_stage != last_notified_stage:
@@ -2567,12 +2657,12 @@ class BackgroundEventScheduler:
                         )
                         
                         # 更新資料庫中的通知記錄
-                        c.execute("""
+                        # 通知標記不需立即讀回，交給寫入佇列批次提交
+                        _db.submit("""
                             UPDATE todos 
                             SET last_notified_at = ?, last_notified_stage = ?
                             WHERE id = ?
                         """, (now.isoformat(), current_stage, todo_id))
-                        conn.commit()
                         
                         notifications_sent += 1
                         info_log(f"[BackgroundEventScheduler] 待辦事項通知（{current_stage}）：{task_name} (deadline: {deadline_str})")
@@ -2580,8 +2670,6 @@ class BackgroundEventScheduler:
                 except Exception as e:
                     error_log(f"[BackgroundEventScheduler] 處理待辦事項 {todo_id} 失敗：{e}")
             
-            conn.close()
-            
             if notifications_sent > 0:
                 debug_log(2, f"[BackgroundEventScheduler] 已發送 {notifications_sent} 個待辦事項通知")
                 
@@ -2602,74 +2690,73 @@ class BackgroundEventScheduler:
             包含過期項目統計的報告字典
         """
         try:
-            now = datetime.now()
+            now = self._now()
             report = {
                 "overdue_todos": [],
                 "missed_reminders": [],
                 "past_calendar_events": []
             }
             
-            conn = sqlite3.connect(_DB)
-            c = conn.cursor()
+            with _db.connection() as conn:
+                c = conn.cursor()
             
-            # 1. 檢查過期待辦事項
-            c.execute("""
-                SELECT id, task_name, task_description, priority, deadline
-                FROM todos
-                WHERE deadline IS NOT NULL 
-                  AND deadline < ?
-                  AND status != 'completed'
-                ORDER BY deadline ASC
-            """, (now.isoformat(),))
-            
-            for row in c.fetchall():
-                todo_id, task_name, task_description, priority, deadline = row
-                report["overdue_todos"].append({
-                    "id": todo_id,
-                    "task_name": task_name,
-                    "task_description": task_description,
-                    "priority": priority,
-                    "deadline": deadline
-                })
-            
-            # 2. 檢查錯過的提醒
-            c.execute("""
-                SELECT id, time, message
-                FROM reminders
-                WHERE time < ?
-                ORDER BY time ASC
-            """, (now.isoformat(),))
-            
-            for row in c.fetchall():
-                reminder_id, trigger_time, message = row
-                report["missed_reminders"].append({
-                    "id": reminder_id,
-                    "time": trigger_time,
-                    "message": message
-                })
-            
-            # 3. 檢查已過期的日曆事件（過去 24 小時內）
-            from datetime import timedelta
-            past_24h = now - timedelta(hours=24)
+                # 1. 檢查過期待辦事項
+                c.execute("""
+                    SELECT id, task_name, task_description, priority, deadline
+                    FROM todos
+                    WHERE deadline IS NOT NULL 
+                      AND deadline < ?
+                      AND status != 'completed'
+                    ORDER BY deadline ASC
+                """, (now.isoformat(),))
+            
+                for row in c.fetchall():
+                    todo_id, task_name, task_description, priority, deadline = row
+                    report["overdue_todos"].append({
+                        "id": todo_id,
+                        "task_name": task_name,
+                        "task_description": task_description,
+                        "priority": priority,
+                        "deadline": deadline
+                    })
+            
+                # 2. 檢查錯過的提醒
+                c.execute("""
+                    SELECT id, time, message
+                    FROM reminders
+                    WHERE time < ?
+                    ORDER BY time ASC
+                """, (now.isoformat(),))
+            
+                for row in c.fetchall():
+                    reminder_id, trigger_time, message = row
+                    report["missed_reminders"].append({
+                        "id": reminder_id,
+                        "time": trigger_time,
+                        "message": message
+                    })
+            
+                # 3. 檢查已過期的日曆事件（過去 24 小時內）
+                from datetime import timedelta
+                past_24h = now - timedelta(hours=24)
             
-            c.execute("""
-                SELECT id, summary, description, start_time, end_time
-                FROM calendar_events
-                WHERE end_time >= ? AND end_time < ?
-                ORDER BY start_time ASC
-            """, (past_24h.isoformat(), now.isoformat()))
+                c.execute("""
+                    SELECT id, summary, description, start_time, end_time
+                    FROM calendar_events
+                    WHERE end_time >= ? AND end_time < ?
+                    ORDER BY start_time ASC
+                """, (past_24h.isoformat(), now.isoformat()))
             
-            for row in c.fetchall():
-                event_id, summary, description, start_time, end_time = row
-                report["past_calendar_events"].append({
-                    "id": event_id,
-                    "summary": summary,
-                    "description": description,
-                    "start_time": start_time,
-                    "end_time": end_time
-                })
+                for row in c.fetchall():
+                    event_id, summary, description, start_time, end_time = row
+                    report["past_calendar_events"].append({
+                        "id": event_id,
+                        "summary": summary,
+                        "description": description,
+                        "start_time": start_time,
+                        "end_time": end_time
+                    })
             
-            conn.close()
             
             # 統計
             total_overdue = len(report["overdue_todos"])
@@ -2717,12 +2804,14 @@ class BackgroundEventScheduler:
         """檢查背景工作流的觸發條件"""
         try:
             # 獲取所有到期需要檢查的工作流
-            due_workflows = get_workflows_due_for_check()
+            due_workflows = get_workflows_due_for_check(self._now().isoformat())
             
             for workflow in due_workflows:
                 task_id = workflow["task_id"]
                 workflow_type = workflow["workflow_type"]
-                trigger_conditions = workflow.get("trigger_conditions", {})
+                trigger_conditions = workflow.get("trigger_conditions") or {}
+                # 同一個 next_check_at 只處理一次，等工作流更新下次檢查時間後再排程
+                self._handled_workflow_checks[task_id] = workflow["next_check_at"]
                 
                 try:
                     # 根據觸發條件類型處理
@@ -2750,6 +2839,11 @@ class BackgroundEventScheduler:
             error_log(f"[BackgroundEventScheduler] 檢查工作流觸發失敗：{e}")
 
 
+def close_task_database(timeout: float = 5.0) -> None:
+    """提交寫入佇列中的寫入並關閉任務資料庫的所有連線（系統關閉時、背景線程都停止後呼叫）"""
+    _db.close(timeout=timeout)
+
+
 # 全域背景事件排程器實例
 _background_scheduler = None
 _scheduler_lock = threading.Lock()
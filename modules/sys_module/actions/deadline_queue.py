@@ -0,0 +1,149 @@
+"""
+modules/sys_module/actions/deadline_queue.py
+背景事件排程器的到期時間佇列
+
+以最小堆維護每個項目（提醒、日曆通知階段、待辦截止、工作流 next_check_at）
+的下一次到期時間，取代固定間隔輪詢資料庫：
+- set / replace：新增或整批更新某個來源的到期時間，舊的堆項目以版本號作廢
+- notify(source)：資料被 API 修改時標記該來源需重新載入，並立即喚醒等待者
+- wait()：阻塞到最早的到期時間或收到通知為止，沒有到期項目時完全不喚醒
+- clock 可注入，測試時以假時鐘推進時間
+
+堆、通知與等待迴圈與主循環排程器共用 core.deadline_heap.DeadlineHeap，
+這裡只處理一次性項目的版本管理與按來源分組。
+"""
+
+import itertools
+from datetime import datetime
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional, Tuple
+
+from core.deadline_heap import DeadlineHeap
+
+# 項目鍵：(來源, 項目 ID)，例如 ("todos", 12)
+DeadlineKey = Tuple[str, Hashable]
+
+
+class DeadlineQueue(DeadlineHeap):
+    """以來源分組的一次性到期時間最小堆"""
+
+    def __init__(self, clock: Callable[[], datetime] = datetime.now):
+        super().__init__(clock)
+        # 項目鍵 -> (到期時間, 版本號)；版本號不符的堆項目視為已作廢
+        self._entries: Dict[DeadlineKey, Tuple[datetime, int]] = {}
+        self._generation = itertools.count(1)
+
+        self.stats["fired"] = {}
+
+    @staticmethod
+    def _seconds_between(start: datetime, end: datetime) -> float:
+        return (end - start).total_seconds()
+
+    def _is_current(self, key: DeadlineKey, generation: int) -> bool:
+        current = self._entries.get(key)
+        return current is not None and current[1] == generation
+
+    # === 到期時間 ===
+
+    def set(self, key: DeadlineKey, due: Optional[datetime]):
+        """設定（或取消）單一項目的到期時間"""
+        with self._cond:
+            self._set_locked(key, due)
+            self._cond.notify_all()
+
+    def discard(self, key: DeadlineKey):
+        """移除項目"""
+        self.set(key, None)
+
+    def replace(self, source: str, deadlines: Dict[Hashable, datetime]):
+        """以新的到期時間整批取代某個來源的所有項目"""
+        with self._cond:
+            for key in [key for key in self._entries if key[0] == source]:
+                if key[1] not in deadlines:
+                    del self._entries[key]
+            for item_id, due in deadlines.items():
+                self._set_locked((source, item_id), due)
+            self._cond.notify_all()
+
+    def _set_locked(self, key: DeadlineKey, due: Optional[datetime]):
+        if due is None:
+            self._entries.pop(key, None)
+            return
+        current = self._entries.get(key)
+        if current is not None and current[0] == due:
+            return
+        generation = next(self._generation)
+        self._entries[key] = (due, generation)
+        self._push(due, key, generation)
+
+    def next_due(self) -> Optional[datetime]:
+        """最早的到期時間，沒有項目時返回 None"""
+        with self._cond:
+            return self._head_due()
+
+    def pop_due(self, now: Optional[datetime] = None) -> List[DeadlineKey]:
+        """取出所有已到期的項目（依到期時間排序）"""
+        with self._cond:
+            return self._pop_due_locked(self._clock() if now is None else now)
+
+    def _pop_due_locked(self, now: datetime) -> List[DeadlineKey]:
+        due: List[DeadlineKey] = []
+        fired = self.stats["fired"]
+        for _, key, _ in self._pop_due(now):
+            del self._entries[key]
+            due.append(key)
+            fired[key[0]] = fired.get(key[0], 0) + 1
+        return due
+
+    def __len__(self) -> int:
+        with self._cond:
+            return len(self._entries)
+
+    # === 喚醒 ===
+
+    def notify(self, *sources: str):
+        """來源資料已變更，喚醒等待者重新載入"""
+        self._notify(sources)
+
+    def wait(self, max_wait: Optional[float] = None) -> Tuple[List[DeadlineKey], List[str]]:
+        """
+        阻塞到有項目到期、收到通知或超過 max_wait 秒
+
+        Returns:
+            (到期的項目鍵, 需重新載入的來源)；關閉後返回兩個空列表
+        """
+        with self._cond:
+            if not self._wait_locked(max_wait):
+                return [], []
+
+            due = self._pop_due_locked(self._clock())
+            sources = list(self._take_pending())
+            self._count_wakeup(idle=not due and not sources)
+            return due, sources
+
+    # === 生命週期 ===
+
+    def reset(self, sources: Iterable[str] = ()):
+        """清空所有項目並重新開啟，sources 會標記為待載入"""
+        with self._cond:
+            self._heap.clear()
+            self._entries.clear()
+            self._pending.clear()
+            self._closed = False
+            now = self._clock()
+            for source in sources:
+                self._pending[source] = now
+
+    def get_stats(self) -> Dict[str, Any]:
+        """到期項目與喚醒統計"""
+        with self._cond:
+            next_due = self._head_due()
+            per_source: Dict[str, int] = {}
+            for source, _ in self._entries:
+                per_source[source] = per_source.get(source, 0) + 1
+            return {
+                **self.stats,
+                "fired": dict(self.stats["fired"]),
+                "notifications": dict(self.stats["notifications"]),
+                "pending": per_source,
+                "next_due": next_due.isoformat() if next_due else None
+            }
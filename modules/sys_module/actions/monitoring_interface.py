@@ -8,9 +8,8 @@ modules/sys_module/actions/monitoring_interface.py
 
 from typing import Dict, List, Any, Optional
 from datetime import datetime, timedelta
-import sqlite3
 
-from modules.sys_module.actions.automation_helper import _DB, local_todo, local_calendar
+from modules.sys_module.actions.automation_helper import _db, local_todo, local_calendar
 from modules.sys_module.actions.monitoring_events import (
     get_event_bus,
     MonitoringEventData,
@@ -58,9 +57,6 @@ class MonitoringInterface:
             待辦事項列表，按優先級和截止時間排序
         """
         try:
-            conn = sqlite3.connect(_DB)
-            c = conn.cursor()
-            
             if include_completed:
                 query = """
                     SELECT id, task_name, task_description, priority, status, 
@@ -98,10 +94,10 @@ class MonitoringInterface:
                         created_at ASC
                 """
             
-            c.execute(query)
+            rows = _db.query(query)
             
             todos = []
-            for row in c.fetchall():
+            for row in rows:
                 todos.append({
                     "id": row[0],
                     "task_name": row[1],
@@ -114,7 +110,6 @@ class MonitoringInterface:
                     "completed_at": row[8]
                 })
             
-            conn.close()
             debug_log(2, f"[MonitoringInterface] 查詢到 {len(todos)} 個待辦事項")
             return todos
             
@@ -133,10 +128,7 @@ class MonitoringInterface:
             符合條件的待辦事項列表
         """
         try:
-            conn = sqlite3.connect(_DB)
-            c = conn.cursor()
-            
-            c.execute("""
+            rows = _db.query("""
                 SELECT id, task_name, task_description, priority, status, 
                        deadline, created_at, updated_at
                 FROM todos
@@ -145,7 +137,7 @@ class MonitoringInterface:
             """, (priority,))
             
             todos = []
-            for row in c.fetchall():
+            for row in rows:
                 todos.append({
                     "id": row[0],
                     "task_name": row[1],
@@ -157,7 +149,6 @@ class MonitoringInterface:
                     "updated_at": row[7]
                 })
             
-            conn.close()
             return todos
             
         except Exception as e:
@@ -172,12 +163,9 @@ class MonitoringInterface:
             過期的待辦事項列表
         """
         try:
-            conn = sqlite3.connect(_DB)
-            c = conn.cursor()
-            
             now = datetime.now().isoformat()
             
-            c.execute("""
+            rows = _db.query("""
                 SELECT id, task_name, task_description, priority, status, 
                        deadline, created_at, updated_at
                 FROM todos
@@ -186,7 +174,7 @@ class MonitoringInterface:
             """, (now,))
             
             todos = []
-            for row in c.fetchall():
+            for row in rows:
                 todos.append({
                     "id": row[0],
                     "task_name": row[1],
@@ -199,7 +187,6 @@ class MonitoringInterface:
                     "is_expired": True
                 })
             
-            conn.close()
             return todos
             
         except Exception as e:
@@ -224,9 +211,6 @@ class MonitoringInterface:
             行事曆事件列表，按開始時間排序
         """
         try:
-            conn = sqlite3.connect(_DB)
-            c = conn.cursor()
-            
             # 設定預設時間範圍
             if not start_time:
                 start_time = datetime.now().isoformat()
@@ -234,7 +218,7 @@ class MonitoringInterface:
                 end_dt = datetime.now() + timedelta(days=30)
                 end_time = end_dt.isoformat()
             
-            c.execute("""
+            rows = _db.query("""
                 SELECT id, summary, description, start_time, end_time, location,
                        created_at, updated_at, last_notified_at
                 FROM calendar_events
@@ -243,7 +227,7 @@ class MonitoringInterface:
             """, (start_time, end_time))
             
             events = []
-            for row in c.fetchall():
+            for row in rows:
                 events.append({
                     "id": row[0],
                     "summary": row[1],
@@ -256,7 +240,6 @@ class MonitoringInterface:
                     "last_notified_at": row[8]
                 })
             
-            conn.close()
             debug_log(2, f"[MonitoringInterface] 查詢到 {len(events)} 個行事曆事件")
             return events
             
@@ -278,10 +261,7 @@ class MonitoringInterface:
             now = datetime.now()
             end_time = (now + timedelta(hours=hours)).isoformat()
             
-            conn = sqlite3.connect(_DB)
-            c = conn.cursor()
-            
-            c.execute("""
+            rows = _db.query("""
                 SELECT id, summary, description, start_time, end_time, location
                 FROM calendar_events
                 WHERE start_time >= ? AND start_time <= ?
@@ -289,7 +269,7 @@ class MonitoringInterface:
             """, (now.isoformat(), end_time))
             
             events = []
-            for row in c.fetchall():
+            for row in rows:
                 # 計算距離現在的時間差
                 start_dt = datetime.fromisoformat(row[3])
                 time_until = (start_dt - now).total_seconds() / 60  # 轉換為分鐘
@@ -304,7 +284,6 @@ class MonitoringInterface:
                     "minutes_until": int(time_until)
                 })
             
-            conn.close()
             return events
             
         except Exception as e:
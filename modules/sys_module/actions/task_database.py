@@ -0,0 +1,227 @@
+"""
+modules/sys_module/actions/task_database.py
+自動化任務資料庫存取層
+
+uep_tasks.db（待辦事項、行事曆、提醒、背景工作流、干預紀錄）的共用存取入口：
+- 每個執行緒一條長駐連線，不再每次查詢重新 connect
+- WAL 模式 + synchronous=NORMAL：讀取不會被寫入阻塞，提交不必每次 fsync
+- busy_timeout 讓短暫的寫鎖競爭改為等待，而不是立即 "database is locked"
+- 連線長駐後 sqlite3 的預編譯語句快取才會被重用
+- 不需要立即讀回的寫入（通知標記、干預紀錄）可交給寫入佇列，
+  由單一寫入執行緒以單一交易批次提交
+"""
+
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from utils.debug_helper import debug_log, error_log
+
+
+class TaskDatabase:
+    """以執行緒為單位池化連線的 SQLite 存取層"""
+
+    def __init__(self, path: str, busy_timeout: float = 5.0, statement_cache_size: int = 128,
+                 write_batch_size: int = 256, write_batch_delay: float = 0.01):
+        """
+        Args:
+            path: 資料庫檔案路徑
+            busy_timeout: 等待其他連線釋放寫鎖的秒數
+            statement_cache_size: 每條連線的預編譯語句快取容量
+            write_batch_size: 寫入佇列單一交易的最大語句數
+            write_batch_delay: 寫入執行緒收到第一筆後等待更多寫入合併的秒數
+        """
+        self.path = path
+        self.busy_timeout = busy_timeout
+        self.statement_cache_size = statement_cache_size
+        self.write_batch_size = max(1, write_batch_size)
+        self.write_batch_delay = write_batch_delay
+
+        self._local = threading.local()
+        self._connections: Dict[int, Tuple[threading.Thread, sqlite3.Connection]] = {}
+        self._connections_lock = threading.Lock()
+
+        # 寫入佇列：(sql, params, is_many) 或 flush 用的 threading.Event，None 代表停止
+        self._write_queue: "queue.Queue[Any]" = queue.Queue()
+        self._writer: Optional[threading.Thread] = None
+        self._writer_lock = threading.Lock()
+
+        self.stats = {"connections": 0, "queued_writes": 0, "write_batches": 0, "failed_writes": 0}
+
+    # ==================== 連線池 ====================
+
+    def _create_connection(self) -> sqlite3.Connection:
+        # check_same_thread=False 僅供 close() 與回收死亡執行緒的連線；使用上仍是一條執行緒一條連線
+        conn = sqlite3.connect(
+            self.path,
+            timeout=self.busy_timeout,
+            check_same_thread=False,
+            cached_statements=self.statement_cache_size
+        )
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _get_connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            return conn
+
+        conn = self._create_connection()
+        current = threading.current_thread()
+        with self._connections_lock:
+            # 順便回收已結束執行緒留下的連線
+            for ident, (thread, stale) in list(self._connections.items()):
+                if not thread.is_alive():
+                    del self._connections[ident]
+                    stale.close()
+            self._connections[current.ident] = (current, conn)
+            self.stats["connections"] += 1
+        self._local.conn = conn
+        debug_log(3, f"[TaskDatabase] 建立連線（執行緒 {current.name}）")
+        return conn
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        """
+        取得目前執行緒的池化連線
+
+        正常離開時提交尚未提交的交易，發生例外時回滾，
+        確保長駐連線不會帶著未結束的交易（與寫鎖）回到池中。
+        呼叫端可在區塊內自行 commit()，但不可 close()。
+        """
+        conn = self._get_connection()
+        try:
+            yield conn
+        except BaseException:
+            if conn.in_transaction:
+                conn.rollback()
+            raise
+        else:
+            if conn.in_transaction:
+                conn.commit()
+
+    # ==================== 查詢與寫入 ====================
+
+    def query(self, sql: str, params: Sequence[Any] = ()) -> List[tuple]:
+        """執行查詢並返回所有列"""
+        with self.connection() as conn:
+            return conn.execute(sql, params).fetchall()
+
+    def query_one(self, sql: str, params: Sequence[Any] = ()) -> Optional[tuple]:
+        """執行查詢並返回第一列"""
+        with self.connection() as conn:
+            return conn.execute(sql, params).fetchone()
+
+    def execute(self, sql: str, params: Sequence[Any] = ()) -> sqlite3.Cursor:
+        """執行單一寫入語句並提交，返回游標（可讀取 lastrowid / rowcount）"""
+        with self.connection() as conn:
+            return conn.execute(sql, params)
+
+    def executemany(self, sql: str, seq_of_params: Iterable[Sequence[Any]]) -> int:
+        """以同一語句批次寫入並提交，返回影響列數"""
+        with self.connection() as conn:
+            return conn.executemany(sql, seq_of_params).rowcount
+
+    # ==================== 寫入佇列 ====================
+
+    def submit(self, sql: str, params: Sequence[Any] = ()):
+        """將寫入交給寫入執行緒批次提交（不等待完成）"""
+        self._ensure_writer()
+        self._write_queue.put((sql, params, False))
+        self.stats["queued_writes"] += 1
+
+    def submit_many(self, sql: str, seq_of_params: Iterable[Sequence[Any]]):
+        """將同一語句的多筆寫入交給寫入執行緒"""
+        seq_of_params = list(seq_of_params)
+        if not seq_of_params:
+            return
+        self._ensure_writer()
+        self._write_queue.put((sql, seq_of_params, True))
+        self.stats["queued_writes"] += len(seq_of_params)
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """等待目前佇列中的寫入全部提交"""
+        if self._writer is None or not self._writer.is_alive():
+            return self._write_queue.empty()
+        marker = threading.Event()
+        self._write_queue.put(marker)
+        return marker.wait(timeout)
+
+    def _ensure_writer(self):
+        if self._writer is not None and self._writer.is_alive():
+            return
+        with self._writer_lock:
+            if self._writer is None or not self._writer.is_alive():
+                self._writer = threading.Thread(target=self._writer_loop, name="TaskDatabaseWriter", daemon=True)
+                self._writer.start()
+
+    def _writer_loop(self):
+        while True:
+            item = self._write_queue.get()
+            if item is None:
+                return
+            batch = [item]
+            if self.write_batch_delay and isinstance(item, tuple):
+                time.sleep(self.write_batch_delay)
+            while len(batch) < self.write_batch_size:
+                try:
+                    batch.append(self._write_queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            stop = None in batch
+            self._apply_batch([entry for entry in batch if isinstance(entry, tuple)])
+            for entry in batch:
+                if isinstance(entry, threading.Event):
+                    entry.set()
+            if stop:
+                return
+
+    def _apply_batch(self, writes: List[Tuple[str, Any, bool]]):
+        if not writes:
+            return
+        try:
+            with self.connection() as conn:
+                for sql, params, is_many in writes:
+                    try:
+                        if is_many:
+                            conn.executemany(sql, params)
+                        else:
+                            conn.execute(sql, params)
+                    except sqlite3.Error as e:
+                        # 單一語句失敗只回滾該語句，不影響同批其他寫入
+                        self.stats["failed_writes"] += 1
+                        error_log(f"[TaskDatabase] 佇列寫入失敗：{e} ({sql.strip()[:60]})")
+            self.stats["write_batches"] += 1
+        except Exception as e:
+            self.stats["failed_writes"] += len(writes)
+            error_log(f"[TaskDatabase] 批次提交失敗：{e}")
+
+    # ==================== 生命週期 ====================
+
+    def close(self, timeout: float = 5.0):
+        """提交佇列中的寫入並關閉所有連線"""
+        if self._writer is not None and self._writer.is_alive():
+            self._write_queue.put(None)
+            self._writer.join(timeout)
+        self._writer = None
+        with self._connections_lock:
+            for _, conn in self._connections.values():
+                conn.close()
+            self._connections.clear()
+        self._local = threading.local()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """連線池與寫入佇列統計"""
+        with self._connections_lock:
+            open_connections = len(self._connections)
+        return {
+            **self.stats,
+            "open_connections": open_connections,
+            "pending_writes": self._write_queue.qsize(),
+            "path": self.path
+        }
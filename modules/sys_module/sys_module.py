@@ -137,6 +137,13 @@ class SYSModule(BaseModule):
         except Exception as e:
             error_log(f"[SYS] 啟動剪貼簿監控失敗: {e}")
         
+        # 啟動背景事件排程器（提醒、日曆 / 待辦通知、工作流檢查時間）
+        try:
+            from modules.sys_module.actions.automation_helper import get_background_scheduler
+            get_background_scheduler().start()
+        except Exception as e:
+            error_log(f"[SYS] 啟動背景事件排程器失敗: {e}")
+        
         info_log("[SYS] 初始化完成，啟用模式：" + ", ".join(self.enabled_modes))
         return True
     
@@ -214,6 +221,16 @@ class SYSModule(BaseModule):
             # 關閉線程池
             monitoring_pool.shutdown(wait=False, timeout=5)
             
+            # 停止背景事件排程器
+            from modules.sys_module.actions.automation_helper import get_background_scheduler
+            scheduler = get_background_scheduler()
+            if scheduler.is_running:
+                scheduler.stop(timeout=5)
+            
+            # 監控與排程都停止後，提交寫入佇列並關閉任務資料庫連線
+            from modules.sys_module.actions.automation_helper import close_task_database
+            close_task_database(timeout=5)
+            
             info_log("[SYS] 模組已關閉")
             
         except Exception as e:
@@ -702,13 +719,10 @@ class SYSModule(BaseModule):
         
         # 將 initial_data 添加到 session，根據 YAML 的 maps_to_step 映射參數名
         if initial_data:
-            # 載入 workflow_definitions.yaml 獲取參數映射
+            # 從 workflow_definitions.yaml（快取）獲取參數映射
             try:
-                from pathlib import Path
-                import yaml
-                yaml_path = Path(__file__).parent / "workflows" / "workflow_definitions.yaml"
-                with open(yaml_path, 'r', encoding='utf-8') as f:
-                    workflow_defs = yaml.safe_load(f).get('workflows', {})
+                from modules.sys_module.workflows.workflow_registry import get_workflow_definitions
+                workflow_defs = get_workflow_definitions()
                 
                 # 獲取當前工作流的參數映射
                 workflow_def = workflow_defs.get(workflow_type, {})
@@ -820,14 +834,15 @@ class SYSModule(BaseModule):
             # 如果是背景模式，提交到 SYS 模組的背景工作流執行器
             if workflow_mode == WorkflowMode.BACKGROUND:
                 try:
-                    from modules.sys_module.workflow_executor import get_workflow_executor
+                    from modules.sys_module.workflow_executor import get_workflow_executor, WorkflowPriority
                     executor = get_workflow_executor()
                     
-                    # 提交背景任務
+                    # 提交背景任務（優先級由工作流定義的 background_priority 元數據決定）
                     task_id = executor.submit_workflow(
                         workflow_engine=engine,
                         workflow_type=workflow_type,
                         session_id=session_id,
+                        priority=workflow_def.metadata.get("background_priority", WorkflowPriority.NORMAL),
                         metadata={
                             "command": command,
                             "initial_data": initial_data
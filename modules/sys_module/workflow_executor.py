@@ -6,14 +6,24 @@ modules/sys_module/workflow_executor.py
 與 MonitoringThreadPool 的區別：
 - WorkflowExecutor: 執行有限步驟的背景工作流（會完成）
 - MonitoringThreadPool: 持續運行的監控任務（無限循環）
+
+排程方式：
+- 優先級佇列：數字越小越先執行，同優先級依提交順序
+- 每種工作流類型的並行上限，避免單一類型佔滿所有工作線程
+- 取消權杖在步驟之間檢查，執行中的任務也能協作式取消
+- 每個任務記錄排隊時間、執行時間與 CPU 時間（含 DAG 模式步驟工作線程），可設定時間配額
+- 已結束任務只保留最近 max_history 筆
 """
 
+import heapq
+import itertools
 import threading
+import time
 import uuid
-from concurrent.futures import ThreadPoolExecutor
+from collections import deque
 from datetime import datetime
-from typing import Dict, Any, Optional
-from enum import Enum
+from typing import Dict, Any, List, Optional, Tuple
+from enum import Enum, IntEnum
 
 from utils.debug_helper import debug_log, info_log, error_log
 
@@ -27,18 +37,87 @@ class WorkflowStatus(str, Enum):
     CANCELLED = "cancelled"
 
 
+class WorkflowPriority(IntEnum):
+    """背景工作流優先級（數字越小越優先）"""
+    HIGH = 0
+    NORMAL = 10
+    LOW = 20
+
+
+class WorkflowCancelled(Exception):
+    """工作流在步驟之間發現已被取消"""
+
+
+class WorkflowQuotaExceeded(Exception):
+    """工作流超過時間配額"""
+
+
+class CancellationToken:
+    """協作式取消權杖，由執行器在每個步驟之間檢查"""
+
+    def __init__(self):
+        self._event = threading.Event()
+        self.reason: Optional[str] = None
+
+    def cancel(self, reason: str = "cancelled"):
+        self.reason = reason
+        self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def raise_if_cancelled(self):
+        if self._event.is_set():
+            raise WorkflowCancelled(self.reason or "cancelled")
+
+
+class LatencyHistogram:
+    """固定桶界的延遲直方圖（秒）"""
+
+    BOUNDS = (0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0)
+
+    def __init__(self):
+        self.counts = [0] * (len(self.BOUNDS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        index = len(self.BOUNDS)
+        for i, bound in enumerate(self.BOUNDS):
+            if value <= bound:
+                index = i
+                break
+        self.counts[index] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def snapshot(self) -> Dict[str, Any]:
+        buckets = {f"<={bound:g}s": count for bound, count in zip(self.BOUNDS, self.counts)}
+        buckets[f">{self.BOUNDS[-1]:g}s"] = self.counts[-1]
+        return {
+            "count": self.count,
+            "avg": self.total / self.count if self.count else 0.0,
+            "max": self.max,
+            "buckets": buckets
+        }
+
+
 class BackgroundWorkflowExecutor:
     """
     背景工作流執行器
-    
+
     用於在背景線程中執行 BACKGROUND 模式的工作流。
     只負責執行工作流步驟，不負責監控任務。
     """
-    
+
     _instance = None
     _lock = threading.Lock()
-    
-    def __new__(cls):
+
+    def __new__(cls, *args, **kwargs):
         """單例模式"""
         if cls._instance is None:
             with cls._lock:
@@ -46,224 +125,482 @@ class BackgroundWorkflowExecutor:
                     cls._instance = super().__new__(cls)
                     cls._instance._initialized = False
         return cls._instance
-    
-    def __init__(self):
-        """初始化執行器"""
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        """
+        初始化執行器
+
+        Args:
+            config: 執行器設定（對應 sys_module config.yaml 的 background_executor 區段）
+                max_workers: 工作線程數
+                default_type_limit: 每種工作流類型預設的並行上限
+                type_limits: {workflow_type: 並行上限}
+                max_history: 保留的已結束任務數
+                max_iterations: 單一工作流最多執行的步驟數
+                max_wall_time / max_cpu_time: 預設時間配額（秒），None 表示不限
+        """
         if self._initialized:
             return
-        
-        self.executor = ThreadPoolExecutor(
-            max_workers=5,
-            thread_name_prefix="WorkflowBG"
-        )
+
+        config = config or {}
+        self.max_workers = int(config.get("max_workers", 5))
+        self.default_type_limit = int(config.get("default_type_limit", self.max_workers))
+        self.type_limits: Dict[str, int] = dict(config.get("type_limits") or {})
+        self.max_history = int(config.get("max_history", 100))
+        self.max_iterations = int(config.get("max_iterations", 100))
+        self.default_max_wall_time: Optional[float] = config.get("max_wall_time")
+        self.default_max_cpu_time: Optional[float] = config.get("max_cpu_time")
+
         self.active_workflows: Dict[str, Dict[str, Any]] = {}  # task_id -> task_info
+
+        self._cond = threading.Condition(threading.Lock())
+        self._queue: List[Tuple[int, int, str]] = []  # (priority, seq, task_id)
+        self._seq = itertools.count()
+        self._engines: Dict[str, Any] = {}
+        self._tokens: Dict[str, CancellationToken] = {}
+        self._running_by_type: Dict[str, int] = {}
+        self._finished: deque = deque()
+        self._workers: List[threading.Thread] = []
+        self._shutdown = False
+
+        self._histograms = {"queue_wait": LatencyHistogram(), "run_time": LatencyHistogram()}
+        self._type_histograms: Dict[str, Dict[str, LatencyHistogram]] = {}
+        self.stats = {"submitted": 0, "completed": 0, "failed": 0, "cancelled": 0, "evicted": 0}
         self._initialized = True
-        
-        info_log("[WorkflowExecutor] 背景工作流執行器已初始化（max_workers=5）")
-    
+
+        info_log(f"[WorkflowExecutor] 背景工作流執行器已初始化（max_workers={self.max_workers}，"
+                 f"每類型上限 {self.default_type_limit}）")
+
     def submit_workflow(
         self,
         workflow_engine,
         workflow_type: str,
         session_id: Optional[str] = None,
-        metadata: Optional[Dict[str, Any]] = None
+        metadata: Optional[Dict[str, Any]] = None,
+        priority: int = WorkflowPriority.NORMAL,
+        max_wall_time: Optional[float] = None,
+        max_cpu_time: Optional[float] = None
     ) -> str:
         """
         提交工作流到背景執行
-        
+
         Args:
             workflow_engine: WorkflowEngine 實例
             workflow_type: 工作流類型
             session_id: 會話 ID（可選）
             metadata: 額外元數據
-            
+            priority: 優先級（數字越小越優先，見 WorkflowPriority）
+            max_wall_time: 執行時間配額（秒），預設使用執行器設定
+            max_cpu_time: CPU 時間配額（秒，含 DAG 步驟工作線程），預設使用執行器設定
+
         Returns:
             task_id: 任務唯一識別碼
         """
         # 生成唯一任務 ID
         task_id = f"workflow_{workflow_type}_{uuid.uuid4().hex[:8]}"
-        
+
         # 記錄任務信息
         task_info = {
             "task_id": task_id,
             "workflow_type": workflow_type,
             "session_id": session_id,
             "status": WorkflowStatus.QUEUED,
+            "priority": int(priority),
+            "submit_time": datetime.now(),
             "start_time": None,
             "end_time": None,
             "result": None,
             "error": None,
-            "metadata": metadata or {}
+            "metadata": metadata or {},
+            "cancel_requested": False,
+            "steps": 0,
+            "queue_wait": None,
+            "wall_time": None,
+            "cpu_time": 0.0,
+            "max_wall_time": max_wall_time if max_wall_time is not None else self.default_max_wall_time,
+            "max_cpu_time": max_cpu_time if max_cpu_time is not None else self.default_max_cpu_time,
+            "_submitted_at": time.monotonic()
         }
-        
-        self.active_workflows[task_id] = task_info
-        
-        # 定義執行函數
-        def execute_workflow():
-            """在背景線程中執行工作流"""
-            try:
-                # 更新狀態
+
+        token = CancellationToken()
+        # 讓長步驟也能自行檢查取消狀態
+        try:
+            workflow_engine.cancel_token = token
+        except AttributeError:
+            pass
+
+        with self._cond:
+            if self._shutdown:
+                raise RuntimeError("背景工作流執行器已關閉")
+            self.active_workflows[task_id] = task_info
+            self._engines[task_id] = workflow_engine
+            self._tokens[task_id] = token
+            heapq.heappush(self._queue, (int(priority), next(self._seq), task_id))
+            self.stats["submitted"] += 1
+            self._ensure_workers()
+            self._cond.notify()
+
+        info_log(f"[WorkflowExecutor] 已提交背景工作流: {workflow_type} (task_id: {task_id}, 優先級 {int(priority)})")
+        return task_id
+
+    # ==================== 排程 ====================
+
+    def set_type_limit(self, workflow_type: str, limit: Optional[int]):
+        """設定（或以 None 移除）某種工作流類型的並行上限"""
+        with self._cond:
+            if limit is None:
+                self.type_limits.pop(workflow_type, None)
+            else:
+                self.type_limits[workflow_type] = max(1, int(limit))
+            self._cond.notify_all()
+
+    def _type_limit(self, workflow_type: str) -> int:
+        return self.type_limits.get(workflow_type, self.default_type_limit)
+
+    def _ensure_workers(self):
+        """依需要建立工作線程（呼叫者持有鎖）"""
+        self._workers = [worker for worker in self._workers if worker.is_alive()]
+        while len(self._workers) < self.max_workers:
+            worker = threading.Thread(
+                target=self._worker_loop,
+                name=f"WorkflowBG-{len(self._workers)}",
+                daemon=True
+            )
+            self._workers.append(worker)
+            worker.start()
+
+    def _next_runnable(self) -> Optional[str]:
+        """取出優先級最高、且類型未達並行上限的任務（呼叫者持有鎖）"""
+        skipped = []
+        found = None
+        while self._queue:
+            entry = heapq.heappop(self._queue)
+            task_info = self.active_workflows.get(entry[2])
+            if task_info is None or task_info["status"] != WorkflowStatus.QUEUED:
+                continue  # 已取消或已被清除
+            workflow_type = task_info["workflow_type"]
+            if self._running_by_type.get(workflow_type, 0) >= self._type_limit(workflow_type):
+                skipped.append(entry)
+                continue
+            found = entry[2]
+            break
+        for entry in skipped:
+            heapq.heappush(self._queue, entry)
+        return found
+
+    def _worker_loop(self):
+        while True:
+            with self._cond:
+                task_id = None
+                while not self._shutdown:
+                    task_id = self._next_runnable()
+                    if task_id is not None:
+                        break
+                    self._cond.wait()
+                if task_id is None:
+                    return
+
+                task_info = self.active_workflows[task_id]
+                workflow_type = task_info["workflow_type"]
+                self._running_by_type[workflow_type] = self._running_by_type.get(workflow_type, 0) + 1
                 task_info["status"] = WorkflowStatus.RUNNING
                 task_info["start_time"] = datetime.now()
-                
-                info_log(f"[WorkflowExecutor] 開始執行背景工作流: {task_id}")
-                
-                # 執行工作流引擎（自動推進模式）
-                max_iterations = 100  # 防止無限循環
-                iteration = 0
-                final_result = None
-                
-                while iteration < max_iterations:
-                    iteration += 1
-                    
-                    # 處理當前步驟（空輸入，自動模式）
-                    step_result = workflow_engine.process_input("")
-                    
-                    # 檢查是否完成
-                    if step_result.complete:
-                        final_result = step_result
-                        break
-                    elif step_result.cancel:
-                        raise Exception(f"工作流被取消: {step_result.message}")
-                    elif not step_result.success:
-                        raise Exception(f"工作流步驟失敗: {step_result.message}")
-                    
-                    # 檢查當前步驟是否需要用戶輸入
-                    current_step = workflow_engine.get_current_step()
-                    if current_step and current_step.step_type == current_step.STEP_TYPE_INTERACTIVE:
-                        # 背景工作流不應該有互動步驟
-                        raise Exception(f"背景工作流不能有互動步驟: {current_step.id}")
-                
-                if iteration >= max_iterations:
-                    raise Exception("工作流超過最大迭代次數（可能是無限循環）")
-                
-                # 成功完成
-                task_info["status"] = WorkflowStatus.COMPLETED
-                task_info["end_time"] = datetime.now()
-                task_info["result"] = final_result.data if final_result else {}
-                
-                # 🔧 提取已執行的步驟列表
-                step_history = workflow_engine.session.get_data("step_history", [])
-                completed_steps = [step["step_id"] for step in step_history if "step_id" in step]
-                
-                info_log(f"[WorkflowExecutor] 工作流完成: {task_id}（執行了 {iteration} 步）")
-                info_log(f"[WorkflowExecutor] 完成的步驟: {completed_steps}")
-                
-                # 發布完成事件
-                try:
-                    from core.event_bus import event_bus, SystemEvent
-                    if event_bus:
-                        event_bus.publish(
-                            SystemEvent.BACKGROUND_WORKFLOW_COMPLETED,
-                            {
-                                "task_id": task_id,
-                                "workflow_type": workflow_type,
-                                "session_id": session_id,
-                                "result": task_info["result"],
-                                "completed_steps": completed_steps  # ✅ 包含已完成步驟列表
-                            },
-                            source="sys"
-                        )
-                except Exception as e:
-                    error_log(f"[WorkflowExecutor] 發布完成事件失敗: {e}")
-                
-            except Exception as e:
-                # 執行失敗
-                task_info["status"] = WorkflowStatus.FAILED
-                task_info["end_time"] = datetime.now()
-                task_info["error"] = str(e)
-                
-                error_log(f"[WorkflowExecutor] 工作流失敗: {task_id}, 錯誤: {e}")
-                
-                # 發布失敗事件
-                try:
-                    from core.event_bus import event_bus, SystemEvent
-                    if event_bus:
-                        event_bus.publish(
-                            SystemEvent.BACKGROUND_WORKFLOW_FAILED,
-                            {
-                                "task_id": task_id,
-                                "workflow_type": workflow_type,
-                                "session_id": session_id,
-                                "error": str(e)
-                            },
-                            source="sys"
-                        )
-                except Exception as event_error:
-                    error_log(f"[WorkflowExecutor] 發布失敗事件失敗: {event_error}")
-        
-        # 提交到線程池
-        self.executor.submit(execute_workflow)
+                task_info["queue_wait"] = time.monotonic() - task_info["_submitted_at"]
+                self._observe("queue_wait", workflow_type, task_info["queue_wait"])
+                engine = self._engines[task_id]
+                token = self._tokens[task_id]
+
+            try:
+                self._execute(task_info, engine, token)
+            finally:
+                with self._cond:
+                    self._running_by_type[workflow_type] -= 1
+                    self._engines.pop(task_id, None)
+                    self._tokens.pop(task_id, None)
+                    self._cond.notify_all()
+
+    # ==================== 執行 ====================
+
+    def _execute(self, task_info: Dict[str, Any], workflow_engine, token: CancellationToken):
+        """在工作線程中執行工作流，步驟之間檢查取消與時間配額"""
+        task_id = task_info["task_id"]
+        workflow_type = task_info["workflow_type"]
+        session_id = task_info["session_id"]
+        started = time.monotonic()
+        cpu_started = time.thread_time()
+        worker_cpu_started = self._worker_cpu_time(workflow_engine)
         
-        info_log(f"[WorkflowExecutor] 已提交背景工作流: {workflow_type} (task_id: {task_id})")
-        return task_id
-    
-    def get_task_status(self, task_id: str) -> Optional[Dict[str, Any]]:
+        def cpu_used() -> float:
+            # 本線程的 CPU 時間加上引擎在 DAG 工作線程中執行步驟的 CPU 時間
+            return (time.thread_time() - cpu_started
+                    + self._worker_cpu_time(workflow_engine) - worker_cpu_started)
+
+        try:
+            info_log(f"[WorkflowExecutor] 開始執行背景工作流: {task_id}")
+
+            # 執行工作流引擎（自動推進模式）
+            iteration = 0
+            final_result = None
+
+            while iteration < self.max_iterations:
+                token.raise_if_cancelled()
+                self._check_quota(task_info, started, cpu_used())
+                iteration += 1
+                task_info["steps"] = iteration
+
+                # 處理當前步驟（空輸入，自動模式）
+                step_result = workflow_engine.process_input("")
+                task_info["cpu_time"] = cpu_used()
+                # 引擎在自動推進途中看到取消時會返回取消結果，這裡統一視為協作式取消
+                token.raise_if_cancelled()
+
+                # 檢查是否完成
+                if step_result.complete:
+                    final_result = step_result
+                    break
+                elif step_result.cancel:
+                    raise Exception(f"工作流被取消: {step_result.message}")
+                elif not step_result.success:
+                    raise Exception(f"工作流步驟失敗: {step_result.message}")
+
+                # 檢查當前步驟是否需要用戶輸入
+                current_step = workflow_engine.get_current_step()
+                if current_step and current_step.step_type == current_step.STEP_TYPE_INTERACTIVE:
+                    # 背景工作流不應該有互動步驟
+                    raise Exception(f"背景工作流不能有互動步驟: {current_step.id}")
+
+            if final_result is None:
+                raise Exception("工作流超過最大迭代次數（可能是無限循環）")
+
+            # 成功完成
+            task_info["result"] = final_result.data if final_result else {}
+            self._finish(task_info, WorkflowStatus.COMPLETED, started, cpu_used())
+
+            # 🔧 提取已執行的步驟列表
+            step_history = workflow_engine.session.get_data("step_history", [])
+            completed_steps = [step["step_id"] for step in step_history if "step_id" in step]
+
+            info_log(f"[WorkflowExecutor] 工作流完成: {task_id}（執行了 {iteration} 步，"
+                     f"{task_info['wall_time']:.2f}s / CPU {task_info['cpu_time']:.2f}s）")
+            info_log(f"[WorkflowExecutor] 完成的步驟: {completed_steps}")
+
+            # 發布完成事件
+            try:
+                from core.event_bus import event_bus, SystemEvent
+                if event_bus:
+                    event_bus.publish(
+                        SystemEvent.BACKGROUND_WORKFLOW_COMPLETED,
+                        {
+                            "task_id": task_id,
+                            "workflow_type": workflow_type,
+                            "session_id": session_id,
+                            "result": task_info["result"],
+                            "completed_steps": completed_steps  # ✅ 包含已完成步驟列表
+                        },
+                        source="sys"
+                    )
+            except Exception as e:
+                error_log(f"[WorkflowExecutor] 發布完成事件失敗: {e}")
+
+        except WorkflowCancelled as e:
+            # 協作式取消：不視為失敗，也不發布失敗事件
+            task_info["error"] = str(e)
+            self._finish(task_info, WorkflowStatus.CANCELLED, started, cpu_used())
+            info_log(f"[WorkflowExecutor] 工作流已取消: {task_id}（完成 {task_info['steps'] - 1} 步）")
+
+        except Exception as e:
+            # 執行失敗
+            task_info["error"] = str(e)
+            self._finish(task_info, WorkflowStatus.FAILED, started, cpu_used())
+
+            error_log(f"[WorkflowExecutor] 工作流失敗: {task_id}, 錯誤: {e}")
+
+            # 發布失敗事件
+            try:
+                from core.event_bus import event_bus, SystemEvent
+                if event_bus:
+                    event_bus.publish(
+                        SystemEvent.BACKGROUND_WORKFLOW_FAILED,
+                        {
+                            "task_id": task_id,
+                            "workflow_type": workflow_type,
+                            "session_id": session_id,
+                            "error": str(e)
+                        },
+                        source="sys"
+                    )
+            except Exception as event_error:
+                error_log(f"[WorkflowExecutor] 發布失敗事件失敗: {event_error}")
+
+    @staticmethod
+    def _worker_cpu_time(workflow_engine) -> float:
+        """引擎在 DAG 工作線程中累計的步驟 CPU 時間（不支援的引擎視為 0）"""
+        value = getattr(workflow_engine, "worker_cpu_time", 0.0)
+        return float(value) if isinstance(value, (int, float)) else 0.0
+
+    @staticmethod
+    def _check_quota(task_info: Dict[str, Any], started: float, cpu_time: float):
+        """檢查時間配額（在步驟之間呼叫，無法中斷正在執行的步驟）"""
+        max_wall_time = task_info.get("max_wall_time")
+        if max_wall_time is not None and time.monotonic() - started > max_wall_time:
+            raise WorkflowQuotaExceeded(f"超過執行時間配額 {max_wall_time}s")
+        max_cpu_time = task_info.get("max_cpu_time")
+        if max_cpu_time is not None and cpu_time > max_cpu_time:
+            raise WorkflowQuotaExceeded(f"超過 CPU 時間配額 {max_cpu_time}s")
+
+    def _finish(self, task_info: Dict[str, Any], status: WorkflowStatus, started: float, cpu_time: float):
+        """記錄結束狀態與耗時"""
+        with self._cond:
+            task_info["wall_time"] = time.monotonic() - started
+            task_info["cpu_time"] = cpu_time
+            self._observe("run_time", task_info["workflow_type"], task_info["wall_time"])
+            self._mark_finished(task_info, status)
+
+    def _mark_finished(self, task_info: Dict[str, Any], status: WorkflowStatus):
+        """標記任務結束，並限制保留的已結束任務數（呼叫者持有鎖）"""
+        task_info["status"] = status
+        task_info["end_time"] = datetime.now()
+        self.stats[status.value] += 1
+        self._finished.append(task_info["task_id"])
+        self._trim_history(self.max_history)
+
+    def _observe(self, name: str, workflow_type: str, value: float):
+        """記錄直方圖（呼叫者持有鎖）"""
+        self._histograms[name].observe(value)
+        per_type = self._type_histograms.setdefault(
+            workflow_type, {"queue_wait": LatencyHistogram(), "run_time": LatencyHistogram()}
+        )
+        per_type[name].observe(value)
+
+    def _trim_history(self, max_history: int):
+        """移除最舊的已結束任務（呼叫者持有鎖）"""
+        removed = 0
+        while len(self._finished) > max_history:
+            task_id = self._finished.popleft()
+            if self.active_workflows.pop(task_id, None) is not None:
+                removed += 1
+                debug_log(3, f"[WorkflowExecutor] 清理舊任務: {task_id}")
+        self.stats["evicted"] += removed
+        return removed
+
+    # ==================== 查詢與控制 ====================
+
+    def get_task_status(self, task_id: Optional[str] = None) -> Optional[Dict[str, Any]]:
         """
         獲取任務狀態
-        
+
         Args:
-            task_id: 任務 ID
-            
+            task_id: 任務 ID；未指定時返回執行器總覽（佇列、各類型執行數與直方圖）
+
         Returns:
-            任務信息字典，如果不存在則返回 None
+            任務信息字典（含 queue_wait / wall_time / cpu_time），如果不存在則返回 None
         """
-        return self.active_workflows.get(task_id)
-    
-    def cancel_task(self, task_id: str) -> bool:
+        with self._cond:
+            if task_id is None:
+                return self._overview()
+            task_info = self.active_workflows.get(task_id)
+            if task_info is None:
+                return None
+            return {key: value for key, value in task_info.items() if not key.startswith("_")}
+
+    def _overview(self) -> Dict[str, Any]:
+        """執行器總覽（呼叫者持有鎖）"""
+        queued = sum(1 for task in self.active_workflows.values() if task["status"] == WorkflowStatus.QUEUED)
+        return {
+            "queued": queued,
+            "running": sum(self._running_by_type.values()),
+            "running_by_type": {k: v for k, v in self._running_by_type.items() if v},
+            "max_workers": self.max_workers,
+            "type_limits": {"default": self.default_type_limit, **self.type_limits},
+            "retained_tasks": len(self.active_workflows),
+            "stats": dict(self.stats),
+            "histograms": {name: hist.snapshot() for name, hist in self._histograms.items()},
+            "histograms_by_type": {
+                workflow_type: {name: hist.snapshot() for name, hist in hists.items()}
+                for workflow_type, hists in self._type_histograms.items()
+            }
+        }
+
+    def cancel_task(self, task_id: str, reason: str = "cancelled") -> bool:
         """
-        取消任務（注意：無法強制停止正在運行的線程）
-        
+        取消任務
+
+        排隊中的任務立即標記為取消；執行中的任務會在目前步驟結束後停止。
+
         Args:
             task_id: 任務 ID
-            
+            reason: 取消原因
+
         Returns:
-            是否成功標記為取消
+            是否成功取消（或已送出取消請求）
         """
-        if task_id not in self.active_workflows:
-            debug_log(2, f"[WorkflowExecutor] 任務不存在: {task_id}")
-            return False
-        
-        task_info = self.active_workflows[task_id]
-        
-        # 只能取消 QUEUED 或 RUNNING 狀態的任務
-        if task_info["status"] not in [WorkflowStatus.QUEUED, WorkflowStatus.RUNNING]:
-            debug_log(2, f"[WorkflowExecutor] 任務狀態不允許取消: {task_info['status']}")
-            return False
-        
-        # 更新狀態
-        task_info["status"] = WorkflowStatus.CANCELLED
-        task_info["end_time"] = datetime.now()
-        
-        info_log(f"[WorkflowExecutor] 已標記任務為取消: {task_id}")
+        with self._cond:
+            task_info = self.active_workflows.get(task_id)
+            if task_info is None:
+                debug_log(2, f"[WorkflowExecutor] 任務不存在: {task_id}")
+                return False
+
+            # 只能取消 QUEUED 或 RUNNING 狀態的任務
+            status = task_info["status"]
+            if status not in [WorkflowStatus.QUEUED, WorkflowStatus.RUNNING]:
+                debug_log(2, f"[WorkflowExecutor] 任務狀態不允許取消: {status}")
+                return False
+
+            task_info["cancel_requested"] = True
+            token = self._tokens.get(task_id)
+            if token is not None:
+                token.cancel(reason)
+
+            if status == WorkflowStatus.QUEUED:
+                # 尚未開始：直接結束，佇列中的項目在取出時略過
+                task_info["error"] = reason
+                self._mark_finished(task_info, WorkflowStatus.CANCELLED)
+                self._engines.pop(task_id, None)
+                self._tokens.pop(task_id, None)
+
+        if status == WorkflowStatus.QUEUED:
+            info_log(f"[WorkflowExecutor] 已取消排隊中的任務: {task_id}")
+        else:
+            info_log(f"[WorkflowExecutor] 已要求取消執行中的任務: {task_id}（將於目前步驟結束後停止）")
         return True
-    
+
     def cleanup_completed_tasks(self, max_history: int = 100):
         """
         清理已完成的任務
-        
+
         Args:
             max_history: 保留的最大歷史記錄數量
         """
-        # 獲取已完成的任務
-        completed_tasks = [
-            task for task in self.active_workflows.values()
-            if task["status"] in [WorkflowStatus.COMPLETED, WorkflowStatus.FAILED, WorkflowStatus.CANCELLED]
-        ]
-        
-        if len(completed_tasks) <= max_history:
-            return
-        
-        # 按結束時間排序（最舊的在前）
-        completed_tasks.sort(key=lambda t: t["end_time"] or datetime.min)
-        
-        # 移除最舊的任務
-        tasks_to_remove = completed_tasks[:len(completed_tasks) - max_history]
-        for task in tasks_to_remove:
-            del self.active_workflows[task["task_id"]]
-            debug_log(3, f"[WorkflowExecutor] 清理舊任務: {task['task_id']}")
-        
-        debug_log(2, f"[WorkflowExecutor] 清理了 {len(tasks_to_remove)} 個舊任務")
+        with self._cond:
+            removed = self._trim_history(max_history)
+        if removed:
+            debug_log(2, f"[WorkflowExecutor] 清理了 {removed} 個舊任務")
+
+    def shutdown(self, cancel_running: bool = True, timeout: float = 5.0):
+        """
+        關閉執行器：取消排隊中的任務，並可選擇要求執行中的任務停止
+
+        Args:
+            cancel_running: 是否對執行中的任務送出取消請求
+            timeout: 等待工作線程結束的秒數
+        """
+        with self._cond:
+            pending = [task_id for task_id, task in self.active_workflows.items()
+                       if task["status"] in (WorkflowStatus.QUEUED, WorkflowStatus.RUNNING)]
+        for task_id in pending:
+            task_info = self.active_workflows.get(task_id)
+            if task_info is None:
+                continue
+            if task_info["status"] == WorkflowStatus.QUEUED or cancel_running:
+                self.cancel_task(task_id, reason="executor shutdown")
+
+        with self._cond:
+            self._shutdown = True
+            self._cond.notify_all()
+            workers = list(self._workers)
+        deadline = time.monotonic() + timeout
+        for worker in workers:
+            worker.join(max(0.0, deadline - time.monotonic()))
 
 
 # 全局實例
@@ -272,13 +609,19 @@ _executor = None
 def get_workflow_executor() -> BackgroundWorkflowExecutor:
     """
     獲取全局背景工作流執行器實例
-    
+
     Returns:
         BackgroundWorkflowExecutor 實例
     """
     global _executor
-    
+
     if _executor is None:
-        _executor = BackgroundWorkflowExecutor()
-    
+        try:
+            from configs.config_loader import load_module_config
+            config = load_module_config("sys_module").get("background_executor", {})
+        except Exception as e:
+            error_log(f"[WorkflowExecutor] 讀取執行器設定失敗，使用預設值: {e}")
+            config = {}
+        _executor = BackgroundWorkflowExecutor(config)
+
     return _executor
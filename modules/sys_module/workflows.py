@@ -20,7 +20,10 @@ import os
 import inspect
 import datetime
 import time
+import threading
 from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from types import MappingProxyType
 
 from core.sessions.session_manager import WorkflowSession
 from utils.debug_helper import info_log, error_log, debug_log
@@ -282,7 +285,221 @@ class WorkflowStep(ABC):
             "requirements": [(req.key, req.required) for req in self._requirements],
             "can_auto_advance": self.should_auto_advance()
         }
-        
+
+
+# 轉換索引的結果類型；_UNRESOLVED 表示步驟含條件轉換，需逐一評估
+_RESULT_SUCCESS = "success"
+_RESULT_FAILURE = "failure"
+_UNRESOLVED = object()
+
+
+class CompiledWorkflowGraph:
+    """
+    編譯後的工作流程圖（不可變，與會話無關）
+
+    步驟實例綁定各自的會話，所以每個會話都會重建 WorkflowDefinition；
+    但同類型工作流程的轉換結構相同，編譯一次即可按 workflow_type 在會話間共用：
+    - 轉換索引：(步驟 ID, 結果類型) -> 下一步驟（None 表示結束），O(1) 查詢
+    - 含條件函數的步驟不進索引，查詢時退回評估當前定義的轉換列表
+    - warnings：不可達步驟、無法到達結束的步驟、沒有出口的循環
+    """
+
+    __slots__ = ("workflow_type", "signature", "entry_point", "step_ids", "successors",
+                 "exits", "warnings", "transition_index", "_first_targets", "_conditional")
+
+    def __init__(self, workflow_type: str, signature: Tuple, entry_point: str,
+                 step_ids: Tuple[str, ...],
+                 transitions: Dict[str, Tuple[Tuple[str, bool], ...]]):
+        """
+        Args:
+            workflow_type: 工作流程類型
+            signature: 定義的結構簽名，用於判斷快取是否仍適用
+            entry_point: 入口步驟
+            step_ids: 所有步驟 ID
+            transitions: 步驟 ID -> ((目標步驟, 是否有條件), ...)
+        """
+        index: Dict[Tuple[str, str], Optional[str]] = {}
+        first_targets: Dict[str, Optional[str]] = {}
+        conditional: Set[str] = set()
+        successors: Dict[str, Tuple[str, ...]] = {}
+        exits: Set[str] = set()
+
+        for step_id in step_ids:
+            step_transitions = transitions.get(step_id, ())
+            first = step_transitions[0][0] if step_transitions else "END"
+            first_targets[step_id] = None if first == "END" else first
+            successors[step_id] = tuple(dict.fromkeys(
+                to_step for to_step, _ in step_transitions if to_step != "END"))
+
+            # 與逐一掃描相同的語意：遇到 END 或第一個無條件轉換即確定結果
+            target: Optional[str] = None
+            for to_step, has_condition in step_transitions:
+                if to_step == "END":
+                    break
+                if has_condition:
+                    conditional.add(step_id)
+                    break
+                target = to_step
+                break
+            if step_id in conditional or target is None:
+                # 條件全不成立、遇到 END 或沒有轉換時，工作流程在此結束
+                exits.add(step_id)
+            if step_id not in conditional:
+                index[(step_id, _RESULT_SUCCESS)] = target
+                index[(step_id, _RESULT_FAILURE)] = target
+
+        set_attr = object.__setattr__
+        set_attr(self, "workflow_type", workflow_type)
+        set_attr(self, "signature", signature)
+        set_attr(self, "entry_point", entry_point)
+        set_attr(self, "step_ids", step_ids)
+        set_attr(self, "successors", MappingProxyType(successors))
+        set_attr(self, "exits", frozenset(exits))
+        set_attr(self, "transition_index", MappingProxyType(index))
+        set_attr(self, "_first_targets", MappingProxyType(first_targets))
+        set_attr(self, "_conditional", frozenset(conditional))
+        set_attr(self, "warnings", tuple(self._analyze()))
+
+    def __setattr__(self, name: str, value: Any):
+        raise AttributeError("CompiledWorkflowGraph 為不可變物件")
+
+    def _analyze(self) -> List[str]:
+        """結構檢查：不可達步驟、無法到達結束的步驟、沒有出口的循環"""
+        warnings: List[str] = []
+
+        reachable = {self.entry_point}
+        pending = [self.entry_point]
+        while pending:
+            for to_step in self.successors[pending.pop()]:
+                if to_step not in reachable:
+                    reachable.add(to_step)
+                    pending.append(to_step)
+        unreachable = [step_id for step_id in self.step_ids if step_id not in reachable]
+        if unreachable:
+            warnings.append(f"不可達步驟（僅能透過 skip_to / next_step 進入）: {', '.join(unreachable)}")
+
+        predecessors: Dict[str, List[str]] = {step_id: [] for step_id in self.step_ids}
+        for step_id, targets in self.successors.items():
+            for to_step in targets:
+                predecessors[to_step].append(step_id)
+        can_finish = set(self.exits)
+        pending = list(self.exits)
+        while pending:
+            for from_step in predecessors[pending.pop()]:
+                if from_step not in can_finish:
+                    can_finish.add(from_step)
+                    pending.append(from_step)
+        dead_ends = [step_id for step_id in self.step_ids
+                     if step_id in reachable and step_id not in can_finish]
+        if dead_ends:
+            warnings.append(f"無法到達結束的步驟（僅能由步驟結果完成或取消）: {', '.join(dead_ends)}")
+
+        for component in self._strongly_connected(dead_ends):
+            warnings.append(f"沒有出口的循環: {' -> '.join(component)}")
+        return warnings
+
+    def _strongly_connected(self, step_ids: List[str]) -> List[List[str]]:
+        """Tarjan 演算法找出 step_ids 子圖中的循環（多步驟強連通分量或自我循環）"""
+        members = set(step_ids)
+        order: Dict[str, int] = {}
+        low: Dict[str, int] = {}
+        stack: List[str] = []
+        on_stack: Set[str] = set()
+        components: List[List[str]] = []
+
+        def visit(step_id: str):
+            order[step_id] = low[step_id] = len(order)
+            stack.append(step_id)
+            on_stack.add(step_id)
+            for to_step in self.successors[step_id]:
+                if to_step not in members:
+                    continue
+                if to_step not in order:
+                    visit(to_step)
+                    low[step_id] = min(low[step_id], low[to_step])
+                elif to_step in on_stack:
+                    low[step_id] = min(low[step_id], order[to_step])
+            if low[step_id] == order[step_id]:
+                component = []
+                while True:
+                    member = stack.pop()
+                    on_stack.discard(member)
+                    component.append(member)
+                    if member == step_id:
+                        break
+                if len(component) > 1 or step_id in self.successors[step_id]:
+                    components.append(sorted(component, key=step_ids.index))
+
+        for step_id in step_ids:
+            if step_id not in order:
+                visit(step_id)
+        return components
+
+    def first_target(self, step_id: str) -> Optional[str]:
+        """步驟的第一個轉換目標（不檢查條件），END 或沒有轉換時返回 None"""
+        return self._first_targets.get(step_id)
+
+    def get_info(self) -> Dict[str, Any]:
+        """獲取編譯結果摘要"""
+        return {
+            "workflow_type": self.workflow_type,
+            "entry_point": self.entry_point,
+            "steps": len(self.step_ids),
+            "indexed_steps": len(self.step_ids) - len(self._conditional),
+            "conditional_steps": sorted(self._conditional),
+            "exits": sorted(self.exits),
+            "warnings": list(self.warnings)
+        }
+
+
+# 編譯結果快取：workflow_type -> CompiledWorkflowGraph，結構簽名相同時在會話間共用
+_compiled_graphs: Dict[str, CompiledWorkflowGraph] = {}
+_compiled_graphs_lock = threading.Lock()
+_compile_stats = {"hits": 0, "misses": 0}
+
+
+def compile_workflow_definition(definition: 'WorkflowDefinition') -> CompiledWorkflowGraph:
+    """
+    編譯工作流程定義，同類型且結構相同的定義直接取用快取
+
+    Raises:
+        ValueError: 定義無效（缺少入口點、轉換目標不存在）
+    """
+    signature = definition.get_signature()
+    with _compiled_graphs_lock:
+        graph = _compiled_graphs.get(definition.workflow_type)
+        if graph is not None and graph.signature == signature:
+            _compile_stats["hits"] += 1
+            return graph
+
+    is_valid, error = definition.validate()
+    if not is_valid:
+        raise ValueError(f"工作流程定義無效: {error}")
+
+    step_ids, transitions = signature[1], signature[2]
+    graph = CompiledWorkflowGraph(definition.workflow_type, signature, definition.entry_point,
+                                  step_ids, dict(transitions))
+    for warning in graph.warnings:
+        debug_log(1, f"[WorkflowGraph] {definition.workflow_type}: {warning}")
+
+    with _compiled_graphs_lock:
+        _compiled_graphs[definition.workflow_type] = graph
+        _compile_stats["misses"] += 1
+    return graph
+
+
+def get_compiled_graph_stats() -> Dict[str, Any]:
+    """編譯快取統計"""
+    with _compiled_graphs_lock:
+        return {**_compile_stats, "cached_types": sorted(_compiled_graphs)}
+
+
+def clear_compiled_graphs():
+    """清空編譯快取（工作流程定義在執行期間被修改時使用）"""
+    with _compiled_graphs_lock:
+        _compiled_graphs.clear()
+
+
 class WorkflowDefinition:
     """工作流程定義類，包含步驟、轉換規則和元數據"""
     
@@ -311,10 +528,15 @@ class WorkflowDefinition:
         self.transitions: Dict[str, List[Tuple[str, Optional[Callable]]]] = {}
         self.entry_point: Optional[str] = None
         self.metadata: Dict[str, Any] = {}
+        # DAG 模式：步驟 ID -> 依賴的步驟 ID；max_parallel_steps > 1 時啟用並行執行
+        self.step_dependencies: Dict[str, Tuple[str, ...]] = {}
+        self.max_parallel_steps = 1
+        self._graph: Optional[CompiledWorkflowGraph] = None
         
     def add_step(self, step: WorkflowStep) -> 'WorkflowDefinition':
         """添加步驟"""
         self.steps[step.id] = step
+        self._graph = None
         return self
         
     def add_transition(self, from_step: str, to_step: str, 
@@ -330,11 +552,33 @@ class WorkflowDefinition:
         if from_step not in self.transitions:
             self.transitions[from_step] = []
         self.transitions[from_step].append((to_step, condition))
+        self._graph = None
         return self
         
     def set_entry_point(self, step_id: str) -> 'WorkflowDefinition':
         """設置入口點"""
         self.entry_point = step_id
+        self._graph = None
+        return self
+        
+    def add_step_dependencies(self, step_id: str, *depends_on: str) -> 'WorkflowDefinition':
+        """
+        宣告步驟的數據依賴（DAG 模式）
+        
+        宣告過的步驟只需等待 depends_on 的結果合併進會話即可開始，
+        可與轉換順序上前面的其他步驟並行；未宣告的步驟仍等待前面所有步驟完成
+        
+        Args:
+            step_id: 步驟 ID
+            depends_on: 依賴的步驟 ID（可為空，表示不依賴同批次的任何步驟）
+        """
+        self.step_dependencies[step_id] = tuple(depends_on)
+        self._graph = None
+        return self
+        
+    def enable_parallel_steps(self, max_workers: int = 4) -> 'WorkflowDefinition':
+        """啟用 DAG 模式：以最多 max_workers 個執行緒並行執行已就緒的非互動步驟"""
+        self.max_parallel_steps = max(1, max_workers)
         return self
         
     def set_metadata(self, key: str, value: Any) -> 'WorkflowDefinition':
@@ -352,7 +596,16 @@ class WorkflowDefinition:
         if result.cancel or result.complete:
             return None
             
-        # 檢查轉換規則
+        # 查詢編譯後的轉換索引，含條件函數的步驟才逐一評估
+        graph = self._graph or self.compile()
+        next_step = graph.transition_index.get(
+            (current_step, _RESULT_SUCCESS if result.success else _RESULT_FAILURE), _UNRESOLVED)
+        if next_step is _UNRESOLVED:
+            return self.match_transition(current_step, result)
+        return next_step
+        
+    def match_transition(self, current_step: str, result: StepResult) -> Optional[str]:
+        """依序評估步驟的轉換規則（含條件函數），返回第一個符合的目標"""
         if current_step in self.transitions:
             for to_step, condition in self.transitions[current_step]:
                 if to_step == "END":
@@ -376,8 +629,37 @@ class WorkflowDefinition:
                 if to_step != "END" and to_step not in self.steps:
                     return False, f"轉換目標步驟不存在: {to_step} (從 {from_step})"
         
+        # 檢查 DAG 模式的依賴宣告
+        for step_id, depends_on in self.step_dependencies.items():
+            if step_id not in self.steps:
+                return False, f"宣告依賴的步驟不存在: {step_id}"
+            for dependency in depends_on:
+                if dependency == step_id or dependency not in self.steps:
+                    return False, f"無效的步驟依賴: {step_id} -> {dependency}"
+        
         return True, ""
         
+    def get_signature(self) -> Tuple:
+        """結構簽名：入口點、步驟 ID、轉換（條件函數只記錄是否存在）與步驟依賴"""
+        return (
+            self.entry_point,
+            tuple(self.steps),
+            tuple((from_step, tuple((to_step, condition is not None) for to_step, condition in transitions))
+                  for from_step, transitions in self.transitions.items()),
+            tuple(self.step_dependencies.items())
+        )
+        
+    def compile(self) -> CompiledWorkflowGraph:
+        """
+        編譯工作流程定義（結果快取在定義上，並按 workflow_type 在會話間共用）
+        
+        Raises:
+            ValueError: 定義無效
+        """
+        if self._graph is None:
+            self._graph = compile_workflow_definition(self)
+        return self._graph
+        
     def get_info(self) -> Dict[str, Any]:
         """獲取工作流程信息"""
         return {
@@ -389,6 +671,8 @@ class WorkflowDefinition:
             "auto_advance_on_approval": self.auto_advance_on_approval,
             "steps": list(self.steps.keys()),
             "entry_point": self.entry_point,
+            "max_parallel_steps": self.max_parallel_steps,
+            "step_dependencies": {step_id: list(deps) for step_id, deps in self.step_dependencies.items()},
             "metadata": self.metadata
         }
 
@@ -419,10 +703,18 @@ class WorkflowEngine:
         self.executing_step_id = None
         self.step_execution_start_time = None
         
-        # 驗證工作流程定義
-        is_valid, error = self.definition.validate()
-        if not is_valid:
-            raise ValueError(f"工作流程定義無效: {error}")
+        # DAG 模式已執行但尚未被依序處理的步驟結果：步驟 ID -> StepResult（或執行時拋出的例外）
+        # 到達該步驟時直接取用，避免同一步驟的副作用重複發生；步驟重新執行時由 _discard_prefetched 清除
+        self._prefetched_results: Dict[str, Any] = {}
+        
+        # 背景執行器設置的取消權杖（需有 cancelled / reason），在自動推進的步驟之間檢查
+        self.cancel_token = None
+        
+        # DAG 模式工作線程執行步驟累計的 CPU 時間（秒），背景執行器計入 CPU 配額
+        self.worker_cpu_time = 0.0
+        
+        # 驗證並編譯工作流程定義（同類型的會話共用編譯結果）
+        self.definition.compile()
             
         # 初始化會話狀態
         if not self.session.get_data("current_step"):
@@ -509,12 +801,8 @@ class WorkflowEngine:
                 current_step_id = self.session.get_data("current_step")
                 
                 # ✅ 直接查詢轉換表，不使用 get_next_step（它會被 complete=True 阻擋）
-                next_step_id = None
-                if current_step_id in self.definition.transitions:
-                    transitions = self.definition.transitions[current_step_id]
-                    if transitions:
-                        # 取第一個轉換（不檢查條件，因為我們已經批准了）
-                        next_step_id = transitions[0][0] if transitions[0][0] != "END" else None
+                # 取第一個轉換（不檢查條件，因為我們已經批准了）
+                next_step_id = self.definition.compile().first_target(current_step_id)
                 
                 debug_log(2, f"[WorkflowEngine] 當前步驟: {current_step_id}, 下一步驟: {next_step_id}")
                 
@@ -533,6 +821,7 @@ class WorkflowEngine:
                             self.session.add_data("current_step", next_step_id)
                             
                             # 執行下一步
+                            self._discard_prefetched(next_step_id)
                             next_result = next_step.execute()
                             debug_log(2, f"[WorkflowEngine] 下一步執行結果: success={next_result.success}, complete={next_result.complete}")
                             
@@ -651,6 +940,8 @@ class WorkflowEngine:
             # 更新會話數據
             for key, value in modified_params.items():
                 self.session.add_data(key, value)
+            # 會話數據已被修改，先前預取的結果都可能基於舊輸入
+            self._prefetched_results.clear()
             
             # 重新執行當前步驟
             current_step = self.get_current_step()
@@ -962,6 +1253,9 @@ class WorkflowEngine:
         if not is_valid:
             return StepResult.failure(error)
         
+        # 當前步驟將重新執行（例如失敗後重試），丟棄它與依賴它的步驟的預取結果
+        self._discard_prefetched(current_step.id)
+        
         # 🔧 特殊處理：LLM_PROCESSING 步驟
         debug_log(3, f"[WorkflowEngine] 檢查步驟類型: {current_step.step_type}, 是否為LLM_PROCESSING: {current_step.step_type == current_step.STEP_TYPE_LLM_PROCESSING}")
         if current_step.step_type == current_step.STEP_TYPE_LLM_PROCESSING:
@@ -1222,6 +1516,8 @@ class WorkflowEngine:
             if current_step.step_type not in (current_step.STEP_TYPE_PROCESSING, current_step.STEP_TYPE_LLM_PROCESSING):
                 # 非處理步驟不應該進入這個方法
                 return current_result
+            
+            self._discard_prefetched(current_step_id)
                 
             # 🔧 特殊處理：LLM_PROCESSING 步驟
             if current_step.step_type == current_step.STEP_TYPE_LLM_PROCESSING:
@@ -1315,10 +1611,13 @@ class WorkflowEngine:
         """自動推進工作流程"""
         auto_steps = 0
         current_result = last_result
-        
         debug_log(2, f"[WorkflowEngine] [_auto_advance] 開始自動推進，最大步驟數: {self.max_auto_steps}")
         
         while auto_steps < self.max_auto_steps:
+            if self._is_cancel_requested():
+                debug_log(2, f"[WorkflowEngine] [_auto_advance] 收到取消請求，停止推進")
+                return StepResult.cancel_workflow(f"工作流已取消: {self.cancel_token.reason}")
+            
             current_step_id = self.session.get_data("current_step")
             debug_log(2, f"[WorkflowEngine] [_auto_advance] 循環 {auto_steps}: 當前步驟ID = {current_step_id}")
             
@@ -1416,8 +1715,20 @@ class WorkflowEngine:
             if prompt and prompt.strip() and prompt != "處理中...":
                 print(f"🔄 {prompt}")
                 
+            # 🆕 DAG 模式：從當前步驟起並行執行後續已宣告依賴的步驟，結果仍按步驟順序在下面逐一處理
+            if current_step_id not in self._prefetched_results:
+                # 重新進入的步驟（循環、跳回）會重新執行，依賴它的步驟的預取結果已過時
+                self._discard_prefetched(current_step_id)
+                parallel_run = self._plan_parallel_run(current_step_id)
+                if parallel_run:
+                    self._execute_parallel_run(parallel_run)
+            
             # 執行當前步驟（所有步驟統一處理，包括 LLM_PROCESSING）
-            step_result = current_step.execute()
+            step_result = self._prefetched_results.pop(current_step_id, None)
+            if step_result is None:
+                step_result = current_step.execute()
+            elif isinstance(step_result, Exception):
+                raise step_result
             
             # 🔧 檢查是否需要等待 LLM 處理
             if step_result.llm_review_data and step_result.llm_review_data.get("requires_llm_processing"):
@@ -1491,11 +1802,155 @@ class WorkflowEngine:
                 return step_result
                 
         return current_result
+    
+    @staticmethod
+    def _is_plain_success(result: StepResult) -> bool:
+        """結果是否只是成功並沿轉換前進（沒有跳轉、循環、完成、取消或 LLM 處理請求）"""
+        if not result.success or result.cancel or result.complete or result.continue_current_step:
+            return False
+        if result.skip_to or result.next_step:
+            return False
+        return not (result.llm_review_data and result.llm_review_data.get("requires_llm_processing"))
+    
+    def _plan_parallel_run(self, start_step_id: str) -> List[str]:
+        """
+        DAG 模式：從 start_step_id 沿無條件轉換收集連續的可自動推進非互動步驟
+        
+        Returns:
+            按轉換順序排列的步驟 ID；未啟用、遇到條件轉換或沒有步驟能提前開始時返回空列表
+        """
+        definition = self.definition
+        if definition.max_parallel_steps <= 1 or not definition.step_dependencies:
+            return []
+        
+        graph = definition.compile()
+        run: List[str] = []
+        step_id = start_step_id
+        while step_id and step_id not in run and len(run) < self.max_auto_steps:
+            step = definition.steps.get(step_id)
+            if (step is None or step.step_type not in (step.STEP_TYPE_PROCESSING, step.STEP_TYPE_SYSTEM)
+                    or not step.should_auto_advance()):
+                break
+            run.append(step_id)
+            step_id = graph.transition_index.get((step_id, _RESULT_SUCCESS), _UNRESOLVED)
+            if step_id is _UNRESOLVED:
+                break
+        
+        # 依賴轉換順序上較後面的步驟會永遠等不到，從該步驟起截斷
+        for index, step_id in enumerate(run):
+            if any(dependency in run[index:] for dependency in definition.step_dependencies.get(step_id, ())):
+                run = run[:index]
+                break
+        
+        if not any(step_id in definition.step_dependencies for step_id in run[1:]):
+            return []
+        return run
+    
+    def _execute_parallel_run(self, run: List[str]) -> None:
+        """
+        DAG 模式：在有界執行緒池中並行執行 run 的步驟
+        
+        宣告過依賴的步驟在其依賴（以及前面所有未宣告依賴的步驟）提交後即可開始；
+        結果嚴格按 run 的順序提交（data 合併進會話），因此會話狀態與完成先後無關。
+        遇到第一個不是一般成功的結果、或收到取消時即停止提交與派發新步驟。
+        
+        所有已完成步驟的結果（含停止點之後已跑完的）都存入 _prefetched_results，
+        由 _auto_advance 到達該步驟時取用，不會重新執行；已有結果的步驟也不會再派發。
+        """
+        started_at = time.perf_counter()
+        prefetched = self._prefetched_results
+        waits_for: Dict[str, Set[str]] = {}
+        for index, step_id in enumerate(run):
+            earlier = run[:index]
+            declared = self.definition.step_dependencies.get(step_id)
+            if declared is None:
+                waits_for[step_id] = set(earlier)
+            else:
+                waits_for[step_id] = {dependency for dependency in earlier
+                                      if dependency in declared or dependency not in self.definition.step_dependencies}
+        
+        def run_step(step_id: str):
+            cpu_started = time.thread_time()
+            try:
+                result = self.definition.steps[step_id].execute()
+            except Exception as e:
+                result = e
+            return result, time.thread_time() - cpu_started
+        
+        results: Dict[str, Any] = {step_id: prefetched[step_id] for step_id in run if step_id in prefetched}
+        committed: Set[str] = set()
+        launched: Set[str] = set(results)
+        running = {}
+        position = 0
+        stopped = False
+        workers = min(self.definition.max_parallel_steps, len(run))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="workflow-step") as pool:
+            while True:
+                # 按順序提交已完成的前綴
+                while not stopped and position < len(run) and run[position] in results:
+                    result = results[run[position]]
+                    if isinstance(result, Exception) or not self._is_plain_success(result):
+                        stopped = True
+                        break
+                    for key, value in (result.data or {}).items():
+                        self.session.add_data(key, value)
+                    committed.add(run[position])
+                    position += 1
+                if self._is_cancel_requested():
+                    stopped = True
+                
+                if not stopped:
+                    for step_id in run:
+                        if step_id not in launched and waits_for[step_id] <= committed:
+                            launched.add(step_id)
+                            running[pool.submit(run_step, step_id)] = step_id
+                if not running:
+                    break
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    result, cpu_time = future.result()
+                    results[running.pop(future)] = result
+                    self.worker_cpu_time += cpu_time
+        
+        prefetched.update(results)
+        debug_log(2, f"[WorkflowEngine] DAG 並行執行 {len(results)} 個步驟，提交 {position} 個，"
+                     f"耗時 {time.perf_counter() - started_at:.3f}s")
+    
+    def _discard_prefetched(self, step_id: str) -> None:
+        """
+        步驟即將重新執行時，丟棄它以及（遞移地）依賴它的步驟的預取結果
+        
+        未宣告依賴的步驟視為依賴前面所有步驟，一律丟棄；宣告了依賴但不包含
+        該步驟的結果不受影響，仍可沿用。
+        """
+        prefetched = self._prefetched_results
+        if not prefetched:
+            return
+        dependencies = self.definition.step_dependencies
+        stale = {step_id}
+        changed = True
+        while changed:
+            changed = False
+            for other in self.definition.steps:
+                if other in stale:
+                    continue
+                declared = dependencies.get(other)
+                if declared is None or stale.intersection(declared):
+                    stale.add(other)
+                    changed = True
+        dropped = [other for other in stale if prefetched.pop(other, None) is not None]
+        if dropped:
+            debug_log(3, f"[WorkflowEngine] 步驟 {step_id} 重新執行，丟棄過時的預取結果: {sorted(dropped)}")
+    
+    def _is_cancel_requested(self) -> bool:
+        """背景執行器設置的取消權杖是否已取消"""
+        return self.cancel_token is not None and self.cancel_token.cancelled
         
     def reset(self) -> None:
         """重置工作流程到初始狀態"""
         self.session.add_data("current_step", self.definition.entry_point)
         self.session.add_data("step_history", [])
+        self._prefetched_results.clear()
         
     def get_status(self) -> Dict[str, Any]:
         """獲取工作流程狀態"""
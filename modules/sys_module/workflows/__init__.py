@@ -21,6 +21,9 @@ StepResult = workflows_module.StepResult
 WorkflowEngine = workflows_module.WorkflowEngine
 WorkflowDefinition = workflows_module.WorkflowDefinition
 WorkflowStep = workflows_module.WorkflowStep
+CompiledWorkflowGraph = workflows_module.CompiledWorkflowGraph
+get_compiled_graph_stats = workflows_module.get_compiled_graph_stats
+clear_compiled_graphs = workflows_module.clear_compiled_graphs
 
 # Now we can use standard import for step_templates since WorkflowStep/StepResult are available
 from modules.sys_module.step_templates import StepTemplate
@@ -36,6 +39,7 @@ from .utility_workflows import create_utility_workflow, get_available_utility_wo
 __all__ = [
     'WorkflowType', 'WorkflowMode', 'StepResult', 'WorkflowEngine', 'WorkflowDefinition',
     'WorkflowStep', 'StepTemplate',
+    'CompiledWorkflowGraph', 'get_compiled_graph_stats', 'clear_compiled_graphs',
     'create_test_workflow', 'get_available_test_workflows',
     'create_file_workflow', 'get_available_file_workflows',
     'create_text_workflow', 'get_available_text_workflows',
@@ -29,6 +29,7 @@ from modules.sys_module.actions.automation_helper import (
     get_monitoring_pool,
     media_control
 )
+from modules.sys_module.workflow_executor import WorkflowPriority
 from utils.debug_helper import info_log, error_log, debug_log
 
 
@@ -159,6 +160,8 @@ def create_play_media_workflow(
         workflow_mode=WorkflowMode.BACKGROUND,  # ✅ 背景工作流
         requires_llm_review=False  # ❌ 背景工作流不需要 LLM 審核（完全自動化）
     )
+    # 播放可能持續很久，讓出工作線程給短任務
+    workflow_def.set_metadata("background_priority", WorkflowPriority.LOW)
     
     # 預先保存參數到 session（包括空值）
     # ❌ 移除 Interactive 步驟：背景工作流不能有互動步驟
@@ -693,6 +696,8 @@ def create_todo_workflow(
         workflow_mode=WorkflowMode.BACKGROUND,
         requires_llm_review=False
     )
+    # 使用者正在等待建立結果，優先於長時間的背景任務
+    workflow_def.set_metadata("background_priority", WorkflowPriority.HIGH)
     
     # 驗證並設定優先級
     valid_priorities = ["none", "low", "medium", "high"]
@@ -1065,6 +1070,8 @@ def create_calendar_workflow(
         workflow_mode=WorkflowMode.BACKGROUND,
         requires_llm_review=False
     )
+    # 使用者正在等待建立結果，優先於長時間的背景任務
+    workflow_def.set_metadata("background_priority", WorkflowPriority.HIGH)
     
     # 處理 end_time 預設值（當天 23:59）
     if not end_time:
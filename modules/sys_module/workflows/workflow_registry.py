@@ -5,6 +5,7 @@ Workflow Registry - 工作流註冊中心
 從 workflow_definitions.yaml 讀取配置並動態生成 MCP 工具
 """
 
+import threading
 import yaml
 from pathlib import Path
 from typing import TYPE_CHECKING, Dict, Any
@@ -14,6 +15,12 @@ from utils.debug_helper import debug_log, error_log
 if TYPE_CHECKING:
     from modules.sys_module.mcp_server.mcp_server import MCPServer
 
+_WORKFLOW_DEFINITIONS_PATH = Path(__file__).parent / "workflow_definitions.yaml"
+
+# 工作流定義快取：依 YAML 檔案修改時間決定是否重新解析
+_definitions_cache: Dict[str, Any] = {"mtime": None, "workflows": {}}
+_definitions_lock = threading.Lock()
+
 
 async def _wrap_workflow_handler(workflow_type: str, params: dict, sys_module) -> ToolResult:
     """
@@ -77,10 +84,8 @@ def _load_workflow_definitions() -> Dict[str, Any]:
     Returns:
         工作流定義字典
     """
-    yaml_path = Path(__file__).parent / "workflow_definitions.yaml"
-    
     try:
-        with open(yaml_path, 'r', encoding='utf-8') as f:
+        with open(_WORKFLOW_DEFINITIONS_PATH, 'r', encoding='utf-8') as f:
             config = yaml.safe_load(f)
             debug_log(2, f"[WorkflowRegistry] 已載入 {len(config.get('workflows', {}))} 個工作流定義")
             return config.get('workflows', {})
@@ -89,6 +94,28 @@ def _load_workflow_definitions() -> Dict[str, Any]:
         return {}
 
 
+def get_workflow_definitions() -> Dict[str, Any]:
+    """
+    取得工作流定義（快取，YAML 檔案修改後才重新解析）
+    
+    返回的字典在呼叫者之間共用，請勿修改
+    
+    Returns:
+        工作流定義字典
+    """
+    try:
+        mtime = _WORKFLOW_DEFINITIONS_PATH.stat().st_mtime_ns
+    except OSError as e:
+        error_log(f"[WorkflowRegistry] 無法讀取工作流定義檔案: {e}")
+        return {}
+    
+    with _definitions_lock:
+        if _definitions_cache["mtime"] != mtime:
+            _definitions_cache["workflows"] = _load_workflow_definitions()
+            _definitions_cache["mtime"] = mtime
+        return _definitions_cache["workflows"]
+
+
 def _build_tool_description(workflow_name: str, workflow_def: Dict[str, Any]) -> str:
     """
     根據工作流定義構建工具描述
@@ -178,7 +205,7 @@ def register_all_workflows(mcp_server: 'MCPServer', sys_module) -> None:
         mcp_server: MCP Server 實例
         sys_module: SYS Module 實例（用於 handler）
     """
-    workflow_definitions = _load_workflow_definitions()
+    workflow_definitions = get_workflow_definitions()
     
     if not workflow_definitions:
         error_log("[WorkflowRegistry] 無工作流定義可註冊")
@@ -0,0 +1,284 @@
+# modules/tts_module/audio_cache.py
+"""
+短語音頻快取 - 重複出現的 TTS 輸出（問候、確認、工作流程提示、通知）直接重播
+
+功能：
+- 內容定址：鍵為 (正規化文本, 角色, 量化情感向量, 引擎參數) 的 SHA-256
+- 磁碟儲存為 FLAC（無損壓縮的 16-bit PCM），重啟後仍可命中
+- 總容量上限與 LRU 淘汰；索引以 JSON 原子寫入（寫入/淘汰時立即保存，命中只定期保存）
+- 啟動時可依設定的短語列表預熱
+- 命中率與節省的合成時間統計
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+import numpy as np
+import soundfile as sf
+
+from utils.debug_helper import debug_log, info_log, error_log
+
+
+_WHITESPACE = re.compile(r"\s+")
+_INDEX_FILE = "index.json"
+
+
+class PhraseAudioCache:
+    """短語音頻快取"""
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        self.config = config or {}
+        self.enabled = self.config.get("enabled", True)
+        self.cache_dir = self.config.get("cache_dir", os.path.join("outputs", "tts", "cache"))
+        self.max_bytes = int(self.config.get("max_size_mb", 64) * 1024 * 1024)
+        self.max_text_chars = self.config.get("max_text_chars", 120)
+        self.emotion_quantization = self.config.get("emotion_quantization", 0.05)
+        # 命中只更新記憶體中的 LRU 順序，最多每隔此秒數寫回索引一次
+        self.index_flush_seconds = self.config.get("index_flush_seconds", 30.0)
+
+        # LRU 順序：最久未使用在前；值為 {"file", "bytes", "duration", "text", "last_access"}
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self._index_dirty = False
+        self._last_index_save = time.time()
+
+        self.stats = {
+            "lookups": 0,
+            "hits": 0,
+            "misses": 0,
+            "stores": 0,
+            "evictions": 0,
+            "read_errors": 0,
+            "saved_seconds": 0.0
+        }
+
+        if self.enabled:
+            self._load_index()
+
+    # === 鍵 ===
+
+    @staticmethod
+    def normalize_text(text: str) -> str:
+        """正規化文本：NFKC 與合併空白（保留大小寫與標點，兩者都會影響語調）"""
+        normalized = unicodedata.normalize("NFKC", text or "")
+        return _WHITESPACE.sub(" ", normalized).strip()
+
+    def make_key(self, text: str, character: Optional[str], emotion_vector: Optional[List[float]],
+                 engine_params: Optional[Dict[str, Any]] = None) -> str:
+        """計算內容定址鍵"""
+        step = self.emotion_quantization
+        if emotion_vector is None:
+            emotion = None
+        elif step > 0:
+            emotion = [int(round(float(v) / step)) for v in emotion_vector]
+        else:
+            emotion = [float(v) for v in emotion_vector]
+        payload = json.dumps(
+            [self.normalize_text(text), character or "", emotion, engine_params or {}],
+            sort_keys=True, ensure_ascii=False, default=str
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def is_cacheable(self, text: str) -> bool:
+        """只快取短語，長文本幾乎不會重複"""
+        return self.enabled and 0 < len(self.normalize_text(text)) <= self.max_text_chars
+
+    # === 查詢與寫入 ===
+
+    def lookup(self, key: str, synthesis_seconds: float = 0.0) -> Optional[np.ndarray]:
+        """
+        查詢快取
+
+        Args:
+            key: make_key() 的結果
+            synthesis_seconds: 命中時視為節省的合成時間（用於統計），0 則以音頻時長估計
+
+        Returns:
+            [1, samples] float32 波形，未命中返回 None
+        """
+        if not self.enabled:
+            return None
+        with self._lock:
+            self.stats["lookups"] += 1
+            entry = self._entries.get(key)
+            if entry is None:
+                self.stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            entry["last_access"] = time.time()
+
+        path = os.path.join(self.cache_dir, entry["file"])
+        try:
+            audio, _sr = sf.read(path, dtype="float32")
+        except Exception as e:
+            error_log(f"[TTSCache] 讀取快取失敗，移除條目: {e}")
+            with self._lock:
+                self.stats["read_errors"] += 1
+                self.stats["misses"] += 1
+                self._remove_locked(key)
+                self._save_index_locked()
+            return None
+
+        with self._lock:
+            self.stats["hits"] += 1
+            self.stats["saved_seconds"] += synthesis_seconds or entry.get("duration", 0.0)
+            # LRU 順序只在記憶體中更新，定期寫回以保留跨重啟的順序
+            self._index_dirty = True
+            if time.time() - self._last_index_save >= self.index_flush_seconds:
+                self._save_index_locked()
+        return audio.reshape(1, -1)
+
+    def store(self, key: str, audio: Any, sample_rate: int, text: str = "") -> bool:
+        """
+        寫入快取（FLAC 16-bit），超過容量上限時淘汰最久未使用的條目
+
+        Args:
+            audio: [1, samples] 或 [samples] 的浮點波形（numpy 或 torch）
+        """
+        if not self.enabled:
+            return False
+        try:
+            if hasattr(audio, "detach"):
+                audio = audio.detach().cpu().float().numpy()
+            data = np.clip(np.asarray(audio, dtype=np.float32).reshape(-1), -1.0, 1.0)
+
+            os.makedirs(self.cache_dir, exist_ok=True)
+            filename = f"{key}.flac"
+            path = os.path.join(self.cache_dir, filename)
+            tmp_path = f"{path}.tmp"
+            sf.write(tmp_path, data, sample_rate, format="FLAC", subtype="PCM_16")
+            os.replace(tmp_path, path)
+            size = os.path.getsize(path)
+
+            with self._lock:
+                if key in self._entries:
+                    self._total_bytes -= self._entries[key]["bytes"]
+                self._entries[key] = {
+                    "file": filename,
+                    "bytes": size,
+                    "duration": len(data) / float(sample_rate),
+                    "text": self.normalize_text(text)[:80],
+                    "last_access": time.time()
+                }
+                self._entries.move_to_end(key)
+                self._total_bytes += size
+                self.stats["stores"] += 1
+                self._evict_locked()
+                self._save_index_locked()
+            return True
+        except Exception as e:
+            error_log(f"[TTSCache] 寫入快取失敗: {e}")
+            return False
+
+    def prewarm(self, phrases: Iterable[str], make_key: Callable[[str], str],
+                synthesize: Callable[[str], Any], sample_rate: int) -> int:
+        """
+        預熱：合成尚未快取的短語
+
+        Args:
+            phrases: 短語列表
+            make_key: 文本 -> 快取鍵（由呼叫者帶入角色、情感與引擎參數）
+            synthesize: 文本 -> 波形（失敗返回 None）
+
+        Returns:
+            新寫入的條目數
+        """
+        if not self.enabled:
+            return 0
+        added = 0
+        for phrase in phrases:
+            if not self.is_cacheable(phrase):
+                continue
+            key = make_key(phrase)
+            with self._lock:
+                if key in self._entries:
+                    continue
+            audio = synthesize(phrase)
+            if audio is not None and self.store(key, audio, sample_rate, phrase):
+                added += 1
+        if added:
+            info_log(f"[TTSCache] 預熱完成，新增 {added} 條短語")
+        return added
+
+    def flush(self):
+        """將尚未保存的 LRU 順序寫回索引（關閉時調用）"""
+        with self._lock:
+            if self._index_dirty:
+                self._save_index_locked()
+
+    def clear(self):
+        """清空快取（刪除音頻檔與索引）"""
+        with self._lock:
+            for key in list(self._entries.keys()):
+                self._remove_locked(key)
+            self._save_index_locked()
+
+    # === 內部 ===
+
+    def _evict_locked(self):
+        """超過容量上限時淘汰最久未使用的條目（呼叫者持有鎖）"""
+        while self._total_bytes > self.max_bytes and len(self._entries) > 1:
+            key = next(iter(self._entries))
+            self._remove_locked(key)
+            self.stats["evictions"] += 1
+
+    def _remove_locked(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        self._total_bytes -= entry["bytes"]
+        try:
+            os.remove(os.path.join(self.cache_dir, entry["file"]))
+        except OSError:
+            pass
+
+    def _load_index(self):
+        """載入索引，略過檔案已不存在的條目"""
+        path = os.path.join(self.cache_dir, _INDEX_FILE)
+        if not os.path.exists(path):
+            return
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                raw = json.load(f)
+        except Exception as e:
+            error_log(f"[TTSCache] 索引損毀，重新建立: {e}")
+            return
+
+        for key, entry in sorted(raw.items(), key=lambda item: item[1].get("last_access", 0)):
+            if os.path.exists(os.path.join(self.cache_dir, entry.get("file", ""))):
+                self._entries[key] = entry
+                self._total_bytes += entry.get("bytes", 0)
+        self._evict_locked()
+        debug_log(2, f"[TTSCache] 已載入 {len(self._entries)} 條快取 ({self._total_bytes / 1024:.0f} KB)")
+
+    def _save_index_locked(self):
+        """原子寫入索引（呼叫者持有鎖）"""
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            path = os.path.join(self.cache_dir, _INDEX_FILE)
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self._entries, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+            self._index_dirty = False
+            self._last_index_save = time.time()
+        except Exception as e:
+            error_log(f"[TTSCache] 寫入索引失敗: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """獲取快取統計"""
+        with self._lock:
+            stats = dict(self.stats)
+            stats["entries"] = len(self._entries)
+            stats["size_bytes"] = self._total_bytes
+            stats["max_bytes"] = self.max_bytes
+            stats["hit_rate"] = stats["hits"] / stats["lookups"] if stats["lookups"] else 0.0
+            return stats
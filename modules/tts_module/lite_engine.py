@@ -26,11 +26,15 @@ IndexTTS2 Lite Engine - 精簡推論引擎
         emotion_vector=[0.3, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0],  # Happy
         max_emotion_strength=0.3  # 保留 70% 原始聲音
     )
+    
+    # 或直接取得波形 (不寫檔)
+    audio = engine.synthesize_audio("Hello world")  # [1, samples], 22050 Hz
 """
 
 import os
 import torch
 import warnings
+from collections import OrderedDict
 from pathlib import Path
 from typing import Optional, List, Union
 
@@ -73,6 +77,15 @@ except ImportError:
     from s2mel.modules.bigvgan import bigvgan
 
 
+# CFM 延遲設定檔 (steps: 擴散步數, solver: euler/midpoint, cfg_rate: CFG 強度, cfg_cutoff: t 超過此值後不再做 CFG)
+# quality 與原本固定的 25 步 Euler + CFG 0.7 相同
+DEFAULT_CFM_PROFILES = {
+    'quality': {'steps': 25, 'solver': 'euler', 'cfg_rate': 0.7, 'cfg_cutoff': 1.0},
+    'balanced': {'steps': 12, 'solver': 'euler', 'cfg_rate': 0.7, 'cfg_cutoff': 0.8},
+    'fast': {'steps': 6, 'solver': 'midpoint', 'cfg_rate': 0.7, 'cfg_cutoff': 0.5},
+}
+
+
 class IndexTTSLite:
     """精簡版 IndexTTS2 推論引擎"""
     
@@ -82,7 +95,8 @@ class IndexTTSLite:
         model_dir: str = "checkpoints",
         use_fp16: bool = True,
         device: Optional[str] = None,
-        use_cuda_kernel: bool = False
+        use_cuda_kernel: bool = False,
+        synthesis_config: Optional[dict] = None
     ):
         """
         初始化精簡推論引擎
@@ -93,6 +107,7 @@ class IndexTTSLite:
             use_fp16: 是否使用半精度
             device: 設備 (None=自動檢測)
             use_cuda_kernel: 是否使用 CUDA kernel (需要 CUDA Toolkit)
+            synthesis_config: 合成配置 (modules/tts_module/config.yaml 的 synthesis 區塊)
         """
         self.model_dir = model_dir
         self.use_fp16 = use_fp16
@@ -145,6 +160,30 @@ class IndexTTSLite:
             except Exception as e:
                 debug_log(1, f"   ⚠️  SDPA 配置失敗: {e}")
         
+        # 輸出取樣率 (BigVGAN)
+        self.sample_rate = 22050
+        
+        # 多段合成配置
+        synthesis_config = synthesis_config or {}
+        self.max_text_tokens_per_segment = synthesis_config.get('max_text_tokens_per_segment', 200)
+        self.segment_batch_size = max(1, synthesis_config.get('segment_batch_size', 4))
+        self.segment_crossfade_ms = synthesis_config.get('segment_crossfade_ms', 40)
+        
+        # 情感向量快取：以量化後的情感向量為鍵 (TTSModule 依狀態切換情感，常見組合有限)
+        self.emotion_quantization = synthesis_config.get('emotion_quantization', 0.01)
+        self.emovec_cache_size = synthesis_config.get('emovec_cache_size', 32)
+        self._emovec_cache: "OrderedDict[tuple, tuple]" = OrderedDict()
+        self._emovec_cache_stats = {"hits": 0, "misses": 0, "evictions": 0}
+        self._character_conditioning: Optional[dict] = None
+        
+        # CFM 擴散解碼延遲設定檔：步數 / 解算器 / CFG 強度 / CFG 截止時間
+        self.cfm_profiles = dict(DEFAULT_CFM_PROFILES)
+        self.cfm_profiles.update(synthesis_config.get('cfm_profiles', {}) or {})
+        self.cfm_profile = synthesis_config.get('cfm_profile', 'quality')
+        if self.cfm_profile not in self.cfm_profiles:
+            debug_log(1, f"[IndexTTSLite] 未知的 CFM 設定檔 '{self.cfm_profile}'，改用 quality")
+            self.cfm_profile = 'quality'
+        
         # 當前加載的角色特徵
         self.current_character = None
         self.character_features = None
@@ -171,37 +210,21 @@ class IndexTTSLite:
         """
         info_log(f"🔥 [預熱] 開始模型預熱... (文本: '{warmup_text}', 次數: {iterations})")
         
-        import tempfile
         import time
         
         start_time = time.time()
         
         try:
-            # 創建臨時檔案
-            with tempfile.NamedTemporaryFile(mode='w', suffix='.wav', delete=False) as tmp_file:
-                tmp_path = tmp_file.name
-            
-            # 執行預熱生成
+            # 執行預熱生成（只在記憶體中產生波形，不寫檔）
             for i in range(iterations):
                 debug_log(3, f"   [預熱] 第 {i+1}/{iterations} 次...")
                 
-                # 呼叫 synthesize 方法（不顯示詳細訊息）
-                self.synthesize(
+                self.synthesize_audio(
                     text=warmup_text,
-                    output_path=tmp_path,
                     emotion_vector=None,
                     verbose=False  # 關閉詳細輸出
                 )
             
-            # 刪除臨時檔案
-            try:
-                import os
-                if os.path.exists(tmp_path):
-                    os.remove(tmp_path)
-                    debug_log(3, f"   [預熱] 已刪除臨時檔案: {tmp_path}")
-            except Exception as e:
-                debug_log(1, f"   [預熱] 刪除臨時檔案失敗: {e}")
-            
             elapsed = time.time() - start_time
             info_log(f"✅ [預熱] 完成! 耗時: {elapsed:.2f}秒")
             info_log(f"   ✓ torch.compile 已編譯")
@@ -376,6 +399,9 @@ class IndexTTSLite:
             self.character_features = features
             self.current_character = character_path.stem
             
+            # 預計算只依賴角色的條件張量，並清空上一個角色的情感向量快取
+            self._precompute_character_conditioning()
+            
             if verbose:
                 info_log(f"   ✓ 角色 '{self.current_character}' 加載成功!")
                 
@@ -409,6 +435,123 @@ class IndexTTSLite:
             traceback.print_exc()
             return False
     
+    def _precompute_character_conditioning(self):
+        """
+        預計算只依賴角色的條件張量 (load_character 時調用)
+        
+        - emo_matrix_cat: 依 emo_indices 選出的 8 個情感基底 [8, hidden_dim]
+        - base_emovec: spk_cond_emb 經 merge_emovec 的結果 [1, dim]
+        - cond_lengths: spk_cond_emb 長度
+        """
+        spk_cond_emb = self.character_features['spk_cond_emb']
+        emo_indices = self.character_features['emo_indices']
+        
+        emo_matrix_cat = torch.cat(
+            [emo_mat[int(idx)].unsqueeze(0) for idx, emo_mat in zip(emo_indices, self.emo_matrix)], 0
+        )
+        cond_lengths = torch.tensor([spk_cond_emb.shape[-1]], device=self.device)
+        
+        with torch.no_grad():
+            dtype = torch.float16 if self.use_fp16 else None
+            with torch.amp.autocast(self.device.type, enabled=dtype is not None, dtype=dtype):
+                # 簡化版:使用 spk_cond_emb 作為 emo_cond_emb (完整版應從情感參考音頻提取)
+                # Merge emovec (參考 infer_v2.py line 535-544)
+                base_emovec = self.gpt.merge_emovec(
+                    spk_cond_emb,
+                    spk_cond_emb,
+                    cond_lengths,
+                    cond_lengths,
+                    alpha=1.0  # emo_alpha
+                )
+        
+        self._character_conditioning = {
+            'emo_matrix_cat': emo_matrix_cat,
+            'base_emovec': base_emovec,
+            'cond_lengths': cond_lengths
+        }
+        self._emovec_cache.clear()
+    
+    def _get_emotion_conditioning(self, normalized_emotion: List[float]):
+        """
+        取得 (emovec, emovec_mat)，以量化後的情感向量為鍵做 LRU 快取
+        
+        量化步長為 emotion_quantization (預設 0.01)，計算也使用量化後的權重，
+        因此快取結果與重新計算完全一致。
+        
+        Returns:
+            (emovec, emovec_mat): 皆為 [1, dim]
+        """
+        if self._character_conditioning is None:
+            self._precompute_character_conditioning()
+        
+        step = self.emotion_quantization
+        key = tuple(int(round(v / step)) for v in normalized_emotion) if step > 0 else tuple(normalized_emotion)
+        cached = self._emovec_cache.get(key)
+        if cached is not None:
+            self._emovec_cache.move_to_end(key)
+            self._emovec_cache_stats["hits"] += 1
+            return cached
+        self._emovec_cache_stats["misses"] += 1
+        
+        weights = [k * step for k in key] if step > 0 else list(normalized_emotion)
+        conditioning = self._character_conditioning
+        
+        # 從 emo_matrix 中獲取對應的情感向量並加權
+        weight_vector = torch.tensor(weights, device=self.device)
+        emovec_mat = weight_vector.unsqueeze(1) * conditioning['emo_matrix_cat']  # [8, hidden_dim]
+        emovec_mat = torch.sum(emovec_mat, 0).unsqueeze(0)  # [1, hidden_dim]
+        
+        # 確保 dtype 與模型一致
+        if self.use_fp16:
+            emovec_mat = emovec_mat.half()
+        
+        with torch.no_grad():
+            dtype = torch.float16 if self.use_fp16 else None
+            with torch.amp.autocast(self.device.type, enabled=dtype is not None, dtype=dtype):
+                # 混合 emovec_mat
+                weight_sum = float(sum(weights))
+                emovec = emovec_mat + (1 - weight_sum) * conditioning['base_emovec']
+        
+        result = (emovec, emovec_mat)
+        self._emovec_cache[key] = result
+        while len(self._emovec_cache) > self.emovec_cache_size:
+            self._emovec_cache.popitem(last=False)
+            self._emovec_cache_stats["evictions"] += 1
+        return result
+    
+    def get_cfm_profile(self, name: Optional[str] = None) -> dict:
+        """
+        取得 CFM 設定檔內容，缺少的欄位以 quality 設定補齊
+        
+        Args:
+            name: 設定檔名稱 (None = 目前的 cfm_profile，未知名稱退回目前設定檔)
+        """
+        if name is None or name not in self.cfm_profiles:
+            if name is not None:
+                debug_log(2, f"[IndexTTSLite] 未知的 CFM 設定檔 '{name}'，使用 {self.cfm_profile}")
+            name = self.cfm_profile
+        settings = dict(DEFAULT_CFM_PROFILES['quality'])
+        settings.update(self.cfm_profiles[name])
+        settings['name'] = name
+        return settings
+    
+    def set_cfm_profile(self, name: str) -> bool:
+        """切換預設的 CFM 設定檔"""
+        if name not in self.cfm_profiles:
+            error_log(f"[IndexTTSLite] 未知的 CFM 設定檔: {name}")
+            return False
+        self.cfm_profile = name
+        return True
+    
+    def get_emovec_cache_stats(self) -> dict:
+        """獲取情感向量快取統計"""
+        stats = dict(self._emovec_cache_stats)
+        lookups = stats["hits"] + stats["misses"]
+        stats["entries"] = len(self._emovec_cache)
+        stats["max_entries"] = self.emovec_cache_size
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
+    
     def normalize_emotion_vector(
         self,
         emotion_vector: List[float],
@@ -481,14 +624,88 @@ class IndexTTSLite:
         temperature: float = 0.0,  # 確定性輸出
         top_p: float = 1.0,
         top_k: int = 50,
-        verbose: bool = True
+        verbose: bool = True,
+        cfm_profile: Optional[str] = None
     ) -> bool:
         """
-        合成語音 (獨立引擎實現,參考 infer_v2.py 邏輯)
+        合成語音並保存為 WAV 檔案 (synthesize_audio + save_audio)
         
         Args:
             text: 要合成的文本
             output_path: 輸出音頻路徑
+            其餘參數同 synthesize_audio()
+            
+        Returns:
+            bool: 是否成功
+        """
+        audio_output = self.synthesize_audio(
+            text,
+            emotion_vector=emotion_vector,
+            max_emotion_strength=max_emotion_strength,
+            language=language,
+            num_beams=num_beams,
+            do_sample=do_sample,
+            temperature=temperature,
+            top_p=top_p,
+            top_k=top_k,
+            verbose=verbose,
+            cfm_profile=cfm_profile
+        )
+        if audio_output is None:
+            return False
+        
+        if not self.save_audio(audio_output, output_path):
+            return False
+        
+        if verbose:
+            debug_log(3, f"   📁 保存至: {output_path}")
+        return True
+    
+    def save_audio(self, audio_output: torch.Tensor, output_path: str) -> bool:
+        """
+        將 synthesize_audio() 的輸出保存為 16-bit PCM WAV
+        
+        Args:
+            audio_output: [1, samples] 浮點波形 (CPU)
+            output_path: 輸出音頻路徑
+            
+        Returns:
+            bool: 是否成功
+        """
+        try:
+            import torchaudio
+            torchaudio.save(
+                output_path,
+                audio_output,
+                sample_rate=self.sample_rate,
+                encoding="PCM_S",
+                bits_per_sample=16
+            )
+            return True
+        except Exception as e:
+            error_log(f"❌ 保存音頻失敗: {e}")
+            return False
+    
+    def synthesize_audio(
+        self,
+        text: str,
+        emotion_vector: Optional[List[float]] = None,
+        max_emotion_strength: float = 0.5,
+        language: str = 'en',
+        # GPT 優化參數 (🚀 已優化: 關閉隨機採樣以加速)
+        num_beams: int = 1,
+        do_sample: bool = False,  # 🚀 關閉採樣，加速 5-8%
+        temperature: float = 0.0,  # 確定性輸出
+        top_p: float = 1.0,
+        top_k: int = 50,
+        verbose: bool = True,
+        cfm_profile: Optional[str] = None
+    ) -> Optional[torch.Tensor]:
+        """
+        合成語音並直接返回波形，不經過檔案 (獨立引擎實現,參考 infer_v2.py 邏輯)
+        
+        Args:
+            text: 要合成的文本
             emotion_vector: 8維情感向量 [happy, angry, sad, afraid, disgusted, melancholic, surprised, calm]
             max_emotion_strength: 最大情感強度 (0.5=保留50%原聲)
             language: 語言 ('en' 或 'zh')
@@ -498,9 +715,10 @@ class IndexTTSLite:
             top_p: Nucleus 採樣
             top_k: Top-K 採樣
             verbose: 是否打印詳細信息
+            cfm_profile: CFM 延遲設定檔名稱 (None = 使用 self.cfm_profile)
             
         Returns:
-            bool: 是否成功
+            [1, samples] 浮點波形 (CPU, 取樣率 self.sample_rate)，失敗時返回 None
         """
         if self.character_features is None:
             raise RuntimeError("請先使用 load_character() 加載角色!")
@@ -511,6 +729,66 @@ class IndexTTSLite:
             debug_log(3, f"   文本: {text}")
             debug_log(3, f"   文本長度: {len(text)} 字符")
         
+        if emotion_vector is not None and len(emotion_vector) != 8:
+            raise ValueError("情感向量必須是 8 維")
+        
+        try:
+            generation_kwargs = dict(
+                num_beams=num_beams,
+                do_sample=do_sample,
+                temperature=temperature,
+                top_p=top_p,
+                top_k=top_k
+            )
+            job = self.text_to_codes(
+                text, emotion_vector, max_emotion_strength,
+                cfm_profile=cfm_profile, generation_kwargs=generation_kwargs, verbose=verbose
+            )
+            self.codes_to_mel(job, verbose=verbose)
+            audio_output = self.mel_to_wave(job, verbose=verbose)
+            
+            if verbose:
+                duration = audio_output.shape[-1] / self.sample_rate
+                debug_log(2, f"   ✓ 合成完成!")
+                debug_log(3, f"   ⏱️  音頻時長: {duration:.2f}秒")
+            
+            return audio_output
+            
+        except Exception as e:
+            error_log(f"❌ 合成失敗: {e}")
+            import traceback
+            traceback.print_exc()
+            return None
+    
+    # === 分階段合成 (text → codes → mel → wave) ===
+    # 三個階段使用不同的模型 (GPT / S2Mel / BigVGAN)，可在不同執行緒上對不同段落重疊執行
+    
+    def text_to_codes(
+        self,
+        text: str,
+        emotion_vector: Optional[List[float]] = None,
+        max_emotion_strength: float = 0.5,
+        cfm_profile: Optional[str] = None,
+        generation_kwargs: Optional[dict] = None,
+        verbose: bool = False
+    ) -> dict:
+        """
+        階段 1：文本處理、情感條件與 GPT 生成語義 codes / latent
+        
+        Args:
+            text: 要合成的文本
+            emotion_vector: 8維情感向量 (None = 中性)
+            max_emotion_strength: 最大情感強度
+            cfm_profile: CFM 延遲設定檔名稱 (在階段 2 使用)
+            generation_kwargs: GPT 生成參數 (None = 與 synthesize_audio 預設相同)
+            verbose: 是否打印詳細信息
+            
+        Returns:
+            合成工作 dict，依序交給 codes_to_mel() 與 mel_to_wave()
+        """
+        if self.character_features is None:
+            raise RuntimeError("請先使用 load_character() 加載角色!")
+        
         # 1. 情感向量處理
         if emotion_vector is None:
             emotion_vector = [0.0] * 8  # 中性
@@ -521,198 +799,249 @@ class IndexTTSLite:
         # 歸一化情感向量
         normalized_emotion = self.normalize_emotion_vector(emotion_vector, max_emotion_strength, verbose)
         
-        try:
-            # 2. 文本處理 (參考 infer_v2.py line 487-523)
-            if verbose:
-                debug_log(3, "   [1/4] 文本處理...")
-            
-            # 使用 BPE tokenizer 進行正確的 tokenization
-            text_tokens_list = self.tokenizer.tokenize(text)
-            # 簡化版:只取第一個 segment (完整版應該循環處理所有 segments)
-            segments = self.tokenizer.split_segments(text_tokens_list, max_text_tokens_per_segment=200)
-            if len(segments) > 1 and verbose:
-                debug_log(2, f"      ⚠️  警告: 文本被分割為 {len(segments)} 段,只處理第一段")
-            
-            # 轉換為 token IDs
-            text_tokens = self.tokenizer.convert_tokens_to_ids(segments[0])
-            text_tokens = torch.tensor(text_tokens, dtype=torch.int32, device=self.device).unsqueeze(0)
-            
-            # 3. 處理情感向量映射 (參考 infer_v2.py line 456-462)
-            # 使用預計算的 emo_indices 或動態計算
-            if 'emo_indices' in self.character_features:
-                # 使用預計算的索引
-                emo_indices = self.character_features['emo_indices']
-            else:
-                # 動態計算最相似的索引 (find_most_similar_cosine)
-                style = self.character_features['style']
-                emo_indices = []
-                for spk_mat in self.spk_matrix:
-                    # 計算餘弦相似度
-                    query_norm = torch.nn.functional.normalize(style.squeeze(0), p=2, dim=-1)
-                    matrix_norm = torch.nn.functional.normalize(spk_mat, p=2, dim=-1)
-                    similarities = torch.matmul(query_norm, matrix_norm.T)
-                    most_similar_idx = torch.argmax(similarities).item()
-                    emo_indices.append(most_similar_idx)
-            
-            # 從 emo_matrix 中獲取對應的情感向量並加權
-            weight_vector = torch.tensor(normalized_emotion, device=self.device)
-            emo_matrix_selected = [emo_mat[idx].unsqueeze(0) for idx, emo_mat in zip(emo_indices, self.emo_matrix)]
-            emo_matrix_cat = torch.cat(emo_matrix_selected, 0)  # [8, hidden_dim]
-            emovec_mat = weight_vector.unsqueeze(1) * emo_matrix_cat  # [8, hidden_dim]
-            emovec_mat = torch.sum(emovec_mat, 0).unsqueeze(0)  # [1, hidden_dim]
-            
-            # 確保 dtype 與模型一致
-            if self.use_fp16:
-                emovec_mat = emovec_mat.half()
-            
-            # 4. GPT 生成語義 tokens
-            if verbose:
-                debug_log(3, "   [2/4] GPT 生成中...")
-            
-            with torch.no_grad():
-                # 使用 autocast 處理 FP16 (參考 infer_v2.py line 534)
-                dtype = torch.float16 if self.use_fp16 else None
-                with torch.amp.autocast(self.device.type, enabled=dtype is not None, dtype=dtype):
-                    # 準備 conditioning (參考 infer_v2.py line 419-452)
-                    spk_cond_emb = self.character_features['spk_cond_emb']
-                    # 簡化版:使用 spk_cond_emb 作為 emo_cond_emb (完整版應從情感參考音頻提取)
-                    emo_cond_emb = spk_cond_emb
-                    
-                    # Merge emovec (參考 infer_v2.py line 535-544)
-                    emovec = self.gpt.merge_emovec(
-                        spk_cond_emb,
-                        emo_cond_emb,
-                        torch.tensor([spk_cond_emb.shape[-1]], device=self.device),
-                        torch.tensor([emo_cond_emb.shape[-1]], device=self.device),
-                        alpha=1.0  # emo_alpha
-                    )
-                    
-                    # 如果有情感向量,混合 emovec_mat
-                    if emovec_mat is not None:
-                        weight_sum = torch.sum(torch.tensor(normalized_emotion, device=self.device))
-                        emovec = emovec_mat + (1 - weight_sum) * emovec
-                    
-                    # inference_speech 返回 (codes, speech_conditioning_latent)
-                    codes, speech_conditioning_latent = self.gpt.inference_speech(
-                        spk_cond_emb,
-                        text_tokens,
-                        emo_cond_emb,  # 使用 emo_cond_emb (不是 spk_cond_emb!)
-                        cond_lengths=torch.tensor([spk_cond_emb.shape[-1]], device=self.device),
-                        emo_cond_lengths=torch.tensor([emo_cond_emb.shape[-1]], device=self.device),
-                        emo_vec=emovec,  # 使用merge後的 emovec
-                        num_return_sequences=1,
-                        num_beams=num_beams,
-                        do_sample=do_sample,
-                        temperature=temperature,
-                        top_p=top_p,
-                        top_k=top_k,
-                        length_penalty=1.0,
-                        repetition_penalty=1.2,
-                        max_generate_length=self.cfg.gpt.max_mel_tokens
-                    )
-                    
-                    # GPT forward 獲取 latent
-                    use_speed = torch.zeros(1, device=self.device).long()
-                    latent = self.gpt(
-                        speech_conditioning_latent,
-                        text_tokens,
-                        torch.tensor([text_tokens.shape[-1]], device=self.device),
-                        codes,
-                        torch.tensor([codes.shape[-1]], device=self.device),
-                        spk_cond_emb,
-                        cond_mel_lengths=torch.tensor([spk_cond_emb.shape[-1]], device=self.device),
-                        emo_cond_mel_lengths=torch.tensor([spk_cond_emb.shape[-1]], device=self.device),
-                        emo_vec=emovec_mat,
-                        use_speed=use_speed
-                    )
-            
-            # 找到實際的 code 長度 (參考 infer_v2.py line 583-591)
-            stop_mel_token = self.cfg.gpt.stop_mel_token
-            code_lens = []
-            for code in codes:
-                if stop_mel_token not in code:
-                    code_len = len(code)
-                else:
-                    len_ = (code == stop_mel_token).nonzero(as_tuple=False)[0] + 1
-                    code_len = len_ - 1
-                code_lens.append(code_len)
-            
-            codes = codes[:, :code_len]  # 裁剪到實際長度
-            code_lens = torch.LongTensor(code_lens).to(self.device)
-            
-            # 5. S2Mel 生成 Mel 頻譜
-            if verbose:
-                debug_log(3, "   [3/4] S2Mel 生成中...")
+        if generation_kwargs is None:
+            generation_kwargs = dict(num_beams=1, do_sample=False, temperature=0.0, top_p=1.0, top_k=50)
+        
+        # 2. 文本處理 (參考 infer_v2.py line 487-523)
+        if verbose:
+            debug_log(3, "   [1/4] 文本處理...")
+        
+        # 使用 BPE tokenizer 進行正確的 tokenization，並切分為多個 segment
+        text_tokens_list = self.tokenizer.tokenize(text)
+        segments = self.tokenizer.split_segments(
+            text_tokens_list, max_text_tokens_per_segment=self.max_text_tokens_per_segment
+        )
+        if not segments:
+            raise ValueError("文本為空，沒有可合成的內容")
+        segment_ids = [self.tokenizer.convert_tokens_to_ids(segment) for segment in segments]
+        if len(segments) > 1 and verbose:
+            debug_log(3, f"      文本分為 {len(segments)} 段，批次大小 {self.segment_batch_size}")
+        
+        # 3. 情感條件：角色相關部分已於 load_character 預計算，這裡只查 LRU 或做一次加權
+        emovec, emovec_mat = self._get_emotion_conditioning(normalized_emotion)
+        
+        # 4. 依長度排序後分批，減少批內補齊；結果在 mel_to_wave 按原順序拼接
+        job = {
+            'features': self.character_features,  # 後續階段使用同一角色，不受中途切換影響
+            'cfm_settings': self.get_cfm_profile(cfm_profile),
+            'num_segments': len(segment_ids),
+            'groups': [],
+            'batches': []
+        }
+        order = sorted(range(len(segment_ids)), key=lambda i: len(segment_ids[i]))
+        for start in range(0, len(order), self.segment_batch_size):
+            group = order[start:start + self.segment_batch_size]
+            job['groups'].append(group)
+            job['batches'].append(self._batch_text_to_codes(
+                [segment_ids[i] for i in group], emovec, emovec_mat, generation_kwargs, verbose
+            ))
+        return job
+    
+    def codes_to_mel(self, job: dict, verbose: bool = False) -> dict:
+        """階段 2：S2Mel (語義嵌入、長度調節、CFM) 生成 mel 頻譜"""
+        if verbose:
+            debug_log(3, "   [3/4] S2Mel 生成中...")
+        for batch in job['batches']:
+            self._batch_codes_to_mel(batch, job['features'], job['cfm_settings'])
+        return job
+    
+    def mel_to_wave(self, job: dict, verbose: bool = False) -> torch.Tensor:
+        """階段 3：BigVGAN 生成波形並依原順序交叉淡化拼接，返回 [1, samples] (CPU)"""
+        if verbose:
+            debug_log(3, "   [4/4] BigVGAN 生成中...")
+        waves: List[Optional[torch.Tensor]] = [None] * job['num_segments']
+        for group, batch in zip(job['groups'], job['batches']):
+            for i, wave in zip(group, self._batch_mel_to_wave(batch)):
+                waves[i] = wave
+        return self._crossfade_concat(waves)
+    
+    def _batch_text_to_codes(
+        self,
+        token_batch: List[List[int]],
+        emovec: torch.Tensor,
+        emovec_mat: torch.Tensor,
+        generation_kwargs: dict,
+        verbose: bool = False
+    ) -> dict:
+        """
+        批次 GPT 生成 (多個文本段落)
+        
+        各段文本以 stop_text_token 補齊後一起送入 GPT 自回歸生成
+        （inference_speech 內部轉為左側補齊 + attention mask）。
+        
+        Args:
+            token_batch: 各段的 text token IDs
+            emovec: 合併後的情感向量 [1, dim]
+            emovec_mat: 情感矩陣加權結果 [1, dim]
+            generation_kwargs: GPT 生成參數
+            verbose: 是否打印詳細信息
             
-            with torch.no_grad():
-                # 使用 dtype=None 的 autocast (參考 infer_v2.py line 617)
-                dtype = None
-                with torch.amp.autocast(self.device.type, enabled=dtype is not None, dtype=dtype):
-                    latent = self.s2mel.models['gpt_layer'](latent)
-                    S_infer = self.semantic_codec.quantizer.vq2emb(codes.unsqueeze(1))
-                    S_infer = S_infer.transpose(1, 2)
-                    
-                    # 裁剪 latent 以匹配 S_infer 的長度
-                    if latent.shape[1] > S_infer.shape[1]:
-                        latent = latent[:, :S_infer.shape[1], :]
-                    
-                    S_infer = S_infer + latent
-                    target_lengths = (code_lens * 1.72).long()
+        Returns:
+            {'batch_size', 'codes', 'code_lens', 'latent'}
+        """
+        batch_size = len(token_batch)
+        spk_cond_emb = self.character_features['spk_cond_emb']
+        
+        # 文本補齊
+        text_lens = torch.tensor([len(tokens) for tokens in token_batch], device=self.device)
+        text_tokens = torch.full(
+            (batch_size, int(text_lens.max())), self.gpt.stop_text_token, dtype=torch.int32, device=self.device
+        )
+        for i, tokens in enumerate(token_batch):
+            text_tokens[i, :len(tokens)] = torch.tensor(tokens, dtype=torch.int32, device=self.device)
+        
+        # 角色條件對整批共用
+        cond = spk_cond_emb.repeat(batch_size, *([1] * (spk_cond_emb.dim() - 1)))
+        cond_lengths = self._character_conditioning['cond_lengths'].repeat(batch_size)
+        
+        # GPT 生成語義 tokens
+        if verbose:
+            debug_log(3, f"   [2/4] GPT 生成中... (批次 {batch_size})")
+        
+        with torch.no_grad():
+            # 使用 autocast 處理 FP16 (參考 infer_v2.py line 534)
+            dtype = torch.float16 if self.use_fp16 else None
+            with torch.amp.autocast(self.device.type, enabled=dtype is not None, dtype=dtype):
+                # inference_speech 返回 (codes, speech_conditioning_latent)
+                codes, speech_conditioning_latent = self.gpt.inference_speech(
+                    cond,
+                    text_tokens.clone(),
+                    cond,  # emo_cond_emb 與 spk_cond_emb 相同
+                    cond_lengths=cond_lengths,
+                    emo_cond_lengths=cond_lengths,
+                    emo_vec=emovec.expand(batch_size, -1),
+                    num_return_sequences=1,
+                    length_penalty=1.0,
+                    repetition_penalty=1.2,
+                    max_generate_length=self.cfg.gpt.max_mel_tokens,
+                    **generation_kwargs
+                )
                 
-                cond = self.s2mel.models['length_regulator'](
+                # 找到各段實際的 code 長度 (參考 infer_v2.py line 583-591)
+                stop_mel_token = self.cfg.gpt.stop_mel_token
+                code_lens = []
+                for code in codes:
+                    stops = (code == stop_mel_token).nonzero(as_tuple=False)
+                    code_lens.append(int(stops[0]) if len(stops) else len(code))
+                codes = codes[:, :max(max(code_lens), 1)]
+                code_lens = torch.LongTensor(code_lens).to(self.device)
+                
+                # GPT forward 獲取 latent（補齊部分由 set_mel_padding / set_text_padding 處理）
+                use_speed = torch.zeros(batch_size, device=self.device).long()
+                latent = self.gpt(
+                    speech_conditioning_latent,
+                    text_tokens,
+                    text_lens,
+                    codes.clone(),
+                    code_lens,
+                    cond,
+                    cond_mel_lengths=cond_lengths,
+                    emo_cond_mel_lengths=cond_lengths,
+                    emo_vec=emovec_mat.expand(batch_size, -1),
+                    use_speed=use_speed
+                )
+        
+        return {'batch_size': batch_size, 'codes': codes, 'code_lens': code_lens, 'latent': latent}
+    
+    def _batch_codes_to_mel(self, batch: dict, features: dict, cfm_settings: dict):
+        """
+        批次 S2Mel：CFM 以 x_lens 長度遮罩處理不同長度的段落
+        
+        結果寫回 batch['mel'] / batch['mel_lens']，並釋放 codes 與 latent。
+        """
+        batch_size = batch['batch_size']
+        codes = batch.pop('codes')
+        code_lens = batch['code_lens']
+        latent = batch.pop('latent')
+        
+        with torch.no_grad():
+            latent = self.s2mel.models['gpt_layer'](latent)
+            
+            # 語義嵌入與長度調節逐段處理（插值長度依各段而異），成本遠低於 CFM
+            conds = []
+            for i in range(batch_size):
+                code_len = int(code_lens[i])
+                S_infer = self.semantic_codec.quantizer.vq2emb(codes[i:i + 1, :code_len].unsqueeze(1))
+                S_infer = S_infer.transpose(1, 2)
+                S_infer = S_infer + latent[i:i + 1, :S_infer.shape[1], :]
+                target_lengths = (code_lens[i:i + 1] * 1.72).long()
+                conds.append(self.s2mel.models['length_regulator'](
                     S_infer,
                     ylens=target_lengths,
                     n_quantizers=3,
                     f0=None
-                )[0]
-                
-                cat_condition = torch.cat([self.character_features['prompt_condition'], cond], dim=1)
-                
-                # CFM inference
-                vc_target = self.s2mel.models['cfm'].inference(
-                    cat_condition,
-                    torch.LongTensor([cat_condition.size(1)]).to(self.device),
-                    self.character_features['ref_mel'],
-                    self.character_features['style'],
-                    None,
-                    n_timesteps=25,
-                    inference_cfg_rate=0.7
-                )
-                
-                # 移除參考音頻部分
-                mel = vc_target[:, :, self.character_features['ref_mel'].size(-1):]
+                )[0])
             
-            # 6. BigVGAN 生成波形
-            if verbose:
-                debug_log(3, "   [4/4] BigVGAN 生成中...")
-            
-            with torch.no_grad():
-                # BigVGAN 需要 Float32 輸入 (參考 infer_v2.py line 641)
-                audio_output = self.bigvgan(mel.float()).squeeze(0).cpu()
+            # [prompt][cond][補齊]，以 x_lens 遮罩補齊部分
+            prompt_condition = features['prompt_condition']
+            prompt_len = prompt_condition.size(1)
+            cond_lens = [c.size(1) for c in conds]
+            cat_condition = conds[0].new_zeros((batch_size, prompt_len + max(cond_lens), conds[0].size(-1)))
+            for i, c in enumerate(conds):
+                cat_condition[i, :prompt_len] = prompt_condition[0]
+                cat_condition[i, prompt_len:prompt_len + cond_lens[i]] = c[0]
+            x_lens = torch.LongTensor([prompt_len + n for n in cond_lens]).to(self.device)
             
-            # 7. 保存音頻
-            import torchaudio
-            torchaudio.save(
-                output_path,
-                audio_output,
-                sample_rate=22050,
-                encoding="PCM_S",
-                bits_per_sample=16
+            # CFM inference
+            vc_target = self.s2mel.models['cfm'].inference(
+                cat_condition,
+                x_lens,
+                features['ref_mel'],
+                features['style'].expand(batch_size, -1),
+                None,
+                n_timesteps=cfm_settings['steps'],
+                inference_cfg_rate=cfm_settings['cfg_rate'],
+                solver=cfm_settings['solver'],
+                cfg_cutoff=cfm_settings['cfg_cutoff']
             )
             
-            if verbose:
-                duration = audio_output.shape[-1] / 22050
-                debug_log(2, f"   ✓ 合成完成!")
-                debug_log(3, f"   📁 保存至: {output_path}")
-                debug_log(3, f"   ⏱️  音頻時長: {duration:.2f}秒")
-            
-            return True
+            # 移除參考音頻部分
+            ref_len = features['ref_mel'].size(-1)
+            mel_lens = [int(x_lens[i]) - ref_len for i in range(batch_size)]
+            mel = vc_target[:, :, ref_len:ref_len + max(mel_lens)].clone()  # CFM 輸出為 inference tensor，需複製後才能修改
+            # 補齊區域填入批內最小值（接近靜音），避免卷積邊界受影響
+            pad_value = mel.min()
+            for i, mel_len in enumerate(mel_lens):
+                mel[i, :, mel_len:] = pad_value
+        
+        batch['mel'] = mel
+        batch['mel_lens'] = mel_lens
+    
+    def _batch_mel_to_wave(self, batch: dict) -> List[torch.Tensor]:
+        """批次 BigVGAN，輸出依各段 mel 長度裁剪為各段 [1, samples] 浮點波形 (CPU)"""
+        mel = batch.pop('mel')
+        mel_lens = batch['mel_lens']
+        with torch.no_grad():
+            # BigVGAN 需要 Float32 輸入 (參考 infer_v2.py line 641)
+            audio = self.bigvgan(mel.float()).cpu()  # [B, 1, samples]
+        
+        hop_length = self.cfg.s2mel.preprocess_params.spect_params.hop_length
+        return [audio[i, :, :mel_lens[i] * hop_length] for i in range(batch['batch_size'])]
+    
+    def _crossfade_concat(self, waves: List[torch.Tensor]) -> torch.Tensor:
+        """
+        以線性交叉淡化拼接各段波形
+        
+        Args:
+            waves: 各段 [1, samples] 波形
             
-        except Exception as e:
-            error_log(f"❌ 合成失敗: {e}")
-            import traceback
-            traceback.print_exc()
-            return False
+        Returns:
+            拼接後的 [1, samples] 波形
+        """
+        if len(waves) == 1:
+            return waves[0]
+        
+        fade = int(self.sample_rate * self.segment_crossfade_ms / 1000)
+        output = waves[0]
+        for wave in waves[1:]:
+            n = min(fade, output.shape[-1], wave.shape[-1])
+            if n <= 0:
+                output = torch.cat([output, wave], dim=-1)
+                continue
+            ramp = torch.linspace(0.0, 1.0, n, dtype=wave.dtype)
+            overlap = output[:, -n:] * (1.0 - ramp) + wave[:, :n] * ramp
+            output = torch.cat([output[:, :-n], overlap, wave[:, n:]], dim=-1)
+        return output
     
     def get_current_character(self) -> Optional[str]:
         """獲取當前加載的角色名稱"""
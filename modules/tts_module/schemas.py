@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Optional, List
+from typing import Optional, List, Dict, Any
 
 class TTSInput(BaseModel):
     text: str = Field(..., description="Text content to synthesize")
@@ -9,6 +9,7 @@ class TTSInput(BaseModel):
     force_chunking: Optional[bool] = Field(False, description="Force chunking even for short text")
     character: Optional[str] = Field(None, description="Character to use for TTS (None = use default)")
     emotion_vector: Optional[List[float]] = Field(None, description="8D emotion vector [happy, angry, sad, afraid, disgusted, melancholic, surprised, calm]. None = derive from Status Manager")
+    stream_id: Optional[str] = Field(None, description="ID of a text stream already being synthesized (from start_text_stream); wait for it instead of synthesizing text")
 
 class TTSOutput(BaseModel):
     status: str = Field(..., description="Status of the TTS process")
@@ -18,6 +19,8 @@ class TTSOutput(BaseModel):
     is_chunked: bool = Field(False, description="Whether the text was processed as chunks")
     chunk_count: int = Field(0, description="Number of chunks if chunking was used")
     audio_duration: Optional[float] = Field(default=None, description="Audio duration in seconds")
+    time_to_first_audio: Optional[float] = Field(default=None, description="Seconds from request (or stream start) until the first audio chunk was ready")
+    chunk_timings: Optional[List[Dict[str, Any]]] = Field(default=None, description="Per-chunk timing (synthesis_ms, convert_ms, audio_seconds, ready_at, playback_start) for streamed synthesis")
 
 class TTSQueueStatus(BaseModel):  # Currently not used
     is_playing: bool = Field(..., description="Whether TTS is currently playing")
@@ -0,0 +1,196 @@
+# modules/tts_module/stage_pipeline.py
+"""
+TTS 分階段管線 - 多段回覆的 text→codes / codes→mel / mel→wave 重疊執行
+
+每個階段一條執行緒，階段之間以有界佇列連接：
+段落 N 在 BigVGAN 生成波形時，段落 N+1 已在 S2Mel、段落 N+2 已在 GPT。
+三個階段使用不同的模型，PyTorch 運算期間釋放 GIL，因此可以真正並行。
+
+torch.set_num_threads 是行程層級的設定（MKL 與 intra-op 執行緒池共用），
+無法按階段切分；CPU 上管線執行期間統一設定一次（預設取一半核心，即 GPT 的份額），
+三個階段共用這個上限，避免同時搶佔全部核心，結束後恢復原值。
+
+輸出依段落順序產生；單段失敗只影響該段，不中斷後續段落。
+"""
+
+import os
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional, Tuple
+
+from utils.debug_helper import debug_log, error_log
+
+STAGES = ("text_to_codes", "codes_to_mel", "mel_to_wave")
+
+_END = object()
+
+
+class TTSStagePipeline:
+    """TTS 分階段管線"""
+
+    def __init__(self, engine, depth: int = 1, overlap: bool = True,
+                 cpu_threads: Optional[int] = None):
+        """
+        Args:
+            engine: 提供 text_to_codes / codes_to_mel / mel_to_wave 的合成引擎
+            depth: 階段間佇列容量（每個階段最多領先下一階段幾段）
+            overlap: False 時在呼叫者執行緒逐段完整合成（與舊行為相同）
+            cpu_threads: 管線執行期間的 torch CPU 執行緒數（三階段共用），None 表示依核心數決定
+        """
+        self.engine = engine
+        self.depth = max(1, depth)
+        self.overlap = overlap
+        self.cpu_threads = cpu_threads
+
+    def _resolve_cpu_threads(self) -> Optional[int]:
+        """CPU 執行緒上限：GPT 自回歸最吃 CPU，取一半核心；核心太少時不調整"""
+        if self.cpu_threads:
+            return int(self.cpu_threads)
+        cores = os.cpu_count() or 1
+        if cores < 4:
+            return None
+        return max(1, cores // 2)
+
+    def run(self, chunks: Iterable[str],
+            stage_kwargs: Callable[[str], Dict[str, Any]]) -> Iterator[Tuple[int, str, Any, Dict[str, Any]]]:
+        """
+        依序產生各段結果
+
+        Args:
+            chunks: 文本段落來源（可以是阻塞迭代器，例如 LLM 串流的 TextStream）
+            stage_kwargs: 段落 -> text_to_codes 的額外參數（情感向量、CFM 設定檔等）
+
+        Yields:
+            (段落序號 1 起, 段落文本, [1, samples] 波形或 None, 各階段耗時 ms 與 synthesis_ms)
+        """
+        if not self.overlap:
+            yield from self._run_serial(chunks, stage_kwargs)
+            return
+        yield from self._run_overlapped(chunks, stage_kwargs)
+
+    def _run_serial(self, chunks, stage_kwargs):
+        for idx, chunk in enumerate(chunks, 1):
+            timing: Dict[str, Any] = {}
+            start = time.perf_counter()
+            try:
+                job = self._timed(timing, "text_to_codes", self.engine.text_to_codes, chunk, **stage_kwargs(chunk))
+                self._timed(timing, "codes_to_mel", self.engine.codes_to_mel, job)
+                audio = self._timed(timing, "mel_to_wave", self.engine.mel_to_wave, job)
+            except Exception as e:
+                error_log(f"[TTSPipeline] 段落 {idx} 合成失敗: {e}")
+                audio = None
+            timing["synthesis_ms"] = (time.perf_counter() - start) * 1000
+            yield idx, chunk, audio, timing
+
+    def _run_overlapped(self, chunks, stage_kwargs):
+        queues = [queue.Queue(maxsize=self.depth) for _ in STAGES]  # 各階段的輸出佇列
+        stop_event = threading.Event()
+        device = getattr(self.engine, "device", None)
+        cpu_threads = self._resolve_cpu_threads() if getattr(device, "type", "cpu") == "cpu" else None
+        original_threads = self._get_thread_count() if cpu_threads else None
+        if cpu_threads:
+            # 行程層級設定，在啟動階段執行緒前設定一次
+            self._set_thread_count(cpu_threads)
+
+        def put(q, item):
+            # 消費端提前結束時不要永久阻塞
+            while not stop_event.is_set():
+                try:
+                    q.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def get(q):
+            while not stop_event.is_set():
+                try:
+                    return q.get(timeout=0.1)
+                except queue.Empty:
+                    continue
+            return _END
+
+        def stage_worker(stage: str, source, sink, work: Callable[[str, Any], Any]):
+            try:
+                while True:
+                    item = next(source, _END) if stage == STAGES[0] else get(source)
+                    if item is _END:
+                        break
+                    if stage == STAGES[0]:
+                        idx, chunk = item
+                        payload, timing = None, {"_started": time.perf_counter()}
+                    else:
+                        idx, chunk, payload, timing = item
+                        if payload is None:
+                            if not put(sink, (idx, chunk, None, timing)):
+                                break
+                            continue
+                    try:
+                        payload = self._timed(timing, stage, work, chunk, payload)
+                    except Exception as e:
+                        error_log(f"[TTSPipeline] 段落 {idx} 於 {stage} 失敗: {e}")
+                        payload = None
+                    if not put(sink, (idx, chunk, payload, timing)):
+                        break
+            except Exception as e:
+                error_log(f"[TTSPipeline] {stage} 執行緒錯誤: {e}")
+            finally:
+                put(sink, _END)
+
+        numbered = enumerate(chunks, 1)
+        workers = [
+            ("text_to_codes", numbered, queues[0],
+             lambda chunk, _payload: self.engine.text_to_codes(chunk, **stage_kwargs(chunk))),
+            ("codes_to_mel", queues[0], queues[1],
+             lambda _chunk, job: self.engine.codes_to_mel(job)),
+            ("mel_to_wave", queues[1], queues[2],
+             lambda _chunk, job: self.engine.mel_to_wave(job)),
+        ]
+        threads = [
+            threading.Thread(target=stage_worker, args=spec, name=f"TTSPipeline-{spec[0]}", daemon=True)
+            for spec in workers
+        ]
+        for thread in threads:
+            thread.start()
+        debug_log(3, f"[TTSPipeline] 啟動 3 階段管線 (深度 {self.depth}, CPU 執行緒 {cpu_threads or '預設'})")
+
+        try:
+            while True:
+                item = queues[2].get()
+                if item is _END:
+                    break
+                idx, chunk, audio, timing = item
+                timing["synthesis_ms"] = (time.perf_counter() - timing.pop("_started")) * 1000
+                yield idx, chunk, audio, timing
+        finally:
+            stop_event.set()
+            for thread in threads:
+                thread.join(timeout=1.0)
+            if original_threads:
+                self._set_thread_count(original_threads)
+
+    @staticmethod
+    def _timed(timing: Dict[str, Any], stage: str, fn: Callable, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            timing[f"{stage}_ms"] = (time.perf_counter() - start) * 1000
+
+    @staticmethod
+    def _get_thread_count() -> Optional[int]:
+        try:
+            import torch
+            return torch.get_num_threads()
+        except Exception:
+            return None
+
+    @staticmethod
+    def _set_thread_count(threads: int):
+        """設定 torch intra-op 執行緒數（整個行程生效）"""
+        try:
+            import torch
+            torch.set_num_threads(threads)
+        except Exception as e:
+            debug_log(2, f"[TTSPipeline] 無法設定 CPU 執行緒數: {e}")
@@ -4,11 +4,14 @@ TTS Module - 重構版本
 """
 
 import asyncio
+import contextlib
 import os
 import time
 import uuid
 import enum
-from typing import Optional, Dict, Any, List
+import functools
+import threading
+from typing import Optional, Dict, Any, Iterable, List
 
 from core.bases.module_base import BaseModule
 from core.working_context import working_context_manager
@@ -20,10 +23,13 @@ from utils.debug_helper import debug_log, debug_log_e, info_log, error_log
 from .schemas import TTSInput, TTSOutput
 from .lite_engine import IndexTTSLite
 from .emotion_mapper import EmotionMapper
-from utils.tts_chunker import TTSChunker
+from .audio_cache import PhraseAudioCache
+from .stage_pipeline import TTSStagePipeline
+from utils.tts_chunker import TTSChunker, TextStream
 
 import numpy as np
 import soundfile as sf
+import torch
 try:
     import simpleaudio as sa
 except ImportError:
@@ -82,10 +88,27 @@ class TTSModule(BaseModule):
         self.emotion_max_strength = emotion_config.get("max_strength", 0.3)
         self.default_emotion = emotion_config.get("default", None)  # None = 使用角色原聲
         
+        # 短句 (感嘆詞、簡短回應) 使用較快的 CFM 設定檔，其餘使用引擎預設設定檔
+        synthesis_config = self.config.get("synthesis", {})
+        self.short_text_cfm_profile = synthesis_config.get("short_text_cfm_profile", None)
+        self.short_text_max_chars = synthesis_config.get("short_text_max_chars", 24)
+        
+        # 多段串流的分階段管線 (GPT / S2Mel / BigVGAN 跨段落重疊)
+        pipeline_config = synthesis_config.get("pipeline", {})
+        self.pipeline_overlap = pipeline_config.get("enabled", True)
+        self.pipeline_depth = pipeline_config.get("depth", 1)
+        self.pipeline_cpu_threads = pipeline_config.get("cpu_threads", None)
+        
+        # 短語音頻快取 (問候、確認、工作流程提示等重複輸出直接重播)
+        audio_cache_config = self.config.get("audio_cache", {})
+        self.audio_cache = PhraseAudioCache(audio_cache_config)
+        self.audio_cache_prewarm = audio_cache_config.get("prewarm_phrases", []) or []
+        
         # 播放狀態追踪
         self._playback_state = PlaybackState.IDLE
         self._current_playback_obj = None
-        self._playback_lock = asyncio.Lock()
+        # handle() 與文字串流線程各自執行在不同的事件迴圈，使用執行緒鎖串行化播放
+        self._playback_lock = threading.Lock()
         
         # 初始化組件
         self.engine: Optional[IndexTTSLite] = None
@@ -99,6 +122,11 @@ class TTSModule(BaseModule):
             pause_between_chunks=0.1  # 段落間短暫停頓
         )
         
+        # LLM 串流輸出的文字串流 (stream_id -> TextStream)
+        self._text_streams: Dict[str, TextStream] = {}
+        self._text_streams_lock = threading.Lock()
+        self.text_stream_timeout = chunking_config.get("stream_timeout", 120.0)  # 秒
+        
         # Working Context 和 Status Manager 引用 (使用全局單例)
         self.working_context_manager = working_context_manager
         self.status_manager = status_manager
@@ -118,7 +146,6 @@ class TTSModule(BaseModule):
         user_settings_manager.register_reload_callback("tts_module", self._reload_from_user_settings)
         
         # 創建必要目錄
-        os.makedirs(os.path.join("temp", "tts"), exist_ok=True)
         os.makedirs(os.path.join("outputs", "tts"), exist_ok=True)
     
     def debug(self):
@@ -146,7 +173,8 @@ class TTSModule(BaseModule):
                 model_dir=self.model_dir,
                 use_fp16=self.use_fp16,
                 device=self.device,
-                use_cuda_kernel=True  # 🚀 加速 15-25%
+                use_cuda_kernel=True,  # 🚀 加速 15-25%
+                synthesis_config=self.config.get("synthesis", {})
             )
             
             info_log(f"[TTS] IndexTTS 引擎初始化成功")
@@ -163,6 +191,18 @@ class TTSModule(BaseModule):
             
             info_log(f"[TTS] Chunking 已{'啟用' if self.chunking_enabled else '禁用'}, 閾值: {self.chunking_threshold} 字符")
             
+            # 預熱短語快取 (只合成尚未快取的短語)
+            if self.audio_cache.enabled and self.audio_cache_prewarm:
+                emotion_vector = self._get_emotion_vector_from_status()
+                self.audio_cache.prewarm(
+                    self.audio_cache_prewarm,
+                    make_key=lambda phrase: self._audio_cache_key(phrase, emotion_vector),
+                    synthesize=lambda phrase: self.engine.synthesize_audio(
+                        phrase, emotion_vector, cfm_profile=self._select_cfm_profile(phrase), verbose=False
+                    ),
+                    sample_rate=self.engine.sample_rate
+                )
+            
             return True
             
         except Exception as e:
@@ -346,6 +386,126 @@ class TTSModule(BaseModule):
         except Exception as e:
             error_log(f"[TTS] 輸出完成回調失敗: {e}")
     
+    def start_text_stream(
+        self,
+        character: Optional[str] = None,
+        emotion_vector: Optional[List[float]] = None
+    ) -> Optional[TextStream]:
+        """
+        開啟文字串流：呼叫者（LLM 串流輸出）逐段 put 句子，TTS 在背景立即合成播放
+        
+        輸出層之後以 handle({"text": ..., "stream_id": stream.stream_id}) 等待播放完成，
+        沿用一般的輸出完成事件流程。
+        
+        Returns:
+            TextStream，引擎未就緒時返回 None
+        """
+        if not self.engine:
+            debug_log(2, "[TTS] 引擎未初始化，無法開啟文字串流")
+            return None
+        
+        if character and character != self.default_character:
+            character_path = os.path.join(self.character_dir, f"{character}.pt")
+            if os.path.exists(character_path):
+                self.engine.load_character(character_path)
+        if emotion_vector is None:
+            emotion_vector = self._get_emotion_vector_from_status()
+        
+        stream = TextStream()
+        with self._text_streams_lock:
+            # 清理已完成但從未被領取的串流
+            for stream_id in [sid for sid, s in self._text_streams.items()
+                              if s.done and time.time() - s.created_at > self.text_stream_timeout]:
+                del self._text_streams[stream_id]
+            self._text_streams[stream.stream_id] = stream
+        
+        threading.Thread(
+            target=self._run_text_stream,
+            args=(stream, emotion_vector),
+            name=f"TTSStream-{stream.stream_id}",
+            daemon=True
+        ).start()
+        debug_log(2, f"[TTS] 文字串流已開啟: {stream.stream_id}")
+        return stream
+    
+    @contextlib.asynccontextmanager
+    async def _playback_guard(self):
+        """在目前的事件迴圈中持有播放鎖（阻塞的取得放到執行緒池，不卡住迴圈）"""
+        if not self._playback_lock.acquire(blocking=False):
+            acquiring = asyncio.get_running_loop().run_in_executor(None, self._playback_lock.acquire)
+            try:
+                await asyncio.shield(acquiring)
+            except asyncio.CancelledError:
+                # 取消時執行緒仍會取得鎖，取得後立即釋放
+                acquiring.add_done_callback(
+                    lambda future: self._playback_lock.release()
+                    if not future.cancelled() and future.exception() is None else None
+                )
+                raise
+        try:
+            yield
+        finally:
+            self._playback_lock.release()
+    
+    def _run_text_stream(self, stream: TextStream, emotion_vector: Optional[List[float]]):
+        """文字串流的合成播放線程"""
+        loop = asyncio.new_event_loop()
+        try:
+            result = loop.run_until_complete(
+                self._stream_chunks(stream, save=False, emotion_vector=emotion_vector,
+                                    started_at=stream.created_at)
+            )
+            if stream.error:
+                result["message"] = f"Stream closed with error: {stream.error}"
+        except Exception as e:
+            error_log(f"[TTS] 文字串流處理失敗: {e}")
+            result = TTSOutput(
+                status="error",
+                success=False,
+                message=f"Text stream failed: {e}",
+                output_path=None,
+                is_chunked=True,
+                chunk_count=0
+            ).model_dump()
+        finally:
+            loop.close()
+        stream.set_result(result)
+    
+    def _await_text_stream(self, stream_id: str) -> dict:
+        """等待指定文字串流播放完成並返回其結果"""
+        with self._text_streams_lock:
+            stream = self._text_streams.pop(stream_id, None)
+        
+        if stream is None:
+            return TTSOutput(
+                status="error",
+                success=False,
+                message=f"Unknown text stream: {stream_id}",
+                output_path=None,
+                is_chunked=True,
+                chunk_count=0
+            ).model_dump()
+        
+        # 生產端若未正常關閉，避免永久等待
+        if not stream.closed:
+            stream.close(error="not closed by producer")
+        result = stream.wait(self.text_stream_timeout)
+        if result is None:
+            error_log(f"[TTS] 等待文字串流逾時: {stream_id}")
+            return TTSOutput(
+                status="error",
+                success=False,
+                message="Text stream timed out",
+                output_path=None,
+                is_chunked=True,
+                chunk_count=stream.chunk_count
+            ).model_dump()
+        
+        if result.get("time_to_first_audio") is not None:
+            self.update_custom_metric('time_to_first_audio', result["time_to_first_audio"])
+        info_log(f"[TTS] 文字串流完成: {stream.chunk_count} 段, 首段音頻 {result.get('time_to_first_audio')}s")
+        return result
+    
     def handle(self, data: dict) -> dict:
         """
         處理 TTS 請求 (同步介面)
@@ -379,29 +539,33 @@ class TTSModule(BaseModule):
                 chunk_count=0
             ).dict()
         
-        # 決定是否使用 chunking
-        should_chunk = (
-            self.chunking_enabled and 
-            (len(text) > self.chunking_threshold or inp.force_chunking)
-        )
-        
-        debug_log(2, f"[TTS] 處理文本: 長度={len(text)}, chunking={'是' if should_chunk else '否'}")
-        
-        # 在新的 event loop 中運行異步方法
-        try:
-            loop = asyncio.get_event_loop()
-        except RuntimeError:
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-        
-        if should_chunk:
-            result = loop.run_until_complete(
-                self._handle_streaming(text, inp.save, inp.save_name, character=inp.character, emotion_vector=inp.emotion_vector)
-            )
+        if inp.stream_id:
+            # 文字已由 LLM 串流推送並在合成中，只需等待播放完成
+            result = self._await_text_stream(inp.stream_id)
         else:
-            result = loop.run_until_complete(
-                self._handle_single(text, inp.save, inp.save_name, inp.character, inp.emotion_vector)
+            # 決定是否使用 chunking
+            should_chunk = (
+                self.chunking_enabled and 
+                (len(text) > self.chunking_threshold or inp.force_chunking)
             )
+            
+            debug_log(2, f"[TTS] 處理文本: 長度={len(text)}, chunking={'是' if should_chunk else '否'}")
+            
+            # 在新的 event loop 中運行異步方法
+            try:
+                loop = asyncio.get_event_loop()
+            except RuntimeError:
+                loop = asyncio.new_event_loop()
+                asyncio.set_event_loop(loop)
+            
+            if should_chunk:
+                result = loop.run_until_complete(
+                    self._handle_streaming(text, inp.save, inp.save_name, character=inp.character, emotion_vector=inp.emotion_vector)
+                )
+            else:
+                result = loop.run_until_complete(
+                    self._handle_single(text, inp.save, inp.save_name, inp.character, inp.emotion_vector)
+                )
         
         # TTS 作為輸出層完成後，通知系統進行循環結束檢查
         self._on_output_complete(result)
@@ -413,7 +577,11 @@ class TTSModule(BaseModule):
             self.total_text_length += text_length
             self.update_custom_metric('text_length', text_length)
         
-        if result.get('output_path') and os.path.exists(result['output_path']):
+        if result.get('audio_duration'):
+            # 合成結果已帶有音頻時長，不必再讀檔
+            self.total_audio_generated += result['audio_duration']
+            self.update_custom_metric('audio_duration', result['audio_duration'])
+        elif result.get('output_path') and os.path.exists(result['output_path']):
             try:
                 import wave
                 with wave.open(result['output_path'], 'rb') as wav_file:
@@ -478,28 +646,45 @@ class TTSModule(BaseModule):
             # 獲取使用者偏好
             preferences = self._get_user_preferences()
             
-            # 準備輸出路徑
+            # 準備輸出路徑（只有保存時才寫檔）
             output_path = None
             if save:
                 output_path = os.path.join("outputs", "tts", f"{save_name or f'uep_{uuid.uuid4().hex[:8]}'}.wav")
-            else:
-                output_path = os.path.join("temp", "tts", f"temp_{uuid.uuid4().hex[:8]}.wav")
             
             info_log(f"[TTS] 合成單段文本: {len(text)} 字符")
             
-            # 使用引擎合成
-            async with self._playback_lock:
+            # 先查短語快取，命中時跳過 GPT → S2Mel → BigVGAN；讀檔與 FLAC 編碼放到執行緒池
+            loop = asyncio.get_event_loop()
+            cache_key = None
+            audio = None
+            if self.audio_cache.is_cacheable(text):
+                cache_key = self._audio_cache_key(text, emotion_vector)
+                cached = await loop.run_in_executor(None, self.audio_cache.lookup, cache_key)
+                if cached is not None:
+                    debug_log(2, f"[TTS] 短語快取命中: {text[:30]}")
+                    audio = torch.from_numpy(cached)
+            
+            # 使用引擎合成（直接取得波形）
+            async with self._playback_guard():
                 self._playback_state = PlaybackState.PLAYING
                 
-                result = await asyncio.get_event_loop().run_in_executor(
-                    None,
-                    self.engine.synthesize,
-                    text,
-                    output_path,
-                    emotion_vector
-                )
+                if audio is None:
+                    audio = await loop.run_in_executor(
+                        None,
+                        functools.partial(
+                            self.engine.synthesize_audio,
+                            text,
+                            emotion_vector,
+                            cfm_profile=self._select_cfm_profile(text)
+                        )
+                    )
+                    if audio is not None and cache_key is not None:
+                        await loop.run_in_executor(
+                            None,
+                            functools.partial(self.audio_cache.store, cache_key, audio, self.engine.sample_rate, text)
+                        )
             
-            if not result or not os.path.exists(output_path):
+            if audio is None or (save and not self.engine.save_audio(audio, output_path)):
                 self._playback_state = PlaybackState.ERROR
                 return TTSOutput(
                     status="error",
@@ -510,39 +695,31 @@ class TTSModule(BaseModule):
                     chunk_count=0
                 ).model_dump()
             
+            audio_duration = audio.shape[-1] / self.engine.sample_rate
+            
             # 播放音頻 (如果不保存)
             if not save and sa:
-                data, sr = sf.read(output_path)
-                # 轉換為 int16
-                data_int16 = (data * 32767).astype(np.int16)
+                pcm = self._to_pcm16(audio, self.user_volume / 100.0)
                 self._current_playback_obj = sa.play_buffer(
-                    data_int16.tobytes(),
+                    pcm.tobytes(),
                     num_channels=1,
                     bytes_per_sample=2,
-                    sample_rate=sr
+                    sample_rate=self.engine.sample_rate
                 )
                 self._current_playback_obj.wait_done()
-                
-                # 播放完畢後刪除臨時文件
-                try:
-                    if os.path.exists(output_path):
-                        os.remove(output_path)
-                        debug_log(2, f"[TTS] 已刪除臨時文件: {output_path}")
-                except Exception as e:
-                    debug_log(1, f"[TTS] 刪除臨時文件失敗: {e}")
             
             self._playback_state = PlaybackState.COMPLETED
             
-            final_path = output_path if save else None
-            info_log(f"[TTS] 合成完成: {output_path}")
+            info_log(f"[TTS] 合成完成: {output_path or f'{audio_duration:.2f}s 音頻 (未保存)'}")
             
             return TTSOutput(
                 status="success",
                 success=True,
                 message="TTS completed",
-                output_path=final_path,
+                output_path=output_path,
                 is_chunked=False,
-                chunk_count=1
+                chunk_count=1,
+                audio_duration=audio_duration
             ).model_dump()
             
         except Exception as e:
@@ -579,8 +756,6 @@ class TTSModule(BaseModule):
         Returns:
             dict: TTSOutput 字典
         """
-        generated_files: List[str] = []  # 初始化臨時文件列表(用於錯誤清理)
-        
         try:
             # 檢查引擎是否已初始化
             if not self.engine:
@@ -611,43 +786,117 @@ class TTSModule(BaseModule):
             chunks = self.chunker.split_text(text)
             info_log(f"[TTS] TTSChunker 分成 {len(chunks)} 段")
             
+            return await self._stream_chunks(chunks, save, save_name, emotion_vector)
+            
+        except Exception as e:
+            self._playback_state = PlaybackState.ERROR
+            error_log(f"[TTS] Streaming 錯誤: {str(e)}")
+            return TTSOutput(
+                status="error",
+                success=False,
+                message=f"Streaming failed: {str(e)}",
+                output_path=None,
+                is_chunked=True,
+                chunk_count=0
+            ).model_dump()
+    
+    async def _stream_chunks(
+        self,
+        chunks: Iterable[str],
+        save: bool,
+        save_name: Optional[str] = None,
+        emotion_vector: Optional[List[float]] = None,
+        started_at: Optional[float] = None
+    ) -> dict:
+        """
+        逐段合成並播放 (Producer/Consumer 模式)
+        
+        chunks 可以是已切好的列表，也可以是逐步產生段落的阻塞迭代器
+        （例如 LLM 串流輸出的 TextStream），Producer 會在段落抵達時立即合成。
+        音頻段落以記憶體中的 PCM 緩衝傳給 Consumer，只有 save=True 時才寫檔。
+        
+        Args:
+            chunks: 文本段落來源
+            save: 是否保存到文件
+            save_name: 保存檔名
+            emotion_vector: 情感向量
+            started_at: 計算首段音頻延遲的起點 (預設為呼叫時間)
+            
+        Returns:
+            dict: TTSOutput 字典
+        """
+        started_at = started_at or time.time()
+        first_audio_at: List[float] = []
+        saved_buffers: List[np.ndarray] = []  # save=True 時保留各段 PCM 供合併
+        chunk_timings: List[Dict[str, Any]] = []
+        
+        try:
             # 使用有限緩衝隊列,最多緩衝 2 個音頻段落
             # 這樣可以保持 Producer 領先,減少播放時的停頓
             queue = asyncio.Queue(maxsize=2)
             loop = asyncio.get_event_loop()
-            tmp_dir = "temp/tts"
-            generated_files = []
             
             # 獲取引擎引用 (for type narrowing)
-            engine = self.engine  # Type narrowing: 此時已確認 engine 不是 None
+            engine = self.engine
+            if engine is None:
+                raise RuntimeError("Engine not initialized")
+            sample_rate = engine.sample_rate
+            volume_factor = self.user_volume / 100.0  # 🔧 應用使用者音量設定 (0-100 -> 0.0-1.0)
+            
+            # 分階段管線：段落 N 在 BigVGAN 時段落 N+1 已在 GPT（overlap 關閉時逐段完整合成）
+            # 同一段回覆的各段落一律使用引擎預設設定檔，不套用短句設定檔，避免音質忽高忽低
+            pipeline = TTSStagePipeline(
+                engine,
+                depth=self.pipeline_depth,
+                overlap=self.pipeline_overlap,
+                cpu_threads=self.pipeline_cpu_threads
+            )
+            results = pipeline.run(
+                chunks,
+                lambda chunk: {"emotion_vector": emotion_vector}
+            )
             
             # Producer: 生成音頻段落
             async def producer():
-                info_log(f"[TTS] Producer 開始處理 {len(chunks)} 個段落 (緩衝: 2 段)")
-                for idx, chunk in enumerate(chunks, 1):
+                info_log(f"[TTS] Producer 開始處理段落 (緩衝: 2 段, 階段重疊: {'是' if self.pipeline_overlap else '否'})")
+                while True:
+                    # 段落來源可能阻塞（等待 LLM 串流或管線），放到執行緒池取下一段結果
+                    result = await loop.run_in_executor(None, next, results, None)
+                    if result is None:
+                        break
+                    idx, chunk, audio, stage_timing = result
                     try:
-                        debug_log(3, f"[TTS] 處理段落 {idx}/{len(chunks)}: {chunk[:50]}...")
+                        debug_log(3, f"[TTS] 處理段落 {idx}: {chunk[:50]}...")
+                        synth_ms = stage_timing["synthesis_ms"]
                         
-                        fname = f"chunk_{idx}_{uuid.uuid4().hex[:8]}.wav"
-                        out_path = os.path.join(tmp_dir, fname)
-                        
-                        # 合成段落
-                        await loop.run_in_executor(
-                            None,
-                            engine.synthesize,
-                            chunk,
-                            out_path,
-                            emotion_vector
-                        )
-                        
-                        if os.path.exists(out_path):
-                            generated_files.append(out_path)
-                            # 如果隊列已滿,這裡會等待 Consumer 取走一個音頻
-                            await queue.put(("success", out_path))
-                            debug_log(3, f"[TTS] 段落 {idx} 完成並放入隊列")
-                        else:
+                        if audio is None:
                             error_log(f"[TTS] 段落 {idx} 合成失敗")
                             await queue.put(("error", f"Chunk {idx} failed"))
+                            continue
+                        
+                        convert_start = time.perf_counter()
+                        pcm = self._to_pcm16(audio, volume_factor)
+                        convert_ms = (time.perf_counter() - convert_start) * 1000
+                        
+                        timing = {
+                            "index": idx,
+                            "chars": len(chunk),
+                            "audio_seconds": len(pcm) / sample_rate,
+                            "synthesis_ms": synth_ms,
+                            "convert_ms": convert_ms,
+                            "ready_at": time.time() - started_at
+                        }
+                        timing.update({k: v for k, v in stage_timing.items() if k != "synthesis_ms"})
+                        chunk_timings.append(timing)
+                        if save:
+                            saved_buffers.append(pcm)
+                        
+                        if not first_audio_at:
+                            first_audio_at.append(time.time())
+                            info_log(f"[TTS] 首段音頻就緒: {first_audio_at[0] - started_at:.3f}s")
+                        # 如果隊列已滿,這裡會等待 Consumer 取走一個音頻
+                        await queue.put(("success", (pcm, timing)))
+                        debug_log(3, f"[TTS] 段落 {idx} 完成並放入隊列 (合成 {synth_ms:.0f}ms, 轉換 {convert_ms:.1f}ms)")
                             
                     except Exception as e:
                         error_log(f"[TTS] Producer 錯誤 (段落 {idx}): {str(e)}")
@@ -655,7 +904,7 @@ class TTSModule(BaseModule):
                 
                 # 標記結束
                 await queue.put(("done", None))
-                info_log(f"[TTS] Producer 完成，共生成 {len(generated_files)} 個段落")
+                info_log(f"[TTS] Producer 完成，共生成 {len(chunk_timings)} 個段落")
             
             # Consumer: 播放音頻段落
             async def consumer():
@@ -666,76 +915,49 @@ class TTSModule(BaseModule):
                     if status == "done":
                         break
                     elif status == "error":
-                        error_log(f"[TTS] Consumer 收到錯誤: {data}")
-                        break
+                        # 單段失敗只跳過該段，繼續取用隊列，避免 Producer 卡在已滿的隊列
+                        error_log(f"[TTS] Consumer 收到錯誤，跳過該段: {data}")
+                        continue
                     elif status == "success":
                         count += 1
+                        pcm, timing = data
                         # 播放 (如果不保存)
                         if not save and sa:
                             try:
-                                audio, sr = sf.read(data)
-                                # 🔧 應用使用者音量設定 (0-100 -> 0.0-1.0)
-                                volume_factor = self.user_volume / 100.0
-                                audio = audio * volume_factor
-                                audio_int16 = (audio * 32767).astype(np.int16)
-                                play_obj = sa.play_buffer(
-                                    audio_int16.tobytes(), 1, 2, sr
-                                )
-                                play_obj.wait_done()
-                                
-                                # 播放完畢後刪除該段臨時文件
-                                try:
-                                    if os.path.exists(data):
-                                        os.remove(data)
-                                        debug_log(3, f"[TTS] 已刪除臨時chunk: {data}")
-                                except Exception as del_err:
-                                    debug_log(1, f"[TTS] 刪除臨時chunk失敗: {del_err}")
+                                timing["playback_start"] = time.time() - started_at
+                                play_obj = sa.play_buffer(pcm.tobytes(), 1, 2, sample_rate)
+                                # 在執行緒池等待播放完成，讓 Producer 持續合成下一段
+                                await loop.run_in_executor(None, play_obj.wait_done)
                             except Exception as e:
                                 error_log(f"[TTS] 播放失敗: {str(e)}")
                 
                 info_log(f"[TTS] Consumer 完成，已播放 {count} 個段落")
             
             # 啟動 Producer 和 Consumer
-            async with self._playback_lock:
+            async with self._playback_guard():
                 self._playback_state = PlaybackState.PLAYING
                 
                 producer_task = asyncio.create_task(producer())
                 consumer_task = asyncio.create_task(consumer())
                 
-                await producer_task
-                await consumer_task
+                try:
+                    await asyncio.gather(producer_task, consumer_task)
+                finally:
+                    # 任一方異常結束時取消另一方，避免持有播放鎖無限等待
+                    for task in (producer_task, consumer_task):
+                        if not task.done():
+                            task.cancel()
             
             # 合併音頻 (如果需要保存)
             output_path = None
-            if save and generated_files:
-                info_log(f"[TTS] 合併 {len(generated_files)} 個音頻檔案")
-                buffers = []
-                sr = None
-                
-                for f in generated_files:
-                    if os.path.exists(f):
-                        data, _sr = sf.read(f)
-                        sr = sr or _sr
-                        # 🔧 應用使用者音量設定 (0-100 -> 0.0-1.0)
-                        volume_factor = self.user_volume / 100.0
-                        data = data * volume_factor
-                        buffers.append(data)
-                
-                if buffers:
-                    merged = np.concatenate(buffers, axis=0)
-                    output_path = os.path.join("outputs", "tts", f"{save_name or f'uep_{uuid.uuid4().hex[:8]}'}.wav")
-                    sf.write(output_path, merged, sr)
-                    info_log(f"[TTS] 已合併音頻到 {output_path}")
-                    
-                    # 合併完成後刪除原始臨時chunk文件
-                    for f in generated_files:
-                        try:
-                            if os.path.exists(f):
-                                os.remove(f)
-                                debug_log(3, f"[TTS] 已刪除合併前的chunk: {f}")
-                        except Exception as e:
-                            debug_log(1, f"[TTS] 刪除chunk失敗: {e}")
+            if save and saved_buffers:
+                info_log(f"[TTS] 合併 {len(saved_buffers)} 個音頻段落")
+                merged = np.concatenate(saved_buffers, axis=0)
+                output_path = os.path.join("outputs", "tts", f"{save_name or f'uep_{uuid.uuid4().hex[:8]}'}.wav")
+                sf.write(output_path, merged, sample_rate, subtype="PCM_16")
+                info_log(f"[TTS] 已合併音頻到 {output_path}")
             
+            self._log_chunk_timings(chunk_timings)
             self._playback_state = PlaybackState.COMPLETED
             
             return TTSOutput(
@@ -744,7 +966,10 @@ class TTSModule(BaseModule):
                 message=f"Streaming completed",
                 output_path=output_path,
                 is_chunked=True,
-                chunk_count=len(chunks)
+                chunk_count=len(chunk_timings),
+                audio_duration=sum(t["audio_seconds"] for t in chunk_timings),
+                time_to_first_audio=(first_audio_at[0] - started_at) if first_audio_at else None,
+                chunk_timings=chunk_timings
             ).model_dump()
             
         except Exception as e:
@@ -753,17 +978,6 @@ class TTSModule(BaseModule):
             import traceback
             debug_log(1, f"[TTS] 錯誤詳情:\n{traceback.format_exc()}")
             
-            # 發生錯誤時清理已生成的臨時文件
-            if generated_files:
-                debug_log(2, f"[TTS] 清理 {len(generated_files)} 個臨時文件...")
-                for f in generated_files:
-                    try:
-                        if os.path.exists(f):
-                            os.remove(f)
-                            debug_log(3, f"[TTS] 已刪除: {f}")
-                    except Exception as cleanup_err:
-                        debug_log(1, f"[TTS] 清理失敗: {cleanup_err}")
-            
             return TTSOutput(
                 status="error",
                 success=False,
@@ -773,6 +987,56 @@ class TTSModule(BaseModule):
                 chunk_count=0
             ).model_dump()
     
+    def _audio_cache_key(self, text: str, emotion_vector: Optional[List[float]]) -> str:
+        """短語快取鍵：文本、角色、情感向量與影響輸出的引擎參數"""
+        engine_params = {
+            "cfm": self.engine.get_cfm_profile(self._select_cfm_profile(text)),
+            "sample_rate": self.engine.sample_rate,
+            "max_text_tokens_per_segment": self.engine.max_text_tokens_per_segment,
+            "segment_crossfade_ms": self.engine.segment_crossfade_ms
+        }
+        return self.audio_cache.make_key(text, self.engine.current_character, emotion_vector, engine_params)
+    
+    def _select_cfm_profile(self, text: str) -> Optional[str]:
+        """單段短句改用 short_text_cfm_profile，其餘返回 None (引擎預設設定檔)；多段串流不使用"""
+        if self.short_text_cfm_profile and len(text.strip()) <= self.short_text_max_chars:
+            return self.short_text_cfm_profile
+        return None
+    
+    def _to_pcm16(self, audio: Any, volume: float = 1.0) -> np.ndarray:
+        """
+        將引擎輸出的浮點波形轉為 int16 PCM
+        
+        Args:
+            audio: [1, samples] 張量或 NumPy 陣列 (範圍 -1~1)
+            volume: 音量倍率
+            
+        Returns:
+            np.ndarray: 單聲道 int16 PCM
+        """
+        if hasattr(audio, "detach"):
+            audio = audio.detach().cpu().numpy()
+        audio = np.asarray(audio, dtype=np.float32).reshape(-1)
+        if volume != 1.0:
+            audio = audio * volume
+        return (np.clip(audio, -1.0, 1.0) * 32767).astype(np.int16)
+    
+    def _log_chunk_timings(self, chunk_timings: List[Dict[str, Any]]):
+        """輸出每段的合成/轉換時間與等待播放時間"""
+        for timing in chunk_timings:
+            wait = ""
+            if "playback_start" in timing:
+                wait = f", 等待播放 {max(timing['playback_start'] - timing['ready_at'], 0.0) * 1000:.0f}ms"
+            debug_log(3, f"[TTS] 段落 {timing['index']}: {timing['chars']} 字符 → {timing['audio_seconds']:.2f}s 音頻, "
+                         f"合成 {timing['synthesis_ms']:.0f}ms, 轉換 {timing['convert_ms']:.1f}ms{wait}")
+        if chunk_timings:
+            # 階段重疊時各段合成時間彼此重疊，以「首段開始合成 → 末段就緒」的牆鐘時間計算 RTF
+            first_start = min(t["ready_at"] - t["synthesis_ms"] / 1000 for t in chunk_timings)
+            total_synth = max(t["ready_at"] for t in chunk_timings) - first_start
+            total_audio = sum(t["audio_seconds"] for t in chunk_timings)
+            if total_audio > 0:
+                self.update_custom_metric('tts_rtf', total_synth / total_audio)
+    
     def _reload_from_user_settings(self, key_path: str, value: Any) -> bool:
         """
         從 user_settings.yaml 重載設定
@@ -832,6 +1096,11 @@ class TTSModule(BaseModule):
             error_log(traceback.format_exc())
             return False
     
+    def shutdown(self):
+        """關閉 TTS 模組，保存短語快取索引"""
+        self.audio_cache.flush()
+        super().shutdown()
+    
     def get_performance_window(self) -> dict:
         """獲取效能數據窗口（包含 TTS 特定指標）"""
         window = super().get_performance_window()
@@ -842,6 +1111,7 @@ class TTSModule(BaseModule):
             self.total_audio_generated / self.synthesis_count
             if self.synthesis_count > 0 else 0.0
         )
+        window['audio_cache'] = self.audio_cache.get_stats()
         window['avg_text_length'] = (
             self.total_text_length / self.synthesis_count
             if self.synthesis_count > 0 else 0.0
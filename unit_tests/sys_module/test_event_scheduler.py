@@ -0,0 +1,185 @@
+"""
+背景事件排程器測試（假時鐘）
+測試範圍：
+1. DeadlineQueue 依到期時間取出項目、重新設定後舊項目作廢、notify 喚醒
+2. BackgroundEventScheduler 只在項目到期時檢查資料庫並發布事件
+3. 待辦事項依通知階段逐一排程下一次到期時間
+4. 透過 local_todo 新增項目會立即喚醒運行中的排程器
+5. 停止排程器時提交佇列中的通知標記，重新開啟資料庫後仍在
+"""
+
+import threading
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from core.event_bus import event_bus, SystemEvent
+from modules.sys_module.actions import automation_helper
+from modules.sys_module.actions.automation_helper import BackgroundEventScheduler
+from modules.sys_module.actions.deadline_queue import DeadlineQueue
+from modules.sys_module.actions.task_database import TaskDatabase
+
+
+class FakeClock:
+    """可手動推進的時鐘"""
+
+    def __init__(self, start: datetime):
+        self.now = start
+
+    def __call__(self) -> datetime:
+        return self.now
+
+    def advance(self, **kwargs):
+        self.now += timedelta(**kwargs)
+
+
+@pytest.fixture
+def clock():
+    return FakeClock(datetime(2025, 6, 1, 9, 0, 0))
+
+
+@pytest.fixture
+def published(monkeypatch):
+    events = []
+    monkeypatch.setattr(event_bus, "publish", lambda event_type, data, *args, **kwargs: events.append((event_type, data)))
+    return events
+
+
+@pytest.fixture
+def scheduler(tmp_path, monkeypatch, clock, published):
+    db = TaskDatabase(str(tmp_path / "uep_tasks.db"), write_batch_delay=0)
+    monkeypatch.setattr(automation_helper, "_db", db)
+    automation_helper._init_db()
+    # 不沿用全域單例，改用注入假時鐘的新實例
+    monkeypatch.setattr(BackgroundEventScheduler, "_instance", None)
+    instance = BackgroundEventScheduler(clock=clock)
+    yield instance
+    if instance.is_running:
+        instance.stop(timeout=5)
+    db.close()
+
+
+class TestDeadlineQueue:
+    """測試到期時間最小堆"""
+
+    def test_pop_due_in_deadline_order(self, clock):
+        queue = DeadlineQueue(clock)
+        queue.set(("todos", 1), clock.now + timedelta(minutes=10))
+        queue.set(("reminders", 7), clock.now + timedelta(minutes=5))
+        queue.set(("todos", 2), clock.now + timedelta(hours=1))
+
+        assert queue.next_due() == clock.now + timedelta(minutes=5)
+        assert queue.pop_due() == []
+
+        clock.advance(minutes=10)
+        assert queue.pop_due() == [("reminders", 7), ("todos", 1)]
+        assert len(queue) == 1
+
+    def test_replace_invalidates_old_entries(self, clock):
+        queue = DeadlineQueue(clock)
+        queue.set(("todos", 1), clock.now + timedelta(minutes=1))
+        queue.set(("todos", 2), clock.now + timedelta(minutes=2))
+        queue.replace("todos", {2: clock.now + timedelta(hours=2)})
+
+        clock.advance(minutes=30)
+        assert queue.pop_due() == []
+        assert queue.next_due() == clock.now + timedelta(minutes=90)
+
+    def test_notify_wakes_waiter(self, clock):
+        queue = DeadlineQueue(clock)
+        queue.set(("todos", 1), clock.now + timedelta(days=1))
+        result = {}
+
+        def waiter():
+            start = time.monotonic()
+            result["wait"] = queue.wait()
+            result["elapsed"] = time.monotonic() - start
+
+        thread = threading.Thread(target=waiter)
+        thread.start()
+        time.sleep(0.05)
+        queue.notify("reminders")
+        thread.join(timeout=2.0)
+
+        assert not thread.is_alive()
+        assert result["wait"] == ([], ["reminders"])
+        assert result["elapsed"] < 1.0
+
+
+class TestBackgroundEventScheduler:
+    """測試以到期時間驅動的背景事件排程器"""
+
+    def test_reminder_fires_only_when_due(self, scheduler, clock, published):
+        due_at = clock.now + timedelta(seconds=90)
+        automation_helper.set_reminder(due_at, "喝水")
+
+        scheduler.run_pending([], ["reminders"])
+        assert scheduler.deadlines.next_due() == due_at
+        assert scheduler.deadlines.pop_due() == []
+        assert published == []
+
+        clock.advance(seconds=90)
+        scheduler.run_pending(scheduler.deadlines.pop_due(), [])
+
+        assert [event for event, _ in published] == [SystemEvent.REMINDER_TRIGGERED]
+        assert published[0][1]["message"] == "喝水"
+        assert automation_helper._db.query("SELECT COUNT(*) FROM reminders") == [(0,)]
+        assert scheduler.deadlines.next_due() is None
+
+    def test_todo_stages_scheduled_one_after_another(self, scheduler, clock, published):
+        deadline = clock.now + timedelta(hours=3)
+        automation_helper.local_todo("create", task_name="繳費", deadline=deadline.isoformat())
+
+        # 已在 24 小時內：24h_before 階段立即到期
+        scheduler.run_pending([], ["todos"])
+        scheduler.run_pending(scheduler.deadlines.pop_due(), [])
+        assert published[-1][1]["stage"] == "24h_before"
+        assert scheduler.deadlines.next_due() == deadline - timedelta(hours=1)
+
+        clock.advance(hours=2)
+        scheduler.run_pending(scheduler.deadlines.pop_due(), [])
+        assert published[-1][1]["stage"] == "1h_before"
+        assert scheduler.deadlines.next_due() == deadline
+
+        clock.advance(hours=1)
+        scheduler.run_pending(scheduler.deadlines.pop_due(), [])
+        assert published[-1][0] == SystemEvent.TODO_OVERDUE
+        assert published[-1][1]["stage"] == "at_deadline"
+        assert scheduler.deadlines.next_due() is None
+        assert len(published) == 3
+
+    def test_local_todo_wakes_running_scheduler(self, scheduler, clock, published):
+        assert scheduler.start(resync_interval=60)
+        time.sleep(0.1)
+        assert published == []
+
+        deadline = clock.now + timedelta(minutes=30)
+        automation_helper.local_todo("create", task_name="開會", deadline=deadline.isoformat())
+
+        waited = time.monotonic() + 2.0
+        while not published and time.monotonic() < waited:
+            time.sleep(0.01)
+
+        assert published and published[0][1]["stage"] == "1h_before"
+        assert scheduler.get_stats()["notifications"]["todos"] >= 1
+
+    def test_stop_commits_queued_notification_stamps(self, scheduler, clock, published, tmp_path):
+        assert scheduler.start(resync_interval=60)
+        time.sleep(0.1)
+        # 直接寫入（不喚醒排程器），在測試執行緒檢查，讓通知標記在停止時仍停留在寫入佇列中
+        deadline = clock.now + timedelta(minutes=30)
+        automation_helper._db.execute(
+            "INSERT INTO todos (task_name, created_at, updated_at, deadline) VALUES (?, ?, ?, ?)",
+            ("繳費", clock.now.isoformat(), clock.now.isoformat(), deadline.isoformat()))
+        automation_helper._db.write_batch_delay = 0.5
+        scheduler._check_todos()
+        assert published and published[0][1]["stage"] == "1h_before"
+
+        assert scheduler.stop(timeout=5)
+
+        reopened = TaskDatabase(str(tmp_path / "uep_tasks.db"))
+        try:
+            assert reopened.query("SELECT last_notified_stage FROM todos") == [("1h_before",)]
+        finally:
+            reopened.close()
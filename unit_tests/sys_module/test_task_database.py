@@ -0,0 +1,74 @@
+"""
+TaskDatabase 存取層測試
+測試範圍：
+1. 每執行緒連線池化與 WAL 模式
+2. connection() 的提交 / 回滾語意
+3. 寫入佇列批次提交與 flush
+"""
+
+import sqlite3
+import threading
+
+import pytest
+
+from modules.sys_module.actions.task_database import TaskDatabase
+
+
+@pytest.fixture
+def db(tmp_path):
+    database = TaskDatabase(str(tmp_path / "tasks.db"), write_batch_delay=0)
+    with database.connection() as conn:
+        conn.execute("CREATE TABLE todos (id INTEGER PRIMARY KEY, task_name TEXT NOT NULL)")
+    yield database
+    database.close()
+
+
+class TestTaskDatabase:
+    """測試 TaskDatabase 的連線池與寫入佇列"""
+
+    def test_connection_pooled_per_thread(self, db):
+        """同一執行緒重用連線，不同執行緒各自一條連線，且啟用 WAL"""
+        with db.connection() as first, db.connection() as second:
+            assert first is second
+            assert first.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+        other = {}
+
+        def worker():
+            with db.connection() as conn:
+                other["conn"] = conn
+
+        thread = threading.Thread(target=worker)
+        thread.start()
+        thread.join()
+
+        assert other["conn"] is not first
+        assert db.get_stats()["connections"] == 2
+
+    def test_connection_rolls_back_on_error(self, db):
+        """區塊內例外會回滾，正常離開會提交"""
+        with pytest.raises(sqlite3.IntegrityError):
+            with db.connection() as conn:
+                conn.execute("INSERT INTO todos (task_name) VALUES (?)", ("kept out",))
+                conn.execute("INSERT INTO todos (task_name) VALUES (NULL)")
+
+        assert db.query("SELECT COUNT(*) FROM todos") == [(0,)]
+
+        db.execute("INSERT INTO todos (task_name) VALUES (?)", ("committed",))
+        fresh = sqlite3.connect(db.path)
+        try:
+            assert fresh.execute("SELECT task_name FROM todos").fetchall() == [("committed",)]
+        finally:
+            fresh.close()
+
+    def test_submitted_writes_visible_after_flush(self, db):
+        """佇列寫入在 flush 後可讀回，失敗語句不影響同批其他寫入"""
+        db.submit_many("INSERT INTO todos (task_name) VALUES (?)", [(f"task {i}",) for i in range(50)])
+        db.submit("INSERT INTO todos (task_name) VALUES (NULL)")
+        db.submit("INSERT INTO todos (task_name) VALUES (?)", ("last",))
+
+        assert db.flush(timeout=5.0)
+        assert db.query_one("SELECT COUNT(*) FROM todos") == (51,)
+        stats = db.get_stats()
+        assert stats["failed_writes"] == 1
+        assert stats["pending_writes"] == 0
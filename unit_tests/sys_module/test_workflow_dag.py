@@ -0,0 +1,311 @@
+"""
+工作流程 DAG 模式測試（假的慢步驟）
+測試範圍：
+1. 互不依賴的處理步驟並行執行，牆鐘時間明顯縮短
+2. 結果按步驟順序合併進會話與步驟歷史，與完成先後無關
+3. 未宣告依賴的步驟仍等待前面所有步驟
+4. 失敗後停止提交，後續步驟結果不合併
+5. 循環或跳轉後到達已提前執行的步驟時沿用結果，不重複執行
+6. 重新進入步驟時，依賴它的步驟的預取結果被丟棄並重新執行
+"""
+
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from modules.sys_module.workflows import (
+    WorkflowDefinition, WorkflowEngine, StepResult, StepTemplate, clear_compiled_graphs
+)
+
+
+@pytest.fixture(autouse=True)
+def fresh_cache():
+    clear_compiled_graphs()
+    yield
+    clear_compiled_graphs()
+
+
+def _session():
+    data = {}
+    return SimpleNamespace(
+        session_id="dag-test",
+        data=data,
+        get_data=lambda key, default=None: data.get(key, default),
+        add_data=data.__setitem__
+    )
+
+
+def _slow(delay, key, value, log=None, success=True):
+    def processor(session):
+        if log is not None:
+            log.append(("start", key, time.monotonic()))
+        time.sleep(delay)
+        if log is not None:
+            log.append(("end", key, time.monotonic()))
+        if not success:
+            return StepResult.failure(f"{key} 失敗")
+        return StepResult.success(key, {key: value, "last_writer": key})
+    return processor
+
+
+def _info_workflow(session, parallel, delays=(0.2, 0.2, 0.2), log=None):
+    """模擬同時查詢天氣、世界時間與新聞後彙整"""
+    definition = WorkflowDefinition(workflow_type="dag_info", name="dag_info")
+    names = ["weather", "world_time", "news"]
+
+    def combine(s):
+        return StepResult.complete_workflow("完成", {"summary": [s.get_data(name) for name in names]})
+
+    definition.add_step(StepTemplate.create_processing_step(session, "start", lambda s: StepResult.success("開始")))
+    for name, delay in zip(names, delays):
+        definition.add_step(StepTemplate.create_processing_step(session, name, _slow(delay, name, f"{name}-data", log)))
+    definition.add_step(StepTemplate.create_processing_step(session, "combine", combine))
+
+    chain = ["start"] + names + ["combine"]
+    for current, following in zip(chain, chain[1:]):
+        definition.add_transition(current, following)
+    definition.add_transition("combine", "END")
+    definition.set_entry_point("start")
+
+    if parallel:
+        for name in names:
+            definition.add_step_dependencies(name)
+        definition.add_step_dependencies("combine", *names)
+        definition.enable_parallel_steps(max_workers=4)
+    return definition
+
+
+def _run(definition, session):
+    engine = WorkflowEngine(definition, session)
+    start = time.perf_counter()
+    result = engine.process_input()
+    return result, time.perf_counter() - start
+
+
+class TestParallelSteps:
+    """測試 DAG 模式的並行執行與確定性合併"""
+
+    def test_independent_steps_run_concurrently(self):
+        sequential_session, parallel_session = _session(), _session()
+        sequential, sequential_time = _run(_info_workflow(sequential_session, parallel=False), sequential_session)
+        parallel, parallel_time = _run(_info_workflow(parallel_session, parallel=True), parallel_session)
+
+        assert sequential.complete and parallel.complete
+        assert sequential_time >= 0.6
+        assert parallel_time < sequential_time * 0.6
+        assert parallel.data == sequential.data == {
+            "summary": ["weather-data", "world_time-data", "news-data"]
+        }
+
+    def test_results_merged_in_step_order(self):
+        session = _session()
+        # 新聞最先完成、天氣最後完成，合併順序仍依步驟順序
+        result, _ = _run(_info_workflow(session, parallel=True, delays=(0.15, 0.1, 0.01)), session)
+
+        assert result.complete
+        assert session.data["last_writer"] == "news"
+        history = [entry["step_id"] for entry in session.data["step_history"]]
+        assert history == ["start", "weather", "world_time", "news", "combine"]
+        assert session.data["current_step"] is None
+
+    def test_worker_cpu_time_accumulated(self):
+        session = _session()
+        names = ["weather", "world_time", "news"]
+
+        def busy(key):
+            def processor(s):
+                cpu_started = time.thread_time()
+                while time.thread_time() - cpu_started < 0.03:
+                    pass
+                return StepResult.success(key, {key: f"{key}-data"})
+            return processor
+
+        definition = WorkflowDefinition(workflow_type="dag_cpu", name="dag_cpu")
+        definition.add_step(StepTemplate.create_processing_step(session, "start", lambda s: StepResult.success("開始")))
+        for name in names:
+            definition.add_step(StepTemplate.create_processing_step(session, name, busy(name)))
+        chain = ["start"] + names + ["END"]
+        for current, following in zip(chain, chain[1:]):
+            definition.add_transition(current, following)
+        definition.set_entry_point("start")
+        for name in names:
+            definition.add_step_dependencies(name)
+        definition.enable_parallel_steps(max_workers=3)
+        engine = WorkflowEngine(definition, session)
+
+        engine.process_input()
+        # 三個步驟都在工作線程執行，CPU 時間記錄在引擎上供背景執行器計入配額
+        assert [session.data.get(name) for name in names] == ["weather-data", "world_time-data", "news-data"]
+        assert engine.worker_cpu_time >= 0.09
+
+    def test_undeclared_step_waits_for_predecessors(self):
+        session = _session()
+        log = []
+        definition = _info_workflow(session, parallel=True, log=log, delays=(0.05, 0.05, 0.05))
+        del definition.step_dependencies["world_time"]
+        _run(definition, session)
+
+        times = {(event, key): at for event, key, at in log}
+        assert times[("start", "world_time")] >= times[("end", "weather")]
+        # news 只宣告了空依賴，但仍需等待前面未宣告的 world_time
+        assert times[("start", "news")] >= times[("end", "world_time")]
+
+    def test_failure_stops_commit(self):
+        session = _session()
+        definition = WorkflowDefinition(workflow_type="dag_failure", name="dag_failure")
+        gate = threading.Event()
+
+        def late(s):
+            gate.wait(2.0)
+            return StepResult.success("late", {"late": True})
+
+        definition.add_step(StepTemplate.create_processing_step(session, "start", lambda s: StepResult.success("開始")))
+        definition.add_step(StepTemplate.create_processing_step(session, "a", _slow(0.05, "a", 1)))
+        definition.add_step(StepTemplate.create_processing_step(session, "b", _slow(0.0, "b", 2, success=False)))
+        definition.add_step(StepTemplate.create_processing_step(session, "c", late))
+        for current, following in (("start", "a"), ("a", "b"), ("b", "c"), ("c", "END")):
+            definition.add_transition(current, following)
+        definition.set_entry_point("start")
+        for step_id in ("a", "b", "c"):
+            definition.add_step_dependencies(step_id)
+        definition.enable_parallel_steps(max_workers=3)
+
+        threading.Timer(0.2, gate.set).start()
+        result, _ = _run(definition, session)
+
+        assert not result.success
+        assert session.data["a"] == 1
+        assert "late" not in session.data
+        assert [entry["step_id"] for entry in session.data["step_history"]] == ["start", "a", "b"]
+        assert session.data["current_step"] == "b"
+
+    def test_invalid_dependency_rejected(self):
+        session = _session()
+        definition = _info_workflow(session, parallel=True)
+        definition.add_step_dependencies("news", "missing")
+        with pytest.raises(ValueError):
+            WorkflowEngine(definition, session)
+
+    def test_finished_results_reused_after_loop(self):
+        session = _session()
+        definition = WorkflowDefinition(workflow_type="dag_loop", name="dag_loop")
+        calls = {"poll": 0, "fetch": 0}
+
+        def poll(s):
+            calls["poll"] += 1
+            return StepResult.success("poll", {"polls": calls["poll"]}, continue_current_step=calls["poll"] < 3)
+
+        def fetch(s):
+            calls["fetch"] += 1
+            return StepResult.success("fetch", {"fetched": calls["fetch"]})
+
+        definition.add_step(StepTemplate.create_processing_step(session, "start", lambda s: StepResult.success("開始")))
+        definition.add_step(StepTemplate.create_processing_step(session, "poll", poll))
+        definition.add_step(StepTemplate.create_processing_step(session, "fetch", fetch))
+        definition.add_step(StepTemplate.create_processing_step(
+            session, "done", lambda s: StepResult.complete_workflow("完成")))
+        for current, following in (("start", "poll"), ("poll", "fetch"), ("fetch", "done"), ("done", "END")):
+            definition.add_transition(current, following)
+        definition.set_entry_point("start")
+        definition.add_step_dependencies("poll")
+        definition.add_step_dependencies("fetch")
+        definition.enable_parallel_steps(max_workers=2)
+
+        result, _ = _run(definition, session)
+
+        assert result.complete
+        assert calls == {"poll": 3, "fetch": 1}
+        assert session.data["fetched"] == 1
+        history = [entry["step_id"] for entry in session.data["step_history"]]
+        assert history == ["start", "poll", "poll", "poll", "fetch", "done"]
+
+    def test_skip_to_reuses_finished_result(self):
+        session = _session()
+        definition = WorkflowDefinition(workflow_type="dag_skip", name="dag_skip")
+        calls = []
+
+        def counted(step_id, result):
+            def processor(s):
+                calls.append(step_id)
+                return result
+            return processor
+
+        definition.add_step(StepTemplate.create_processing_step(session, "start", lambda s: StepResult.success("開始")))
+        definition.add_step(StepTemplate.create_processing_step(
+            session, "route", counted("route", StepResult.skip_to("last", "跳過 middle"))))
+        definition.add_step(StepTemplate.create_processing_step(
+            session, "middle", counted("middle", StepResult.success("middle"))))
+        definition.add_step(StepTemplate.create_processing_step(
+            session, "last", counted("last", StepResult.complete_workflow("完成"))))
+        for current, following in (("start", "route"), ("route", "middle"), ("middle", "last"), ("last", "END")):
+            definition.add_transition(current, following)
+        definition.set_entry_point("start")
+        for step_id in ("route", "middle", "last"):
+            definition.add_step_dependencies(step_id)
+        definition.enable_parallel_steps(max_workers=3)
+
+        result, _ = _run(definition, session)
+
+        assert result.complete
+        assert sorted(calls) == ["last", "middle", "route"]
+        assert [entry["step_id"] for entry in session.data["step_history"]] == ["start", "route", "last"]
+
+    def test_revisited_step_discards_stale_dependents(self):
+        session = _session()
+        definition = WorkflowDefinition(workflow_type="dag_revisit", name="dag_revisit")
+        calls = {"load": 0, "route": 0, "report": 0, "check": 0}
+
+        def load(s):
+            calls["load"] += 1
+            return StepResult.success("load", {"loaded": f"load-{calls['load']}"})
+
+        def route(s):
+            calls["route"] += 1
+            if calls["route"] == 1:
+                return StepResult.skip_to("check", "第一輪跳過 report")
+            return StepResult.success("route")
+
+        def report(s):
+            calls["report"] += 1
+            return StepResult.success("report", {"report": s.get_data("loaded")})
+
+        def check(s):
+            calls["check"] += 1
+            if calls["check"] == 1:
+                return StepResult.success("重新載入", next_step="load")
+            return StepResult.complete_workflow("完成")
+
+        for step_id, processor in (("start", lambda s: StepResult.success("開始")), ("load", load),
+                                   ("route", route), ("report", report), ("check", check)):
+            definition.add_step(StepTemplate.create_processing_step(session, step_id, processor))
+        chain = ["start", "load", "route", "report", "check", "END"]
+        for current, following in zip(chain, chain[1:]):
+            definition.add_transition(current, following)
+        definition.set_entry_point("start")
+        definition.add_step_dependencies("load")
+        definition.add_step_dependencies("route")
+        definition.add_step_dependencies("report", "load")
+        definition.enable_parallel_steps(max_workers=3)
+
+        result, _ = _run(definition, session)
+
+        assert result.complete
+        # 第一輪 report 已基於 load-1 提前執行但被跳過；重新進入 load 後必須重跑，不能沿用舊結果
+        assert calls == {"load": 2, "route": 2, "report": 2, "check": 2}
+        assert session.data["report"] == "load-2"
+        history = [entry["step_id"] for entry in session.data["step_history"]]
+        assert history == ["start", "load", "route", "check", "load", "route", "report", "check"]
+
+    def test_reset_returns_to_entry_point(self):
+        session = _session()
+        engine = WorkflowEngine(_info_workflow(session, parallel=True, delays=(0.0, 0.0, 0.0)), session)
+        assert engine.process_input().complete
+        assert session.data["current_step"] is None
+
+        engine.reset()
+
+        assert session.data["current_step"] == "start"
+        assert session.data["step_history"] == []
+        assert engine.process_input().complete
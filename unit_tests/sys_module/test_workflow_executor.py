@@ -0,0 +1,202 @@
+"""
+背景工作流執行器測試
+測試範圍：
+1. 優先級佇列與每類型並行上限
+2. 執行中任務的協作式取消
+3. 時間配額（CPU 配額含 DAG 步驟工作線程）
+4. 已結束任務的保留上限與直方圖
+"""
+
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from core.event_bus import event_bus
+from modules.sys_module.workflow_executor import (
+    BackgroundWorkflowExecutor, WorkflowPriority, WorkflowStatus
+)
+
+
+class FakeEngine:
+    """依序執行 steps 個步驟的假工作流引擎，每步可等待事件或睡眠"""
+
+    def __init__(self, steps=1, delay=0.0, gate=None, log=None, name=None):
+        self.steps = steps
+        self.delay = delay
+        self.gate = gate
+        self.log = log
+        self.name = name
+        self.executed = 0
+        self.session = SimpleNamespace(get_data=lambda key, default=None: [])
+
+    def process_input(self, _):
+        if self.gate is not None:
+            self.gate.wait(5.0)
+        if self.delay:
+            time.sleep(self.delay)
+        self.executed += 1
+        if self.log is not None and self.executed == 1:
+            self.log.append(self.name)
+        done = self.executed >= self.steps
+        return SimpleNamespace(complete=done, cancel=False, success=True, message="", data={"steps": self.executed})
+
+    def get_current_step(self):
+        return None
+
+
+def _wait_for(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.005)
+    return False
+
+
+@pytest.fixture
+def make_executor(monkeypatch):
+    monkeypatch.setattr(event_bus, "publish", lambda *args, **kwargs: None)
+    executors = []
+
+    def factory(**config):
+        monkeypatch.setattr(BackgroundWorkflowExecutor, "_instance", None)
+        executor = BackgroundWorkflowExecutor(config)
+        executors.append(executor)
+        return executor
+
+    yield factory
+    for executor in executors:
+        executor.shutdown(timeout=2.0)
+
+
+class TestBackgroundWorkflowExecutor:
+    """測試優先級、並行上限、取消與統計"""
+
+    def test_higher_priority_runs_first(self, make_executor):
+        executor = make_executor(max_workers=1, default_type_limit=1)
+        gate = threading.Event()
+        order = []
+        blocker = executor.submit_workflow(FakeEngine(gate=gate), "blocker")
+        _wait_for(lambda: executor.get_task_status(blocker)["status"] == WorkflowStatus.RUNNING)
+
+        low = executor.submit_workflow(FakeEngine(log=order, name="low"), "a", priority=WorkflowPriority.LOW)
+        high = executor.submit_workflow(FakeEngine(log=order, name="high"), "b", priority=WorkflowPriority.HIGH)
+        gate.set()
+
+        assert _wait_for(lambda: executor.get_task_status(low)["status"] == WorkflowStatus.COMPLETED)
+        assert order == ["high", "low"]
+        assert executor.get_task_status(high)["queue_wait"] <= executor.get_task_status(low)["queue_wait"]
+
+    def test_type_limit_leaves_room_for_other_types(self, make_executor):
+        executor = make_executor(max_workers=3, default_type_limit=1)
+        gate = threading.Event()
+        first = executor.submit_workflow(FakeEngine(gate=gate), "archive")
+        second = executor.submit_workflow(FakeEngine(gate=gate), "archive")
+        other = executor.submit_workflow(FakeEngine(), "weather")
+
+        assert _wait_for(lambda: executor.get_task_status(other)["status"] == WorkflowStatus.COMPLETED)
+        assert executor.get_task_status(first)["status"] == WorkflowStatus.RUNNING
+        assert executor.get_task_status(second)["status"] == WorkflowStatus.QUEUED
+        assert executor.get_task_status()["running_by_type"] == {"archive": 1}
+
+        gate.set()
+        assert _wait_for(lambda: executor.get_task_status(second)["status"] == WorkflowStatus.COMPLETED)
+
+    def test_cancel_running_task_between_steps(self, make_executor):
+        executor = make_executor(max_workers=1)
+        engine = FakeEngine(steps=1000, delay=0.005)
+        task_id = executor.submit_workflow(engine, "countdown")
+        assert _wait_for(lambda: engine.executed >= 3)
+
+        assert executor.cancel_task(task_id)
+        assert _wait_for(lambda: executor.get_task_status(task_id)["status"] == WorkflowStatus.CANCELLED)
+        assert engine.executed < 1000
+        assert executor.get_task_status(task_id)["cancel_requested"]
+
+    def test_wall_time_quota_fails_task(self, make_executor):
+        executor = make_executor(max_workers=1)
+        task_id = executor.submit_workflow(FakeEngine(steps=100, delay=0.02), "slow", max_wall_time=0.05)
+
+        assert _wait_for(lambda: executor.get_task_status(task_id)["status"] == WorkflowStatus.FAILED)
+        status = executor.get_task_status(task_id)
+        assert "配額" in status["error"]
+        assert status["steps"] < 100
+
+    def test_cpu_quota_counts_dag_worker_threads(self, make_executor):
+        class WorkerEngine(FakeEngine):
+            """每步在另一個線程消耗 CPU，並像 DAG 模式一樣累計到 worker_cpu_time"""
+            worker_cpu_time = 0.0
+
+            def process_input(self, user_input):
+                def burn():
+                    cpu_started = time.thread_time()
+                    while time.thread_time() - cpu_started < 0.02:
+                        pass
+                    self.worker_cpu_time += time.thread_time() - cpu_started
+                worker = threading.Thread(target=burn)
+                worker.start()
+                worker.join()
+                return super().process_input(user_input)
+
+        executor = make_executor(max_workers=1)
+        task_id = executor.submit_workflow(WorkerEngine(steps=100), "dag", max_cpu_time=0.05)
+
+        assert _wait_for(lambda: executor.get_task_status(task_id)["status"] == WorkflowStatus.FAILED)
+        status = executor.get_task_status(task_id)
+        assert "CPU" in status["error"]
+        assert status["steps"] < 100
+        assert status["cpu_time"] > 0.05
+
+    def test_history_bounded_and_histograms_exposed(self, make_executor):
+        executor = make_executor(max_workers=2, max_history=2)
+        task_ids = [executor.submit_workflow(FakeEngine(steps=2), "echo") for _ in range(5)]
+
+        assert _wait_for(lambda: executor.get_task_status()["stats"]["completed"] == 5)
+        overview = executor.get_task_status()
+        assert overview["retained_tasks"] == 2
+        assert overview["stats"]["evicted"] == 3
+        assert overview["histograms"]["run_time"]["count"] == 5
+        assert overview["histograms_by_type"]["echo"]["queue_wait"]["count"] == 5
+        retained_ids = [task_id for task_id in task_ids if executor.get_task_status(task_id) is not None]
+        assert len(retained_ids) == 2
+
+        retained = executor.get_task_status(retained_ids[0])
+        assert retained["wall_time"] is not None and retained["cpu_time"] >= 0.0
+
+    def test_cancel_stops_engine_inside_auto_advance(self, make_executor):
+        from modules.sys_module.workflows import WorkflowDefinition, WorkflowEngine, StepResult, StepTemplate
+
+        data = {}
+        session = SimpleNamespace(session_id="cancel-test", get_data=lambda key, default=None: data.get(key, default),
+                                  add_data=data.__setitem__)
+        gate = threading.Event()
+        executed = []
+
+        def step(step_id):
+            def processor(s):
+                executed.append(step_id)
+                if step_id == "first":
+                    gate.wait(5.0)
+                return StepResult.success(step_id)
+            return processor
+
+        definition = WorkflowDefinition(workflow_type="cancel_chain", name="cancel_chain")
+        definition.add_step(StepTemplate.create_processing_step(session, "start", lambda s: StepResult.success("開始")))
+        for step_id in ("first", "second", "third"):
+            definition.add_step(StepTemplate.create_processing_step(session, step_id, step(step_id)))
+        for current, following in (("start", "first"), ("first", "second"), ("second", "third"), ("third", "END")):
+            definition.add_transition(current, following)
+        definition.set_entry_point("start")
+        engine = WorkflowEngine(definition, session)
+
+        executor = make_executor(max_workers=1)
+        task_id = executor.submit_workflow(engine, "cancel_chain")
+        assert _wait_for(lambda: executed == ["first"])
+
+        assert executor.cancel_task(task_id)
+        gate.set()
+
+        assert _wait_for(lambda: executor.get_task_status(task_id)["status"] == WorkflowStatus.CANCELLED)
+        assert executed == ["first"]
@@ -0,0 +1,131 @@
+"""
+工作流程圖編譯測試
+測試範圍：
+1. 轉換索引與逐一掃描的語意一致（END、條件轉換、skip_to）
+2. 同類型且結構相同的定義在會話間共用編譯結果
+3. 不可達步驟、無法結束的步驟與沒有出口的循環
+4. workflow_definitions.yaml 依修改時間快取
+"""
+
+import os
+
+import pytest
+
+from modules.sys_module.workflows import (
+    WorkflowDefinition, WorkflowEngine, StepResult, StepTemplate, clear_compiled_graphs
+)
+
+
+@pytest.fixture(autouse=True)
+def fresh_cache():
+    clear_compiled_graphs()
+    yield
+    clear_compiled_graphs()
+
+
+def _build(session, workflow_type, step_ids, transitions, entry_point=None):
+    definition = WorkflowDefinition(workflow_type=workflow_type, name=workflow_type)
+    for step_id in step_ids:
+        definition.add_step(StepTemplate.create_processing_step(
+            session=session,
+            step_id=step_id,
+            processor=lambda s: StepResult.success("ok")
+        ))
+    for transition in transitions:
+        definition.add_transition(*transition)
+    definition.set_entry_point(entry_point or step_ids[0])
+    return definition
+
+
+class TestCompiledWorkflowGraph:
+    """測試編譯後的轉換索引與結構檢查"""
+
+    def test_index_matches_transition_semantics(self, mock_workflow_session):
+        definition = _build(mock_workflow_session, "graph_semantics", ["a", "b", "c", "d"], [
+            ("a", "b"),
+            ("b", "c", lambda result: result.data.get("go") == "c"),
+            ("b", "d"),
+            ("c", "END"),
+            ("c", "d"),
+        ])
+        graph = definition.compile()
+
+        assert definition.get_next_step("a", StepResult.success("ok")) == "b"
+        assert definition.get_next_step("a", StepResult.failure("no")) == "b"
+        assert definition.get_next_step("b", StepResult.success("ok", {"go": "c"})) == "c"
+        assert definition.get_next_step("b", StepResult.success("ok")) == "d"
+        assert definition.get_next_step("c", StepResult.success("ok")) is None
+        assert definition.get_next_step("d", StepResult.success("ok")) is None
+        assert definition.get_next_step("a", StepResult.skip_to("d", "跳過")) == "d"
+        assert definition.get_next_step("a", StepResult.complete_workflow("done")) is None
+
+        info = graph.get_info()
+        assert info["conditional_steps"] == ["b"]
+        assert info["exits"] == ["b", "c", "d"]
+        assert graph.first_target("b") == "c"
+        assert graph.first_target("c") is None
+        with pytest.raises(AttributeError):
+            graph.entry_point = "b"
+
+    def test_graph_shared_across_sessions(self, mock_workflow_session):
+        steps, transitions = ["a", "b"], [("a", "b")]
+        first = WorkflowEngine(_build(mock_workflow_session, "graph_shared", steps, transitions),
+                               mock_workflow_session)
+        second = _build(mock_workflow_session, "graph_shared", steps, transitions)
+
+        assert second.compile() is first.definition.compile()
+
+        # 結構不同時重新編譯
+        changed = _build(mock_workflow_session, "graph_shared", steps, [("a", "END")])
+        assert changed.compile() is not first.definition.compile()
+        assert changed.get_next_step("a", StepResult.success("ok")) is None
+
+        # 編譯後修改定義會使定義上的快取失效
+        second.add_transition("b", "a")
+        assert second.compile().first_target("b") == "a"
+
+    def test_invalid_definition_raises(self, mock_workflow_session):
+        definition = _build(mock_workflow_session, "graph_invalid", ["a"], [("a", "missing")])
+        with pytest.raises(ValueError) as exc_info:
+            WorkflowEngine(definition, mock_workflow_session)
+        assert "missing" in str(exc_info.value)
+
+    def test_structural_warnings(self, mock_workflow_session):
+        definition = _build(mock_workflow_session, "graph_warnings", ["a", "b", "c", "orphan"], [
+            ("a", "b"),
+            ("b", "c"),
+            ("c", "b"),
+        ])
+        warnings = definition.compile().warnings
+
+        assert len(warnings) == 3
+        assert "orphan" in warnings[0]
+        assert "a, b, c" in warnings[1]
+        assert warnings[2].endswith("b -> c")
+
+
+class TestWorkflowDefinitionsCache:
+    """測試 YAML 工作流定義快取"""
+
+    def test_reload_only_when_file_changes(self, tmp_path, monkeypatch):
+        from modules.sys_module.workflows import workflow_registry
+
+        path = tmp_path / "workflow_definitions.yaml"
+        path.write_text("workflows:\n  echo:\n    description: first\n", encoding="utf-8")
+        monkeypatch.setattr(workflow_registry, "_WORKFLOW_DEFINITIONS_PATH", path)
+        monkeypatch.setattr(workflow_registry, "_definitions_cache", {"mtime": None, "workflows": {}})
+
+        loads = []
+        original = workflow_registry._load_workflow_definitions
+        monkeypatch.setattr(workflow_registry, "_load_workflow_definitions",
+                            lambda: loads.append(1) or original())
+
+        assert workflow_registry.get_workflow_definitions()["echo"]["description"] == "first"
+        workflow_registry.get_workflow_definitions()
+        assert len(loads) == 1
+
+        path.write_text("workflows:\n  echo:\n    description: second\n", encoding="utf-8")
+        stat = path.stat()
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+        assert workflow_registry.get_workflow_definitions()["echo"]["description"] == "second"
+        assert len(loads) == 2
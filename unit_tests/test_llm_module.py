@@ -19,10 +19,13 @@ import sys
 import os
 import pytest
 import json
+import time
 from unittest.mock import Mock, patch, MagicMock
 from datetime import datetime
 from typing import Dict, Any, List, Optional
 
+import numpy as np
+
 # 添加項目根目錄到系統路徑
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
@@ -247,6 +250,328 @@ class TestContextCaching:
         assert isinstance(stats, dict), "應該有快取統計資料"
 
 
+class TestLocalCacheLRU:
+    """測試本地快取 LRU（不依賴完整 LLM 模組）"""
+    
+    @staticmethod
+    def _cache_manager(**overrides):
+        from modules.llm_module.cache_manager import CacheManager
+        config = {"max_local_entries": 3, "max_local_bytes": 10_000, "local_ttl_seconds": 60}
+        config.update(overrides)
+        return CacheManager(config)
+    
+    def test_evicts_least_recently_used(self):
+        cache_manager = self._cache_manager()
+        for key in ("a", "b", "c"):
+            cache_manager.put_local_cache(key, f"value {key}")
+        assert cache_manager.get_local_cache("a") == "value a"
+        
+        cache_manager.put_local_cache("d", "value d")
+        
+        assert cache_manager.get_local_cache("b") is None
+        assert list(cache_manager.local_cache.keys()) == ["c", "a", "d"]
+        assert cache_manager.stats.local_evictions == 1
+    
+    def test_byte_budget_and_per_type_stats(self):
+        from modules.llm_module.cache_manager import CacheType
+        cache_manager = self._cache_manager(max_local_entries=100, max_local_bytes=3_000)
+        cache_manager.cache_memory_context("m" * 1000)
+        cache_manager.cache_memory_context("n" * 1000)
+        cache_manager.cache_identity_context({"current_identity": "user_1"})
+        cache_manager.cache_memory_context("o" * 1000)
+        
+        stats = cache_manager.get_cache_statistics()["local_cache"]
+        assert stats["resident_bytes"] <= 3_000
+        assert stats["resident_bytes"] == sum(t["resident_bytes"] for t in stats["by_type"].values())
+        assert stats["by_type"][CacheType.MEMORY.value]["evictions"] >= 1
+        assert stats["by_type"][CacheType.IDENTITY.value]["entries"] == 1
+        # 超過整體上限的內容直接略過
+        cache_manager.put_local_cache("huge", "x" * 5_000)
+        assert "huge" not in cache_manager.local_cache
+    
+    def test_ttl_lazy_expiry_and_sweep(self):
+        cache_manager = self._cache_manager(local_ttl_seconds=10, local_sweep_interval=5)
+        with patch("modules.llm_module.cache_manager.time.time", return_value=1000.0):
+            cache_manager.put_local_cache("a", "value a")
+            cache_manager._last_local_sweep = 1000.0
+        with patch("modules.llm_module.cache_manager.time.time", return_value=1005.0):
+            cache_manager.put_local_cache("b", "value b")
+        
+        with patch("modules.llm_module.cache_manager.time.time", return_value=1011.0):
+            # 定期清掃移除 a；b 仍有效
+            assert cache_manager.get_local_cache("b") == "value b"
+            assert "a" not in cache_manager.local_cache
+        with patch("modules.llm_module.cache_manager.time.time", return_value=1015.5):
+            # 未到清掃間隔，過期條目於存取時惰性移除
+            assert cache_manager.get_local_cache("b") is None
+        
+        assert cache_manager.stats.local_expirations == 2
+        assert cache_manager.stats.local_resident_bytes == 0
+
+
+class TestSemanticResponseCache:
+    """測試語意回應快取（使用字元雜湊的假編碼器）"""
+
+    class _FakeEncoder:
+        def encode(self, texts):
+            vectors = np.zeros((len(texts), 64), dtype=np.float32)
+            for row, text in enumerate(texts):
+                for word in text.split():
+                    vectors[row, hash(word) % 64] += 1.0
+            return vectors
+
+    def _cache(self, **overrides):
+        from modules.llm_module.semantic_cache import SemanticResponseCache
+        config = {"enabled": True, "max_entries": 2, "thresholds": {"chat": 0.9}}
+        config.update(overrides)
+        return SemanticResponseCache(config, encoder=self._FakeEncoder())
+
+    def _output(self, text, processing_time=1.5):
+        from modules.llm_module.schemas import LLMOutput
+        return LLMOutput(text=text, processing_time=processing_time, metadata={"mode": "CHAT"})
+
+    def test_hit_requires_similarity_and_same_context(self):
+        cache = self._cache()
+        fingerprint = cache.context_fingerprint({"identity_id": "u1"}, "likes tea")
+        cache.store("How are you today?", "chat", fingerprint, self._output("I'm great!"))
+
+        hit = cache.lookup("  how are YOU today！", "chat", fingerprint)
+        assert hit is not None and hit[0].text == "I'm great!"
+        assert hit[1] > 0.99
+
+        # 上下文指紋不同、語意不相近或模式不同時皆不命中
+        other = cache.context_fingerprint({"identity_id": "u2"}, "likes tea")
+        assert cache.lookup("how are you today", "chat", other) is None
+        assert cache.lookup("open the calendar please", "chat", fingerprint) is None
+        assert cache.lookup("how are you today", "work", fingerprint) is None
+
+        stats = cache.get_stats()
+        assert stats["lookups"] == 4 and stats["hits"] == 1
+        assert stats["hit_rate"] == pytest.approx(0.25)
+        assert stats["saved_latency_ms"] > 1000
+
+    def test_fingerprint_covers_session_and_recent_history(self):
+        cache = self._cache(history_turns=2)
+        history_a = [ConversationEntry(role="user", content="I missed the bus"),
+                     ConversationEntry(role="assistant", content="Oh no!")]
+        history_b = [{"role": "user", "content": "My cat knocked over a vase"},
+                     {"role": "assistant", "content": "Oh no!"}]
+        fingerprint = cache.context_fingerprint(None, None, history_a, session_id="s1")
+        cache.store("why?", "chat", fingerprint, self._output("Traffic, probably."))
+
+        assert cache.lookup("why?", "chat", fingerprint) is not None
+        # 相同的簡短追問在不同對話或不同會話中不可共用回應
+        assert cache.lookup("why?", "chat", cache.context_fingerprint(None, None, history_b, session_id="s1")) is None
+        assert cache.lookup("why?", "chat", cache.context_fingerprint(None, None, history_a, session_id="s2")) is None
+        # 只有最近 history_turns 輪納入指紋
+        older = [ConversationEntry(role="user", content="hello")] + history_a
+        assert cache.context_fingerprint(None, None, older, session_id="s1") == fingerprint
+
+    def test_lru_bound_and_ttl(self):
+        cache = self._cache()
+        fingerprint = cache.context_fingerprint(None, None)
+        for text in ("first question here", "second question there", "third one elsewhere"):
+            cache.store(text, "chat", fingerprint, self._output(text))
+        assert cache.get_stats()["entries"] == 2
+        assert cache.lookup("first question here", "chat", fingerprint) is None
+
+        with patch("modules.llm_module.semantic_cache.time.time", return_value=time.time() + 3600):
+            assert cache.lookup("third one elsewhere", "chat", fingerprint) is None
+        assert cache.get_stats()["expirations"] == 1
+
+    def _chat_twice(self, llm_module, texts, reply, memory_operations):
+        """以語意快取（假編碼器）連續處理兩次 CHAT，返回 (輸出, 模型查詢, 記憶操作, 互動記錄) 的 mock"""
+        cache = llm_module.cache_manager.semantic_cache
+        cache.clear()
+        outputs = []
+        with patch.object(cache, "enabled", True), \
+                patch.object(cache, "encoder", self._FakeEncoder()), \
+                patch.object(llm_module, "_open_tts_stream", return_value=(None, None)), \
+                patch.object(llm_module, "_query_model", return_value=reply) as query, \
+                patch.object(llm_module, "_get_system_caches", return_value={}), \
+                patch.object(llm_module, "_process_chat_memory_operations",
+                             side_effect=memory_operations) as memory_ops, \
+                patch.object(llm_module, "_process_session_control", return_value=None), \
+                patch.object(llm_module, "_publish_llm_response_event"), \
+                patch.object(llm_module.learning_engine, "learning_enabled", True), \
+                patch.object(llm_module.learning_engine, "record_interaction") as record:
+            for text in texts:
+                outputs.append(llm_module._handle_chat_mode(LLMInput(text=text, mode=LLMMode.CHAT), {}))
+        cache.clear()
+        return outputs, query, memory_ops, record
+
+    def test_semantic_hit_keeps_memory_and_learning_bookkeeping(self, llm_module):
+        outputs, query, memory_ops, record = self._chat_twice(
+            llm_module, ["How was your day today?", "how was your day today"],
+            {"text": "Pretty good, thanks for asking!"},
+            lambda llm_input, response_data, response_text: []
+        )
+
+        assert query.call_count == 1
+        assert outputs[1].metadata["cache_tier"] == "semantic"
+        # 命中的回合同樣寫入對話記憶與學習記錄
+        assert memory_ops.call_count == 2
+        assert memory_ops.call_args.args[0].text == "how was your day today"
+        assert memory_ops.call_args.args[2] == "Pretty good, thanks for asking!"
+        assert record.call_count == 2
+        assert record.call_args.kwargs["user_input"] == "how was your day today"
+
+    def test_auto_memory_store_does_not_block_caching(self, llm_module):
+        auto_store = [{"operation": "store", "metadata": {"auto_generated": True}}]
+        outputs, query, _, _ = self._chat_twice(
+            llm_module, ["Tell me something nice please", "tell me something nice please"],
+            {"text": "You are doing great today."},
+            lambda llm_input, response_data, response_text: list(auto_store)
+        )
+        assert query.call_count == 1
+        assert outputs[1].metadata["cache_tier"] == "semantic"
+        assert outputs[1].metadata["memory_operations"] == auto_store
+
+        # 模型指定的記憶操作、狀態更新屬於副作用，回應不進入語意快取
+        for side_effect in ({"memory_operations": [{"operation": "update"}]},
+                            {"status_updates": {"mood_delta": 0.1}}):
+            with patch.object(llm_module, "_process_status_updates"):
+                _, query, _, _ = self._chat_twice(
+                    llm_module, ["Tell me something nice please", "tell me something nice please"],
+                    {"text": "You are doing great today.", **side_effect},
+                    lambda llm_input, response_data, response_text: []
+                )
+            assert query.call_count == 2
+
+    def test_disabled_cache_is_inert(self):
+        cache = self._cache(enabled=False)
+        assert cache.store("hello", "chat", "fp", self._output("hi")) is False
+        assert cache.lookup("hello", "chat", "fp") is None
+        assert cache.get_stats()["lookups"] == 0
+
+
+class TestStreamingGeneration:
+    """測試串流生成：部分 JSON 文字抽取與逐句推送（使用假串流客戶端）"""
+
+    class _Part:
+        def __init__(self, text=None, function_call=None):
+            self.text = text
+            self.function_call = function_call
+
+    class _Chunk:
+        def __init__(self, part):
+            self.candidates = [Mock(content=Mock(parts=[part]))]
+            self.usage_metadata = None
+
+    class _FakeModels:
+        def __init__(self, pieces, delay=0.0, fail=False):
+            self.pieces = pieces
+            self.delay = delay
+            self.fail = fail
+            self.query_calls = 0
+
+        def generate_content_stream(self, model, contents, config):
+            if self.fail:
+                raise RuntimeError("stream unavailable")
+            for piece in self.pieces:
+                time.sleep(self.delay)
+                yield TestStreamingGeneration._Chunk(TestStreamingGeneration._Part(text=piece))
+
+    def _wrapper(self, models):
+        from modules.llm_module.gemini_client import GeminiWrapper
+        with patch("modules.llm_module.gemini_client.genai.Client"):
+            wrapper = GeminiWrapper({"cache_enabled": False})
+        wrapper.client = Mock(models=models)
+        return wrapper
+
+    @staticmethod
+    def _split(text, size):
+        return [text[i:i + size] for i in range(0, len(text), size)]
+
+    def test_extractor_decodes_text_field_incrementally(self):
+        from modules.llm_module.gemini_client import StreamingTextExtractor
+        document = json.dumps({
+            "confidence": 0.9,
+            "text": "Hi \"there\"\n你好 \U0001F600",
+            "status_updates": {"text": "nested"}
+        })
+        extractor = StreamingTextExtractor()
+        deltas = [extractor.feed(piece) for piece in self._split(document, 3)]
+        assert "".join(deltas) == "Hi \"there\"\n你好 \U0001F600"
+        assert extractor.text == json.loads(document)["text"]
+
+    def test_query_stream_emits_text_before_completion(self):
+        document = json.dumps({"text": "Sure thing. The weather is sunny today. Enjoy!", "confidence": 0.8})
+        models = self._FakeModels(self._split(document, 8))
+        wrapper = self._wrapper(models)
+
+        deltas = []
+        payload = wrapper.query_stream("hi", mode="chat", on_text=deltas.append)
+
+        assert len(deltas) > 1
+        assert "".join(deltas) == "Sure thing. The weather is sunny today. Enjoy!"
+        assert payload["confidence"] == 0.8
+        assert payload["_meta"]["streamed"] is True
+        assert payload["_meta"]["stream_chunks"] == len(models.pieces)
+
+    def test_query_stream_falls_back_when_stream_fails(self):
+        wrapper = self._wrapper(self._FakeModels([], fail=True))
+        with patch.object(wrapper, "query", return_value={"text": "fallback"}) as mock_query:
+            payload = wrapper.query_stream("hi", mode="chat", on_text=lambda delta: None)
+        assert payload == {"text": "fallback"}
+        mock_query.assert_called_once()
+
+    def test_sentences_reach_consumer_before_stream_ends(self):
+        import threading
+        from utils.tts_chunker import StreamingTextChunker, TextStream
+        document = json.dumps({"text": "First sentence here. Second sentence follows. Third one ends it.",
+                               "confidence": 0.9})
+        wrapper = self._wrapper(self._FakeModels(self._split(document, 6), delay=0.01))
+
+        stream = TextStream()
+        chunker = StreamingTextChunker(max_chars=80, min_chars=10, first_min_chars=5)
+        received = []
+
+        def consumer():
+            for chunk in stream:
+                received.append((chunk, time.time()))
+        thread = threading.Thread(target=consumer)
+        thread.start()
+
+        def on_text(delta):
+            for chunk in chunker.feed(delta):
+                stream.put(chunk)
+        wrapper.query_stream("hi", mode="chat", on_text=on_text)
+        finished_at = time.time()
+        for chunk in chunker.flush():
+            stream.put(chunk)
+        stream.close()
+        thread.join(timeout=5)
+
+        assert [chunk for chunk, _ in received] == [
+            "First sentence here.", "Second sentence follows.", "Third one ends it."
+        ]
+        # 第一句在完整回應結束前已送達消費端
+        assert received[0][1] < finished_at
+
+    def test_cached_streamed_reply_has_no_stream_id(self, llm_module):
+        """串流回應的快取副本不可帶有已關閉的串流 ID，否則命中時 TTS 找不到串流而不發聲"""
+        from utils.tts_chunker import StreamingTextChunker, TextStream
+        stream = TextStream()
+        chunker = StreamingTextChunker(max_chars=80, min_chars=10, first_min_chars=5)
+
+        chat_input = LLMInput(text="Tell me a joke about cats", mode=LLMMode.CHAT)
+        with patch.object(llm_module, "_open_tts_stream", return_value=(stream, chunker)), \
+                patch.object(llm_module, "_query_model", return_value={"text": "Cats own the sofa."}), \
+                patch.object(llm_module, "_get_system_caches", return_value={}), \
+                patch.object(llm_module, "_process_chat_memory_operations", return_value=[]), \
+                patch.object(llm_module, "_process_session_control", return_value=None), \
+                patch.object(llm_module, "_publish_llm_response_event"), \
+                patch.object(llm_module.cache_manager, "cache_response") as cache_response, \
+                patch.object(llm_module.learning_engine, "learning_enabled", False):
+            output = llm_module._handle_chat_mode(chat_input, {})
+
+        assert output.metadata["tts_stream_id"] == stream.stream_id
+        cached = cache_response.call_args.args[1]
+        assert cached.text == "Cats own the sofa."
+        assert "tts_stream_id" not in cached.metadata
+
+
 class TestMemoryModuleCollaboration:
     """測試與 MEM 模組協作 - 狀態感知雙管道"""
     
@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+"""
+主循環排程器單元測試
+
+測試目標：
+1. 計時器依到期時間觸發與重新排程
+2. notify 立即喚醒等待中的主循環
+3. 取消計時器與關閉排程器
+4. 閒置喚醒與延遲統計
+"""
+
+import threading
+import time
+
+import pytest
+
+from core.loop_scheduler import LoopScheduler
+
+
+@pytest.mark.critical
+class TestLoopScheduler:
+    """主循環排程器測試"""
+
+    def test_timers_fire_in_due_order(self):
+        """測試多個計時器依到期時間觸發"""
+        scheduler = LoopScheduler()
+        fired = []
+        scheduler.schedule_interval("slow", 0.08, lambda: fired.append("slow"))
+        scheduler.schedule_interval("fast", 0.02, lambda: fired.append("fast"))
+
+        deadline = time.monotonic() + 0.2
+        while time.monotonic() < deadline:
+            due, reasons = scheduler.wait(max_wait=0.2)
+            assert reasons == []
+            scheduler.run_due(due)
+            if "slow" in fired:
+                break
+
+        assert fired[0] == "fast"
+        assert "slow" in fired
+        assert fired.count("fast") >= 3
+
+    def test_notify_wakes_waiter_immediately(self):
+        """測試 notify 在計時器到期前喚醒等待者"""
+        scheduler = LoopScheduler()
+        scheduler.schedule_interval("heartbeat", 10.0)
+        result = {}
+
+        def waiter():
+            start = time.monotonic()
+            result["wait"] = scheduler.wait()
+            result["elapsed"] = time.monotonic() - start
+
+        thread = threading.Thread(target=waiter)
+        thread.start()
+        time.sleep(0.05)
+        scheduler.notify("state_queue")
+        thread.join(timeout=2.0)
+
+        assert not thread.is_alive()
+        due, reasons = result["wait"]
+        assert due == []
+        assert reasons == ["state_queue"]
+        assert result["elapsed"] < 1.0
+
+        stats = scheduler.get_stats()
+        assert stats["notifications"] == {"state_queue": 1}
+        assert stats["latency_count"] == 1
+        assert stats["idle_wakeups"] == 0
+
+    def test_pending_notifications_are_coalesced(self):
+        """測試處理前的多次通知合併為一次喚醒"""
+        scheduler = LoopScheduler()
+        scheduler.notify("state_changed")
+        scheduler.notify("state_changed")
+        scheduler.notify("output_layer_complete")
+
+        due, reasons = scheduler.wait()
+        assert sorted(reasons) == ["output_layer_complete", "state_changed"]
+        assert scheduler.get_stats()["wakeups"] == 1
+
+    def test_cancel_and_reschedule(self):
+        """測試取消與重新設定計時器間隔"""
+        scheduler = LoopScheduler()
+        fired = []
+        scheduler.schedule_interval("gc", 0.01, lambda: fired.append("gc"))
+        scheduler.cancel("gc")
+        assert scheduler.next_due_in() is None
+
+        due, _ = scheduler.wait(max_wait=0.05)
+        scheduler.run_due(due)
+        assert fired == []
+
+        scheduler.schedule_interval("gc", 5.0, lambda: fired.append("gc"))
+        scheduler.schedule_interval("gc", 0.01)
+        due, _ = scheduler.wait(max_wait=1.0)
+        scheduler.run_due(due)
+        assert fired == ["gc"]
+
+    def test_close_releases_waiter(self):
+        """測試關閉排程器後等待者立即返回"""
+        scheduler = LoopScheduler()
+        result = {}
+
+        thread = threading.Thread(target=lambda: result.setdefault("wait", scheduler.wait()))
+        thread.start()
+        time.sleep(0.05)
+        scheduler.close()
+        thread.join(timeout=2.0)
+
+        assert not thread.is_alive()
+        assert result["wait"] == ([], [])
+
+    def test_failing_callback_does_not_stop_others(self):
+        """測試單一計時器回調失敗不影響其他計時器"""
+        scheduler = LoopScheduler()
+        fired = []
+
+        def broken():
+            raise RuntimeError("boom")
+
+        scheduler.schedule_interval("broken", 0.01, broken)
+        scheduler.schedule_interval("snapshot", 0.01, lambda: fired.append("snapshot"))
+        time.sleep(0.03)
+
+        due, _ = scheduler.wait()
+        scheduler.run_due(due)
+        assert fired == ["snapshot"]
@@ -0,0 +1,628 @@
+# -*- coding: utf-8 -*-
+"""
+MEM模組存儲層單元測試
+
+測試範圍：
+- FAISS索引檢索路徑與全量比對結果一致
+- 過濾條件淘汰過多命中時的超採樣
+- 刪除記憶時同步移除向量
+- 啟動時索引與元資料不一致的自動修復
+- 嵌入向量存儲：JSON內嵌向量遷移、重新載入、壓縮與壓縮中途崩潰復原
+- SQLite 元資料後端：過濾結果與 JSON 後端一致、JSON 遷移
+- 存取統計：搜索不寫入存儲、批次寫回與關閉時寫回
+- 嵌入向量服務：內容雜湊快取、位元組上限淘汰、並發合併、磁碟快取與其 LRU 淘汰、向量補算
+- 向量索引背景重建：影子索引替換、期間增刪重放、超過閾值切換 IVF / HNSW
+"""
+
+import hashlib
+import json
+import sys
+import threading
+import time
+import os
+import pytest
+import numpy as np
+from unittest.mock import Mock, patch
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.mem_module.schemas import MemoryEntry, MemoryQuery, MemoryType
+from modules.mem_module.storage.access_tracker import AccessTracker
+from modules.mem_module.storage.embedding_service import EmbeddingService
+from modules.mem_module.storage.embedding_store import EmbeddingStore
+from modules.mem_module.storage.metadata_storage import MetadataStorageManager
+from modules.mem_module.storage.sqlite_metadata_storage import SQLiteMetadataStorageManager
+from modules.mem_module.storage.storage_manager import MemoryStorageManager
+from modules.mem_module.storage.vector_index import VectorIndexManager
+
+DIMENSION = 16
+
+
+class FakeEncoder:
+    """以文本雜湊產生確定性向量的嵌入模型替身"""
+
+    def __init__(self, *args, **kwargs):
+        self.calls = 0
+
+    def encode(self, text, convert_to_numpy=True, **kwargs):
+        self.calls += 1
+        if isinstance(text, list):
+            return np.vstack([self._vector(t) for t in text])
+        return self._vector(text)
+
+    @staticmethod
+    def _vector(text):
+        seed = int.from_bytes(hashlib.md5(text.encode("utf-8")).digest()[:4], "little")
+        return np.random.default_rng(seed).standard_normal(DIMENSION).astype(np.float32)
+
+
+def _allow_all_identity():
+    identity = Mock()
+    identity.initialize.return_value = True
+    identity.validate_memory_token.return_value = True
+    identity.check_operation_permission.return_value = True
+    identity.get_stats.return_value = {}
+    return identity
+
+
+def _make_storage(tmp_path, **overrides):
+    config = {
+        "vector": {"index_file": str(tmp_path / "mem_faiss_index"), "vector_dimension": DIMENSION},
+        "metadata": {"metadata_file": str(tmp_path / "mem_metadata.json")},
+    }
+    config.update(overrides)
+    storage = MemoryStorageManager(config, identity_manager=_allow_all_identity())
+    with patch("modules.mem_module.storage.storage_manager.SentenceTransformer", FakeEncoder):
+        assert storage.initialize()
+    return storage
+
+
+def _store(storage, memory_id, token, content, memory_type=MemoryType.LONG_TERM):
+    result = storage.store_memory(MemoryEntry(
+        memory_id=memory_id,
+        memory_token=token,
+        memory_type=memory_type,
+        content=content,
+    ))
+    assert result.success, result.message
+
+
+@pytest.fixture
+def storage(tmp_path):
+    storage = _make_storage(tmp_path)
+    for i in range(40):
+        token = "token_a" if i % 4 == 0 else "token_b"
+        memory_type = MemoryType.SNAPSHOT if i % 2 else MemoryType.LONG_TERM
+        _store(storage, f"mem_{i}", token, f"memory content {i}", memory_type)
+    return storage
+
+
+class TestIndexRetrieval:
+    """FAISS索引檢索路徑"""
+
+    def test_index_matches_brute_force(self, storage):
+        query = MemoryQuery(memory_token="token_b", query_text="memory content 7",
+                            max_results=5, similarity_threshold=-1.0)
+
+        storage.retrieval_mode = "brute_force"
+        brute = [r.memory_entry.memory_id for r in storage.search_memories(query)]
+        storage.retrieval_mode = "index"
+        indexed = [r.memory_entry.memory_id for r in storage.search_memories(query)]
+
+        assert indexed == brute
+        assert indexed[0] == "mem_7"
+
+    def test_oversample_when_filters_reject_hits(self, storage):
+        # token_a 只佔四分之一，且再以類型過濾，top-k 的大部分命中都會被淘汰
+        storage.index_oversample = 1
+        query = MemoryQuery(memory_token="token_a", query_text="memory content 3",
+                            memory_types=[MemoryType.LONG_TERM],
+                            max_results=5, similarity_threshold=-1.0)
+
+        results = storage.search_memories(query)
+
+        assert len(results) == 5
+        for result in results:
+            assert result.memory_entry.memory_token == "token_a"
+            assert result.memory_entry.memory_type == MemoryType.LONG_TERM
+
+    def test_delete_removes_vector(self, storage):
+        assert storage.delete_memory("mem_7", "token_b").success
+
+        assert VectorIndexManager.vector_id_for("mem_7") not in storage.vector_manager.get_vector_ids()
+        query = MemoryQuery(memory_token="token_b", query_text="memory content 7",
+                            max_results=40, similarity_threshold=-1.0)
+        assert "mem_7" not in [r.memory_entry.memory_id for r in storage.search_memories(query)]
+
+    def test_resync_index_on_startup(self, tmp_path):
+        storage = _make_storage(tmp_path)
+        for i in range(5):
+            _store(storage, f"mem_{i}", "token_a", f"memory content {i}")
+        storage.metadata_manager.force_save()
+
+        # 模擬舊版索引（ID不穩定）：清空後保存
+        storage.vector_manager.clear_index()
+        storage.vector_manager.save_index()
+
+        reloaded = _make_storage(tmp_path)
+
+        assert reloaded._index_consistent
+        assert len(reloaded.vector_manager.get_vector_ids()) == 5
+        query = MemoryQuery(memory_token="token_a", query_text="memory content 2",
+                            max_results=1, similarity_threshold=-1.0)
+        assert reloaded.search_memories(query)[0].memory_entry.memory_id == "mem_2"
+
+
+class TestEmbeddingStore:
+    """記憶體映射嵌入向量存儲"""
+
+    def test_metadata_json_has_no_vectors(self, tmp_path):
+        storage = _make_storage(tmp_path)
+        _store(storage, "mem_0", "token_a", "memory content 0")
+        storage.metadata_manager.force_save()
+
+        with open(tmp_path / "mem_metadata.json", encoding="utf-8") as f:
+            saved = json.load(f)
+        assert "embedding_vector" not in saved["memories"][0]
+        assert storage.metadata_manager.get_embedding("mem_0").shape == (DIMENSION,)
+
+    def test_migrates_inline_vectors(self, tmp_path):
+        legacy_vector = [float(i) for i in range(DIMENSION)]
+        with open(tmp_path / "mem_metadata.json", "w", encoding="utf-8") as f:
+            json.dump({"memories": [{
+                "memory_id": "legacy", "memory_token": "token_a",
+                "memory_type": "long_term", "content": "old", "embedding_vector": legacy_vector,
+            }]}, f)
+
+        manager = MetadataStorageManager({"metadata_file": str(tmp_path / "mem_metadata.json")})
+        assert manager.initialize()
+
+        np.testing.assert_array_equal(manager.get_embedding("legacy"), legacy_vector)
+        with open(tmp_path / "mem_metadata.json", encoding="utf-8") as f:
+            assert "embedding_vector" not in json.load(f)["memories"][0]
+
+    def test_reload_and_compaction(self, tmp_path):
+        config = {"embedding_store_file": str(tmp_path / "emb"),
+                  "compaction_min_dead_rows": 2, "compaction_dead_ratio": 0.3}
+        store = EmbeddingStore(config)
+        assert store.initialize()
+        vectors = np.random.default_rng(0).standard_normal((6, DIMENSION)).astype(np.float32)
+        for i, vector in enumerate(vectors):
+            store.put(f"m{i}", vector)
+        store.delete("m1")
+        store.delete("m3")
+        assert store.save()
+
+        # 墓碑超過閾值時保存會觸發壓縮
+        assert store.get_stats()["dead_rows"] == 0
+        assert os.path.getsize(store.data_file) == 4 * DIMENSION * 4
+        assert not os.path.exists(tmp_path / "emb.f32")
+
+        reopened = EmbeddingStore(config)
+        assert reopened.initialize()
+        ids, matrix = reopened.get_many(["m0", "m1", "m5"])
+        assert ids == ["m0", "m5"]
+        np.testing.assert_array_equal(matrix, vectors[[0, 5]])
+
+    def test_crash_during_compaction_keeps_old_generation(self, tmp_path):
+        config = {"embedding_store_file": str(tmp_path / "emb"),
+                  "compaction_min_dead_rows": 2, "compaction_dead_ratio": 0.3}
+        store = EmbeddingStore(config)
+        assert store.initialize()
+        vectors = np.random.default_rng(1).standard_normal((6, DIMENSION)).astype(np.float32)
+        for i, vector in enumerate(vectors):
+            store.put(f"m{i}", vector)
+        store.delete("m0")
+        store.delete("m2")
+
+        # 新世代資料已寫出、快照尚未寫入時崩潰
+        with patch.object(store, "_write_snapshot", side_effect=OSError("crash")):
+            assert not store.compact()
+        assert os.path.exists(tmp_path / "emb.1.f32")
+
+        reopened = EmbeddingStore(config)
+        assert reopened.initialize()
+        assert reopened.generation == 0
+        assert not os.path.exists(tmp_path / "emb.1.f32")
+        ids, matrix = reopened.get_many([f"m{i}" for i in range(6)])
+        assert ids == ["m1", "m3", "m4", "m5"]
+        np.testing.assert_array_equal(matrix, vectors[[1, 3, 4, 5]])
+
+        # 快照已切換、舊世代尚未刪除時崩潰
+        with patch.object(reopened, "_remove_stale_files"):
+            assert reopened.compact()
+        assert os.path.exists(tmp_path / "emb.f32")
+
+        recovered = EmbeddingStore(config)
+        assert recovered.initialize()
+        assert recovered.generation == 1
+        assert not os.path.exists(tmp_path / "emb.f32")
+        assert not os.path.exists(tmp_path / "emb.idx.log")
+        ids, matrix = recovered.get_many([f"m{i}" for i in range(6)])
+        assert ids == ["m1", "m3", "m4", "m5"]
+        np.testing.assert_array_equal(matrix, vectors[[1, 3, 4, 5]])
+
+
+class TestSQLiteMetadataBackend:
+    """SQLite 元資料後端"""
+
+    @staticmethod
+    def _entries():
+        for i in range(12):
+            yield MemoryEntry(
+                memory_id=f"mem_{i}",
+                memory_token="token_a" if i % 3 else "token_b",
+                memory_type=MemoryType.SNAPSHOT if i % 2 else MemoryType.PROFILE,
+                content=f"content {i}",
+                topic="weather" if i % 4 == 0 else "music",
+                embedding_vector=[float(i)] * DIMENSION,
+            )
+
+    def test_filters_match_json_backend(self, tmp_path):
+        json_manager = MetadataStorageManager({"metadata_file": str(tmp_path / "json" / "mem_metadata.json")})
+        sqlite_manager = SQLiteMetadataStorageManager({"metadata_file": str(tmp_path / "db" / "mem_metadata.json")})
+        assert json_manager.initialize() and sqlite_manager.initialize()
+        for entry in self._entries():
+            assert json_manager.add_memory(entry)
+            assert sqlite_manager.add_memory(entry.copy())
+
+        filters = {"memory_types": ["snapshot"], "topic_filter": "music", "include_archived": False}
+        expected = [m["memory_id"] for m in json_manager.search_memories("token_a", filters)]
+        actual = [m["memory_id"] for m in sqlite_manager.search_memories("token_a", filters)]
+
+        assert actual == expected and actual
+        assert sqlite_manager.get_memory_stats("token_a")["total_memories"] == \
+            json_manager.get_memory_stats("token_a")["total_memories"]
+
+    def test_update_is_single_row(self, tmp_path):
+        manager = SQLiteMetadataStorageManager({"metadata_file": str(tmp_path / "mem_metadata.json")})
+        assert manager.initialize()
+        for entry in self._entries():
+            manager.add_memory(entry)
+
+        assert manager.update_memory("mem_4", {"access_count": 3, "is_archived": True})
+
+        assert manager.get_memory_by_id("mem_4")["access_count"] == 3
+        assert "mem_4" not in [m["memory_id"] for m in manager.search_memories("token_a", {"include_archived": False})]
+        assert not os.path.exists(tmp_path / "mem_metadata.json")
+        assert not manager.add_memory(next(self._entries()))
+
+    def test_migrates_existing_json(self, tmp_path):
+        metadata_file = tmp_path / "mem_metadata.json"
+        json_manager = MetadataStorageManager({"metadata_file": str(metadata_file)})
+        assert json_manager.initialize()
+        for entry in self._entries():
+            json_manager.add_memory(entry)
+
+        manager = SQLiteMetadataStorageManager({"metadata_file": str(metadata_file)})
+        assert manager.initialize()
+
+        assert manager.get_all_memory_ids() == json_manager.get_all_memory_ids()
+        np.testing.assert_array_equal(manager.get_embedding("mem_5"), [5.0] * DIMENSION)
+        assert not metadata_file.exists()
+        assert (tmp_path / "mem_metadata.json.migrated").exists()
+
+
+class TestAccessTracking:
+    """存取統計延遲批次寫回"""
+
+    @staticmethod
+    def _query():
+        return MemoryQuery(memory_token="token_b", query_text="memory content 7",
+                           max_results=3, similarity_threshold=-1.0)
+
+    def test_search_does_not_write_storage(self, storage):
+        with patch.object(storage.metadata_manager, "update_memory") as update, \
+                patch.object(storage.metadata_manager, "_save_metadata") as save:
+            storage.search_memories(self._query())
+            storage.search_memories(self._query())
+
+        update.assert_not_called()
+        save.assert_not_called()
+        stats = storage.get_stats()["access_tracking"]
+        assert stats["pending_accesses"] == 6
+        assert stats["pending_memories"] == 3
+        # 待寫次數已反映在檢索結果中
+        assert storage.search_memories(self._query())[0].memory_entry.access_count == 2
+
+    @pytest.mark.parametrize("backend", ["json", "sqlite"])
+    def test_flush_applies_counts_in_one_batch(self, tmp_path, backend):
+        storage = _make_storage(tmp_path, metadata_backend=backend)
+        for i in range(5):
+            _store(storage, f"mem_{i}", "token_b", f"memory content {i}")
+        for _ in range(4):
+            storage.search_memories(self._query())
+
+        with patch.object(storage.access_tracker, "flush_callback",
+                          wraps=storage.metadata_manager.increment_access_stats) as increment:
+            assert storage.flush_access_stats()
+        increment.assert_called_once()
+
+        top = storage.search_memories(self._query())[0].memory_entry
+        assert storage.metadata_manager.get_memory_by_id(top.memory_id)["access_count"] == 4
+        stats = storage.access_tracker.get_stats()
+        assert stats["flushed_accesses"] == 12 and stats["flush_batches"] == 1
+        assert stats["writes_avoided"] == 11
+
+    def test_shutdown_flushes_pending(self, tmp_path):
+        storage = _make_storage(tmp_path)
+        _store(storage, "mem_0", "token_b", "memory content 0")
+        storage.search_memories(self._query())
+        assert storage.shutdown()
+
+        reloaded = MetadataStorageManager({"metadata_file": str(tmp_path / "mem_metadata.json")})
+        assert reloaded.initialize()
+        assert reloaded.get_memory_by_id("mem_0")["access_count"] == 1
+
+    def test_threshold_wakes_flusher_and_failures_requeue(self):
+        results = [False, True]
+        batches = []
+
+        def flush(batch):
+            batches.append(dict(batch))
+            return results.pop(0)
+
+        tracker = AccessTracker({"access_flush_interval": 60, "access_flush_threshold": 2}, flush)
+        tracker.record("a", 10.0)
+        assert not tracker.flush()
+        assert tracker.pending_count("a") == 1
+
+        tracker.start()
+        tracker.record("a", 20.0)
+        tracker.record("b", 15.0)
+        for _ in range(100):
+            if not tracker.get_stats()["pending_memories"]:
+                break
+            time.sleep(0.01)
+        tracker.stop()
+
+        assert batches[-1] == {"a": (2, 20.0), "b": (1, 15.0)}
+        assert tracker.get_stats()["failed_flushes"] == 1
+
+
+class TestEmbeddingService:
+    """嵌入向量服務"""
+
+    @staticmethod
+    def _service(tmp_path=None, **overrides):
+        config = {"embedding_batch_window_ms": 0}
+        if tmp_path is not None:
+            config.update(embedding_disk_cache=True, embedding_disk_cache_file=str(tmp_path / "emb_cache"))
+        config.update(overrides)
+        service = EmbeddingService(config, model=FakeEncoder())
+        assert service.initialize()
+        return service
+
+    def test_repeated_text_hits_cache(self):
+        service = self._service()
+        first = service.encode("你好")
+        first[:] = 0  # 返回值為複本，修改不影響快取
+        again = service.encode_batch(["你好", "你好", "再見"])
+
+        assert service.model.calls == 2
+        np.testing.assert_array_equal(again[0], FakeEncoder._vector("你好"))
+        np.testing.assert_array_equal(again[1], again[0])
+        stats = service.get_stats()
+        assert stats["cache_hits"] == 1 and stats["texts_encoded"] == 2
+
+    def test_cache_bounded_by_bytes(self):
+        service = self._service(embedding_cache_max_bytes=3 * DIMENSION * 4)
+        service.encode_batch([f"text {i}" for i in range(5)])
+        service.encode("text 4")
+
+        stats = service.get_stats()
+        assert stats["cache_entries"] == 3 and stats["cache_bytes"] <= 3 * DIMENSION * 4
+        assert stats["evictions"] == 2 and stats["cache_hits"] == 1
+
+    def test_concurrent_requests_coalesce(self):
+        service = self._service(embedding_batch_window_ms=50)
+        barrier = threading.Barrier(8)
+        results = {}
+
+        def worker(i):
+            barrier.wait()
+            results[i] = service.encode(f"query {i}")
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert service.model.calls < 8
+        for i in range(8):
+            np.testing.assert_array_equal(results[i], FakeEncoder._vector(f"query {i}"))
+
+    def test_disk_cache_survives_restart(self, tmp_path):
+        service = self._service(tmp_path)
+        service.encode_batch(["alpha", "beta"])
+        service.shutdown()
+
+        restarted = self._service(tmp_path)
+        vectors = restarted.encode_batch(["alpha", "beta"])
+
+        assert restarted.model.calls == 0
+        assert restarted.get_stats()["disk_hits"] == 2
+        np.testing.assert_array_equal(vectors[1], FakeEncoder._vector("beta"))
+
+    def test_disk_cache_evicts_least_recently_used(self, tmp_path):
+        service = self._service(tmp_path, embedding_disk_cache_max_entries=3)
+        service.encode_batch(["alpha", "beta", "gamma"])
+        service.clear_cache()
+        service.encode("alpha")  # 磁碟命中，更新使用順序
+        service.encode("delta")
+
+        disk = service.disk_cache
+        assert len(disk) == 3
+        assert service.cache_key("beta") not in disk
+        for text in ("alpha", "gamma", "delta"):
+            assert service.cache_key(text) in disk
+
+        # 超過上限只淘汰必要的條目，其餘仍由磁碟取得
+        service.clear_cache()
+        calls = service.model.calls
+        service.encode_batch(["alpha", "gamma", "delta"])
+        assert service.model.calls == calls
+
+    def test_backfill_missing_embeddings(self, storage):
+        storage.metadata_manager.embedding_store.delete("mem_3")
+        storage.metadata_manager.embedding_store.delete("mem_5")
+        calls = storage.embedding_model.calls
+
+        assert storage._backfill_embeddings() == 2
+        # 內容曾經編碼過，直接由快取取得
+        assert storage.embedding_model.calls == calls
+        np.testing.assert_array_equal(storage.metadata_manager.get_embedding("mem_5"),
+                                      FakeEncoder._vector("memory content 5"))
+
+
+class TestVectorIndexRebuild:
+    """向量索引背景重建"""
+
+    @staticmethod
+    def _manager(tmp_path, **overrides):
+        config = {"index_file": str(tmp_path / "index"), "vector_dimension": DIMENSION,
+                  "ann_threshold": 400, "auto_rebuild": False}
+        config.update(overrides)
+        manager = VectorIndexManager(config)
+        assert manager.initialize()
+        return manager
+
+    @staticmethod
+    def _vectors(count, seed=0):
+        return np.random.default_rng(seed).standard_normal((count, DIMENSION)).astype(np.float32)
+
+    @pytest.mark.parametrize("ann_type", ["IndexIVFFlat", "IndexHNSWFlat"])
+    def test_switches_to_ann_above_threshold(self, tmp_path, ann_type):
+        manager = self._manager(tmp_path, ann_index_type=ann_type, nprobe=64)
+        vectors = self._vectors(800)
+        ids = [f"m{i}" for i in range(800)]
+        assert manager.add_vectors(vectors.copy(), ids)
+
+        assert manager.rebuild_index()
+
+        stats = manager.get_stats()
+        assert stats["index_type"] == ann_type and stats["vector_count"] == 800
+        assert stats["rebuild"]["state"] == "completed" and stats["rebuild"]["last_duration"] >= 0
+        _, hits = manager.search_vectors(vectors[5].copy(), top_k=1, similarity_threshold=-1.0)
+        assert hits == [VectorIndexManager.vector_id_for("m5")]
+
+        # 刪除後不再出現（HNSW 以墓碑過濾）
+        assert manager.remove_vectors(["m5"]) == 1
+        _, hits = manager.search_vectors(vectors[5].copy(), top_k=3, similarity_threshold=-1.0)
+        assert VectorIndexManager.vector_id_for("m5") not in hits
+        assert len(manager.get_vector_ids()) == 799
+
+        assert manager.save_index()
+        reloaded = self._manager(tmp_path)
+        assert reloaded.index_type == ann_type
+
+    def test_hnsw_deletions_survive_reload(self, tmp_path):
+        manager = self._manager(tmp_path, ann_index_type="IndexHNSWFlat", ann_threshold=10)
+        vectors = self._vectors(40)
+        assert manager.add_vectors(vectors.copy(), [f"m{i}" for i in range(40)])
+        assert manager.rebuild_index() and manager.index_type == "IndexHNSWFlat"
+        assert manager.remove_vectors(["m3", "m7"]) == 2
+        assert manager.save_index()
+
+        reloaded = self._manager(tmp_path, ann_index_type="IndexHNSWFlat", ann_threshold=10)
+        expected = {VectorIndexManager.vector_id_for(f"m{i}") for i in range(40) if i not in (3, 7)}
+        assert set(reloaded.get_vector_ids()) == expected
+        assert reloaded.get_stats()["vector_count"] == 38
+        _, hits = reloaded.search_vectors(vectors[3].copy(), top_k=3, similarity_threshold=-1.0)
+        assert VectorIndexManager.vector_id_for("m3") not in hits
+
+        # 墓碑清空（重建後）再保存時，舊的墓碑檔一併移除
+        assert reloaded.rebuild_index() and reloaded.save_index()
+        assert not os.path.exists(reloaded.tombstone_file)
+        assert set(self._manager(tmp_path).get_vector_ids()) == expected
+
+    def test_auto_rebuild_when_crossing_threshold(self, tmp_path):
+        manager = self._manager(tmp_path, auto_rebuild=True)
+        assert manager.add_vectors(self._vectors(300), [f"m{i}" for i in range(300)])
+        assert manager.index_type == "IndexFlatIP" and not manager.is_rebuilding()
+
+        assert manager.add_vectors(self._vectors(200, seed=1), [f"n{i}" for i in range(200)])
+        assert manager.wait_for_rebuild(timeout=10)
+
+        assert manager.index_type == "IndexIVFFlat"
+        assert len(manager.get_vector_ids()) == 500
+        assert os.path.exists(tmp_path / "index")
+
+    def test_changes_during_rebuild_are_replayed(self, tmp_path):
+        manager = self._manager(tmp_path)
+        vectors = self._vectors(20)
+        assert manager.add_vectors(vectors[:10].copy(), [f"m{i}" for i in range(10)])
+
+        release = threading.Event()
+        build_index = manager._build_index
+
+        def slow_build(index_type, matrix):
+            release.wait(5)
+            return build_index(index_type, matrix)
+
+        with patch.object(manager, "_build_index", side_effect=slow_build):
+            assert manager.rebuild_index(background=True)
+            assert manager.get_stats()["rebuild"]["state"] == "running"
+            # 重建期間現有索引仍可查詢與增刪
+            _, hits = manager.search_vectors(vectors[3].copy(), top_k=1, similarity_threshold=-1.0)
+            assert hits == [VectorIndexManager.vector_id_for("m3")]
+            assert manager.add_vectors(vectors[10:].copy(), [f"m{i}" for i in range(10, 20)])
+            assert manager.remove_vectors(["m0", "m15"]) == 2
+            release.set()
+            assert manager.wait_for_rebuild(timeout=5)
+
+        expected = {VectorIndexManager.vector_id_for(f"m{i}") for i in range(20) if i not in (0, 15)}
+        assert set(manager.get_vector_ids()) == expected
+
+    def test_clear_cancels_running_rebuild(self, tmp_path):
+        manager = self._manager(tmp_path)
+        assert manager.add_vectors(self._vectors(10), [f"m{i}" for i in range(10)])
+        release = threading.Event()
+        build_index = manager._build_index
+
+        with patch.object(manager, "_build_index",
+                          side_effect=lambda *args: release.wait(5) and build_index(*args)):
+            assert manager.rebuild_index(background=True)
+            assert manager.clear_index()
+            release.set()
+            assert not manager.wait_for_rebuild(timeout=5)
+
+        assert manager.get_stats()["rebuild"]["state"] == "cancelled"
+        assert manager.get_vector_ids() == []
+
+    def test_storage_rebuild_keeps_results(self, storage):
+        query = MemoryQuery(memory_token="token_b", query_text="memory content 7",
+                            max_results=5, similarity_threshold=-1.0)
+        before = [r.memory_entry.memory_id for r in storage.search_memories(query)]
+
+        assert storage.rebuild_index()
+
+        assert [r.memory_entry.memory_id for r in storage.search_memories(query)] == before
+        assert storage.get_stats()["vector_index"]["rebuild"]["completed_rebuilds"] == 1
+
+    def test_backfill_inference_does_not_hold_sync_lock(self, storage):
+        storage.metadata_manager.embedding_store.delete("mem_3")
+        storage.metadata_manager.embedding_store.delete("mem_5")
+        encode = storage.generate_embeddings
+        lock_free = []
+
+        def generate_while_deleting(texts):
+            # 推論期間其他執行緒能取得同步鎖，並刪除其中一筆待補算的記憶
+            def try_lock():
+                if storage._sync_lock.acquire(timeout=1):
+                    storage._sync_lock.release()
+                    lock_free.append(True)
+
+            thread = threading.Thread(target=try_lock)
+            thread.start()
+            thread.join()
+            storage.delete_memory("mem_3", "token_b")
+            return encode(texts)
+
+        with patch.object(storage, "generate_embeddings", side_effect=generate_while_deleting):
+            assert storage.rebuild_index()
+
+        assert lock_free == [True]
+        assert not storage.metadata_manager.has_embedding("mem_3")
+        assert storage.metadata_manager.has_embedding("mem_5")
@@ -623,3 +623,101 @@ def test_advanced_error_handling(nlp):
     result3 = nlp.handle(large_data)
     # 應該能處理超大輸入而不崩潰
     assert "primary_intent" in result3
+
+
+# === BIOTagger 批次推論與快取 ===
+
+class _WordTokenizer:
+    """以空白分詞的假 tokenizer，輸出右側填充的批次"""
+    
+    def __call__(self, texts, **kwargs):
+        import torch
+        rows = []
+        for text in texts:
+            ids, offsets, pos = [101], [(0, 0)], 0
+            for word in text.split():
+                start = text.index(word, pos)
+                pos = start + len(word)
+                ids.append(1000 + len(ids))
+                offsets.append((start, pos))
+            rows.append((ids + [102], offsets + [(0, 0)]))
+        width = max(len(ids) for ids, _ in rows)
+        pad = lambda seq, value: seq + [value] * (width - len(seq))
+        return {
+            "input_ids": torch.tensor([pad(ids, 0) for ids, _ in rows]),
+            "attention_mask": torch.tensor([pad([1] * len(ids), 0) for ids, _ in rows]),
+            "offset_mapping": torch.tensor([pad(offsets, (0, 0)) for _, offsets in rows]),
+        }
+    
+    def convert_ids_to_tokens(self, ids):
+        names = {101: "[CLS]", 102: "[SEP]", 0: "[PAD]"}
+        return [names.get(i, f"w{i}") for i in ids.tolist()]
+
+
+class _ChatModel:
+    """第一個詞標 B-CHAT、其餘詞 I-CHAT，填充位置刻意標 B-CALL"""
+    
+    def __init__(self):
+        self.batches = []
+    
+    def __call__(self, input_ids, attention_mask):
+        import torch
+        from types import SimpleNamespace
+        self.batches.append(input_ids.shape[0])
+        labels = torch.full(input_ids.shape, BIOTagger.BIO_LABELS.index("I-CHAT"))
+        labels[:, 1] = BIOTagger.BIO_LABELS.index("B-CHAT")
+        labels[attention_mask == 0] = BIOTagger.BIO_LABELS.index("B-CALL")
+        logits = torch.nn.functional.one_hot(labels, len(BIOTagger.BIO_LABELS)).float() * 5
+        return SimpleNamespace(logits=logits)
+
+
+def test_bio_tagger_predict_batch_padding_and_cache():
+    """測試批次預測忽略填充位置、去除重複並快取結果"""
+    tagger = BIOTagger(batch_size=2, cache_size=8)
+    tagger.tokenizer = _WordTokenizer()
+    tagger.model = _ChatModel()
+    
+    texts = ["hi", "tell me a story please", "hi", "how are you"]
+    results = tagger.predict_batch(texts)
+    
+    assert tagger.model.batches == [2, 1]  # 三段不重複文本，每批最多兩段
+    for text, segments in zip(texts, results):
+        assert [(s["intent"], s["text"]) for s in segments] == [("chat", text)]
+    assert results[0] == tagger.predict("hi")
+    
+    # 命中快取不再推論，且回傳的是複本
+    results[1][0]["intent"] = "call"
+    again = tagger.predict("tell me a story please")
+    assert tagger.model.batches == [2, 1]
+    assert again[0]["intent"] == "chat"
+    assert tagger.get_cache_stats()["hits"] >= 2
+
+
+def test_bio_tagger_cache_copies_nested_fields():
+    """測試快取存取都是深複本，修改巢狀欄位不影響快取"""
+    tagger = BIOTagger(cache_size=4)
+    segments = [{"intent": "chat", "text": "hi", "entities": [{"type": "name", "value": "Ann"}]}]
+    tagger._cache_put("hi", segments)
+    segments[0]["entities"][0]["value"] = "Bob"
+    
+    cached = tagger._cache_get("hi")
+    assert cached[0]["entities"] == [{"type": "name", "value": "Ann"}]
+    cached[0]["entities"].append({"type": "place", "value": "Paris"})
+    assert tagger._cache_get("hi")[0]["entities"] == [{"type": "name", "value": "Ann"}]
+
+
+def test_bio_tagger_cache_is_bounded():
+    """測試快取容量上限與停用"""
+    tagger = BIOTagger(cache_size=2)
+    tagger.tokenizer = _WordTokenizer()
+    tagger.model = _ChatModel()
+    for text in ["a", "b", "c"]:
+        tagger.predict(text)
+    assert list(tagger._cache) == ["b", "c"]
+    
+    tagger = BIOTagger(cache_size=0)
+    tagger.tokenizer = _WordTokenizer()
+    tagger.model = _ChatModel()
+    tagger.predict("a")
+    tagger.predict("a")
+    assert tagger.model.batches == [1, 1]
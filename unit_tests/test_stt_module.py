@@ -358,5 +358,252 @@ class TestSTTModuleIntegration:
             assert True  # 測試通過
 
 
+
+class TestStreamingVAD:
+    """測試串流 VAD 與向量化能量計算"""
+    
+    SAMPLE_RATE = 16000
+    
+    def _synthetic_audio(self, bursts, total=6.0):
+        """低噪聲背景 + 指定 (起, 迄) 秒數的 200Hz 語音替代訊號"""
+        rng = np.random.default_rng(0)
+        audio = rng.standard_normal(int(total * self.SAMPLE_RATE)) * 50
+        for start, end in bursts:
+            t = np.arange(int((end - start) * self.SAMPLE_RATE)) / self.SAMPLE_RATE
+            begin = int(start * self.SAMPLE_RATE)
+            audio[begin:begin + len(t)] += 8000 * np.sin(2 * np.pi * 200 * t)
+        return audio.astype(np.int16)
+    
+    def test_vectorized_detection_events(self):
+        """測試向量化 detect_voice_activity 的事件時間與尾端未完成語音"""
+        from modules.stt_module.vad import VoiceActivityDetection
+        vad = VoiceActivityDetection(self.SAMPLE_RATE)
+        
+        events = vad.detect_voice_activity(self._synthetic_audio([(1.0, 2.0), (5.0, 6.0)]))
+        
+        assert [e['event_type'] for e in events] == ['speech_start', 'speech_end', 'speech_start', 'speech_end']
+        assert events[0]['timestamp'] == pytest.approx(1.0)
+        assert events[1]['duration'] == pytest.approx(1.0)
+        assert events[3].get('is_incomplete') is True
+        assert vad.has_sufficient_speech(self._synthetic_audio([(1.0, 2.0)]))
+        assert not vad.has_sufficient_speech(self._synthetic_audio([]))
+    
+    def test_streaming_events_fire_at_frame_granularity(self):
+        """測試 20ms 幀推入時語音起訖在一個 hangover 內觸發並帶出整段音訊"""
+        from modules.stt_module.vad import VoiceActivityDetection
+        vad = VoiceActivityDetection(self.SAMPLE_RATE)
+        stream = vad.create_stream(silence_duration=0.3, pre_roll=0.1)
+        audio = self._synthetic_audio([(1.0, 2.0), (3.5, 4.5)])
+        
+        events = []
+        for i in range(0, len(audio), 320):
+            events.extend(stream.push(audio[i:i + 320]))
+        
+        starts = [e for e in events if e['event_type'] == 'speech_start']
+        ends = [e for e in events if e['event_type'] == 'speech_end']
+        assert len(starts) == 2 and len(ends) == 2
+        assert starts[0]['timestamp'] == pytest.approx(1.0)
+        assert starts[0]['detected_at'] - starts[0]['timestamp'] <= 0.1
+        assert ends[0]['timestamp'] == pytest.approx(2.0)
+        assert ends[0]['detected_at'] - ends[0]['timestamp'] == pytest.approx(0.3, abs=0.03)
+        # 前導 0.1 秒 + 語音 1 秒 + 最多 0.2 秒尾音
+        assert 1.1 * self.SAMPLE_RATE <= len(ends[0]['audio']) <= 1.3 * self.SAMPLE_RATE
+    
+    def test_streaming_odd_sized_pushes_and_limits(self):
+        """測試非整幀推入、過短語音取消、最大長度強制結束與 flush"""
+        from modules.stt_module.vad import StreamingVAD
+        stream = StreamingVAD(self.SAMPLE_RATE, energy_threshold=0.00065, silence_duration=0.2,
+                              min_speech_duration=0.3, max_utterance=1.0)
+        audio = self._synthetic_audio([(0.5, 0.6), (1.0, 3.5)], total=3.5)
+        
+        events = []
+        for i in range(0, len(audio), 777):
+            events.extend(stream.push(audio[i:i + 777]))
+        events.extend(stream.flush())
+        
+        types = [e['event_type'] for e in events]
+        assert types[:2] == ['speech_start', 'speech_cancel']
+        forced = [e for e in events if e.get('forced')]
+        assert len(forced) == 2 and all(e['duration'] == pytest.approx(1.0, abs=0.03) for e in forced)
+        assert events[-1].get('is_incomplete') is True
+        assert stream.get_stats()['frames'] == len(audio) // stream.frame_samples
+
+
+class TestSpeakerEmbeddingIndex:
+    """測試向量化說話人嵌入索引"""
+
+    def _database(self, speakers=5, samples=4, dim=32):
+        rng = np.random.default_rng(0)
+        database = {}
+        for k in range(speakers):
+            center = rng.normal(size=dim) * 3
+            database[f"speaker_{k:03d}"] = {
+                'embeddings': [center + rng.normal(size=dim) * 0.3 for _ in range(samples)],
+                'metadata': {'sample_count': samples}
+            }
+        return database
+
+    def test_distances_match_pairwise_definitions(self):
+        """測試向量化距離與逐對計算一致"""
+        from modules.stt_module.speaker_index import SpeakerEmbeddingIndex, enhanced_feature_matrix
+        database = self._database()
+        index = SpeakerEmbeddingIndex()
+        index.rebuild(database)
+        query = database['speaker_002']['embeddings'][1] + 0.05
+
+        rows = index.rows_for(['speaker_001', 'speaker_002'])
+        distances = index.distances(query, rows)
+
+        stored = [e for sid in ('speaker_001', 'speaker_002') for e in database[sid]['embeddings']]
+        assert [index.speaker_at(r) for r in rows] == ['speaker_001'] * 4 + ['speaker_002'] * 4
+        for i, emb in enumerate(stored):
+            a, b = query / np.linalg.norm(query), emb / np.linalg.norm(emb)
+            assert distances['cosine'][i] == pytest.approx(1 - a @ b, abs=1e-10)
+            assert distances['euclidean'][i] == pytest.approx(np.linalg.norm(a - b), abs=1e-6)
+            assert distances['magnitude'][i] == pytest.approx(abs(np.linalg.norm(query) - np.linalg.norm(emb)))
+            assert distances['correlation'][i] == pytest.approx(1 - abs(np.corrcoef(query, emb)[0, 1]), abs=1e-10)
+            features = enhanced_feature_matrix(np.vstack([query, emb]))
+            assert distances['enhanced'][i] == pytest.approx(np.linalg.norm(features[0] - features[1]))
+        assert int(np.argmin(distances['cosine'])) >= 4
+
+    def test_incremental_sync_rename_and_remove(self):
+        """測試附加樣本增量同步、重新命名與刪除後的壓縮"""
+        from modules.stt_module.speaker_index import SpeakerEmbeddingIndex
+        database = self._database()
+        index = SpeakerEmbeddingIndex(initial_capacity=4)
+        index.rebuild(database)
+        assert len(index) == 20
+
+        new_sample = database['speaker_003']['embeddings'][0] * 1.01
+        database['speaker_003']['embeddings'].append(new_sample)
+        assert index.sync(database) is True
+        assert index.sync(database) is False
+        assert len(index) == 21
+
+        assert index.rename('speaker_003', 'alice')
+        database['alice'] = database.pop('speaker_003')
+        distances = index.distances(new_sample, index.rows_for())
+        assert index.speaker_at(int(np.argmin(distances['cosine']))) == 'alice'
+
+        index.remove('alice')
+        assert len(index) == 16
+        assert 'alice' not in index.speaker_ids
+        assert set(index.speaker_at(r) for r in index.rows_for()) == {f"speaker_{k:03d}" for k in (0, 1, 2, 4)}
+
+
+class TestSpeakerEmbeddingStore:
+    """測試僅追加的說話人嵌入存儲"""
+
+    def _database(self, speakers=3, samples=4, dim=16):
+        rng = np.random.default_rng(1)
+        return {
+            f"speaker_{k:03d}": {
+                'embeddings': [rng.normal(size=dim).astype(np.float32) for _ in range(samples)],
+                'metadata': {'sample_count': samples, 'created_at': 1.0}
+            }
+            for k in range(speakers)
+        }
+
+    def _assert_same(self, loaded, expected):
+        assert set(loaded) == set(expected)
+        for speaker_id, data in expected.items():
+            assert loaded[speaker_id]['metadata'] == data['metadata']
+            assert len(loaded[speaker_id]['embeddings']) == len(data['embeddings'])
+            for a, b in zip(loaded[speaker_id]['embeddings'], data['embeddings']):
+                assert a.dtype == b.dtype
+                np.testing.assert_array_equal(a, b)
+
+    def test_incremental_writes_and_reload(self, tmp_path):
+        """測試新增樣本只追加，重新命名與刪除後可正確重放"""
+        from modules.stt_module.speaker_store import SpeakerEmbeddingStore
+        store = SpeakerEmbeddingStore(str(tmp_path / "store"), fsync=False)
+        database, counter = store.load()
+        assert database == {} and counter == 0
+
+        database.update(self._database())
+        assert store.sync(database, 3)
+        data_file = tmp_path / "store" / f"embeddings.{store.generation}.bin"
+        size = data_file.stat().st_size
+
+        database['speaker_001']['embeddings'].append(np.ones(16, dtype=np.float32))
+        database['speaker_001']['metadata']['sample_count'] = 5
+        assert store.sync(database, 3)
+        assert data_file.stat().st_size == size + 16 * 4
+
+        database['alice'] = database.pop('speaker_001')
+        assert store.rename('speaker_001', 'alice')
+        del database['speaker_002']
+        assert store.sync(database, 3)
+
+        loaded, counter = SpeakerEmbeddingStore(str(tmp_path / "store")).load()
+        assert counter == 3
+        self._assert_same(loaded, database)
+
+    def test_torn_index_tail_is_dropped(self, tmp_path):
+        """測試崩潰留下的殘缺索引末行與未引用資料不影響載入"""
+        from modules.stt_module.speaker_store import SpeakerEmbeddingStore
+        store = SpeakerEmbeddingStore(str(tmp_path), fsync=False)
+        database, _ = store.load()
+        database.update(self._database())
+        store.sync(database, 3)
+
+        with open(tmp_path / f"embeddings.{store.generation}.bin", 'ab') as f:
+            f.write(b"\0" * 64)
+        with open(tmp_path / "index.jsonl", 'a', encoding='utf-8') as f:
+            f.write('["s", "speaker_000", 999')
+
+        reloaded = SpeakerEmbeddingStore(str(tmp_path), fsync=False)
+        loaded, _ = reloaded.load()
+        self._assert_same(loaded, database)
+        assert (tmp_path / "index.jsonl").read_bytes().endswith(b"\n")
+
+        loaded['speaker_000']['embeddings'].append(np.zeros(16, dtype=np.float32))
+        assert reloaded.sync(loaded, 3)
+        self._assert_same(SpeakerEmbeddingStore(str(tmp_path)).load()[0], loaded)
+
+    def test_compaction_switches_generation(self, tmp_path):
+        """測試刪除後壓縮回收空間並移除舊世代資料檔"""
+        from modules.stt_module.speaker_store import SpeakerEmbeddingStore
+        store = SpeakerEmbeddingStore(str(tmp_path), compaction_min_dead_bytes=0, fsync=False)
+        database, _ = store.load()
+        database.update(self._database(speakers=4))
+        store.sync(database, 4)
+        generation = store.generation
+
+        del database['speaker_000']
+        store.sync(database, 4)
+        assert store.generation == generation + 1
+        assert store.get_stats()['dead_bytes'] == 0
+        assert sorted(p.name for p in tmp_path.glob("embeddings.*.bin")) == [f"embeddings.{generation + 1}.bin"]
+        self._assert_same(SpeakerEmbeddingStore(str(tmp_path)).load()[0], database)
+
+    def test_legacy_migration_backup_and_restore(self, tmp_path):
+        """測試舊版 pickle 遷移與備份 / 恢復"""
+        import pickle
+        from modules.stt_module.speaker_identification import SpeakerIdentification
+        legacy = self._database()
+        legacy_path = tmp_path / "speaker_models.pkl"
+        with open(legacy_path, 'wb') as f:
+            pickle.dump({'database': legacy, 'counter': 3}, f)
+
+        speaker = SpeakerIdentification()
+        speaker.database_path = str(tmp_path / "speaker_store")
+        speaker.legacy_database_path = str(legacy_path)
+        speaker._load_speaker_database()
+        self._assert_same(speaker.speaker_database, legacy)
+        assert speaker.speaker_counter == 3
+        assert not legacy_path.exists() and (tmp_path / "speaker_models.pkl.migrated").exists()
+        assert len(speaker.embedding_index) == 12
+
+        backup_path = str(tmp_path / "backup")
+        assert speaker.backup_speakers(backup_path)
+        assert speaker.delete_speaker('speaker_000')
+        assert speaker.restore_speakers(backup_path)
+        self._assert_same(speaker.speaker_database, legacy)
+        assert (tmp_path / "speaker_store.pre_restore" / "index.jsonl").exists()
+
+        assert speaker.restore_speakers(str(tmp_path / "speaker_models.pkl.migrated"))
+        self._assert_same(speaker.speaker_database, legacy)
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
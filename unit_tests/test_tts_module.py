@@ -258,6 +258,10 @@ class TestChunkingAndStreaming:
         assert result["status"] == "success"
         assert result["is_chunked"] == True
         assert result["chunk_count"] > 1
+        # 每段都有計時資料，且音頻不經暫存檔傳遞
+        assert len(result["chunk_timings"]) == result["chunk_count"]
+        assert all(t["synthesis_ms"] > 0 and t["audio_seconds"] > 0 for t in result["chunk_timings"])
+        assert not list(Path("temp/tts").glob("chunk_*.wav"))
         info_log(f"[Test] Streaming synthesis successful, {result['chunk_count']} chunks")
 
 
@@ -277,6 +281,599 @@ class TestErrorHandling:
         info_log("[Test] Invalid input handled correctly")
 
 
+# ============================================================================
+# Test 7: Phrase Audio Cache
+# ============================================================================
+
+class TestPhraseAudioCache:
+    """Test the persistent phrase audio cache (no engine required)"""
+    
+    def _cache(self, tmp_path, **overrides):
+        from modules.tts_module.audio_cache import PhraseAudioCache
+        config = {"cache_dir": str(tmp_path), "max_size_mb": 1, "emotion_quantization": 0.05}
+        config.update(overrides)
+        return PhraseAudioCache(config)
+    
+    def _audio(self, seconds=0.5, sample_rate=22050):
+        import numpy as np
+        t = np.arange(int(seconds * sample_rate)) / sample_rate
+        return (0.3 * np.sin(2 * np.pi * 220 * t)).astype("float32").reshape(1, -1)
+    
+    def test_key_normalization_and_quantization(self, tmp_path):
+        """Test 7.1: Whitespace and small emotion jitter share a key; other inputs do not"""
+        cache = self._cache(tmp_path)
+        params = {"cfm": "quality"}
+        emotion = [0.2, 0, 0, 0, 0, 0, 0, 0.1]
+        key = cache.make_key("Okay!", "uep", emotion, params)
+        
+        assert cache.make_key("  Okay!\n", "uep", [0.21, 0, 0, 0, 0, 0, 0, 0.1], params) == key
+        assert cache.make_key("Okay.", "uep", emotion, params) != key
+        assert cache.make_key("Okay!", "other", emotion, params) != key
+        assert cache.make_key("Okay!", "uep", emotion, {"cfm": "fast"}) != key
+    
+    def test_round_trip_persists_across_instances(self, tmp_path):
+        """Test 7.2: Stored audio is lossless to 16-bit and survives a restart"""
+        import numpy as np
+        audio = self._audio()
+        cache = self._cache(tmp_path)
+        key = cache.make_key("Hello!", "uep", None)
+        assert cache.lookup(key) is None
+        assert cache.store(key, audio, 22050, "Hello!")
+        
+        reopened = self._cache(tmp_path)
+        cached = reopened.lookup(key)
+        assert cached is not None and cached.shape == audio.shape
+        assert np.abs(cached - audio).max() < 1.0 / 32767 * 2
+        
+        stats = reopened.get_stats()
+        assert stats["hits"] == 1 and stats["entries"] == 1
+        assert stats["saved_seconds"] == pytest.approx(0.5, rel=1e-3)
+    
+    def test_size_cap_evicts_least_recently_used(self, tmp_path):
+        """Test 7.3: Exceeding the size cap evicts the least recently used phrase"""
+        cache = self._cache(tmp_path)
+        keys = [cache.make_key(f"phrase {i}", "uep", None) for i in range(3)]
+        cache.store(keys[0], self._audio(), 22050)
+        cache.store(keys[1], self._audio(), 22050)
+        # room for two entries only
+        cache.max_bytes = int(cache.get_stats()["size_bytes"] * 1.25)
+        assert cache.lookup(keys[0]) is not None  # keys[1] is now the oldest
+        cache.store(keys[2], self._audio(), 22050)
+        
+        assert cache.lookup(keys[1]) is None
+        assert cache.lookup(keys[0]) is not None
+        assert cache.get_stats()["evictions"] >= 1
+        assert cache.get_stats()["size_bytes"] <= cache.max_bytes
+    
+    def test_hits_defer_index_writes(self, tmp_path, monkeypatch):
+        """Test 7.5: Hits only mark the index dirty; store and flush write it"""
+        cache = self._cache(tmp_path, index_flush_seconds=60)
+        key = cache.make_key("Okay!", "uep", None)
+        cache.store(key, self._audio(0.1), 22050)
+        
+        writes = []
+        original = cache._save_index_locked
+        monkeypatch.setattr(cache, "_save_index_locked", lambda: writes.append(1) or original())
+        for _ in range(5):
+            assert cache.lookup(key) is not None
+        assert writes == []
+        
+        cache.flush()
+        assert len(writes) == 1
+        cache.flush()  # nothing new to save
+        assert len(writes) == 1
+        
+        # 超過寫回間隔後，下一次命中即寫回
+        cache._last_index_save -= 61
+        cache.lookup(key)
+        assert len(writes) == 2
+    
+    def test_prewarm_only_synthesizes_missing_phrases(self, tmp_path):
+        """Test 7.4: Prewarm skips cached and over-long phrases"""
+        cache = self._cache(tmp_path, max_text_chars=20)
+        synthesized = []
+        
+        def synthesize(phrase):
+            synthesized.append(phrase)
+            return self._audio(0.1)
+        
+        make_key = lambda phrase: cache.make_key(phrase, "uep", None)
+        phrases = ["Okay!", "Done!", "This phrase is far too long to be cached"]
+        assert cache.prewarm(phrases, make_key, synthesize, 22050) == 2
+        assert cache.prewarm(phrases, make_key, synthesize, 22050) == 0
+        assert synthesized == ["Okay!", "Done!"]
+
+
+# ============================================================================
+# Test 8: Stage Pipeline
+# ============================================================================
+
+class TestStagePipeline:
+    """Test overlapped text→codes / codes→mel / mel→wave stages (fake engine)"""
+    
+    class _FakeEngine:
+        """Each stage sleeps; chunks containing 'bad' fail in codes_to_mel"""
+        device = None
+        
+        def __init__(self, stage_seconds=0.05):
+            import threading
+            self.stage_seconds = stage_seconds
+            self.active = 0
+            self.max_active = 0
+            self._lock = threading.Lock()
+        
+        def _work(self):
+            import time
+            with self._lock:
+                self.active += 1
+                self.max_active = max(self.max_active, self.active)
+            time.sleep(self.stage_seconds)
+            with self._lock:
+                self.active -= 1
+        
+        def text_to_codes(self, text, emotion_vector=None, cfm_profile=None):
+            self._work()
+            return {"text": text, "profile": cfm_profile}
+        
+        def codes_to_mel(self, job):
+            self._work()
+            if "bad" in job["text"]:
+                raise RuntimeError("mel failed")
+            return job
+        
+        def mel_to_wave(self, job):
+            self._work()
+            return f"wave:{job['text']}:{job['profile']}"
+    
+    def _run(self, overlap, chunks):
+        import time
+        from modules.tts_module.stage_pipeline import TTSStagePipeline
+        engine = self._FakeEngine()
+        pipeline = TTSStagePipeline(engine, depth=1, overlap=overlap)
+        start = time.perf_counter()
+        results = list(pipeline.run(chunks, lambda chunk: {"cfm_profile": "fast" if len(chunk) < 3 else None}))
+        return results, time.perf_counter() - start, engine
+    
+    def test_overlapped_stages_keep_order_and_run_concurrently(self):
+        """Test 8.1: Overlapped pipeline yields in order and beats serial wall time"""
+        chunks = ["one", "two", "3", "four", "five", "six"]
+        serial, serial_wall, serial_engine = self._run(False, chunks)
+        overlapped, overlapped_wall, engine = self._run(True, chunks)
+        
+        assert [r[2] for r in overlapped] == [r[2] for r in serial]
+        assert [r[0] for r in overlapped] == list(range(1, 7))
+        assert overlapped[2][2] == "wave:3:fast"
+        assert serial_engine.max_active == 1
+        assert engine.max_active >= 2
+        assert overlapped_wall < serial_wall * 0.8
+        assert all({"text_to_codes_ms", "codes_to_mel_ms", "mel_to_wave_ms", "synthesis_ms"} <= set(r[3])
+                   for r in overlapped)
+    
+    def test_failed_chunk_does_not_stop_pipeline(self):
+        """Test 8.2: A chunk failing mid-pipeline yields None and later chunks still finish"""
+        results, _, _ = self._run(True, ["first", "bad chunk", "third"])
+        assert [r[2] for r in results] == ["wave:first:None", None, "wave:third:None"]
+        assert "mel_to_wave_ms" not in results[1][3]
+
+
+# ============================================================================
+# Test 9: Streaming Producer/Consumer
+# ============================================================================
+
+class TestStreamingConsumer:
+    """Test the producer/consumer loop of _stream_chunks (fake pipeline, no playback)"""
+    
+    class _FakePipeline:
+        """Yields pre-built stage results; chunks containing 'bad' have no audio"""
+        
+        options_seen = []
+        
+        def __init__(self, engine, **kwargs):
+            pass
+        
+        def run(self, chunks, options):
+            import numpy as np
+            for idx, chunk in enumerate(chunks, 1):
+                self.options_seen.append(options(chunk))
+                audio = None if "bad" in chunk else np.zeros((1, 2205), dtype="float32")
+                yield idx, chunk, audio, {"synthesis_ms": 1.0}
+    
+    def test_failed_chunk_does_not_block_later_chunks(self, tmp_path, monkeypatch):
+        """Test 9.1: A failing chunk followed by more than the queue size still completes"""
+        import asyncio
+        from types import SimpleNamespace
+        import modules.tts_module.tts_module as tts_module_impl
+        
+        monkeypatch.setattr(tts_module_impl, "TTSStagePipeline", self._FakePipeline)
+        monkeypatch.setattr(tts_module_impl, "sa", None)
+        module = TTSModule(config={"audio_cache": {"enabled": False, "cache_dir": str(tmp_path)}})
+        module.engine = SimpleNamespace(sample_rate=22050)
+        
+        chunks = ["bad chunk", "one", "two", "three", "four"]
+        result = asyncio.run(asyncio.wait_for(module._stream_chunks(chunks, save=False), timeout=5))
+        
+        assert result["success"]
+        assert result["chunk_count"] == 4
+        assert [t["index"] for t in result["chunk_timings"]] == [2, 3, 4, 5]
+        assert module._playback_state == PlaybackState.COMPLETED
+        assert not module._playback_lock.locked()
+    
+    def test_streamed_chunks_keep_default_cfm_profile(self, tmp_path, monkeypatch):
+        """Test 9.2: Short streamed chunks do not switch to the short-text CFM profile"""
+        import asyncio
+        from types import SimpleNamespace
+        import modules.tts_module.tts_module as tts_module_impl
+        
+        monkeypatch.setattr(tts_module_impl, "TTSStagePipeline", self._FakePipeline)
+        monkeypatch.setattr(tts_module_impl, "sa", None)
+        monkeypatch.setattr(self._FakePipeline, "options_seen", [])
+        module = TTSModule(config={
+            "audio_cache": {"enabled": False, "cache_dir": str(tmp_path)},
+            "synthesis": {"short_text_cfm_profile": "fast", "short_text_max_chars": 24}
+        })
+        module.engine = SimpleNamespace(sample_rate=22050)
+        
+        chunks = ["Okay!", "This is a much longer sentence that follows the short one."]
+        asyncio.run(asyncio.wait_for(module._stream_chunks(chunks, save=False), timeout=5))
+        
+        assert module._select_cfm_profile("Okay!") == "fast"
+        assert len(self._FakePipeline.options_seen) == 2
+        assert all(options.get("cfm_profile") is None for options in self._FakePipeline.options_seen)
+    
+    def test_playback_lock_spans_event_loops(self, tmp_path, monkeypatch):
+        """Test 9.3: A stream on another thread's event loop waits for playback held elsewhere"""
+        import asyncio
+        import threading
+        from types import SimpleNamespace
+        import modules.tts_module.tts_module as tts_module_impl
+        
+        monkeypatch.setattr(tts_module_impl, "TTSStagePipeline", self._FakePipeline)
+        monkeypatch.setattr(tts_module_impl, "sa", None)
+        module = TTSModule(config={"audio_cache": {"enabled": False, "cache_dir": str(tmp_path)}})
+        module.engine = SimpleNamespace(sample_rate=22050)
+        
+        results = []
+        def run_stream():
+            results.append(asyncio.run(module._stream_chunks(["one", "two"], save=False)))
+        
+        module._playback_lock.acquire()
+        threads = [threading.Thread(target=run_stream) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        threads[0].join(timeout=0.3)
+        assert threads[0].is_alive() and not results
+        
+        module._playback_lock.release()
+        for thread in threads:
+            thread.join(timeout=5)
+        assert len(results) == 2 and all(result["success"] for result in results)
+        assert not module._playback_lock.locked()
+
+# ============================================================================
+# Test 10: CFM Solvers
+# ============================================================================
+
+class TestCFMSolvers:
+    """Test the Euler / midpoint solvers and CFG cutoff with a stub estimator (no weights)"""
+    
+    class _StubEstimator:
+        """Deterministic velocity field that records batch size and timestep of every call"""
+        
+        def __init__(self):
+            self.calls = []
+        
+        def __call__(self, x, prompt_x, x_lens, t, style, mu):
+            import torch
+            self.calls.append((x.size(0), float(t[0])))
+            return (torch.sin(x + t.view(-1, 1, 1)) + 0.1 * prompt_x
+                    + 0.01 * style.sum(-1).view(-1, 1, 1) + 0.05 * mu.mean(1, keepdim=True))
+    
+    def _cfm(self):
+        from types import SimpleNamespace
+        from modules.tts_module.s2mel.modules.flow_matching import BASECFM
+        cfm = BASECFM(SimpleNamespace(DiT=SimpleNamespace(in_channels=4), reg_loss_type="l2"))
+        cfm.estimator = self._StubEstimator()
+        return cfm
+    
+    def _inputs(self, steps):
+        import torch
+        generator = torch.Generator().manual_seed(0)
+        return {
+            "x": torch.randn(1, 4, 12, generator=generator),
+            "x_lens": torch.tensor([12]),
+            "prompt": torch.randn(1, 4, 3, generator=generator),
+            "mu": torch.randn(1, 8, 12, generator=generator),
+            "style": torch.randn(1, 6, generator=generator),
+            "t_span": torch.linspace(0, 1, steps + 1),
+        }
+    
+    @staticmethod
+    def _legacy_euler(estimator, x, x_lens, prompt, mu, style, t_span, inference_cfg_rate):
+        """Euler loop before CFM profiles were added (tqdm removed)"""
+        import torch
+        t = t_span[0]
+        sol = []
+        prompt_len = prompt.size(-1)
+        prompt_x = torch.zeros_like(x)
+        prompt_x[..., :prompt_len] = prompt[..., :prompt_len]
+        x[..., :prompt_len] = 0
+        for step in range(1, len(t_span)):
+            dt = t_span[step] - t_span[step - 1]
+            stacked_prompt_x = torch.cat([prompt_x, torch.zeros_like(prompt_x)], dim=0)
+            stacked_style = torch.cat([style, torch.zeros_like(style)], dim=0)
+            stacked_mu = torch.cat([mu, torch.zeros_like(mu)], dim=0)
+            stacked_x = torch.cat([x, x], dim=0)
+            stacked_t = t.reshape(1).expand(stacked_x.size(0))
+            stacked_x_lens = torch.cat([x_lens, x_lens], dim=0)
+            stacked_dphi_dt = estimator(stacked_x, stacked_prompt_x, stacked_x_lens, stacked_t, stacked_style, stacked_mu)
+            dphi_dt, cfg_dphi_dt = stacked_dphi_dt.chunk(2, dim=0)
+            dphi_dt = (1.0 + inference_cfg_rate) * dphi_dt - inference_cfg_rate * cfg_dphi_dt
+            x = x + dt * dphi_dt
+            t = t + dt
+            sol.append(x)
+            x[:, :, :prompt_len] = 0
+        return sol[-1]
+    
+    def test_quality_profile_matches_legacy_euler(self):
+        """Test 10.1: Euler with cfg_cutoff=1.0 is bit-identical to the old loop"""
+        import torch
+        cfm = self._cfm()
+        a, b = self._inputs(25), self._inputs(25)
+        legacy = self._legacy_euler(self._StubEstimator(), b["x"], b["x_lens"], b["prompt"], b["mu"],
+                                    b["style"], b["t_span"], 0.7)
+        result = cfm.solve_euler(a["x"], a["x_lens"], a["prompt"], a["mu"], a["style"], None,
+                                 a["t_span"], inference_cfg_rate=0.7, cfg_cutoff=1.0)
+        
+        assert torch.equal(result, legacy)
+        assert len(cfm.estimator.calls) == 25
+        assert all(batch == 2 for batch, _ in cfm.estimator.calls)
+    
+    def test_midpoint_calls_estimator_twice_per_step(self):
+        """Test 10.2: Midpoint evaluates at t and t + dt/2 on every step"""
+        cfm = self._cfm()
+        inputs = self._inputs(6)
+        cfm.solve_midpoint(inputs["x"], inputs["x_lens"], inputs["prompt"], inputs["mu"], inputs["style"], None,
+                           inputs["t_span"], inference_cfg_rate=0.7, cfg_cutoff=1.0)
+        
+        times = [t for _, t in cfm.estimator.calls]
+        assert len(times) == 12
+        assert times[0::2] == pytest.approx([i / 6 for i in range(6)])
+        assert times[1::2] == pytest.approx([(i + 0.5) / 6 for i in range(6)])
+    
+    @pytest.mark.parametrize("solver", ["solve_euler", "solve_midpoint"])
+    def test_cfg_cutoff_halves_batch(self, solver):
+        """Test 10.3: Calls at t >= cfg_cutoff run the conditional branch alone"""
+        cfm = self._cfm()
+        inputs = self._inputs(6)
+        getattr(cfm, solver)(inputs["x"], inputs["x_lens"], inputs["prompt"], inputs["mu"], inputs["style"], None,
+                             inputs["t_span"], inference_cfg_rate=0.7, cfg_cutoff=0.5)
+        
+        calls = cfm.estimator.calls
+        assert any(batch == 2 for batch, _ in calls) and any(batch == 1 for batch, _ in calls)
+        assert all(batch == (2 if t < 0.5 else 1) for batch, t in calls)
+
+# ============================================================================
+# Test 11: Emotion Conditioning Cache
+# ============================================================================
+
+class TestEmotionConditioningCache:
+    """Test the per-character conditioning and quantized emovec LRU (stub GPT, no weights)"""
+    
+    HIDDEN = 6
+    
+    def _engine(self, cache_size=32, quantization=0.01):
+        import torch
+        from collections import OrderedDict
+        from types import SimpleNamespace
+        from modules.tts_module.lite_engine import IndexTTSLite
+        
+        engine = IndexTTSLite.__new__(IndexTTSLite)
+        generator = torch.Generator().manual_seed(0)
+        engine.device = torch.device("cpu")
+        engine.use_fp16 = False
+        engine.emotion_quantization = quantization
+        engine.emovec_cache_size = cache_size
+        engine._emovec_cache = OrderedDict()
+        engine._emovec_cache_stats = {"hits": 0, "misses": 0, "evictions": 0}
+        engine._character_conditioning = None
+        engine.emo_matrix = tuple(torch.randn(3, self.HIDDEN, generator=generator) for _ in range(8))
+        engine.merge_calls = 0
+        
+        def merge_emovec(spk_cond, emo_cond, spk_len, emo_len, alpha=1.0):
+            engine.merge_calls += 1
+            return spk_cond.mean(-1) * alpha
+        engine.gpt = SimpleNamespace(merge_emovec=merge_emovec)
+        engine.character_features = self._features(seed=1)
+        return engine
+    
+    def _features(self, seed, emo_indices=(0, 1, 2, 0, 1, 2, 0, 1)):
+        import torch
+        generator = torch.Generator().manual_seed(seed)
+        features = {"spk_cond_emb": torch.randn(1, self.HIDDEN, 5, generator=generator)}
+        if emo_indices is not None:
+            features["emo_indices"] = torch.tensor(emo_indices, dtype=torch.long)
+        return features
+    
+    def _uncached(self, engine, weights):
+        """The per-call computation before the cache existed"""
+        import torch
+        features = engine.character_features
+        emo_matrix_cat = torch.cat(
+            [emo_mat[int(idx)].unsqueeze(0) for idx, emo_mat in zip(features["emo_indices"], engine.emo_matrix)], 0
+        )
+        emovec_mat = torch.sum(torch.tensor(weights).unsqueeze(1) * emo_matrix_cat, 0).unsqueeze(0)
+        base = engine.gpt.merge_emovec(features["spk_cond_emb"], features["spk_cond_emb"], None, None)
+        return emovec_mat + (1 - torch.sum(torch.tensor(weights))) * base, emovec_mat
+    
+    def test_quantized_key_shares_entry(self):
+        """Test 11.1: Jitter below the quantization step hits; larger changes miss"""
+        engine = self._engine(quantization=0.05)
+        first = engine._get_emotion_conditioning([0.2, 0, 0, 0, 0, 0, 0, 0.1])
+        
+        assert engine._get_emotion_conditioning([0.21, 0, 0, 0, 0, 0, 0, 0.09]) is first
+        assert engine._get_emotion_conditioning([0.3, 0, 0, 0, 0, 0, 0, 0.1]) is not first
+        stats = engine.get_emovec_cache_stats()
+        assert (stats["hits"], stats["misses"], stats["entries"]) == (1, 2, 2)
+        assert engine.merge_calls == 1  # base emovec computed once per character
+    
+    def test_lru_hit_and_eviction_counts(self):
+        """Test 11.2: Entries beyond the cap evict the least recently used vector"""
+        engine = self._engine(cache_size=2)
+        a, b, c = ([0.1 * i] + [0.0] * 7 for i in (1, 2, 3))
+        engine._get_emotion_conditioning(a)
+        engine._get_emotion_conditioning(b)
+        engine._get_emotion_conditioning(a)  # b is now the oldest
+        engine._get_emotion_conditioning(c)
+        engine._get_emotion_conditioning(a)
+        engine._get_emotion_conditioning(b)
+        
+        stats = engine.get_emovec_cache_stats()
+        assert (stats["hits"], stats["misses"], stats["evictions"]) == (2, 4, 2)
+        assert stats["entries"] == stats["max_entries"] == 2
+        assert stats["hit_rate"] == pytest.approx(2 / 6)
+    
+    def test_load_character_clears_cache(self, tmp_path):
+        """Test 11.3: Loading a character recomputes conditioning and drops cached vectors"""
+        import torch
+        engine = self._engine()
+        emotion = [0.2, 0, 0, 0, 0, 0, 0, 0]
+        before = engine._get_emotion_conditioning(emotion)
+        
+        path = tmp_path / "other.pt"
+        features = self._features(seed=2)
+        features.update({"style": torch.zeros(1, 4), "prompt_condition": torch.zeros(1, 4, 2),
+                         "ref_mel": torch.zeros(1, 4, 2)})
+        torch.save(features, path)
+        assert engine.load_character(path, verbose=False)
+        
+        assert engine.get_emovec_cache_stats()["entries"] == 0
+        after = engine._get_emotion_conditioning(emotion)
+        assert not torch.equal(after[0], before[0])
+        assert torch.allclose(after[0], self._uncached(engine, emotion)[0])
+    
+    def test_cached_matches_uncached_computation(self):
+        """Test 11.4: Cached and freshly computed vectors match the pre-cache formula"""
+        import torch
+        engine = self._engine()
+        emotion = [0.12, 0.0, 0.05, 0.0, 0.0, 0.07, 0.0, 0.01]
+        miss = engine._get_emotion_conditioning(emotion)
+        hit = engine._get_emotion_conditioning(emotion)
+        emovec, emovec_mat = self._uncached(engine, emotion)
+        
+        assert hit is miss
+        assert torch.allclose(miss[0], emovec, atol=1e-6)
+        assert torch.allclose(miss[1], emovec_mat, atol=1e-6)
+    
+    def test_missing_emo_indices_default_to_zeros(self, tmp_path):
+        """Test 11.5: Characters without emo_indices keep using the first basis of each emotion"""
+        import torch
+        engine = self._engine()
+        path = tmp_path / "plain.pt"
+        features = self._features(seed=3, emo_indices=None)
+        features.update({"style": torch.zeros(1, 4), "prompt_condition": torch.zeros(1, 4, 2),
+                         "ref_mel": torch.zeros(1, 4, 2)})
+        torch.save(features, path)
+        assert engine.load_character(path, verbose=False)
+        
+        assert torch.equal(engine.character_features["emo_indices"], torch.zeros(8, dtype=torch.long))
+
+# ============================================================================
+# Test 12: Segment Batching
+# ============================================================================
+
+class TestSegmentBatching:
+    """Test multi-segment batching, reordering, trimming and crossfade (fake stages, no weights)"""
+    
+    def _engine(self, batch_size=2, crossfade_ms=0, sample_rate=1000, hop_length=4):
+        from types import SimpleNamespace
+        from modules.tts_module.lite_engine import IndexTTSLite
+        
+        engine = IndexTTSLite.__new__(IndexTTSLite)
+        engine.sample_rate = sample_rate
+        engine.segment_crossfade_ms = crossfade_ms
+        engine.segment_batch_size = batch_size
+        engine.max_text_tokens_per_segment = 200
+        engine.character_features = {}
+        engine.cfg = SimpleNamespace(s2mel=SimpleNamespace(
+            preprocess_params=SimpleNamespace(spect_params=SimpleNamespace(hop_length=hop_length))
+        ))
+        return engine
+    
+    def _fake_stages(self, engine):
+        """Segments are separated by '/'; each fake wave repeats its first token id"""
+        import torch
+        from types import SimpleNamespace
+        engine.tokenizer = SimpleNamespace(
+            tokenize=lambda text: text.split(),
+            split_segments=lambda tokens, max_text_tokens_per_segment: [
+                segment.split() for segment in " ".join(tokens).split("/")
+            ],
+            convert_tokens_to_ids=lambda segment: [int(token) for token in segment]
+        )
+        engine.normalize_emotion_vector = lambda emotion, strength, verbose: emotion
+        engine._get_emotion_conditioning = lambda emotion: (None, None)
+        engine.get_cfm_profile = lambda name: {"name": name}
+        engine.batches_seen = []
+        
+        def batch_text_to_codes(token_batch, emovec, emovec_mat, generation_kwargs, verbose):
+            engine.batches_seen.append([len(tokens) for tokens in token_batch])
+            return {"batch_size": len(token_batch), "tokens": token_batch}
+        engine._batch_text_to_codes = batch_text_to_codes
+        engine._batch_mel_to_wave = lambda batch: [
+            torch.full((1, 4 * len(tokens)), float(tokens[0])) for tokens in batch["tokens"]
+        ]
+    
+    def test_crossfade_length_and_continuity(self):
+        """Test 12.1: Each join overlaps fade samples and ramps linearly between segments"""
+        import torch
+        engine = self._engine(crossfade_ms=10)  # 10 samples at 1 kHz
+        ones = engine._crossfade_concat([torch.ones(1, 50), torch.ones(1, 30), torch.ones(1, 40)])
+        assert ones.shape == (1, 50 + 30 + 40 - 2 * 10)
+        assert torch.allclose(ones, torch.ones_like(ones))
+        
+        joined = engine._crossfade_concat([torch.zeros(1, 50), torch.ones(1, 30)])
+        overlap = joined[0, 40:50]
+        assert torch.equal(joined[0, :40], torch.zeros(40))
+        assert torch.equal(joined[0, 50:], torch.ones(20))
+        assert torch.allclose(overlap, torch.linspace(0.0, 1.0, 10))
+        assert torch.all(overlap[1:] >= overlap[:-1])
+        
+        # 比淡化長度短的段落只重疊其自身長度
+        assert engine._crossfade_concat([torch.ones(1, 50), torch.ones(1, 4)]).shape == (1, 50)
+        single = torch.ones(1, 7)
+        assert engine._crossfade_concat([single]) is single
+    
+    def test_length_sorted_batches_restore_original_order(self):
+        """Test 12.2: Segments are batched shortest first but concatenated in text order"""
+        import torch
+        engine = self._engine(batch_size=2)
+        self._fake_stages(engine)
+        job = engine.text_to_codes("1 1 1 / 2 / 3 3 / 4 4 4 4", [0.0] * 8)
+        
+        assert job["groups"] == [[1, 2], [0, 3]]
+        assert engine.batches_seen == [[1, 2], [3, 4]]
+        wave = engine.mel_to_wave(job)
+        expected = torch.cat([torch.full((1, 4 * n), float(v)) for v, n in ((1, 3), (2, 1), (3, 2), (4, 4))], dim=-1)
+        assert torch.equal(wave, expected)
+    
+    def test_batch_output_trimmed_to_mel_lengths(self):
+        """Test 12.3: Vocoder output of padded mels is cut to mel_lens * hop_length per segment"""
+        import torch
+        engine = self._engine(hop_length=4)
+        # 第一段 3 幀、第二段 5 幀，補齊區填 -1
+        mel = torch.full((2, 2, 5), -1.0)
+        mel[0, :, :3] = 1.0
+        mel[1] = 2.0
+        engine.bigvgan = lambda m: m[:, :1, :].repeat_interleave(4, dim=-1)
+        batch = {"batch_size": 2, "mel": mel, "mel_lens": [3, 5]}
+        
+        waves = engine._batch_mel_to_wave(batch)
+        
+        assert [w.shape for w in waves] == [(1, 12), (1, 20)]
+        assert torch.equal(waves[0], torch.ones(1, 12))
+        assert torch.equal(waves[1], torch.full((1, 20), 2.0))
+        assert "mel" not in batch
+
 # ============================================================================
 # Main Test Runner
 # ============================================================================
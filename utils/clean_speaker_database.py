@@ -6,19 +6,25 @@
 """
 
 import os
-import pickle
 import sys
 import time
-from typing import Dict, Any
 
-def load_speaker_database(db_path="memory/speaker_models.pkl"):
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.stt_module.speaker_store import SpeakerEmbeddingStore
+
+STORE_PATH = "memory/speaker_store"
+LEGACY_PATH = "memory/speaker_models.pkl"
+
+def open_speaker_store(store_path=STORE_PATH):
+    """開啟說話人嵌入存儲（舊版 pickle 會自動遷移）"""
+    return SpeakerEmbeddingStore(store_path, legacy_path=LEGACY_PATH)
+
+def load_speaker_database(store):
     """載入說話人資料庫"""
     try:
-        if os.path.exists(db_path):
-            with open(db_path, 'rb') as f:
-                data = pickle.load(f)
-                speaker_database = data.get('database', {})
-                speaker_counter = data.get('counter', 0)
+        if store.exists():
+            speaker_database, speaker_counter = store.load()
             print(f"載入說話人資料庫: {len(speaker_database)} 位說話人")
             return speaker_database, speaker_counter
         else:
@@ -28,25 +34,10 @@ def load_speaker_database(db_path="memory/speaker_models.pkl"):
         print(f"載入資料庫失敗: {e}")
         return {}, 0
 
-def save_speaker_database(speaker_database, speaker_counter, db_path="memory/speaker_models.pkl"):
-    """儲存說話人資料庫"""
-    try:
-        os.makedirs(os.path.dirname(db_path), exist_ok=True)
-        data = {
-            'database': speaker_database,
-            'counter': speaker_counter
-        }
-        with open(db_path, 'wb') as f:
-            pickle.dump(data, f)
-        print(f"儲存說話人資料庫: {len(speaker_database)} 位說話人")
-        return True
-    except Exception as e:
-        print(f"儲存資料庫失敗: {e}")
-        return False
-
 def clean_speaker_database(min_samples=15):
     """清理不符合最低樣本數閾值的語者"""
-    speaker_database, speaker_counter = load_speaker_database()
+    store = open_speaker_store()
+    speaker_database, speaker_counter = load_speaker_database(store)
     
     if not speaker_database:
         print("資料庫為空或無法載入")
@@ -83,16 +74,20 @@ def clean_speaker_database(min_samples=15):
         return
     
     # 創建備份
-    backup_path = f"memory/speaker_models_backup_{int(time.time())}.pkl"
-    save_speaker_database(speaker_database, speaker_counter, backup_path)
+    backup_path = f"{STORE_PATH}_backup_{int(time.time())}"
+    if not store.export(backup_path):
+        print("創建備份失敗，操作已取消")
+        return
     print(f"已創建備份: {backup_path}")
     
     # 移除語者
     for speaker_id in speakers_to_remove:
         del speaker_database[speaker_id]
     
-    # 保存更新後的資料庫
-    save_speaker_database(speaker_database, speaker_counter)
+    # 保存更新後的資料庫（重寫為不含已刪除樣本的新世代）
+    if not store.compact(speaker_database, speaker_counter):
+        print("儲存資料庫失敗")
+        return
     print(f"\n清理完成。剩餘 {len(speaker_database)} 位語者")
 
 if __name__ == "__main__":
@@ -1,5 +1,8 @@
 import re
 import asyncio
+import queue
+import threading
+import uuid
 from typing import List, Optional, Dict, Any
 from collections import deque
 import time
@@ -398,4 +401,168 @@ class TTSChunker:
         return {
             "is_playing": self.is_playing,
             "queue_length": len(self.queue)
-        }
\ No newline at end of file
+        }
+
+class StreamingTextChunker:
+    """
+    Incremental sentence chunker for text that arrives in pieces (e.g. streamed LLM output).
+
+    feed() returns the chunks completed by the new text; flush() returns whatever remains.
+    The first chunk is emitted as soon as it reaches first_min_chars so that speech can
+    start early; later chunks wait for min_chars to avoid choppy prosody.
+    """
+
+    # 中文標點直接視為句界；英文標點需後接空白才確認（避免 3.5、e.g. 被切斷）
+    _CJK_TERMINATORS = "。？！…"
+    _LATIN_TERMINATORS = ".!?"
+    _CLOSERS = "」』）》)]\"'"
+    _ABBREVIATIONS = ("e.g.", "i.e.", "etc.", "vs.", "mr.", "mrs.", "ms.", "dr.", "prof.")
+
+    def __init__(self,
+                 max_chars: int = 150,
+                 min_chars: int = 40,
+                 first_min_chars: int = 12):
+        self.max_chars = max_chars
+        self.min_chars = min_chars
+        self.first_min_chars = first_min_chars
+        self._splitter = TTSChunker(max_chars=max_chars, min_chars=0)
+        self._buffer = ""
+        self._scan_pos = 0
+        self.emitted_chunks = 0
+
+    def feed(self, text: str) -> List[str]:
+        """Append streamed text and return any chunks that are now complete"""
+        if not text:
+            return []
+        self._buffer += text
+        chunks = []
+
+        while True:
+            boundary = self._find_boundary()
+            if boundary is None:
+                break
+            chunk = self._buffer[:boundary].strip()
+            self._buffer = self._buffer[boundary:]
+            self._scan_pos = 0
+            if chunk:
+                chunks.append(chunk)
+                self.emitted_chunks += 1
+
+        # 沒有句界但已超長：用既有的語意切點分割，保留最後一段繼續累積
+        if len(self._buffer) > self.max_chars:
+            parts = self._splitter._smart_split_long_text(self._buffer.strip(), self.max_chars)
+            for part in parts[:-1]:
+                chunks.append(part)
+                self.emitted_chunks += 1
+            self._buffer = parts[-1] if parts else ""
+            self._scan_pos = 0
+
+        return chunks
+
+    def flush(self) -> List[str]:
+        """Return the remaining buffered text as final chunk(s)"""
+        remaining = self._buffer.strip()
+        self._buffer = ""
+        self._scan_pos = 0
+        if not remaining:
+            return []
+        chunks = self._splitter._smart_split_long_text(remaining, self.max_chars)
+        self.emitted_chunks += len(chunks)
+        return chunks
+
+    def _find_boundary(self) -> Optional[int]:
+        """Find the end index of the first complete sentence long enough to emit"""
+        threshold = self.first_min_chars if self.emitted_chunks == 0 else self.min_chars
+        buffer = self._buffer
+
+        i = self._scan_pos
+        while i < len(buffer):
+            ch = buffer[i]
+            end = None
+            if ch in self._CJK_TERMINATORS:
+                end = i + 1
+            elif ch in self._LATIN_TERMINATORS:
+                # 需要看到下一個字元才能確認
+                if i + 1 >= len(buffer):
+                    break
+                if buffer[i + 1].isspace() or buffer[i + 1] in self._CLOSERS:
+                    word = buffer[:i + 1].rsplit(None, 1)[-1].lower()
+                    if not word.endswith(self._ABBREVIATIONS):
+                        end = i + 1
+            if end is not None:
+                # 把緊接的收尾引號/括號併入本句
+                while end < len(buffer) and buffer[end] in self._CLOSERS:
+                    end += 1
+                if len(buffer[:end].strip()) >= threshold:
+                    return end
+            i += 1
+
+        # 下次從尚未確認的位置繼續掃描
+        self._scan_pos = i
+        return None
+
+
+class TextStream:
+    """
+    Thread-safe channel of text chunks between a producer (LLM) and a consumer (TTS).
+
+    Iterating blocks until the next chunk arrives and stops once the producer calls close().
+    """
+
+    _END = object()
+
+    def __init__(self, stream_id: Optional[str] = None):
+        self.stream_id = stream_id or uuid.uuid4().hex[:12]
+        self._queue: "queue.Queue" = queue.Queue()
+        self._done = threading.Event()
+        self.closed = False
+        self.error: Optional[str] = None
+        self.result: Optional[Dict[str, Any]] = None
+        self.created_at = time.time()
+        self.first_chunk_at: Optional[float] = None
+        self.chunk_count = 0
+        self.text_parts: List[str] = []
+
+    def put(self, chunk: str):
+        """Push one chunk (ignored after close)"""
+        if self.closed or not chunk:
+            return
+        if self.first_chunk_at is None:
+            self.first_chunk_at = time.time()
+        self.chunk_count += 1
+        self.text_parts.append(chunk)
+        self._queue.put(chunk)
+
+    def close(self, error: Optional[str] = None):
+        """Mark the end of the stream; error aborts consumers after queued chunks"""
+        if self.closed:
+            return
+        self.closed = True
+        self.error = error
+        self._queue.put(self._END)
+
+    def __iter__(self):
+        while True:
+            item = self._queue.get()
+            if item is self._END:
+                return
+            yield item
+
+    @property
+    def text(self) -> str:
+        """All text pushed so far"""
+        return " ".join(self.text_parts)
+
+    def set_result(self, result: Dict[str, Any]):
+        """Consumer reports the final result and releases waiters"""
+        self.result = result
+        self._done.set()
+
+    def wait(self, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """Wait for the consumer to finish; returns its result or None on timeout"""
+        self._done.wait(timeout)
+        return self.result
+
+    @property
+    def done(self) -> bool:
+        return self._done.is_set()